@@ -0,0 +1,5 @@
+"""Run the DocLens API: `python -m app --help` (see app.launcher)."""
+
+from app.launcher import main
+
+main()
@@ -0,0 +1,78 @@
+"""
+Client-disconnect and deadline handling for long-running route handlers.
+
+run_cancellable() runs an upstream-bound coroutine while watching the
+client connection. If the client goes away (tab closed, search
+superseded) or the request deadline passes, the coroutine is cancelled,
+which aborts the in-flight upstream HTTP request and frees its pool slot.
+"""
+
+import asyncio
+from typing import Awaitable, TypeVar
+
+from fastapi import HTTPException, Request
+
+from app.services.deadline import Deadline
+
+# Non-standard status (nginx convention) for "client closed request"
+CLIENT_CLOSED_REQUEST = 499
+
+T = TypeVar("T")
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    """
+    Return once the client has disconnected.
+
+    Only valid after the request body has been read (as it is for routes
+    taking a parsed body model): further ASGI receive() calls then block
+    until the server reports http.disconnect.
+    """
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def run_cancellable(
+    request: Request,
+    awaitable: Awaitable[T],
+    deadline: Deadline,
+) -> T:
+    """
+    Await `awaitable`, cancelling it on client disconnect or deadline.
+
+    Args:
+        request: The incoming request (used to detect disconnects).
+        awaitable: Work to run, typically a GroqService call.
+        deadline: Request deadline.
+
+    Returns:
+        The awaitable's result.
+
+    Raises:
+        HTTPException: 499 if the client disconnected, 504 on deadline.
+    """
+    task = asyncio.ensure_future(awaitable)
+    watcher = asyncio.create_task(_wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait(
+            {task, watcher},
+            timeout=deadline.remaining(),
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+        # Let cancelled work unwind so upstream connections are released
+        await asyncio.gather(watcher, task, return_exceptions=True)
+
+    if task in done:
+        return task.result()
+    if watcher in done:
+        raise HTTPException(
+            status_code=CLIENT_CLOSED_REQUEST,
+            detail="Client closed request",
+        )
+    raise HTTPException(status_code=504, detail="Request deadline exceeded")
@@ -0,0 +1,141 @@
+"""
+Shared FastAPI dependencies for route handlers.
+"""
+
+import asyncio
+import hashlib
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Callable
+
+from fastapi import HTTPException, Request
+
+from app.resources import AppResources
+from app.services.admission import AdmissionRejected
+from app.services.deadline import Deadline
+
+# Header a client can send to shorten a route's deadline (seconds)
+DEADLINE_HEADER = "X-Request-Timeout"
+
+# Optional header identifying the caller for fair scheduling
+CLIENT_ID_HEADER = "X-Client-Id"
+
+
+def get_resources(request: Request) -> AppResources:
+    """Return the lifespan-managed resources of the running app."""
+    return request.app.state.resources
+
+
+def request_deadline(route: str) -> Callable[[Request], Deadline]:
+    """
+    Build a dependency that creates the request's Deadline.
+
+    The route default comes from Settings.route_deadlines; a client may
+    ask for a shorter budget with the X-Request-Timeout header.
+
+    Args:
+        route: Key into Settings.route_deadlines (e.g. "search").
+    """
+
+    def dependency(request: Request) -> Deadline:
+        settings = get_resources(request).settings
+        seconds = settings.route_deadlines.get(route, settings.http_timeout)
+        header = request.headers.get(DEADLINE_HEADER)
+        if header:
+            try:
+                requested = float(header)
+            except ValueError:
+                requested = seconds
+            if requested > 0:
+                seconds = min(seconds, requested)
+        return Deadline(seconds)
+
+    return dependency
+
+
+def client_identity(request: Request, api_key: str | None = None) -> str:
+    """
+    Identify the caller for fair scheduling.
+
+    Client-supplied API keys identify the caller (hashed, never stored in
+    clear); otherwise the X-Client-Id header, then the client address.
+    """
+    if api_key and api_key.strip():
+        digest = hashlib.sha256(api_key.strip().encode("utf-8")).hexdigest()
+        return f"key:{digest[:16]}"
+    header = request.headers.get(CLIENT_ID_HEADER)
+    if header:
+        return f"client:{header[:64]}"
+    host = request.client.host if request.client else "unknown"
+    return f"ip:{host}"
+
+
+@asynccontextmanager
+async def admission_slot(
+    request: Request,
+    resources: AppResources,
+    api_key: str | None,
+    deadline: Deadline,
+) -> AsyncIterator[None]:
+    """
+    Hold an admission slot for an upstream-bound block of a route.
+
+    Raises:
+        HTTPException: 503 with Retry-After when the request is rejected.
+    """
+    try:
+        async with resources.admission.slot(
+            client_identity(request, api_key),
+            timeout=deadline.remaining(),
+        ):
+            yield
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=503,
+            detail=e.message,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+class SharedAdmissionSlot:
+    """
+    One admission slot for the concurrent upstream blocks of a request.
+
+    The first block to enter acquires the slot, blocks entering while it
+    is held join it, and the last one to leave releases it, so a route
+    running phases side by side (/analyze/progressive) counts as one
+    request.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        resources: AppResources,
+        api_key: str | None,
+        deadline: Deadline,
+    ):
+        self._slot = lambda: admission_slot(request, resources, api_key, deadline)
+        self._lock = asyncio.Lock()
+        self._holders = 0
+        self._held: AsyncExitStack | None = None
+
+    @asynccontextmanager
+    async def __call__(self) -> AsyncIterator[None]:
+        """
+        Hold the shared slot for the duration of the block.
+
+        Raises:
+            HTTPException: 503 with Retry-After when the request is rejected.
+        """
+        async with self._lock:
+            if self._holders == 0:
+                held = AsyncExitStack()
+                await held.enter_async_context(self._slot())
+                self._held = held
+            self._holders += 1
+        try:
+            yield
+        finally:
+            self._holders -= 1
+            if self._holders == 0:
+                held, self._held = self._held, None
+                await held.aclose()
@@ -0,0 +1,34 @@
+"""
+Mapping of service errors to HTTP responses.
+"""
+
+from fastapi import HTTPException
+
+from app.services.groq_service import GroqServiceError
+
+
+def groq_http_exception(e: GroqServiceError) -> HTTPException:
+    """
+    Translate a GroqServiceError into the HTTPException returned to clients.
+
+    Args:
+        e: Error raised by GroqService.
+
+    Returns:
+        HTTPException with a client-facing status and message.
+    """
+    status = e.status_code or 500
+    if status == 401:
+        return HTTPException(status_code=401, detail="Invalid API key")
+    if status == 429:
+        return HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded. Please wait and try again.",
+        )
+    if status == 400:
+        return HTTPException(status_code=400, detail=str(e.message))
+    if status in (502, 503):
+        return HTTPException(status_code=status, detail=str(e.message))
+    if status == 504:
+        return HTTPException(status_code=504, detail=str(e.message))
+    return HTTPException(status_code=500, detail=str(e.message))
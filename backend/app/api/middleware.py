@@ -0,0 +1,111 @@
+"""
+Request timing middleware.
+
+Adds a Server-Timing header with per-stage durations to every API
+response, logs requests slower than a threshold together with their
+stage timings, document size and token counts, and optionally profiles a
+sample of requests with cProfile, attaching the hottest functions to the
+slow-request log entry.
+
+Implemented as plain ASGI (not BaseHTTPMiddleware) so the route handler
+runs in the same context and sees the request's timings.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import pstats
+import random
+
+from app.config import Settings
+from app.services import timing
+
+slow_logger = logging.getLogger("app.slow_requests")
+
+# Functions listed in a profile summary
+PROFILE_TOP_FUNCTIONS = 15
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware recording stage timings for each HTTP request.
+    """
+
+    def __init__(self, app, settings: Settings):
+        self.app = app
+        self.slow_seconds = settings.slow_request_seconds
+        self.profile_sample_rate = settings.profile_sample_rate
+        self._profiling = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = timing.start_request()
+        status = {"code": 0}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.header_value().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profiler = self._maybe_start_profiler()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            profile = None
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+            elapsed = timings.elapsed()
+            if elapsed >= self.slow_seconds:
+                if profiler is not None:
+                    profile = _summarize(profiler)
+                self._log_slow(scope, status["code"], timings, elapsed, profile)
+
+    def _maybe_start_profiler(self) -> cProfile.Profile | None:
+        """
+        Start a profiler for a sampled request.
+
+        Only one profile runs at a time per worker. The profiler sees the
+        whole event-loop thread, so work interleaved from concurrent
+        requests shows up in the summary too.
+        """
+        if self._profiling or self.profile_sample_rate <= 0:
+            return None
+        if random.random() >= self.profile_sample_rate:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (e.g. a debugger) is already active
+            return None
+        self._profiling = True
+        return profiler
+
+    def _log_slow(self, scope, status_code, timings, elapsed, profile) -> None:
+        entry = {
+            "method": scope.get("method"),
+            "path": scope.get("path"),
+            "status": status_code,
+            "total_ms": round(elapsed * 1000, 1),
+            "stages_ms": {k: round(v * 1000, 1) for k, v in timings.stages.items()},
+            **timings.annotations,
+        }
+        if profile:
+            entry["profile"] = profile
+        slow_logger.warning("slow request %s", json.dumps(entry))
+
+
+def _summarize(profiler: cProfile.Profile) -> str:
+    """Return the top functions by cumulative time as text."""
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    return out.getvalue()
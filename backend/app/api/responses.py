@@ -0,0 +1,21 @@
+"""
+Pre-serialized JSON responses.
+
+A route that declares a response_model and returns a model or dict is
+validated and serialized again by FastAPI after the handler returns,
+outside the route's "serialize" timing stage. json_response serializes
+an already validated model once, where the route calls it; FastAPI sends
+the returned Response as-is and response_model only documents the schema.
+"""
+
+from fastapi import Response
+from pydantic import BaseModel
+
+
+def json_response(model: BaseModel, status_code: int = 200) -> Response:
+    """Serialize model to an application/json Response."""
+    return Response(
+        content=model.model_dump_json(),
+        status_code=status_code,
+        media_type="application/json",
+    )
@@ -2,74 +2,497 @@
 Document analysis API routes.
 
 Handles requests to analyze documents via the Groq API and return
-structured analysis sections. Uses GROQ_API_KEY from env when client
-does not provide an api_key.
+structured analysis sections, parsed server-side into typed fields. Uses
+GROQ_API_KEY from env when client does not provide an api_key. Dates,
+amounts, parties and similar figures are extracted locally (see
+entity_extractor), returned as `entities` and merged into
+NAMED_ENTITIES, so the model writes less of that section. Documents
+longer than the analysis window keep their most salient chunks (see
+salience) rather than only their head. The route runs that selection
+and entity extraction off the event loop for large documents
+(AppResources.offload). /analyze/progressive streams a quick summary
+from the fast model first and the full analysis after it.
 """
 
-from fastapi import APIRouter, HTTPException
+import asyncio
+import logging
+from typing import AsyncIterator
 
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from app.api.cancellation import run_cancellable
+from app.api.deps import (
+    SharedAdmissionSlot,
+    admission_slot,
+    get_resources,
+    request_deadline,
+)
+from app.api.errors import groq_http_exception
+from app.api.responses import json_response
 from app.config import get_groq_api_key
-from app.models.schemas import AnalyzeRequest
+from app.models.schemas import (
+    AnalysisErrorEvent,
+    AnalysisResultEvent,
+    AnalysisSections,
+    AnalysisSummaryEvent,
+    AnalyzeRequest,
+    AnalyzeResponse,
+)
+from app.resources import AppResources
+from app.services.analysis_parser import (
+    SECTIONS,
+    format_sections,
+    parse_section,
+    split_sections,
+)
+from app.services import timing
+from app.services.cache import content_hash
+from app.services.deadline import Deadline
+from app.services.entity_extractor import extract_entities, format_entities, merge_entities
 from app.services.groq_service import GroqService, GroqServiceError
 
 # Maximum characters to send to the model (context limit safety)
 MAX_CHARS = 24000
 
+# Characters of the compressed document the fast summary of
+# /analyze/progressive reads
+PREVIEW_CHARS = 6000
+
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+# A cached section: raw labeled body and its parsed value
+CachedSection = tuple[str, object]
+
+
+def prepare_text(text: str) -> tuple[str, bool]:
+    """Limit text to what is sent to the model; returns (text, truncated)."""
+    if len(text) > MAX_CHARS:
+        return text[:MAX_CHARS], True
+    return text, False
+
 
-@router.post("/analyze")
-async def analyze_document(request: AnalyzeRequest):
+def prepare_document(
+    resources: AppResources,
+    text: str,
+    document_type: str,
+) -> tuple[str, bool]:
     """
-    Analyze a document and return structured sections.
+    Text of a document as sent to the model; returns (text, truncated).
 
-    The analysis includes: Executive Summary, Key Points, Critical Flags,
-    Named Entities, and Recommended Actions. Output format is tailored
-    to the document type (contracts, research, business, general).
+    Documents over MAX_CHARS keep their most salient chunks (see
+    salience) unless Settings.analysis_selection is "head".
+    """
+    if len(text) <= MAX_CHARS or resources.settings.analysis_selection == "head":
+        return prepare_text(text)
+    return resources.salient_text(text, document_type, MAX_CHARS), True
+
+
+async def aprepare_document(
+    resources: AppResources,
+    text: str,
+    document_type: str,
+) -> tuple[str, bool]:
+    """prepare_document() with salience selection off the event loop."""
+    if len(text) <= MAX_CHARS or resources.settings.analysis_selection == "head":
+        return prepare_text(text)
+    return await resources.asalient_text(text, document_type, MAX_CHARS), True
+
+
+def sections_key(resources: AppResources, text: str, document_type: str) -> str:
+    """Analysis cache key of a prepared document."""
+    settings = resources.settings
+    return content_hash(
+        text, document_type, settings.groq_model_analysis, settings.local_entities
+    )
+
+
+def local_entities(resources: AppResources, text: str) -> dict[str, list[str]] | None:
+    """Entities extracted locally from text (None when disabled)."""
+    if resources.settings.local_entities == "off":
+        return None
+    with timing.stage("entities"):
+        return extract_entities(text)
+
+
+async def alocal_entities(
+    resources: AppResources,
+    text: str,
+) -> dict[str, list[str]] | None:
+    """local_entities() with large documents scanned off the event loop."""
+    if resources.settings.local_entities == "off":
+        return None
+    return await resources.offload("entities", len(text), extract_entities, text)
+
+
+def model_sections(resources: AppResources, labels: list[str]) -> list[str]:
+    """Sections the model writes (NAMED_ENTITIES is local-only in "replace" mode)."""
+    if resources.settings.local_entities == "replace":
+        return [label for label in labels if label != "NAMED_ENTITIES"]
+    return labels
+
+
+def entity_hints(
+    resources: AppResources,
+    entities: dict[str, list[str]] | None,
+) -> dict[str, list[str]] | None:
+    """Entities to pass to the model with the document, if any."""
+    return entities if resources.settings.local_entities == "hint" else None
 
-    Args:
-        request: AnalyzeRequest with document_text, document_type, api_key (optional).
+
+def with_local_entities(
+    found: dict[str, CachedSection],
+    labels: list[str],
+    entities: dict[str, list[str]] | None,
+) -> tuple[dict[str, CachedSection], bool]:
+    """
+    Merge local entities into NAMED_ENTITIES when it was requested.
 
     Returns:
-        Raw analysis text with labeled sections.
+        The sections (in SECTIONS order) and whether anything was merged.
+    """
+    if not entities or "NAMED_ENTITIES" not in labels:
+        return found, False
+    model = found.get("NAMED_ENTITIES")
+    merged = merge_entities(model[1] if model else None, entities)
+    found = {**found, "NAMED_ENTITIES": (format_entities(merged), merged)}
+    return {label: found[label] for label in SECTIONS if label in found}, True
 
-    Raises:
-        HTTPException: On invalid API key, rate limit, or other Groq errors.
+
+def cached_sections(
+    resources: AppResources,
+    doc_key: str,
+    labels: list[str],
+) -> dict[str, CachedSection | None]:
+    """Look up sections in the analysis cache (None when not cached)."""
+    cache = resources.analysis_cache
+    return {label: cache.get((doc_key, label)) for label in labels}
+
+
+def store_sections(
+    resources: AppResources,
+    doc_key: str,
+    labels: list[str],
+    result: str,
+) -> dict[str, CachedSection]:
+    """
+    Parse the requested sections out of model output and cache them.
+
+    Returns:
+        The sections that were present in the output.
     """
-    api_key = get_groq_api_key(request.api_key)
+    raw_sections = split_sections(result)
+    stored = {}
+    for label in labels:
+        body = raw_sections.get(label)
+        if body is not None:
+            stored[label] = (body, parse_section(label, body))
+            resources.analysis_cache.set((doc_key, label), stored[label])
+    return stored
+
+
+def analysis_service(
+    resources: AppResources,
+    api_key: str,
+    request_key: str | None,
+    deadline: Deadline,
+) -> GroqService:
+    """GroqService for an analysis request."""
+    return GroqService(
+        api_key=api_key,
+        client=resources.http_client,
+        settings=resources.settings,
+        deadline=deadline,
+        latency=resources.upstream_latency,
+        metrics=resources.metrics,
+        pool=resources.upstream_for(request_key),
+    )
+
+
+def require_api_key(resources: AppResources, request_key: str | None) -> str:
+    """The Groq API key to use; 401 when neither side has one."""
+    api_key = get_groq_api_key(request_key, resources.settings)
     if not api_key:
         raise HTTPException(
             status_code=401,
             detail="No API key provided. Set GROQ_API_KEY in .env or send api_key in request.",
         )
+    return api_key
+
+
+async def full_analysis(
+    request: AnalyzeRequest,
+    http_request: Request,
+    resources: AppResources,
+    deadline: Deadline,
+    api_key: str,
+    slot: SharedAdmissionSlot | None = None,
+) -> AnalyzeResponse:
+    """
+    The /analyze response for a request (see analyze_document).
+
+    The upstream call holds an admission slot of its own, or `slot` when
+    given.
+
+    Raises:
+        HTTPException: On rate limit, deadline, disconnect or Groq errors.
+    """
+    text, truncated = await aprepare_document(
+        resources, request.document_text, request.document_type
+    )
+    # Over the whole document: figures past the truncation point still count
+    entities = await alocal_entities(resources, request.document_text)
+
+    requested = [label for label in SECTIONS if label in (request.sections or SECTIONS)]
+    doc_key = sections_key(resources, text, request.document_type)
+    cached = cached_sections(resources, doc_key, model_sections(resources, requested))
+    missing = [label for label, entry in cached.items() if entry is None]
+
+    if missing:
+        precompute_key = content_hash(request.document_text, request.document_type)
+        if resources.precompute.pending(precompute_key) is not None:
+            # Disconnect or deadline stops the wait, not the background
+            # job; it keeps warming the cache
+            await run_cancellable(
+                http_request, resources.precompute.wait(precompute_key), deadline
+            )
+            cached = cached_sections(resources, doc_key, list(cached))
+            missing = [label for label, entry in cached.items() if entry is None]
+
+    result = None
+    if missing:
+        try:
+            service = analysis_service(resources, api_key, request.api_key, deadline)
+            async with slot() if slot else admission_slot(
+                http_request, resources, request.api_key, deadline
+            ):
+                result = await run_cancellable(
+                    http_request,
+                    service.analyze_document(
+                        document_text=text,
+                        document_type=request.document_type,
+                        sections=missing,
+                        entity_hints=entity_hints(resources, entities),
+                    ),
+                    deadline,
+                )
+        except GroqServiceError as e:
+            raise groq_http_exception(e)
+
+        with timing.stage("response_parse"):
+            cached.update(store_sections(resources, doc_key, missing, result))
+
+    found = {label: entry for label, entry in cached.items() if entry is not None}
+    found, merged = with_local_entities(found, requested, entities)
+    # Raw model output is returned as-is when it answered the whole request
+    if result is None or merged or len(missing) < len(requested):
+        result = format_sections({label: body for label, (body, _) in found.items()})
+
+    return AnalyzeResponse(
+        analysis=result,
+        sections=AnalysisSections(
+            **{label.lower(): parsed for label, (_, parsed) in found.items()}
+        ),
+        truncated=truncated,
+        entities=entities,
+    )
+
+
+async def preview_summary(
+    request: AnalyzeRequest,
+    http_request: Request,
+    resources: AppResources,
+    deadline: Deadline,
+    api_key: str,
+    slot: SharedAdmissionSlot | None = None,
+) -> AnalysisSummaryEvent:
+    """
+    A quick executive summary: the cached full one, or the fast model's
+    over at most PREVIEW_CHARS of the document's most salient text.
+
+    The fast summary is parsed and cached like any analysis section,
+    under its own key (compressed text and fast model). Its upstream call
+    holds `slot` when given, as full_analysis does.
+
+    Raises:
+        HTTPException: On rate limit, deadline, disconnect or Groq errors.
+    """
+    settings = resources.settings
+    document_type = request.document_type
+    text, _ = await aprepare_document(resources, request.document_text, document_type)
+    doc_key = sections_key(resources, text, document_type)
+    entry = cached_sections(resources, doc_key, ["EXECUTIVE_SUMMARY"])["EXECUTIVE_SUMMARY"]
+    if entry is not None:
+        return AnalysisSummaryEvent(
+            executive_summary=entry[1],
+            model=settings.groq_model_analysis,
+            compressed=len(request.document_text) > MAX_CHARS,
+        )
 
-    # Truncate if necessary
     text = request.document_text
-    truncated = False
-    if len(text) > MAX_CHARS:
-        text = text[:MAX_CHARS]
-        truncated = True
+    compressed = len(text) > PREVIEW_CHARS
+    if compressed:
+        if settings.analysis_selection == "head":
+            text = text[:PREVIEW_CHARS]
+        else:
+            text = await resources.asalient_text(text, document_type, PREVIEW_CHARS)
+    preview_key = content_hash(text, document_type, settings.groq_model_fast)
+    entry = cached_sections(resources, preview_key, ["EXECUTIVE_SUMMARY"])["EXECUTIVE_SUMMARY"]
+    if entry is None:
+        try:
+            service = analysis_service(resources, api_key, request.api_key, deadline)
+            async with slot() if slot else admission_slot(
+                http_request, resources, request.api_key, deadline
+            ):
+                result = await run_cancellable(
+                    http_request,
+                    service.analyze_document(
+                        document_text=text,
+                        document_type=document_type,
+                        sections=["EXECUTIVE_SUMMARY"],
+                        model=settings.groq_model_fast,
+                    ),
+                    deadline,
+                )
+        except GroqServiceError as e:
+            raise groq_http_exception(e)
+        with timing.stage("response_parse"):
+            stored = store_sections(resources, preview_key, ["EXECUTIVE_SUMMARY"], result)
+        entry = stored.get("EXECUTIVE_SUMMARY") or (result, result.strip())
+    return AnalysisSummaryEvent(
+        executive_summary=entry[1],
+        model=settings.groq_model_fast,
+        compressed=compressed,
+    )
+
+
+@router.post("/analyze", response_model=AnalyzeResponse)
+async def analyze_document(
+    request: AnalyzeRequest,
+    http_request: Request,
+    resources: AppResources = Depends(get_resources),
+    deadline: Deadline = Depends(request_deadline("analyze")),
+):
+    """
+    Analyze a document and return structured sections.
+
+    The analysis includes: Executive Summary, Key Points, Critical Flags,
+    Named Entities, and Recommended Actions. Output format is tailored
+    to the document type (contracts, research, business, general).
+    Callers may request a subset via `sections`; the prompt and token
+    budget shrink to match. Locally extracted entities are returned in
+    `entities` and merged into NAMED_ENTITIES. Documents longer than
+    MAX_CHARS are cut down to their most salient chunks. Parsed sections
+    are cached per document and section, so only sections not seen before
+    are generated (NAMED_ENTITIES is never sent to the model when
+    Settings.local_entities is "replace"); if the document is still being
+    precomputed after /documents/open, that work is awaited instead of
+    being repeated, unless it is still queued for an admission slot.
+
+    The upstream call is bounded by the route deadline (X-Request-Timeout
+    may shorten it) and cancelled if the client disconnects.
+
+    Args:
+        request: AnalyzeRequest with document_text, document_type,
+            sections (optional), api_key (optional).
 
+    Returns:
+        AnalyzeResponse with labeled analysis text, parsed sections and
+        the truncation flag.
+
+    Raises:
+        HTTPException: On invalid API key, rate limit, deadline, or other Groq errors.
+    """
+    timing.mark_parsed()
+    timing.annotate("document_chars", len(request.document_text))
+    api_key = require_api_key(resources, request.api_key)
+    response = await full_analysis(request, http_request, resources, deadline, api_key)
+    with timing.stage("serialize"):
+        return json_response(response)
+
+
+@router.post("/analyze/progressive")
+async def analyze_progressive(
+    request: AnalyzeRequest,
+    http_request: Request,
+    resources: AppResources = Depends(get_resources),
+    deadline: Deadline = Depends(request_deadline("analyze")),
+):
+    """
+    Analyze a document in two phases, streamed as NDJSON events.
+
+    Both phases start at once. The first event (AnalysisSummaryEvent) is
+    an executive summary from the fast model over a compressed document,
+    usually within about a second; the second (AnalysisResultEvent) is
+    exactly what /analyze returns. A phase that fails is reported as an
+    AnalysisErrorEvent (with its phase) in its place; clients should treat
+    only an analysis-phase error as fatal. If the full analysis finishes
+    first (e.g. it was cached), the summary is taken from it. Both phases
+    read and fill the analysis cache, and share one admission slot.
+
+    Args:
+        request: AnalyzeRequest, as for /analyze.
+
+    Returns:
+        application/x-ndjson stream of one summary and one analysis (or
+        error) event.
+
+    Raises:
+        HTTPException: 401 when no API key is available.
+    """
+    timing.mark_parsed()
+    timing.annotate("document_chars", len(request.document_text))
+    api_key = require_api_key(resources, request.api_key)
+    slot = SharedAdmissionSlot(http_request, resources, request.api_key, deadline)
+    args = (request, http_request, resources, deadline, api_key, slot)
+
+    async def events() -> AsyncIterator[str]:
+        full = asyncio.create_task(full_analysis(*args))
+        preview = asyncio.create_task(preview_summary(*args))
+        try:
+            await asyncio.wait({full, preview}, return_when=asyncio.FIRST_COMPLETED)
+            event = None
+            if full.done() and full.exception() is None:
+                result = full.result()
+                summary = result.sections.executive_summary
+                if summary is not None:
+                    preview.cancel()
+                    event = AnalysisSummaryEvent(
+                        executive_summary=summary,
+                        model=resources.settings.groq_model_analysis,
+                        compressed=result.truncated,
+                    )
+            if event is None:
+                event = await _event(preview, "summary")
+            yield event.model_dump_json() + "\n"
+            result = await _event(full, "analysis")
+            if isinstance(result, AnalyzeResponse):
+                result = AnalysisResultEvent(**dict(result))
+            yield result.model_dump_json() + "\n"
+        finally:
+            for task in (full, preview):
+                task.cancel()
+            await asyncio.gather(full, preview, return_exceptions=True)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+async def _event(task: asyncio.Task, phase: str):
+    """
+    A phase's result, or an AnalysisErrorEvent if it failed.
+
+    Any failure of the summary phase becomes an event (500 for unexpected
+    errors), since the stream has already started and a lost preview
+    must not cut off the analysis.
+    """
     try:
-        service = GroqService(api_key=api_key)
-        result = await service.analyze_document(
-            document_text=text,
-            document_type=request.document_type,
-        )
-    except GroqServiceError as e:
-        status = e.status_code or 500
-        if status == 401:
-            raise HTTPException(status_code=401, detail="Invalid API key")
-        if status == 429:
-            raise HTTPException(
-                status_code=429,
-                detail="Rate limit exceeded. Please wait and try again.",
-            )
-        if status == 400:
-            raise HTTPException(status_code=400, detail=str(e.message))
-        raise HTTPException(status_code=500, detail=str(e.message))
-
-    return {
-        "analysis": result,
-        "truncated": truncated,
-    }
+        return await task
+    except HTTPException as e:
+        return AnalysisErrorEvent(phase=phase, status_code=e.status_code, detail=str(e.detail))
+    except Exception:
+        if phase != "summary":
+            raise
+        logger.exception("Progressive summary failed")
+        return AnalysisErrorEvent(phase=phase, status_code=500, detail="Summary failed")
@@ -0,0 +1,216 @@
+"""
+Corpus search API routes.
+
+Documents added to the corpus are chunked and indexed into the sharded
+inverted index (see CorpusIndex); /corpus/search queries every document
+at once and returns the best chunks with their document ids. Lexical
+matches can optionally be re-ranked by the LLM. /corpus/snapshot
+persists the index as memory-mapped segments (see CORPUS_DIR).
+"""
+
+import asyncio
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from app.api.cancellation import run_cancellable
+from app.api.deps import admission_slot, get_resources, request_deadline
+from app.api.errors import groq_http_exception
+from app.api.responses import json_response
+from app.config import get_groq_api_key
+from app.models.schemas import (
+    CorpusDocumentInfo,
+    CorpusDocumentRequest,
+    CorpusSearchHit,
+    CorpusSearchRequest,
+    CorpusSearchResponse,
+)
+from app.resources import AppResources
+from app.services import timing
+from app.services.deadline import Deadline
+from app.services.groq_service import GroqService, GroqServiceError
+
+router = APIRouter()
+
+
+@router.post("/corpus/documents", response_model=CorpusDocumentInfo, status_code=201)
+async def add_corpus_document(
+    request: CorpusDocumentRequest,
+    resources: AppResources = Depends(get_resources),
+):
+    """
+    Chunk a document and index it into the corpus.
+
+    Indexing is incremental: only the document's own shard is updated,
+    and a document sent again under the same id replaces the old version.
+
+    Args:
+        request: CorpusDocumentRequest with document_text and optional
+            document_id.
+
+    Returns:
+        CorpusDocumentInfo with the document id and chunk count.
+    """
+    timing.mark_parsed()
+    timing.annotate("document_chars", len(request.document_text))
+    document_id = request.document_id or uuid.uuid4().hex
+    chunks = resources.chunk(request.document_text)
+    if not chunks:
+        raise HTTPException(status_code=422, detail="Document is empty.")
+    with timing.stage("index"):
+        resources.corpus.add_document(document_id, chunks)
+    return CorpusDocumentInfo(document_id=document_id, total_chunks=len(chunks))
+
+
+@router.delete("/corpus/documents/{document_id}", status_code=204)
+async def delete_corpus_document(
+    document_id: str,
+    resources: AppResources = Depends(get_resources),
+):
+    """
+    Remove a document from the corpus.
+
+    Raises:
+        HTTPException: 404 if the document is not indexed.
+    """
+    resources.corpus.refresh()
+    if not resources.corpus.remove_document(document_id):
+        raise HTTPException(status_code=404, detail="Document not found")
+
+
+@router.get("/corpus/stats")
+async def corpus_stats(resources: AppResources = Depends(get_resources)):
+    """Corpus size: documents, chunks, shards, terms and postings bytes."""
+    resources.corpus.refresh()
+    return resources.corpus.stats()
+
+
+@router.post("/corpus/snapshot")
+async def snapshot_corpus(resources: AppResources = Depends(get_resources)):
+    """
+    Write the corpus to its segment files and remap them.
+
+    Documents indexed since the last snapshot move from the heap into the
+    memory-mapped segments, merged with what other workers have saved
+    (see CorpusIndex.save). Runs on the worker pool.
+
+    Raises:
+        HTTPException: 409 if no CORPUS_DIR is configured.
+    """
+    corpus = resources.corpus
+    if corpus.directory is None:
+        raise HTTPException(status_code=409, detail="Corpus persistence is not configured (CORPUS_DIR).")
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(resources.executor, corpus.save)
+    return corpus.stats()
+
+
+@router.post("/corpus/search", response_model=CorpusSearchResponse)
+async def search_corpus(
+    request: CorpusSearchRequest,
+    http_request: Request,
+    resources: AppResources = Depends(get_resources),
+    deadline: Deadline = Depends(request_deadline("corpus_search")),
+):
+    """
+    Search every corpus document for the query.
+
+    Shards are scored with corpus-wide BM25 statistics (on the worker
+    pool for large corpora), and their top hits are merged. Segments
+    other workers have saved since are remapped first. With `rerank`, the
+    lexical hits are scored by the LLM and only the chunks it judges
+    relevant are returned, in its order.
+
+    Args:
+        request: CorpusSearchRequest with query, top_k, rerank and
+            api_key (optional).
+
+    Returns:
+        CorpusSearchResponse with hits (document id, chunk index, score,
+        text) and corpus size.
+
+    Raises:
+        HTTPException: 401 when re-ranking without an API key, or mapped
+            Groq errors.
+    """
+    timing.mark_parsed()
+    corpus = resources.corpus
+    api_key = None
+    if request.rerank:
+        api_key = get_groq_api_key(request.api_key, resources.settings)
+        if not api_key:
+            raise HTTPException(
+                status_code=401,
+                detail="No API key provided. Set GROQ_API_KEY in .env or send api_key in request.",
+            )
+
+    with timing.stage("retrieve"):
+        corpus.refresh()
+        hits = await corpus.asearch(request.query, request.top_k, resources.executor)
+
+    results = []
+    for hit in hits:
+        text = corpus.chunk_text(hit.document_id, hit.chunk_index)
+        if text is not None:
+            results.append(
+                CorpusSearchHit(
+                    document_id=hit.document_id,
+                    chunk_index=hit.chunk_index,
+                    score=round(hit.score, 4),
+                    chunk_text=text,
+                )
+            )
+
+    if request.rerank and results:
+        try:
+            service = GroqService(
+                api_key=api_key,
+                client=resources.http_client,
+                settings=resources.settings,
+                deadline=deadline,
+                latency=resources.upstream_latency,
+                metrics=resources.metrics,
+                pool=resources.upstream_for(request.api_key),
+            )
+            # Hits from different documents can share a chunk index, so
+            # they are numbered by position for the model
+            passages = [
+                {"index": position, "text": hit.chunk_text}
+                for position, hit in enumerate(results)
+            ]
+            async with admission_slot(
+                http_request, resources, request.api_key, deadline
+            ):
+                scored = await run_cancellable(
+                    http_request,
+                    service.score_chunks(
+                        passages, request.query, service.models["search"]
+                    ),
+                    deadline,
+                )
+        except GroqServiceError as e:
+            raise groq_http_exception(e)
+
+        reranked = []
+        seen = set()
+        for r in scored:
+            if 0 <= r["chunkIndex"] < len(results) and r["chunkIndex"] not in seen:
+                seen.add(r["chunkIndex"])
+                reranked.append(
+                    results[r["chunkIndex"]].model_copy(update={
+                        "relevance_score": r["relevanceScore"],
+                        "reason": r["reason"],
+                    })
+                )
+        results = reranked
+
+    with timing.stage("serialize"):
+        return json_response(
+            CorpusSearchResponse(
+                results=results,
+                query=request.query,
+                total_documents=len(corpus),
+                total_chunks=corpus.total_chunks,
+                reranked=request.rerank,
+            )
+        )
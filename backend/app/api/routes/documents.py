@@ -0,0 +1,534 @@
+"""
+Document ingestion API routes.
+
+Accepts raw document text as a streamed request body and chunks it while
+the upload is still in flight, so no full copy of the document is ever
+materialized as one string. Chunks are registered in the document store
+under a new document id, which follow-up questions refer to.
+
+Registered documents carry a summary tree (chunk, section and document
+summaries, built on demand and kept), which drill-down summaries,
+analysis of documents larger than one prompt, and coarse-to-fine search
+use instead of re-reading the full text.
+"""
+
+import re
+from typing import AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from app.api.cancellation import run_cancellable
+from app.api.deps import admission_slot, get_resources, request_deadline
+from app.api.errors import groq_http_exception
+from app.api.responses import json_response
+from app.api.routes.analysis import (
+    MAX_CHARS,
+    alocal_entities,
+    cached_sections,
+    entity_hints,
+    model_sections,
+    prepare_text,
+    sections_key,
+    store_sections,
+    with_local_entities,
+)
+from app.api.routes.search import build_result_items
+from app.config import get_groq_api_key
+from app.models.schemas import (
+    AnalysisSections,
+    AskRequest,
+    AskResponse,
+    DocumentAnalyzeRequest,
+    DocumentAnalyzeResponse,
+    DocumentInfo,
+    DocumentSearchRequest,
+    SearchResponse,
+    SummaryNodeInfo,
+    SummaryTreeRequest,
+    SummaryTreeResponse,
+)
+from app.resources import AppResources
+from app.services import timing
+from app.services.analysis_parser import SECTIONS, format_sections
+from app.services.deadline import Deadline
+from app.services.document_store import StoredDocument
+from app.services.groq_service import GroqService, GroqServiceError
+from app.services.summary_tree import SummaryNode, SummaryTree, document_text
+
+# Maximum upload size in bytes (about 25x the analyze/search inline limit)
+MAX_INGEST_BYTES = 5_000_000
+
+# Chunks retrieved as context for each question
+QA_CONTEXT_CHUNKS = 4
+
+# Previous turns forwarded upstream (oldest are dropped first)
+QA_MAX_HISTORY_TURNS = 6
+
+_CITATION_RE = re.compile(r"\[(\d+)\]")
+
+router = APIRouter()
+
+
+async def _limited_stream(
+    request: Request,
+    counter: dict,
+) -> AsyncIterator[bytes]:
+    """Yield body bytes, rejecting uploads larger than MAX_INGEST_BYTES."""
+    async for data in request.stream():
+        counter["bytes"] += len(data)
+        if counter["bytes"] > MAX_INGEST_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Document exceeds {MAX_INGEST_BYTES} bytes.",
+            )
+        yield data
+
+
+@router.post("/documents/ingest", status_code=201, response_model=DocumentInfo)
+async def ingest_document(
+    request: Request,
+    resources: AppResources = Depends(get_resources),
+):
+    """
+    Stream a plain-text document into the document store.
+
+    The body is decoded incrementally as UTF-8 and fed word by word into
+    the chunker; each chunk is stored as soon as its window fills.
+
+    Args:
+        request: Raw request whose body is the document text.
+
+    Returns:
+        DocumentInfo with the new document_id and chunk/word counts.
+    """
+    counter = {"bytes": 0}
+    document_store = resources.document_store
+    document = document_store.create()
+    body = _limited_stream(request, counter)
+    async for chunk in resources.chunk_service.aiter_chunks(body):
+        document.add_chunk(chunk)
+
+    if not document.chunks:
+        raise HTTPException(status_code=422, detail="Document is empty.")
+
+    document.total_bytes = counter["bytes"]
+    timing.annotate("document_bytes", document.total_bytes)
+    document_store.put(document)
+    return DocumentInfo(
+        document_id=document.document_id,
+        total_chunks=len(document.chunks),
+        total_words=document.total_words,
+        total_bytes=document.total_bytes,
+    )
+
+
+@router.get("/documents/{document_id}", response_model=DocumentInfo)
+async def get_document(
+    document_id: str,
+    resources: AppResources = Depends(get_resources),
+):
+    """
+    Return metadata for a registered document.
+
+    Raises:
+        HTTPException: 404 if the document is unknown or was evicted.
+    """
+    document = resources.document_store.get(document_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return DocumentInfo(
+        document_id=document.document_id,
+        total_chunks=len(document.chunks),
+        total_words=document.total_words,
+        total_bytes=document.total_bytes,
+    )
+
+
+@router.post("/documents/{document_id}/ask", response_model=AskResponse)
+async def ask_document(
+    document_id: str,
+    request: AskRequest,
+    http_request: Request,
+    resources: AppResources = Depends(get_resources),
+    deadline: Deadline = Depends(request_deadline("ask")),
+):
+    """
+    Answer a question about a registered document.
+
+    Only the few chunks most relevant to the question (BM25 over the
+    stored chunks) are sent, so each follow-up costs a bounded number of
+    tokens regardless of document size. The prompt prefix (system prompt
+    plus document overview) is identical for every question on the same
+    document, letting upstream prompt caching apply.
+
+    Args:
+        document_id: Id returned by /documents/ingest.
+        request: AskRequest with question, history, api_key (optional).
+
+    Returns:
+        AskResponse with the answer and the chunk indexes it cites.
+
+    Raises:
+        HTTPException: 404 for unknown documents, 401 without API key,
+            or mapped Groq errors.
+    """
+    timing.mark_parsed()
+    document = resources.document_store.get(document_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    timing.annotate("document_words", document.total_words)
+
+    api_key = get_groq_api_key(request.api_key, resources.settings)
+    if not api_key:
+        raise HTTPException(
+            status_code=401,
+            detail="No API key provided. Set GROQ_API_KEY in .env or send api_key in request.",
+        )
+
+    with timing.stage("retrieve"):
+        top = document.scorer().top(request.question, QA_CONTEXT_CHUNKS)
+    context_indexes = sorted(idx for idx, _ in top)
+    if not context_indexes:
+        context_indexes = [c["index"] for c in document.chunks[:QA_CONTEXT_CHUNKS]]
+    excerpts = [document.chunks[idx] for idx in context_indexes]
+    history = [t.model_dump() for t in request.history[-QA_MAX_HISTORY_TURNS:]]
+
+    try:
+        service = GroqService(
+            api_key=api_key,
+            client=resources.http_client,
+            settings=resources.settings,
+            deadline=deadline,
+            latency=resources.upstream_latency,
+            metrics=resources.metrics,
+            pool=resources.upstream_for(request.api_key),
+        )
+        async with admission_slot(
+            http_request, resources, request.api_key, deadline
+        ):
+            answer = await run_cancellable(
+                http_request,
+                service.answer_question(
+                    document_overview=document.overview(),
+                    excerpts=excerpts,
+                    question=request.question,
+                    history=history,
+                ),
+                deadline,
+            )
+    except GroqServiceError as e:
+        raise groq_http_exception(e)
+
+    allowed = set(context_indexes)
+    citations = sorted({
+        int(m) for m in _CITATION_RE.findall(answer) if int(m) in allowed
+    })
+    return AskResponse(
+        answer=answer,
+        citations=citations,
+        context_chunks=context_indexes,
+    )
+
+
+def _registered(resources: AppResources, document_id: str) -> StoredDocument:
+    document = resources.document_store.get(document_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return document
+
+
+def _tree_node(tree: SummaryTree, level: int | None, index: int) -> SummaryNode:
+    node = tree.node(level, index)
+    if node is None:
+        raise HTTPException(status_code=404, detail="Summary node not found")
+    return node
+
+
+def _node_info(node: SummaryNode) -> SummaryNodeInfo:
+    return SummaryNodeInfo(
+        level=node.level,
+        index=node.index,
+        chunk_start=node.chunk_start,
+        chunk_end=node.chunk_end,
+        summary=node.summary,
+    )
+
+
+async def _summarize(
+    service: GroqService,
+    resources: AppResources,
+    document: StoredDocument,
+    nodes: list[SummaryNode],
+) -> int:
+    """Fill in the summaries of nodes (and their subtrees) that are missing."""
+    return await document.tree().build(
+        nodes,
+        document.chunks,
+        service.summarize_chunk,
+        service.summarize_parts,
+        concurrency=resources.settings.summary_concurrency,
+    )
+
+
+@router.post("/documents/{document_id}/summary", response_model=SummaryTreeResponse)
+async def summarize_document(
+    document_id: str,
+    request: SummaryTreeRequest,
+    http_request: Request,
+    resources: AppResources = Depends(get_resources),
+    deadline: Deadline = Depends(request_deadline("summary")),
+):
+    """
+    Return a node of the document's summary tree with its children.
+
+    Without level the root (whole document) is returned; level 1 nodes
+    are sections of up to eight chunks, level 0 single chunks. Only the
+    missing summaries of the requested subtree are generated; the rest
+    come from the tree stored with the document.
+
+    Args:
+        document_id: Id returned by /documents/ingest.
+        request: SummaryTreeRequest with level, index, api_key (optional).
+
+    Returns:
+        SummaryTreeResponse with the node, its children and how many
+        summaries this request generated.
+
+    Raises:
+        HTTPException: 404 for unknown documents or nodes, 401 without
+            API key, or mapped Groq errors.
+    """
+    timing.mark_parsed()
+    document = _registered(resources, document_id)
+    timing.annotate("document_words", document.total_words)
+    api_key = get_groq_api_key(request.api_key, resources.settings)
+    if not api_key:
+        raise HTTPException(
+            status_code=401,
+            detail="No API key provided. Set GROQ_API_KEY in .env or send api_key in request.",
+        )
+    tree = document.tree()
+    node = _tree_node(tree, request.level, request.index)
+
+    generated = 0
+    if node.summary is None:
+        try:
+            service = GroqService(
+                api_key=api_key,
+                client=resources.http_client,
+                settings=resources.settings,
+                deadline=deadline,
+                latency=resources.upstream_latency,
+                metrics=resources.metrics,
+                pool=resources.upstream_for(request.api_key),
+            )
+            async with admission_slot(
+                http_request, resources, request.api_key, deadline
+            ):
+                generated = await run_cancellable(
+                    http_request,
+                    _summarize(service, resources, document, [node]),
+                    deadline,
+                )
+        except GroqServiceError as e:
+            raise groq_http_exception(e)
+
+    return SummaryTreeResponse(
+        document_id=document.document_id,
+        depth=tree.depth,
+        node=_node_info(node),
+        children=[_node_info(child) for child in node.children],
+        generated=generated,
+    )
+
+
+@router.post("/documents/{document_id}/analyze", response_model=DocumentAnalyzeResponse)
+async def analyze_registered_document(
+    document_id: str,
+    request: DocumentAnalyzeRequest,
+    http_request: Request,
+    resources: AppResources = Depends(get_resources),
+    deadline: Deadline = Depends(request_deadline("summary")),
+):
+    """
+    Analyze a registered document, or one node of its summary tree.
+
+    A part whose text fits the analysis window is analyzed from its text;
+    a larger one from the summaries of its children, so nothing is cut
+    off. Sections are cached like /analyze results.
+
+    Args:
+        document_id: Id returned by /documents/ingest.
+        request: DocumentAnalyzeRequest with document_type, sections,
+            level, index, api_key (optional).
+
+    Returns:
+        DocumentAnalyzeResponse with the analysis, the chunk range it
+        covers and whether it was generated from text or summaries.
+    """
+    timing.mark_parsed()
+    document = _registered(resources, document_id)
+    timing.annotate("document_words", document.total_words)
+    api_key = get_groq_api_key(request.api_key, resources.settings)
+    if not api_key:
+        raise HTTPException(
+            status_code=401,
+            detail="No API key provided. Set GROQ_API_KEY in .env or send api_key in request.",
+        )
+    node = _tree_node(document.tree(), request.level, request.index)
+    requested = [label for label in SECTIONS if label in (request.sections or SECTIONS)]
+    chunks = document.chunks[node.chunk_start:node.chunk_end]
+    # Rejoining and scanning a whole large document run off the event loop
+    text = await resources.offload(
+        "join", sum(len(chunk["text"]) for chunk in chunks), document_text, chunks
+    )
+    source = "text" if len(text) <= MAX_CHARS else "summaries"
+    entities = await alocal_entities(resources, text)
+
+    async def analyze(service: GroqService) -> tuple[dict, str | None]:
+        analyzed = text
+        if source == "summaries":
+            await _summarize(service, resources, document, node.children)
+            analyzed = "\n\n".join(
+                f"PART {child.index + 1} (chunks {child.chunk_start}-{child.chunk_end - 1})\n"
+                f"{child.summary}"
+                for child in node.children
+            )
+        analyzed, _ = prepare_text(analyzed)
+        doc_key = sections_key(resources, analyzed, request.document_type)
+        cached = cached_sections(resources, doc_key, model_sections(resources, requested))
+        missing = [label for label, entry in cached.items() if entry is None]
+        result = None
+        if missing:
+            result = await service.analyze_document(
+                document_text=analyzed,
+                document_type=request.document_type,
+                sections=missing,
+                entity_hints=entity_hints(resources, entities),
+            )
+            cached.update(store_sections(resources, doc_key, missing, result))
+            if len(missing) < len(requested):
+                result = None
+        return cached, result
+
+    try:
+        service = GroqService(
+            api_key=api_key,
+            client=resources.http_client,
+            settings=resources.settings,
+            deadline=deadline,
+            latency=resources.upstream_latency,
+            metrics=resources.metrics,
+            pool=resources.upstream_for(request.api_key),
+        )
+        async with admission_slot(
+            http_request, resources, request.api_key, deadline
+        ):
+            cached, result = await run_cancellable(
+                http_request, analyze(service), deadline
+            )
+    except GroqServiceError as e:
+        raise groq_http_exception(e)
+
+    found = {label: entry for label, entry in cached.items() if entry is not None}
+    found, merged = with_local_entities(found, requested, entities)
+    if result is None or merged:
+        result = format_sections({label: body for label, (body, _) in found.items()})
+    return DocumentAnalyzeResponse(
+        analysis=result,
+        sections=AnalysisSections(
+            **{label.lower(): parsed for label, (_, parsed) in found.items()}
+        ),
+        truncated=False,
+        entities=entities,
+        source=source,
+        chunk_start=node.chunk_start,
+        chunk_end=node.chunk_end,
+    )
+
+
+@router.post("/documents/{document_id}/search", response_model=SearchResponse)
+async def search_registered_document(
+    document_id: str,
+    request: DocumentSearchRequest,
+    http_request: Request,
+    resources: AppResources = Depends(get_resources),
+    deadline: Deadline = Depends(request_deadline("summary")),
+):
+    """
+    Coarse-to-fine search in a registered document.
+
+    The fast model picks the sections whose summaries match the query;
+    only their chunks are scored by the search model. Documents with no
+    more sections than top_sections are scored chunk by chunk directly.
+    When no section matches, BM25 picks the candidates instead.
+
+    Args:
+        document_id: Id returned by /documents/ingest.
+        request: DocumentSearchRequest with query, top_sections, api_key
+            (optional).
+
+    Returns:
+        SearchResponse (mode "tree") with ranked chunk results.
+    """
+    timing.mark_parsed()
+    document = _registered(resources, document_id)
+    timing.annotate("document_words", document.total_words)
+    api_key = get_groq_api_key(request.api_key, resources.settings)
+    if not api_key:
+        raise HTTPException(
+            status_code=401,
+            detail="No API key provided. Set GROQ_API_KEY in .env or send api_key in request.",
+        )
+    chunks = document.chunks
+    sections = document.tree().sections
+
+    async def search(service: GroqService) -> list[dict]:
+        candidates = chunks
+        if len(sections) > request.top_sections:
+            await _summarize(service, resources, document, sections)
+            ranked = await service.score_chunks(
+                [{"index": s.index, "text": s.summary} for s in sections],
+                request.query,
+                service.models["fast"],
+            )
+            picked = [
+                sections[r["chunkIndex"]]
+                for r in ranked[: request.top_sections]
+                if 0 <= r["chunkIndex"] < len(sections)
+            ]
+            if picked:
+                wanted = {i for s in picked for i in range(s.chunk_start, s.chunk_end)}
+            else:
+                with timing.stage("retrieve"):
+                    top = document.scorer().top(request.query, service.cascade_candidates)
+                wanted = {idx for idx, _ in top}
+            candidates = [c for c in chunks if c["index"] in wanted] or chunks
+        return await service.score_chunks(candidates, request.query, service.models["search"])
+
+    try:
+        service = GroqService(
+            api_key=api_key,
+            client=resources.http_client,
+            settings=resources.settings,
+            deadline=deadline,
+            latency=resources.upstream_latency,
+            metrics=resources.metrics,
+            pool=resources.upstream_for(request.api_key),
+        )
+        async with admission_slot(
+            http_request, resources, request.api_key, deadline
+        ):
+            raw_results = await run_cancellable(http_request, search(service), deadline)
+    except GroqServiceError as e:
+        raise groq_http_exception(e)
+
+    with timing.stage("serialize"):
+        return json_response(
+            SearchResponse(
+                results=build_result_items(raw_results, chunks),
+                total_chunks=len(chunks),
+                query=request.query,
+                mode="tree",
+            )
+        )
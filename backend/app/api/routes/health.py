@@ -1,10 +1,13 @@
 """
-Health check and config endpoints for monitoring and client configuration.
+Health check, metrics and config endpoints for monitoring and client
+configuration.
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
+from app.api.deps import get_resources
 from app.config import has_server_api_key
+from app.resources import AppResources
 
 router = APIRouter()
 
@@ -21,9 +24,20 @@ async def health_check():
 
 
 @router.get("/config")
-async def get_config():
+async def get_config(resources: AppResources = Depends(get_resources)):
     """
     Return client configuration (e.g. whether server has API key).
     Frontend uses this to decide if user needs to enter an API key.
     """
-    return {"hasApiKey": has_server_api_key()}
+    return {"hasApiKey": has_server_api_key(resources.settings)}
+
+
+@router.get("/metrics")
+async def get_metrics(resources: AppResources = Depends(get_resources)):
+    """
+    Return this worker's metrics (admission queue depth, wait times, ...).
+
+    Returns:
+        Dict with counters, gauges and summaries.
+    """
+    return resources.metrics.snapshot()
@@ -0,0 +1,179 @@
+"""
+Document-opened API routes.
+
+The frontend calls POST /documents/open as soon as a document is loaded,
+before the user has asked for anything. The call returns at once and
+starts low-priority background work whose results land in the caches
+the real requests read: chunks, the BM25 index and near-duplicate
+clusters (/search, /search/batch) and, when asked for and there is spare
+upstream capacity, the analysis sections (/analyze).
+DELETE /documents/open/{document_key} abandons it.
+"""
+
+import asyncio
+from contextlib import AsyncExitStack
+
+from fastapi import APIRouter, Depends, Request, Response
+
+from app.api.deps import client_identity, get_resources
+from app.api.routes.analysis import (
+    cached_sections,
+    entity_hints,
+    local_entities,
+    model_sections,
+    prepare_document,
+    sections_key,
+    store_sections,
+)
+from app.config import get_groq_api_key
+from app.models.schemas import DocumentOpenRequest, DocumentOpenResponse
+from app.resources import AppResources
+from app.services import timing
+from app.services.analysis_parser import SECTIONS
+from app.services.cache import content_hash
+from app.services.deadline import Deadline
+from app.services.groq_service import GroqService
+from app.services.upstream_pool import UpstreamPool
+
+# Admission identity shared by all background analysis
+PRECOMPUTE_CLIENT = "precompute"
+
+router = APIRouter()
+
+
+async def precompute_document(
+    resources: AppResources,
+    key: str,
+    text: str,
+    document_type: str,
+    api_key: str | None,
+    pool: UpstreamPool | None = None,
+) -> None:
+    """
+    Warm the caches for a document.
+
+    Chunking, the BM25 build and duplicate detection run on the worker
+    pool. The analysis is generated only with an API key and when
+    admission has at least half of its slots free and nobody waiting; it
+    then competes for a slot at precompute_weight, so user requests keep
+    priority. While it waits for that slot, /analyze does not wait for
+    it (PrecomputeManager.wait).
+
+    Args:
+        resources: Application resources.
+        key: Document key of the job.
+        text: Full document text.
+        document_type: Document type the analysis is generated for.
+        api_key: Resolved Groq API key; None skips the analysis.
+        pool: Upstream pool for the analysis call (server-side keys).
+    """
+    loop = asyncio.get_running_loop()
+    # Builds (and caches) the chunks on the way
+    await loop.run_in_executor(resources.executor, resources.lexical_index, text)
+    await loop.run_in_executor(resources.executor, resources.duplicate_clusters, text)
+    if api_key is None:
+        return
+
+    prepared, _ = await loop.run_in_executor(
+        resources.executor, prepare_document, resources, text, document_type
+    )
+    doc_key = sections_key(resources, prepared, document_type)
+    cached = cached_sections(resources, doc_key, model_sections(resources, list(SECTIONS)))
+    missing = [label for label, entry in cached.items() if entry is None]
+    if not missing:
+        return
+
+    admission = resources.admission
+    if admission.queue_depth or admission.headroom * 2 < admission.max_concurrency:
+        resources.metrics.inc("precompute.analysis_deferred")
+        return
+
+    entities = await loop.run_in_executor(resources.executor, local_entities, resources, text)
+    settings = resources.settings
+    deadline = Deadline(settings.route_deadlines.get("precompute", settings.http_timeout))
+    service = GroqService(
+        api_key=api_key,
+        client=resources.http_client,
+        settings=settings,
+        deadline=deadline,
+        latency=resources.upstream_latency,
+        metrics=resources.metrics,
+        pool=pool,
+    )
+    async with AsyncExitStack() as stack:
+        with resources.precompute.queued(key):
+            await stack.enter_async_context(
+                admission.slot(
+                    PRECOMPUTE_CLIENT, deadline.remaining(), weight=settings.precompute_weight
+                )
+            )
+        result = await service.analyze_document(
+            document_text=prepared,
+            document_type=document_type,
+            sections=missing,
+            entity_hints=entity_hints(resources, entities),
+        )
+    store_sections(resources, doc_key, missing, result)
+
+
+@router.post("/documents/open", status_code=202, response_model=DocumentOpenResponse)
+async def open_document(
+    request: DocumentOpenRequest,
+    http_request: Request,
+    resources: AppResources = Depends(get_resources),
+):
+    """
+    Start precomputing a document the client has just opened.
+
+    Returns immediately. Each client (X-Client-Id header, else address)
+    has one job at a time: opening another document cancels the previous
+    one unless another client has it open. When too many jobs are
+    running nothing is started ("busy") and requests simply compute on
+    demand.
+
+    Args:
+        request: DocumentOpenRequest with document_text, document_type,
+            precompute_analysis, api_key (optional).
+
+    Returns:
+        DocumentOpenResponse with the document_key (for cancellation)
+        and whether the job was started.
+    """
+    timing.mark_parsed()
+    timing.annotate("document_chars", len(request.document_text))
+    api_key = None
+    if request.precompute_analysis:
+        api_key = get_groq_api_key(request.api_key, resources.settings)
+
+    key = content_hash(request.document_text, request.document_type)
+    # Not by API key: DELETE has no body, and must name the same client
+    status = resources.precompute.start(
+        key,
+        client_identity(http_request),
+        lambda: precompute_document(
+            resources,
+            key,
+            request.document_text,
+            request.document_type,
+            api_key,
+            resources.upstream_for(request.api_key),
+        ),
+    )
+    return DocumentOpenResponse(document_key=key, status=status)
+
+
+@router.delete("/documents/open/{document_key}", status_code=204)
+async def close_document(
+    document_key: str,
+    http_request: Request,
+    resources: AppResources = Depends(get_resources),
+):
+    """
+    Cancel the background work of an abandoned document.
+
+    The job is cancelled only when the caller is the last client with the
+    document open. Cached results that are already complete are kept.
+    Unknown or finished keys are accepted, so the call is safe to repeat.
+    """
+    resources.precompute.cancel(document_key, client_identity(http_request))
+    return Response(status_code=204)
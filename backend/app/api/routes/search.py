@@ -3,27 +3,55 @@ Semantic search API routes.
 
 Handles requests to search within a document using LLM-based
 semantic similarity rather than keyword matching. Uses GROQ_API_KEY
-from env when client does not provide an api_key.
+from env when client does not provide an api_key. /search/batch answers
+a list of queries against the same document with shared upstream calls.
+Near-duplicate chunks are scored once per cluster (see near_duplicates)
+and the share skipped is reported as dedup_ratio. Small /search calls
+can share upstream requests with concurrent ones (see search_batcher).
+With SEARCH_CARDS, balanced /search ranks cached chunk cards instead of
+full chunk text (see chunk_cards).
+Chunking, indexing and de-duplication of large documents run off the
+event loop (AppResources.offload).
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 
+from app.api.cancellation import run_cancellable
+from app.api.deps import admission_slot, client_identity, get_resources, request_deadline
+from app.api.errors import groq_http_exception
 from app.config import get_groq_api_key
-from app.models.schemas import SearchRequest, SearchResultItem
-from app.services.chunk_service import ChunkService
+from app.models.schemas import (
+    BatchQueryResult,
+    BatchSearchRequest,
+    BatchSearchResponse,
+    SearchRequest,
+    SearchResultItem,
+)
+from app.resources import AppResources
+from app.services import timing
+from app.services.chunk_cards import build_cards
+from app.services.deadline import Deadline
 from app.services.groq_service import GroqService, GroqServiceError
+from app.services.lexical_service import LexicalScorer
+from app.services.near_duplicates import DuplicateClusters
 
 router = APIRouter()
-chunk_service = ChunkService()
 
 
 @router.post("/search")
-async def semantic_search(request: SearchRequest):
+async def semantic_search(
+    request: SearchRequest,
+    http_request: Request,
+    resources: AppResources = Depends(get_resources),
+    deadline: Deadline = Depends(request_deadline("search")),
+):
     """
     Perform semantic search within a document.
 
     Chunks the document, sends chunks and query to the LLM, and returns
-    ranked results with relevance scores and explanations.
+    ranked results with relevance scores and explanations. The upstream
+    call is bounded by the route deadline and cancelled if the client
+    disconnects.
 
     Args:
         request: SearchRequest with document_text, query, api_key (optional).
@@ -31,57 +59,227 @@ async def semantic_search(request: SearchRequest):
     Returns:
         SearchResponse with results, total_chunks, and query.
     """
-    api_key = get_groq_api_key(request.api_key)
+    timing.mark_parsed()
+    timing.annotate("document_chars", len(request.document_text))
+    api_key = get_groq_api_key(request.api_key, resources.settings)
     if not api_key:
         raise HTTPException(
             status_code=401,
             detail="No API key provided. Set GROQ_API_KEY in .env or send api_key in request.",
         )
 
-    # Chunk the document
-    chunks = chunk_service.chunk(request.document_text)
+    # Chunk the document (cached per document content)
+    chunks = await resources.achunk(request.document_text)
 
     if not chunks:
         return {
             "results": [],
             "total_chunks": 0,
             "query": request.query,
+            "mode": request.mode,
+            "dedup_ratio": 0.0,
         }
 
+    # BM25 recall is only used by the cheaper modes (cached per document)
+    scorer = None
+    if request.mode != "thorough":
+        scorer = await resources.alexical_index(request.document_text)
+    clusters = await resources.aduplicate_clusters(request.document_text)
+    dedup_ratio = record_dedup(resources, clusters)
+
     try:
-        service = GroqService(api_key=api_key)
-        raw_results = await service.semantic_search(
-            chunks=chunks,
-            query=request.query,
+        service = GroqService(
+            api_key=api_key,
+            client=resources.http_client,
+            settings=resources.settings,
+            deadline=deadline,
+            latency=resources.upstream_latency,
+            metrics=resources.metrics,
+            pool=resources.upstream_for(request.api_key),
+            batcher=resources.search_batcher,
+            client_id=client_identity(http_request, request.api_key),
         )
+        async with admission_slot(
+            http_request, resources, request.api_key, deadline
+        ):
+            raw_results = await run_cancellable(
+                http_request,
+                search_document(
+                    resources, service, chunks, request.query, request.mode, scorer, clusters
+                ),
+                deadline,
+            )
     except GroqServiceError as e:
-        status = e.status_code or 500
-        if status == 401:
-            raise HTTPException(status_code=401, detail="Invalid API key")
-        if status == 429:
-            raise HTTPException(
-                status_code=429,
-                detail="Rate limit exceeded. Please wait and try again.",
+        raise groq_http_exception(e)
+
+    with timing.stage("serialize"):
+        results = build_result_items(raw_results, chunks)
+        return {
+            "results": [r.model_dump() for r in results],
+            "total_chunks": len(chunks),
+            "query": request.query,
+            "mode": request.mode,
+            "dedup_ratio": dedup_ratio,
+        }
+
+
+@router.post("/search/batch")
+async def batch_search(
+    request: BatchSearchRequest,
+    http_request: Request,
+    resources: AppResources = Depends(get_resources),
+    deadline: Deadline = Depends(request_deadline("search_batch")),
+):
+    """
+    Answer several queries against one document in one pass.
+
+    The document is chunked once, each query is prefiltered locally, and
+    queries are packed into shared upstream calls (see
+    GroqService.batch_search), so a checklist of N queries costs far
+    fewer prompts than N calls to /search.
+
+    Args:
+        request: BatchSearchRequest with document_text, queries, prefilter,
+            api_key (optional).
+
+    Returns:
+        BatchSearchResponse with per-query results and total_chunks.
+    """
+    timing.mark_parsed()
+    timing.annotate("document_chars", len(request.document_text))
+    api_key = get_groq_api_key(request.api_key, resources.settings)
+    if not api_key:
+        raise HTTPException(
+            status_code=401,
+            detail="No API key provided. Set GROQ_API_KEY in .env or send api_key in request.",
+        )
+
+    chunks = await resources.achunk(request.document_text)
+    if not chunks:
+        return {
+            "results": [
+                {"query": query, "results": []} for query in request.queries
+            ],
+            "total_chunks": 0,
+            "dedup_ratio": 0.0,
+        }
+
+    scorer = None
+    if request.prefilter:
+        scorer = await resources.alexical_index(request.document_text)
+    clusters = await resources.aduplicate_clusters(request.document_text)
+    dedup_ratio = record_dedup(resources, clusters)
+
+    try:
+        service = GroqService(
+            api_key=api_key,
+            client=resources.http_client,
+            settings=resources.settings,
+            deadline=deadline,
+            latency=resources.upstream_latency,
+            metrics=resources.metrics,
+            pool=resources.upstream_for(request.api_key),
+        )
+        async with admission_slot(
+            http_request, resources, request.api_key, deadline
+        ):
+            per_query = await run_cancellable(
+                http_request,
+                service.batch_search(
+                    chunks=chunks,
+                    queries=request.queries,
+                    prefilter=request.prefilter,
+                    scorer=scorer,
+                    clusters=clusters,
+                ),
+                deadline,
             )
-        raise HTTPException(status_code=500, detail=str(e.message))
+    except GroqServiceError as e:
+        raise groq_http_exception(e)
+
+    with timing.stage("serialize"):
+        response = BatchSearchResponse(
+            results=[
+                BatchQueryResult(query=query, results=build_result_items(raw, chunks))
+                for query, raw in zip(request.queries, per_query)
+            ],
+            total_chunks=len(chunks),
+            dedup_ratio=dedup_ratio,
+        )
+        return response.model_dump()
+
+
+async def search_document(
+    resources: AppResources,
+    service: GroqService,
+    chunks: list[dict],
+    query: str,
+    mode: str,
+    scorer: LexicalScorer | None,
+    clusters: DuplicateClusters | None,
+) -> list[dict]:
+    """
+    Run semantic_search, over chunk cards when SEARCH_CARDS is on.
+
+    Cards are used by the balanced mode only (thorough reads every chunk
+    in full); missing ones (one per near-duplicate cluster) are written
+    first and cached.
+    """
+    cards = None
+    if resources.settings.search_cards and mode == "balanced":
+        represented = clusters.representatives(chunks) if clusters else chunks
+        cards = await build_cards(
+            service,
+            represented,
+            resources.card_cache,
+            batch_size=resources.settings.card_batch_size,
+        )
+    return await service.semantic_search(
+        chunks=chunks,
+        query=query,
+        mode=mode,
+        scorer=scorer,
+        clusters=clusters,
+        cards=cards,
+    )
+
+
+def record_dedup(resources: AppResources, clusters: DuplicateClusters | None) -> float:
+    """Report a request's near-duplicate ratio (timing, metrics); return it."""
+    if clusters is None:
+        return 0.0
+    ratio = round(clusters.ratio, 4)
+    timing.annotate("dedup_ratio", ratio)
+    resources.metrics.observe("search.dedup_ratio", ratio)
+    resources.metrics.inc("search.deduplicated_chunks", clusters.duplicates)
+    return ratio
+
+
+def build_result_items(
+    raw_results: list[dict],
+    chunks: list[dict],
+) -> list[SearchResultItem]:
+    """
+    Attach chunk text to raw LLM results, dropping unknown chunk indexes.
+
+    Args:
+        raw_results: Dicts with chunkIndex, relevanceScore, reason.
+        chunks: Chunks the results refer to.
 
-    # Build response with chunk text for each result
+    Returns:
+        SearchResultItem list in the order of raw_results.
+    """
+    by_index = {c["index"]: c for c in chunks}
     results = []
     for r in raw_results:
-        idx = r["chunkIndex"]
-        chunk = next((c for c in chunks if c["index"] == idx), None)
+        chunk = by_index.get(r["chunkIndex"])
         if chunk:
             results.append(
                 SearchResultItem(
-                    chunk_index=idx,
+                    chunk_index=r["chunkIndex"],
                     relevance_score=r["relevanceScore"],
                     reason=r["reason"],
                     chunk_text=chunk["text"],
                 )
             )
-
-    return {
-        "results": [r.model_dump() for r in results],
-        "total_chunks": len(chunks),
-        "query": request.query,
-    }
+    return results
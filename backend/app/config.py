@@ -3,25 +3,208 @@ Application configuration and secrets management.
 
 Loads environment variables from .env file (gitignored). The GROQ_API_KEY
 is never committed to version control. All modules should import from here
-to access the API key.
+to access the API key and runtime settings.
 """
 
 from functools import lru_cache
 from pathlib import Path
+from typing import Literal
 
+from pydantic import BaseModel, Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from dotenv import load_dotenv
 
-# Load .env from backend directory or project root (before Settings reads env)
-_env_path = Path(__file__).resolve().parent.parent / ".env"
-load_dotenv(dotenv_path=_env_path)
-load_dotenv(dotenv_path=Path(__file__).resolve().parent.parent.parent / ".env")
+# .env locations: backend directory first, then project root
+_ENV_PATHS = (
+    Path(__file__).resolve().parent.parent / ".env",
+    Path(__file__).resolve().parent.parent.parent / ".env",
+)
+
+
+class UpstreamEndpoint(BaseModel):
+    """An extra OpenAI-compatible chat completions endpoint for the pool."""
+
+    endpoint: str
+    # Local servers usually accept any bearer token
+    api_key: str = "none"
+    name: str | None = None
+    # Model names to substitute on this endpoint (e.g. a local stand-in)
+    models: dict[str, str] = {}
 
 
 class Settings(BaseSettings):
     """Application settings loaded from environment."""
 
     groq_api_key: str | None = None
+    groq_endpoint: str = "https://api.groq.com/openai/v1/chat/completions"
+
+    # Server-side upstream pool: extra Groq keys (JSON list) and other
+    # endpoints (JSON list of UpstreamEndpoint). Calls from clients that
+    # send their own api_key bypass the pool.
+    groq_api_keys: list[str] = []
+    upstream_endpoints: list[UpstreamEndpoint] = []
+    # Consecutive failures that take a pool member out, and how long
+    # before it is probed again (seconds)
+    upstream_failure_threshold: int = 3
+    upstream_cooldown_seconds: float = 30.0
+
+    # Model routing per task
+    groq_model_analysis: str = "llama-3.3-70b-versatile"
+    groq_model_search: str = "llama-3.3-70b-versatile"
+    groq_model_qa: str = "llama-3.3-70b-versatile"
+    groq_model_fast: str = "llama-3.1-8b-instant"
+    # Ask for JSON-mode (response_format) output when scoring search results
+    groq_json_mode: bool = True
+
+    # Chunks the search cascade passes from recall to re-ranking
+    search_cascade_candidates: int = 8
+
+    # Score one chunk per cluster of near-duplicate chunks (MinHash/LSH)
+    # and copy its result to the rest; threshold is shingle Jaccard
+    search_dedup: bool = True
+    dedup_threshold: float = 0.8
+
+    # List consecutive chunks in search prompts without their shared
+    # overlap words, so overlapping text is sent once
+    search_overlap_free: bool = True
+
+    # Chunk cards (one-line synopsis, key terms, entities per chunk): with
+    # search_cards, balanced /search ranks the cards and scores the full
+    # text of the search_card_hits best chunks only (thorough still scores
+    # every chunk in full). Missing cards are written by the fast model
+    # (card_batch_size chunks per call) on first search and cached by
+    # chunk content (card_cache_size cards)
+    search_cards: bool = False
+    search_card_hits: int = 3
+    card_batch_size: int = 8
+    card_cache_size: int = 16384
+
+    # Micro-batch small /search scoring calls across requests: calls over
+    # at most search_batch_max_chars of chunk text are held up to
+    # search_batch_window_ms and packed (up to search_batch_max_size) into
+    # one upstream prompt
+    search_microbatch: bool = False
+    search_batch_window_ms: float = 5.0
+    search_batch_max_size: int = 8
+    search_batch_max_chars: int = 6000
+
+    # Shared upstream HTTP connection pool
+    http_timeout: float = 60.0
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+
+    # Open a connection to the Groq endpoint at startup (DNS + TLS warm-up)
+    prewarm_upstream: bool = False
+
+    # Default request deadline per route (seconds); clients may shorten it
+    # with the X-Request-Timeout header
+    route_deadlines: dict[str, float] = {
+        "analyze": 60.0,
+        "search": 30.0,
+        "search_batch": 60.0,
+        "ask": 30.0,
+        "corpus_search": 30.0,
+        "precompute": 60.0,
+        "summary": 120.0,
+    }
+
+    # Send a second upstream request when the first is slower than the
+    # recent p95 latency; the first response wins
+    hedge_upstream: bool = False
+    hedge_min_samples: int = 20
+
+    # Admission control for Groq-backed routes (per worker)
+    admission_max_concurrency: int = 32
+    admission_max_queue: int = 128
+    admission_queue_timeout: float = 10.0
+    # Relative share per client identity ("key:<hash>", "client:<id>", "ip:<addr>");
+    # weights must be positive
+    admission_weights: dict[str, float] = {}
+
+    # Worker threads for CPU-bound work kept off the event loop
+    executor_workers: int = 4
+    # Chunking, indexing, de-duplication, salience selection and entity
+    # extraction of documents of at least offload_min_chars run on a
+    # thread or process pool (executor_workers) instead of the event loop
+    offload_executor: Literal["thread", "process"] = "thread"
+    offload_min_chars: int = 50_000
+
+    # Event-loop lag monitor: delay is sampled every loop_monitor_interval
+    # seconds (loop.lag_ms), and a stall over loop_block_warn_seconds is
+    # logged with the stack of the blocking call
+    loop_monitor: bool = True
+    loop_monitor_interval: float = 0.05
+    loop_block_warn_seconds: float = 0.1
+
+    # Launcher (python -m app): web_workers 0 runs one worker per CPU as
+    # long as each gets worker_memory_mb; a worker is recycled after
+    # max_requests (+ up to max_requests_jitter; 0 disables) requests and
+    # gets graceful_timeout seconds to finish in-flight requests on stop
+    server_host: str = "127.0.0.1"
+    server_port: int = 8000
+    web_workers: int = 0
+    worker_memory_mb: int = 512
+    max_requests: int = 100_000
+    max_requests_jitter: int = 10_000
+    graceful_timeout: float = 30.0
+    # Import the app before forking workers (shared copy-on-write)
+    preload_app: bool = True
+    access_log: bool = False
+
+    # Requests slower than this are logged with their stage timings
+    slow_request_seconds: float = 2.0
+    # Fraction of requests run under cProfile (0 disables); profiles are
+    # attached to the slow-request log entry
+    profile_sample_rate: float = 0.0
+
+    # Shards of the corpus inverted index (per worker)
+    corpus_shards: int = 8
+    # Directory for memory-mapped corpus segments (unset: in-memory only).
+    # Loaded on startup, saved on shutdown and by /api/corpus/snapshot
+    corpus_dir: str | None = None
+
+    # Entries kept in the in-process chunk cache (keyed by document hash)
+    chunk_cache_size: int = 128
+
+    # Parsed analysis sections kept in memory (one entry per document+section)
+    analysis_cache_size: int = 1024
+
+    # What /analyze keeps of documents longer than its window: the most
+    # salient chunks in document order ("salience") or the head ("head")
+    analysis_selection: Literal["head", "salience"] = "salience"
+
+    # Locally extracted dates, amounts, percentages, durations, defined
+    # terms and parties: "hint" passes them to the model so NAMED_ENTITIES
+    # only adds people and organizations, "replace" skips the model for
+    # NAMED_ENTITIES, "off" disables extraction
+    local_entities: Literal["off", "hint", "replace"] = "hint"
+
+    # Summary tree calls (chunk/section summaries) in flight per request
+    summary_concurrency: int = 8
+
+    # Background precompute jobs (POST /api/documents/open) running at
+    # once, and their fair-share admission weight relative to users (1.0)
+    precompute_max_tasks: int = 4
+    precompute_weight: float = Field(0.25, gt=0)
+
+    # Vite build directory (frontend/dist) to serve from this app in
+    # production; unset when the frontend is served separately
+    frontend_dir: str | None = None
+
+    cors_origins: list[str] = [
+        "http://localhost:3000",
+        "http://localhost:5173",
+        "http://localhost:5000",
+    ]
+
+    @field_validator("admission_weights")
+    @classmethod
+    def _positive_weights(cls, weights: dict[str, float]) -> dict[str, float]:
+        """Reject weights admission could not divide by."""
+        for client_id, weight in weights.items():
+            if weight <= 0:
+                raise ValueError(f"admission weight of {client_id!r} must be > 0")
+        return weights
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -30,25 +213,42 @@ class Settings(BaseSettings):
     )
 
 
+def load_env_files() -> None:
+    """Load .env files into the process environment (existing vars win)."""
+    for path in _ENV_PATHS:
+        load_dotenv(dotenv_path=path)
+
+
 @lru_cache
 def get_settings() -> Settings:
-    """Cached settings instance."""
+    """Cached settings instance. Loads .env files on first call."""
+    load_env_files()
     return Settings()
 
 
-def get_groq_api_key(request_key: str | None = None) -> str | None:
+def get_groq_api_key(
+    request_key: str | None = None,
+    settings: Settings | None = None,
+) -> str | None:
     """
     Return the Groq API key to use for requests.
 
-    Priority: request_key (from client) > GROQ_API_KEY env var.
-    Returns None if neither is set.
+    Priority: request_key (from client) > GROQ_API_KEY env var > the
+    first server-side pool member. Returns None if none is set.
     """
     if request_key and request_key.strip():
         return request_key.strip()
-    settings = get_settings()
-    return settings.groq_api_key
+    settings = settings or get_settings()
+    if settings.groq_api_key:
+        return settings.groq_api_key
+    # Server-side pool without GROQ_API_KEY: calls go through the pool
+    if settings.groq_api_keys:
+        return settings.groq_api_keys[0]
+    if settings.upstream_endpoints:
+        return settings.upstream_endpoints[0].api_key
+    return None
 
 
-def has_server_api_key() -> bool:
-    """Return True if the server has a configured Groq API key."""
-    return bool(get_settings().groq_api_key)
+def has_server_api_key(settings: Settings | None = None) -> bool:
+    """Return True if the server has a configured Groq API key or pool."""
+    return bool(get_groq_api_key(None, settings or get_settings()))
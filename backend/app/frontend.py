@@ -0,0 +1,227 @@
+"""
+Production serving of the built frontend.
+
+When FRONTEND_DIR points at the Vite build (frontend/dist), the FastAPI
+app serves it directly, so browsers talk to uvicorn without the Express
+proxy hop. Files are indexed once at startup:
+
+- Precompressed `.br` / `.gz` siblings are served to clients that accept
+  them (`Vary: Accept-Encoding`); nothing is compressed per request.
+- Every representation has a strong ETag derived from its bytes, and
+  If-None-Match is answered with 304.
+- Hashed build assets (under /assets/) are cached as immutable for a
+  year; everything else is revalidated on each load.
+- Unknown paths that are not API calls or files fall back to index.html
+  so client-side routes work.
+
+Create the compressed variants after `npm run build` with:
+
+    python -m app.frontend ../frontend/dist
+
+Brotli output needs the optional `brotli` package; gzip is always made.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from starlette.responses import FileResponse, PlainTextResponse, Response
+
+# Content codings served from precompressed siblings, in preference order
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# Paths under this prefix carry a content hash in their file name
+IMMUTABLE_PREFIX = "/assets/"
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+# Files worth precompressing
+COMPRESSIBLE_SUFFIXES = frozenset(
+    ".html .js .mjs .css .json .map .svg .txt .xml .wasm .webmanifest".split()
+)
+MIN_COMPRESS_BYTES = 1024
+
+
+@dataclass
+class _Variant:
+    path: Path
+    etag: str
+
+
+@dataclass
+class _Entry:
+    identity: _Variant
+    media_type: str
+    cache_control: str
+    encoded: dict[str, _Variant] = field(default_factory=dict)
+
+
+def _etag(path: Path) -> str:
+    digest = hashlib.sha256(path.read_bytes()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def _accepted_encodings(header: str) -> set[str]:
+    """Codings the client accepts (q > 0) from an Accept-Encoding header."""
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name and q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class FrontendFiles:
+    """
+    ASGI app serving a static build with precompression and SPA fallback.
+    """
+
+    def __init__(self, directory: str | Path, api_prefix: str = "/api"):
+        """
+        Index the build directory.
+
+        Args:
+            directory: Vite build output (contains index.html).
+            api_prefix: Paths under it are never answered with index.html.
+
+        Raises:
+            RuntimeError: If the directory has no index.html.
+        """
+        self.directory = Path(directory).resolve()
+        self.api_prefix = api_prefix.rstrip("/") + "/"
+        if not (self.directory / "index.html").is_file():
+            raise RuntimeError(f"No index.html in frontend build {self.directory}")
+        self._files = self._scan()
+
+    def _scan(self) -> dict[str, _Entry]:
+        files: dict[str, _Entry] = {}
+        compressed_suffixes = {suffix for _, suffix in ENCODINGS}
+        for path in sorted(self.directory.rglob("*")):
+            if not path.is_file() or path.suffix in compressed_suffixes:
+                continue
+            url = "/" + path.relative_to(self.directory).as_posix()
+            media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            entry = _Entry(
+                identity=_Variant(path, _etag(path)),
+                media_type=media_type,
+                cache_control=(
+                    IMMUTABLE_CACHE if url.startswith(IMMUTABLE_PREFIX) else REVALIDATE_CACHE
+                ),
+            )
+            mtime = path.stat().st_mtime
+            for coding, suffix in ENCODINGS:
+                variant = path.with_name(path.name + suffix)
+                # A variant older than its source is left over from a previous build
+                if variant.is_file() and variant.stat().st_mtime >= mtime:
+                    entry.encoded[coding] = _Variant(variant, _etag(variant))
+            files[url] = entry
+        return files
+
+    def _lookup(self, path: str) -> _Entry | None:
+        entry = self._files.get(path)
+        if entry is None and path.endswith("/"):
+            entry = self._files.get(path + "index.html")
+        if entry is None and not path.startswith(self.api_prefix):
+            # Client-side route: anything without a file extension
+            if "." not in path.rsplit("/", 1)[-1]:
+                entry = self._files["/index.html"]
+        return entry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        method = scope["method"]
+        if method not in ("GET", "HEAD"):
+            response = PlainTextResponse(
+                "Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"}
+            )
+            await response(scope, receive, send)
+            return
+
+        entry = self._lookup(scope["path"])
+        if entry is None:
+            await PlainTextResponse("Not Found", status_code=404)(scope, receive, send)
+            return
+
+        headers = {
+            key.decode("latin-1").lower(): value.decode("latin-1")
+            for key, value in scope["headers"]
+        }
+        accepted = _accepted_encodings(headers.get("accept-encoding", ""))
+        coding = next((c for c, _ in ENCODINGS if c in accepted and c in entry.encoded), None)
+        variant = entry.encoded[coding] if coding else entry.identity
+
+        response_headers = {
+            "ETag": variant.etag,
+            "Cache-Control": entry.cache_control,
+        }
+        if entry.encoded:
+            response_headers["Vary"] = "Accept-Encoding"
+        if coding:
+            response_headers["Content-Encoding"] = coding
+
+        if_none_match = headers.get("if-none-match")
+        if if_none_match and variant.etag in {t.strip() for t in if_none_match.split(",")}:
+            await Response(status_code=304, headers=response_headers)(scope, receive, send)
+            return
+
+        response = FileResponse(
+            variant.path,
+            media_type=entry.media_type,
+            headers=response_headers,
+            stat_result=os.stat(variant.path),
+        )
+        await response(scope, receive, send)
+
+
+def precompress(directory: str | Path) -> list[Path]:
+    """
+    Write .gz (and .br, when brotli is installed) next to build files.
+
+    Only text-like files of at least MIN_COMPRESS_BYTES are compressed,
+    and a variant is kept only if it is smaller than the original.
+
+    Returns:
+        Paths of the variants written.
+    """
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    written = []
+    for path in sorted(Path(directory).rglob("*")):
+        if not path.is_file() or path.suffix not in COMPRESSIBLE_SUFFIXES:
+            continue
+        data = path.read_bytes()
+        if len(data) < MIN_COMPRESS_BYTES:
+            continue
+        variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants[".br"] = brotli.compress(data, quality=11)
+        for suffix, compressed in variants.items():
+            target = path.with_name(path.name + suffix)
+            if len(compressed) < len(data):
+                target.write_bytes(compressed)
+                written.append(target)
+            elif target.exists():
+                target.unlink()
+    return written
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m app.frontend <build directory>")
+    for variant in precompress(sys.argv[1]):
+        print(variant)
@@ -0,0 +1,339 @@
+"""
+Production launcher: `python -m app`.
+
+Runs the API under a small pre-forking supervisor around uvicorn:
+
+- The listening socket is bound once. With preloading (the default),
+  the application is imported in the supervisor before any worker is
+  forked, so workers share the imported modules copy-on-write and start
+  in milliseconds. Lifespan resources (HTTP pool, threads, caches) are
+  still created in each worker after the fork.
+- Workers are sized from the CPUs and memory available to the process
+  (cgroup limits included): one event loop per CPU, as long as each
+  worker gets Settings.worker_memory_mb.
+- uvloop and httptools are used when installed (asyncio and h11
+  otherwise).
+- A worker exits after Settings.max_requests requests (plus a random
+  jitter, so workers do not recycle together) and is replaced, which
+  bounds memory growth.
+- SIGHUP replaces the workers one at a time, each finishing its in-flight
+  requests first; without preloading the new workers re-import the
+  application (and re-read .env). SIGTERM or SIGINT stops gracefully.
+
+`--reload` runs uvicorn's development reloader instead.
+"""
+
+import argparse
+import importlib.util
+import logging
+import math
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+
+import uvicorn
+
+from app.config import Settings, get_settings
+
+# uvicorn's logger, so supervisor messages share its handler and format
+logger = logging.getLogger("uvicorn.error")
+
+APP = "app.main:app"
+
+# Seconds between supervisor checks of its workers
+POLL_INTERVAL = 0.1
+
+# A worker that exits sooner than this after starting is restarted only
+# after RESPAWN_BACKOFF seconds (e.g. a crash on startup)
+MIN_WORKER_LIFETIME = 1.0
+RESPAWN_BACKOFF = 1.0
+
+_CGROUP = Path("/sys/fs/cgroup")
+
+
+def available_cpus() -> int:
+    """CPUs this process may use (affinity and cgroup quota)."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        quota, period = (_CGROUP / "cpu.max").read_text().split()
+        if quota != "max":
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def available_memory() -> int | None:
+    """Bytes of memory this process may use (cgroup limit or RAM), if known."""
+    memory = None
+    try:
+        memory = os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, OSError, ValueError):
+        pass
+    try:
+        limit = (_CGROUP / "memory.max").read_text().strip()
+        if limit != "max":
+            memory = min(memory or int(limit), int(limit))
+    except (OSError, ValueError):
+        pass
+    return memory
+
+
+def worker_count(worker_memory_mb: int) -> int:
+    """
+    Workers to run: one per CPU, limited by memory.
+
+    Each worker is a single event loop, so more workers than CPUs only
+    add memory; CPU-bound stages already have their own executor.
+
+    Args:
+        worker_memory_mb: Memory to reserve per worker.
+
+    Returns:
+        At least 1.
+    """
+    workers = available_cpus()
+    memory = available_memory()
+    if memory is not None and worker_memory_mb > 0:
+        workers = min(workers, memory // (worker_memory_mb * 2**20))
+    return max(1, workers)
+
+
+def fastest_loop() -> str:
+    """uvicorn loop implementation: uvloop when installed."""
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def fastest_http() -> str:
+    """uvicorn HTTP parser: httptools when installed."""
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+class Supervisor:
+    """
+    Forks workers serving one shared socket and keeps them running.
+    """
+
+    def __init__(
+        self,
+        config: uvicorn.Config,
+        sock: socket.socket,
+        workers: int,
+        max_requests: int,
+        max_requests_jitter: int,
+        graceful_timeout: float,
+    ):
+        """
+        Prepare the supervisor. Call run() to start the workers.
+
+        Args:
+            config: uvicorn configuration shared by all workers (loaded
+                already when the app is preloaded).
+            sock: Bound listening socket.
+            workers: Number of workers to keep running.
+            max_requests: Requests after which a worker is recycled
+                (0 disables).
+            max_requests_jitter: Random extra requests per worker.
+            graceful_timeout: Seconds a stopping worker gets before it is
+                killed.
+        """
+        self.config = config
+        self.sock = sock
+        self.workers = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        # Running workers: pid -> start time
+        self.children: dict[int, float] = {}
+        # Workers asked to stop: pid -> deadline for a forced kill
+        self.stopping: dict[int, float] = {}
+        self.respawn_at = 0.0
+        self._signals: list[int] = []
+
+    def run(self) -> None:
+        """Serve until SIGTERM or SIGINT, then stop the workers gracefully."""
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(sig, self._on_signal)
+        logger.info(
+            "Starting %d workers (loop=%s, http=%s, preload=%s)",
+            self.workers,
+            self.config.loop,
+            self.config.http,
+            self.config.loaded,
+        )
+        try:
+            while True:
+                self._reap()
+                while self._signals:
+                    sig = self._signals.pop(0)
+                    if sig == signal.SIGHUP:
+                        self._reload()
+                    else:
+                        return
+                self._spawn_missing()
+                self._kill_overdue()
+                time.sleep(POLL_INTERVAL)
+        finally:
+            self._stop_all()
+
+    def _on_signal(self, sig: int, frame) -> None:
+        self._signals.append(sig)
+
+    def _spawn(self) -> None:
+        limit = None
+        if self.max_requests > 0:
+            limit = self.max_requests + random.randint(0, self.max_requests_jitter)
+        pid = os.fork()
+        if pid == 0:
+            self._serve(limit)
+        self.children[pid] = time.monotonic()
+
+    def _serve(self, limit: int | None) -> None:
+        """Worker process body; never returns."""
+        code = 0
+        try:
+            # uvicorn handles SIGTERM/SIGINT while serving; a signal it
+            # re-raises after shutdown must not kill the worker
+            for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                signal.signal(sig, signal.SIG_IGN)
+            random.seed()
+            if not self.config.loaded:
+                # Import the application afresh, with code and .env
+                # changes made since the supervisor started
+                for name in [n for n in sys.modules if n.startswith("app.") and n != __name__]:
+                    del sys.modules[name]
+            self.config.limit_max_requests = limit
+            uvicorn.Server(self.config).run(sockets=[self.sock])
+        except BaseException:
+            logger.exception("Worker %d failed", os.getpid())
+            code = 1
+        finally:
+            logging.shutdown()
+            os._exit(code)
+
+    def _spawn_missing(self) -> None:
+        now = time.monotonic()
+        if now < self.respawn_at:
+            return
+        for _ in range(self.workers - len(self.children)):
+            self._spawn()
+
+    def _reap(self) -> None:
+        while self.children or self.stopping:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            started = self.children.pop(pid, None)
+            if self.stopping.pop(pid, None) is not None or started is None:
+                continue
+            if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                logger.error("Worker %d exited on startup (status %d)", pid, status)
+                self.respawn_at = time.monotonic() + RESPAWN_BACKOFF
+            else:
+                logger.info("Worker %d exited (status %d); replacing it", pid, status)
+
+    def _reload(self) -> None:
+        """Replace every worker, starting each replacement before stopping."""
+        logger.info("Reloading %d workers", len(self.children))
+        for pid in list(self.children):
+            self._spawn()
+            self._terminate(pid)
+
+    def _terminate(self, pid: int) -> None:
+        self.children.pop(pid, None)
+        self.stopping[pid] = time.monotonic() + self.graceful_timeout
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            self.stopping.pop(pid, None)
+
+    def _kill_overdue(self) -> None:
+        now = time.monotonic()
+        for pid, deadline in list(self.stopping.items()):
+            if now >= deadline:
+                logger.warning("Worker %d did not stop in time; killing it", pid)
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    self.stopping.pop(pid, None)
+
+    def _stop_all(self) -> None:
+        for pid in list(self.children):
+            self._terminate(pid)
+        while self.stopping:
+            self._reap()
+            self._kill_overdue()
+            time.sleep(POLL_INTERVAL)
+
+
+def parse_args(argv: list[str] | None, settings: Settings) -> argparse.Namespace:
+    """Command-line options; defaults come from Settings."""
+    parser = argparse.ArgumentParser(prog="python -m app", description="Run the DocLens API.")
+    parser.add_argument("--host", default=settings.server_host)
+    parser.add_argument("--port", type=int, default=settings.server_port)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.web_workers,
+        help="worker processes (0: one per CPU, limited by memory)",
+    )
+    parser.add_argument("--max-requests", type=int, default=settings.max_requests)
+    parser.add_argument("--max-requests-jitter", type=int, default=settings.max_requests_jitter)
+    parser.add_argument("--graceful-timeout", type=float, default=settings.graceful_timeout)
+    parser.add_argument(
+        "--preload",
+        action=argparse.BooleanOptionalAction,
+        default=settings.preload_app,
+        help="import the app before forking workers",
+    )
+    parser.add_argument(
+        "--access-log", action=argparse.BooleanOptionalAction, default=settings.access_log
+    )
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument(
+        "--reload", action="store_true", help="development server reloading on code changes"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Entry point of `python -m app`."""
+    settings = get_settings()
+    args = parse_args(argv, settings)
+    options = {
+        "host": args.host,
+        "port": args.port,
+        "loop": fastest_loop(),
+        "http": fastest_http(),
+        "access_log": args.access_log,
+        "log_level": args.log_level,
+        "timeout_graceful_shutdown": args.graceful_timeout,
+    }
+    if args.reload:
+        uvicorn.run(APP, reload=True, **options)
+        return
+
+    config = uvicorn.Config(APP, **options)
+    sock = config.bind_socket()
+    if args.preload:
+        config.load()
+    workers = args.workers or worker_count(settings.worker_memory_mb)
+    Supervisor(
+        config,
+        sock,
+        workers,
+        args.max_requests,
+        args.max_requests_jitter,
+        args.graceful_timeout,
+    ).run()
+    sock.close()
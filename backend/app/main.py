@@ -4,39 +4,39 @@ DocLens FastAPI Application Entry Point
 Configures and runs the FastAPI application with CORS, routes, and middleware.
 The API serves as the backend for the React frontend, handling all AI/LLM
 operations via the Groq API.
+
+Use create_app(settings) to build an application; the module-level `app`
+is created with default settings for `uvicorn app.main:app`. Shared
+resources (HTTP pool, executors, caches) are created in the lifespan
+context and released on shutdown.
 """
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 
-from app.api.routes import analysis, search, health
+from app.api.middleware import ServerTimingMiddleware
+from app.api.routes import analysis, corpus, documents, precompute, search, health
+from app.config import Settings, get_settings
+from app.frontend import FrontendFiles
+from app.resources import AppResources
 
-app = FastAPI(
-    title="DocLens API",
-    description="AI-powered document analysis backend using Groq Llama 3.3 70B",
-    version="1.0.0",
-    docs_url="/api/docs",
-    redoc_url="/api/redoc",
-)
 
-# CORS configuration for React frontend (dev and prod)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://localhost:5173", "http://localhost:5000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources on startup and release them on shutdown."""
+    resources = AppResources(app.state.settings)
+    await resources.startup()
+    app.state.resources = resources
+    try:
+        yield
+    finally:
+        await resources.aclose()
 
-# Register route modules
-app.include_router(health.router, prefix="/api", tags=["Health"])
-app.include_router(analysis.router, prefix="/api", tags=["Analysis"])
-app.include_router(search.router, prefix="/api", tags=["Search"])
 
-
-@app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request, exc: RequestValidationError):
     """Format validation errors for clearer client feedback."""
     errors = exc.errors()
@@ -51,7 +51,6 @@ async def validation_exception_handler(request, exc: RequestValidationError):
     )
 
 
-@app.get("/")
 async def root():
     """Root endpoint - API info."""
     return {
@@ -59,3 +58,57 @@ async def root():
         "version": "1.0.0",
         "docs": "/api/docs",
     }
+
+
+def create_app(settings: Settings | None = None) -> FastAPI:
+    """
+    Build a configured DocLens application.
+
+    Args:
+        settings: Application settings (defaults to environment settings).
+
+    Returns:
+        FastAPI app whose lifespan manages shared resources.
+    """
+    settings = settings or get_settings()
+    app = FastAPI(
+        title="DocLens API",
+        description="AI-powered document analysis backend using Groq Llama 3.3 70B",
+        version="1.0.0",
+        docs_url="/api/docs",
+        redoc_url="/api/redoc",
+        lifespan=lifespan,
+    )
+    app.state.settings = settings
+
+    # CORS configuration for React frontend (dev and prod)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.cors_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["Server-Timing"],
+    )
+    # Stage timings, slow-request log and sampled profiling
+    app.add_middleware(ServerTimingMiddleware, settings=settings)
+
+    # Register route modules
+    app.include_router(health.router, prefix="/api", tags=["Health"])
+    app.include_router(analysis.router, prefix="/api", tags=["Analysis"])
+    app.include_router(search.router, prefix="/api", tags=["Search"])
+    app.include_router(precompute.router, prefix="/api", tags=["Documents"])
+    app.include_router(documents.router, prefix="/api", tags=["Documents"])
+    app.include_router(corpus.router, prefix="/api", tags=["Corpus"])
+
+    app.add_exception_handler(RequestValidationError, validation_exception_handler)
+    if settings.frontend_dir:
+        # Production: serve the built frontend from this process (after the
+        # API routes, which take precedence)
+        app.mount("/", FrontendFiles(settings.frontend_dir), name="frontend")
+    else:
+        app.add_api_route("/", root, methods=["GET"])
+    return app
+
+
+app = create_app()
@@ -1,15 +1,59 @@
 """Data models and schemas for the DocLens API."""
 
 from app.models.schemas import (
+    AnalysisSections,
     AnalyzeRequest,
+    AnalyzeResponse,
+    AskRequest,
+    AskResponse,
+    BatchQueryResult,
+    BatchSearchRequest,
+    BatchSearchResponse,
+    CorpusDocumentInfo,
+    CorpusDocumentRequest,
+    CorpusSearchHit,
+    CorpusSearchRequest,
+    CorpusSearchResponse,
+    DocumentAnalyzeRequest,
+    DocumentAnalyzeResponse,
+    DocumentInfo,
+    DocumentOpenRequest,
+    DocumentOpenResponse,
+    DocumentSearchRequest,
+    QATurn,
     SearchRequest,
     SearchResultItem,
     SearchResponse,
+    SummaryNodeInfo,
+    SummaryTreeRequest,
+    SummaryTreeResponse,
 )
 
 __all__ = [
+    "AnalysisSections",
     "AnalyzeRequest",
+    "AnalyzeResponse",
+    "AskRequest",
+    "AskResponse",
+    "BatchQueryResult",
+    "BatchSearchRequest",
+    "BatchSearchResponse",
+    "CorpusDocumentInfo",
+    "CorpusDocumentRequest",
+    "CorpusSearchHit",
+    "CorpusSearchRequest",
+    "CorpusSearchResponse",
+    "DocumentAnalyzeRequest",
+    "DocumentAnalyzeResponse",
+    "DocumentInfo",
+    "DocumentOpenRequest",
+    "DocumentOpenResponse",
+    "DocumentSearchRequest",
+    "QATurn",
     "SearchRequest",
     "SearchResultItem",
     "SearchResponse",
+    "SummaryNodeInfo",
+    "SummaryTreeRequest",
+    "SummaryTreeResponse",
 ]
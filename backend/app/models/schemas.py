@@ -5,11 +5,20 @@ These models define the structure of incoming requests and outgoing responses,
 ensuring type safety and automatic OpenAPI documentation.
 """
 
-from typing import Optional
+from typing import Annotated, Literal, Optional
 
 from pydantic import BaseModel, Field
 
 
+AnalysisSection = Literal[
+    "EXECUTIVE_SUMMARY",
+    "KEY_POINTS",
+    "CRITICAL_FLAGS",
+    "NAMED_ENTITIES",
+    "RECOMMENDED_ACTIONS",
+]
+
+
 class AnalyzeRequest(BaseModel):
     """Request body for document analysis endpoint."""
 
@@ -18,17 +27,97 @@ class AnalyzeRequest(BaseModel):
         default="general",
         description="Type of document: contracts, research, business, or general",
     )
+    sections: Optional[list[AnalysisSection]] = Field(
+        default=None,
+        min_length=1,
+        description="Sections to produce (default: all five); fewer sections return faster",
+    )
     api_key: Optional[str] = Field(
         default=None,
         description="Groq API key (optional if server has GROQ_API_KEY in env)",
     )
 
 
+class AnalysisSections(BaseModel):
+    """Structured analysis; sections that were not requested are null."""
+
+    executive_summary: Optional[str] = None
+    key_points: Optional[list[str]] = None
+    critical_flags: Optional[list[str]] = None
+    named_entities: Optional[dict[str, list[str]]] = None
+    recommended_actions: Optional[list[str]] = None
+
+
+class AnalyzeResponse(BaseModel):
+    """Response of the document analysis endpoint."""
+
+    analysis: str = Field(..., description="Labeled analysis text")
+    sections: AnalysisSections
+    truncated: bool
+    entities: Optional[dict[str, list[str]]] = Field(
+        default=None,
+        description="Dates, amounts, percentages, durations, defined terms and parties extracted locally",
+    )
+
+
+class AnalysisSummaryEvent(BaseModel):
+    """First event of /analyze/progressive: a quick executive summary."""
+
+    event: Literal["summary"] = "summary"
+    executive_summary: str
+    model: str = Field(..., description="Model that wrote the summary")
+    compressed: bool = Field(
+        ..., description="Whether the summary was written from a compressed document"
+    )
+
+
+class AnalysisResultEvent(AnalyzeResponse):
+    """Second event of /analyze/progressive: the full analysis."""
+
+    event: Literal["analysis"] = "analysis"
+
+
+class AnalysisErrorEvent(BaseModel):
+    """Event of /analyze/progressive replacing a phase that failed."""
+
+    event: Literal["error"] = "error"
+    phase: Literal["summary", "analysis"] = Field(
+        ..., description="Phase that failed; a failed summary is not fatal"
+    )
+    status_code: int
+    detail: str
+
+
 class SearchRequest(BaseModel):
     """Request body for semantic search endpoint."""
 
     document_text: str = Field(..., min_length=1, max_length=100000)
     query: str = Field(..., min_length=1, max_length=500)
+    mode: Literal["fast", "balanced", "thorough"] = Field(
+        default="thorough",
+        description=(
+            "Latency/quality preset: fast (local recall + small model), "
+            "balanced (small model recall + large model re-rank), "
+            "thorough (large model scores every chunk)"
+        ),
+    )
+    api_key: Optional[str] = Field(
+        default=None,
+        description="Groq API key (optional if server has GROQ_API_KEY in env)",
+    )
+
+
+class BatchSearchRequest(BaseModel):
+    """Request body for answering several queries against one document."""
+
+    document_text: str = Field(..., min_length=1, max_length=100000)
+    queries: list[Annotated[str, Field(min_length=1, max_length=500)]] = Field(
+        ..., min_length=1, max_length=50
+    )
+    prefilter: bool = Field(
+        default=True,
+        description="Narrow chunks per query with the local lexical scorer",
+    )
     api_key: Optional[str] = Field(
         default=None,
         description="Groq API key (optional if server has GROQ_API_KEY in env)",
@@ -50,3 +139,222 @@ class SearchResponse(BaseModel):
     results: list[SearchResultItem]
     total_chunks: int
     query: str
+    mode: str = "thorough"
+    dedup_ratio: float = Field(
+        default=0.0, description="Fraction of chunks skipped as near-duplicates"
+    )
+
+
+class BatchQueryResult(BaseModel):
+    """Results for one query of a batch search."""
+
+    query: str
+    results: list[SearchResultItem]
+
+
+class BatchSearchResponse(BaseModel):
+    """Response containing per-query results of a batch search."""
+
+    results: list[BatchQueryResult]
+    total_chunks: int
+    dedup_ratio: float = Field(
+        default=0.0, description="Fraction of chunks skipped as near-duplicates"
+    )
+
+
+class DocumentInfo(BaseModel):
+    """Metadata for a document registered in the document store."""
+
+    document_id: str
+    total_chunks: int
+    total_words: int
+    total_bytes: int
+
+
+class QATurn(BaseModel):
+    """One previous turn of a document Q&A conversation."""
+
+    role: Literal["user", "assistant"]
+    content: str = Field(..., min_length=1, max_length=4000)
+
+
+class AskRequest(BaseModel):
+    """Request body for asking a question about a registered document."""
+
+    question: str = Field(..., min_length=1, max_length=1000)
+    history: list[QATurn] = Field(
+        default_factory=list,
+        max_length=20,
+        description="Previous turns, oldest first (only the most recent are sent upstream)",
+    )
+    api_key: Optional[str] = Field(
+        default=None,
+        description="Groq API key (optional if server has GROQ_API_KEY in env)",
+    )
+
+
+class AskResponse(BaseModel):
+    """Answer to a document question with cited chunk indexes."""
+
+    answer: str
+    citations: list[int]
+    context_chunks: list[int]
+
+
+class SummaryTreeRequest(BaseModel):
+    """Request body for reading a node of a document's summary tree."""
+
+    level: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="Tree level (0 = chunk leaves, 1 = sections, ...); the root when omitted",
+    )
+    index: int = Field(default=0, ge=0, description="Node index within the level")
+    api_key: Optional[str] = Field(
+        default=None,
+        description="Groq API key (optional if server has GROQ_API_KEY in env)",
+    )
+
+
+class SummaryNodeInfo(BaseModel):
+    """One summary tree node and the chunk range it covers."""
+
+    level: int
+    index: int
+    chunk_start: int
+    chunk_end: int
+    summary: Optional[str] = None
+
+
+class SummaryTreeResponse(BaseModel):
+    """A summarized tree node with its (summarized) children."""
+
+    document_id: str
+    depth: int
+    node: SummaryNodeInfo
+    children: list[SummaryNodeInfo]
+    generated: int = Field(..., description="Summaries generated by this request")
+
+
+class DocumentAnalyzeRequest(BaseModel):
+    """Request body for analyzing a registered document or one of its nodes."""
+
+    document_type: str = Field(
+        default="general",
+        description="Type of document: contracts, research, business, or general",
+    )
+    sections: Optional[list[AnalysisSection]] = Field(default=None, min_length=1)
+    level: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="Summary tree level of the part to analyze; the whole document when omitted",
+    )
+    index: int = Field(default=0, ge=0)
+    api_key: Optional[str] = Field(
+        default=None,
+        description="Groq API key (optional if server has GROQ_API_KEY in env)",
+    )
+
+
+class DocumentAnalyzeResponse(AnalyzeResponse):
+    """Analysis of a registered document and what it was generated from."""
+
+    source: Literal["text", "summaries"]
+    chunk_start: int
+    chunk_end: int
+
+
+class DocumentSearchRequest(BaseModel):
+    """Request body for coarse-to-fine search in a registered document."""
+
+    query: str = Field(..., min_length=1, max_length=500)
+    top_sections: int = Field(
+        default=2,
+        ge=1,
+        le=8,
+        description="Sections (by summary) whose chunks are scored",
+    )
+    api_key: Optional[str] = Field(
+        default=None,
+        description="Groq API key (optional if server has GROQ_API_KEY in env)",
+    )
+
+
+class DocumentOpenRequest(BaseModel):
+    """Request body announcing that a client opened a document."""
+
+    document_text: str = Field(..., min_length=1, max_length=200000)
+    document_type: str = Field(
+        default="general",
+        description="Type of document: contracts, research, business, or general",
+    )
+    precompute_analysis: bool = Field(
+        default=False,
+        description="Also generate the analysis in the background when capacity allows",
+    )
+    api_key: Optional[str] = Field(
+        default=None,
+        description="Groq API key (optional if server has GROQ_API_KEY in env)",
+    )
+
+
+class DocumentOpenResponse(BaseModel):
+    """Handle for the background precomputation of an opened document."""
+
+    document_key: str
+    status: Literal["started", "running", "busy"]
+
+
+class CorpusDocumentRequest(BaseModel):
+    """Request body for adding a document to the search corpus."""
+
+    document_id: Optional[str] = Field(
+        default=None,
+        min_length=1,
+        max_length=128,
+        description="Id to store the document under; an existing document with this id is replaced (default: new id)",
+    )
+    document_text: str = Field(..., min_length=1, max_length=200000)
+
+
+class CorpusDocumentInfo(BaseModel):
+    """Metadata for a document indexed in the corpus."""
+
+    document_id: str
+    total_chunks: int
+
+
+class CorpusSearchRequest(BaseModel):
+    """Request body for searching across all corpus documents."""
+
+    query: str = Field(..., min_length=1, max_length=500)
+    top_k: int = Field(default=10, ge=1, le=50)
+    rerank: bool = Field(
+        default=False,
+        description="Re-rank the lexical matches with the LLM (needs an API key)",
+    )
+    api_key: Optional[str] = Field(
+        default=None,
+        description="Groq API key (optional if server has GROQ_API_KEY in env)",
+    )
+
+
+class CorpusSearchHit(BaseModel):
+    """One matching chunk of a corpus document."""
+
+    document_id: str
+    chunk_index: int
+    score: float
+    chunk_text: str
+    relevance_score: Optional[int] = Field(default=None, ge=1, le=10)
+    reason: Optional[str] = None
+
+
+class CorpusSearchResponse(BaseModel):
+    """Response containing corpus-wide search results."""
+
+    results: list[CorpusSearchHit]
+    query: str
+    total_documents: int
+    total_chunks: int
+    reranked: bool
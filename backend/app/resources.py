@@ -0,0 +1,298 @@
+"""
+Process-wide resources managed by the application lifespan.
+
+Everything that should be created once per worker and released on
+shutdown lives here: the pooled HTTP client used for upstream calls, the
+worker thread pool, the upstream key/endpoint pool, caches, the document
+store, the corpus index, metrics, admission control, background
+precompute jobs and the search micro-batcher. Route handlers reach them
+through app.api.deps.get_resources.
+
+CPU-bound document work has async variants (achunk, alexical_index, ...)
+that run it on the CPU executor for large documents (see offload), and
+the event-loop lag monitor runs for the lifetime of the resources.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+import httpx
+
+from app.config import Settings
+from app.services import timing
+from app.services.admission import AdmissionController
+from app.services.cache import LRUCache, content_hash
+from app.services.chunk_service import ChunkService
+from app.services.corpus_index import CorpusIndex
+from app.services.deadline import LatencyTracker
+from app.services.document_store import DocumentStore
+from app.services.lexical_service import LexicalScorer
+from app.services.loop_monitor import LoopLagMonitor
+from app.services.metrics import MetricsRegistry
+from app.services.near_duplicates import DuplicateClusters, find_near_duplicates
+from app.services.precompute import PrecomputeManager
+from app.services.salience import select_document
+from app.services.search_batcher import SearchBatcher
+from app.services.upstream_pool import UpstreamPool
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class AppResources:
+    """
+    Container for shared, lifespan-scoped resources.
+    """
+
+    def __init__(self, settings: Settings):
+        """
+        Create resources from settings. Call startup() before use.
+
+        Args:
+            settings: Application settings.
+        """
+        self.settings = settings
+        self.chunk_service = ChunkService()
+        self.document_store = DocumentStore()
+        self.corpus = CorpusIndex(settings.corpus_shards, settings.corpus_dir)
+        self.chunk_cache = LRUCache(settings.chunk_cache_size)
+        self.lexical_cache = LRUCache(settings.chunk_cache_size)
+        self.duplicate_cache = LRUCache(settings.chunk_cache_size)
+        self.selection_cache = LRUCache(settings.chunk_cache_size)
+        self.analysis_cache = LRUCache(settings.analysis_cache_size)
+        self.card_cache = LRUCache(settings.card_cache_size)
+        self.upstream_latency = LatencyTracker()
+        self.metrics = MetricsRegistry()
+        self.admission = AdmissionController(
+            max_concurrency=settings.admission_max_concurrency,
+            max_queue=settings.admission_max_queue,
+            queue_timeout=settings.admission_queue_timeout,
+            weights=settings.admission_weights,
+            metrics=self.metrics,
+        )
+        self.upstream_pool = UpstreamPool.from_settings(settings, self.metrics)
+        self.precompute = PrecomputeManager(settings.precompute_max_tasks, self.metrics)
+        self.search_batcher: SearchBatcher | None = None
+        if settings.search_microbatch:
+            self.search_batcher = SearchBatcher(
+                window_ms=settings.search_batch_window_ms,
+                max_size=settings.search_batch_max_size,
+                max_chars=settings.search_batch_max_chars,
+                metrics=self.metrics,
+            )
+        self.loop_monitor: LoopLagMonitor | None = None
+        if settings.loop_monitor:
+            self.loop_monitor = LoopLagMonitor(
+                self.metrics,
+                interval=settings.loop_monitor_interval,
+                warn_after=settings.loop_block_warn_seconds,
+            )
+        self.http_client: httpx.AsyncClient | None = None
+        self.executor: ThreadPoolExecutor | None = None
+        # Runs offloaded CPU-bound work: the worker threads, or a process
+        # pool when Settings.offload_executor is "process"
+        self.cpu_executor: Executor | None = None
+
+    async def startup(self) -> None:
+        """Open the upstream connection pool and worker threads."""
+        settings = self.settings
+        self.http_client = httpx.AsyncClient(
+            timeout=settings.http_timeout,
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_keepalive_connections,
+            ),
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.executor_workers,
+            thread_name_prefix="doclens-worker",
+        )
+        self.cpu_executor = self.executor
+        if settings.offload_executor == "process":
+            # Workers are spawned, not forked, from this multi-threaded process
+            self.cpu_executor = ProcessPoolExecutor(
+                max_workers=settings.executor_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        if self.loop_monitor is not None:
+            self.loop_monitor.start()
+        if self.corpus.directory is not None:
+            loaded = self.corpus.load()
+            logger.info("Mapped %d corpus documents from %s", loaded, self.corpus.directory)
+        if settings.prewarm_upstream:
+            await self.prewarm()
+
+    async def prewarm(self) -> None:
+        """
+        Resolve DNS and complete the TLS handshake with the Groq endpoint.
+
+        The pooled connection is kept alive, so the first real upstream
+        call skips connection setup. Failures are logged and ignored.
+        """
+        try:
+            await self.http_client.head(self.settings.groq_endpoint)
+        except httpx.HTTPError as e:
+            logger.warning("Upstream pre-warm failed: %s", e)
+
+    async def aclose(self) -> None:
+        """Release the connection pool and worker threads; persist the corpus."""
+        if self.loop_monitor is not None:
+            await self.loop_monitor.aclose()
+        await self.precompute.aclose()
+        if self.search_batcher is not None:
+            await self.search_batcher.aclose()
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+        if self.cpu_executor is not None and self.cpu_executor is not self.executor:
+            self.cpu_executor.shutdown(wait=False, cancel_futures=True)
+        self.cpu_executor = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        self.chunk_cache.clear()
+        self.lexical_cache.clear()
+        self.duplicate_cache.clear()
+        self.selection_cache.clear()
+        self.analysis_cache.clear()
+        self.card_cache.clear()
+        if self.corpus.directory is not None and self.corpus.dirty:
+            self.corpus.save()
+        self.corpus.close()
+
+    def chunk(self, text: str) -> list[dict]:
+        """Chunk text, reusing the cached result for identical documents."""
+        key = content_hash(text)
+        chunks = self.chunk_cache.get(key)
+        if chunks is None:
+            with timing.stage("chunk"):
+                chunks = self.chunk_service.chunk(text)
+            self.chunk_cache.set(key, chunks)
+        return chunks
+
+    def upstream_for(self, request_key: str | None) -> UpstreamPool | None:
+        """
+        The pool to send a request through: the server-side pool, unless
+        the client brought its own API key (its calls use that key only).
+        """
+        if request_key and request_key.strip():
+            return None
+        return self.upstream_pool
+
+    def lexical_index(self, text: str) -> LexicalScorer:
+        """BM25 index over the chunks of text, cached per document content."""
+        key = content_hash(text)
+        scorer = self.lexical_cache.get(key)
+        if scorer is None:
+            chunks = self.chunk(text)
+            with timing.stage("index"):
+                scorer = LexicalScorer(chunks)
+            self.lexical_cache.set(key, scorer)
+        return scorer
+
+    def salient_text(self, text: str, document_type: str, budget: int) -> str:
+        """
+        The most salient chunks of text that fit budget characters (see
+        salience), cached per document content, type and budget.
+        """
+        key = content_hash(text, document_type, str(budget))
+        selected = self.selection_cache.get(key)
+        if selected is None:
+            chunks = self.chunk(text)
+            scorer = self.lexical_index(text)
+            with timing.stage("select"):
+                selected = select_document(chunks, document_type, scorer, budget)
+            self.selection_cache.set(key, selected)
+        return selected
+
+    def duplicate_clusters(self, text: str) -> DuplicateClusters | None:
+        """
+        Near-duplicate clusters of the chunks of text, cached per document
+        content. None when SEARCH_DEDUP is off.
+        """
+        if not self.settings.search_dedup:
+            return None
+        key = content_hash(text)
+        clusters = self.duplicate_cache.get(key)
+        if clusters is None:
+            chunks = self.chunk(text)
+            with timing.stage("dedup"):
+                clusters = find_near_duplicates(chunks, self.settings.dedup_threshold)
+            self.duplicate_cache.set(key, clusters)
+        return clusters
+
+    async def offload(self, stage: str, size: int, func: Callable[..., T], *args: Any) -> T:
+        """
+        Run CPU-bound func(*args) as a timed request stage.
+
+        Work on inputs of at least Settings.offload_min_chars characters
+        runs on the CPU executor, so the event loop keeps serving other
+        requests meanwhile; smaller inputs run inline, where a pool hop
+        would cost more than it saves. With a process executor, func and
+        args must be picklable.
+
+        Args:
+            stage: Stage name for Server-Timing.
+            size: Input size in characters.
+            func: Function to run.
+            args: Its positional arguments.
+
+        Returns:
+            func's result.
+        """
+        with timing.stage(stage):
+            if self.cpu_executor is None or size < self.settings.offload_min_chars:
+                return func(*args)
+            self.metrics.inc("offload.calls")
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.cpu_executor, func, *args)
+
+    async def achunk(self, text: str) -> list[dict]:
+        """chunk() with large documents chunked off the event loop."""
+        key = content_hash(text)
+        chunks = self.chunk_cache.get(key)
+        if chunks is None:
+            chunks = await self.offload("chunk", len(text), self.chunk_service.chunk, text)
+            self.chunk_cache.set(key, chunks)
+        return chunks
+
+    async def alexical_index(self, text: str) -> LexicalScorer:
+        """lexical_index() with large documents indexed off the event loop."""
+        key = content_hash(text)
+        scorer = self.lexical_cache.get(key)
+        if scorer is None:
+            chunks = await self.achunk(text)
+            scorer = await self.offload("index", len(text), LexicalScorer, chunks)
+            self.lexical_cache.set(key, scorer)
+        return scorer
+
+    async def asalient_text(self, text: str, document_type: str, budget: int) -> str:
+        """salient_text() with large documents scored off the event loop."""
+        key = content_hash(text, document_type, str(budget))
+        selected = self.selection_cache.get(key)
+        if selected is None:
+            chunks = await self.achunk(text)
+            scorer = await self.alexical_index(text)
+            selected = await self.offload(
+                "select", len(text), select_document, chunks, document_type, scorer, budget
+            )
+            self.selection_cache.set(key, selected)
+        return selected
+
+    async def aduplicate_clusters(self, text: str) -> DuplicateClusters | None:
+        """duplicate_clusters() with large documents clustered off the event loop."""
+        if not self.settings.search_dedup:
+            return None
+        key = content_hash(text)
+        clusters = self.duplicate_cache.get(key)
+        if clusters is None:
+            chunks = await self.achunk(text)
+            clusters = await self.offload(
+                "dedup", len(text), find_near_duplicates, chunks, self.settings.dedup_threshold
+            )
+            self.duplicate_cache.set(key, clusters)
+        return clusters
@@ -2,5 +2,6 @@
 
 from app.services.groq_service import GroqService
 from app.services.chunk_service import ChunkService
+from app.services.document_store import DocumentStore
 
-__all__ = ["GroqService", "ChunkService"]
+__all__ = ["GroqService", "ChunkService", "DocumentStore"]
@@ -0,0 +1,181 @@
+"""
+Admission Control
+
+Bounds how many upstream-bound requests run at once per worker. Requests
+over the concurrency limit wait in a bounded queue; waiters are released
+in weighted fair order across client identities (start-time fair
+queuing), so one heavy API key cannot starve the others. When the queue
+is full, or a waiter exceeds its queue-time budget, the request is
+rejected immediately with a retry hint instead of piling onto upstream.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from app.services.metrics import MetricsRegistry
+
+# Smoothing factor for the service-time estimate behind Retry-After
+_SERVICE_TIME_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted (queue full or wait timeout)."""
+
+    def __init__(self, message: str, retry_after: int):
+        self.message = message
+        self.retry_after = retry_after
+        super().__init__(self.message)
+
+
+class AdmissionController:
+    """
+    Global concurrency limit with a weighted fair wait queue.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float,
+        weights: dict[str, float] | None = None,
+        metrics: MetricsRegistry | None = None,
+    ):
+        """
+        Initialize the controller.
+
+        Args:
+            max_concurrency: Requests allowed to run at once.
+            max_queue: Requests allowed to wait; beyond this, reject.
+            queue_timeout: Longest time a request may wait for a slot.
+            weights: Relative share per client identity (default 1.0).
+            metrics: Registry for queue depth, wait time and rejections.
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.weights = weights or {}
+        self.metrics = metrics or MetricsRegistry()
+        self.active = 0
+        self._heap: list[tuple[float, int, str, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._last_tag: dict[str, float] = {}
+        self._service_time = 1.0
+        self._update_gauges()
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests currently waiting."""
+        return len(self._heap)
+
+    @property
+    def headroom(self) -> int:
+        """Free slots not already claimed by waiting requests."""
+        return self.max_concurrency - self.active - self.queue_depth
+
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait before retrying."""
+        backlog = (self.queue_depth + 1) / max(1, self.max_concurrency)
+        return max(1, math.ceil(backlog * self._service_time))
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        client_id: str,
+        timeout: float | None = None,
+        weight: float | None = None,
+    ) -> AsyncIterator[None]:
+        """
+        Hold one concurrency slot for the duration of the block.
+
+        Args:
+            client_id: Identity used for fair scheduling.
+            timeout: Queue-time budget (default: queue_timeout; the
+                smaller of the two is used).
+            weight: Fair-share weight for this request (default: the
+                configured weight of client_id, else 1.0).
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait times out.
+        """
+        waited = await self._acquire(client_id, timeout, weight)
+        self.metrics.observe("admission.wait_seconds", waited)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            self._service_time += _SERVICE_TIME_ALPHA * (elapsed - self._service_time)
+            self._release()
+
+    async def _acquire(
+        self,
+        client_id: str,
+        timeout: float | None,
+        weight: float | None = None,
+    ) -> float:
+        """Wait for a slot; return seconds spent queued."""
+        if self.active < self.max_concurrency and not self._heap:
+            self.active += 1
+            self._update_gauges()
+            return 0.0
+
+        if len(self._heap) >= self.max_queue:
+            self.metrics.inc("admission.rejected_queue_full")
+            raise AdmissionRejected("Server busy, queue full", self.retry_after())
+
+        if weight is None:
+            weight = self.weights.get(client_id, 1.0)
+        start_tag = max(self._virtual_time, self._last_tag.get(client_id, 0.0))
+        tag = start_tag + 1.0 / weight
+        self._last_tag[client_id] = tag
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (tag, next(self._seq), client_id, future))
+        self._update_gauges()
+
+        budget = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        enqueued = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=budget)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Slot was granted just as we gave up: hand it on
+                self._release()
+            else:
+                future.cancel()
+                self._discard(future)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.metrics.inc("admission.rejected_timeout")
+            raise AdmissionRejected("Server busy, timed out in queue", self.retry_after())
+        return time.monotonic() - enqueued
+
+    def _release(self) -> None:
+        """Free a slot and hand it to the next waiter in fair order."""
+        self.active -= 1
+        while self._heap and self.active < self.max_concurrency:
+            tag, _, _, future = heapq.heappop(self._heap)
+            if future.done():
+                continue
+            self._virtual_time = tag
+            self.active += 1
+            future.set_result(None)
+        if not self._heap:
+            # No one is waiting, so past finish tags no longer matter
+            self._last_tag.clear()
+        self._update_gauges()
+
+    def _discard(self, future: asyncio.Future) -> None:
+        """Remove an abandoned waiter from the queue."""
+        self._heap = [entry for entry in self._heap if entry[3] is not future]
+        heapq.heapify(self._heap)
+        self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        self.metrics.set_gauge("admission.active", self.active)
+        self.metrics.set_gauge("admission.queue_depth", self.queue_depth)
@@ -0,0 +1,95 @@
+"""
+Analysis Output Parser
+
+Splits the labeled plain-text analysis produced by the LLM into its
+sections and converts each section into structured data, so clients get
+typed fields instead of re-parsing the raw text.
+"""
+
+import re
+
+# Section labels in the order the model is asked to emit them
+SECTIONS = (
+    "EXECUTIVE_SUMMARY",
+    "KEY_POINTS",
+    "CRITICAL_FLAGS",
+    "NAMED_ENTITIES",
+    "RECOMMENDED_ACTIONS",
+)
+
+# Label line, tolerating markdown decoration ("## KEY_POINTS", "**KEY_POINTS:**")
+_LABEL_RE = re.compile(
+    r"^[\s#*_]*(" + "|".join(SECTIONS) + r")[\s*_]*:?[\s*_]*$",
+    re.MULTILINE,
+)
+# List item markers: "1.", "2)", "-", "*", "•"
+_ITEM_RE = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s*")
+# Item separator: a comma that is not a thousands separator ("$50,000")
+_COMMA_RE = re.compile(r",(?!\d{3}\b)")
+
+
+def split_sections(text: str) -> dict[str, str]:
+    """
+    Split labeled analysis text into raw section bodies.
+
+    Args:
+        text: Model output with each label on its own line.
+
+    Returns:
+        Mapping of section label to its stripped body, for labels found.
+    """
+    matches = list(_LABEL_RE.finditer(text))
+    sections = {}
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        sections[match.group(1)] = text[match.end() : end].strip()
+    return sections
+
+
+def parse_items(body: str) -> list[str]:
+    """Parse a numbered or bulleted list body into item strings."""
+    items = []
+    for line in body.splitlines():
+        item = _ITEM_RE.sub("", line).strip()
+        if item:
+            items.append(item)
+    return items
+
+
+def parse_entities(body: str) -> dict[str, list[str]]:
+    """
+    Parse "Type: a, b, c" lines into a mapping of entity type to items.
+
+    Lines without a type prefix are collected under "Other".
+    """
+    entities: dict[str, list[str]] = {}
+    for line in parse_items(body):
+        group, sep, rest = line.partition(":")
+        if not sep:
+            group, rest = "Other", line
+        values = [v.strip() for v in _COMMA_RE.split(rest) if v.strip()]
+        if values:
+            entities.setdefault(group.strip(" *_"), []).extend(values)
+    return entities
+
+
+def parse_section(label: str, body: str):
+    """
+    Convert one raw section body into its structured form.
+
+    Returns:
+        str for EXECUTIVE_SUMMARY, dict for NAMED_ENTITIES, list otherwise.
+        CRITICAL_FLAGS of "NONE" parses to an empty list.
+    """
+    if label == "EXECUTIVE_SUMMARY":
+        return " ".join(body.split())
+    if label == "NAMED_ENTITIES":
+        return parse_entities(body)
+    if label == "CRITICAL_FLAGS" and body.strip().strip(".").upper() == "NONE":
+        return []
+    return parse_items(body)
+
+
+def format_sections(sections: dict[str, str]) -> str:
+    """Render raw section bodies back into labeled analysis text."""
+    return "\n\n".join(f"{label}\n{body}" for label, body in sections.items())
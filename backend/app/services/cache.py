@@ -0,0 +1,73 @@
+"""
+In-process LRU cache.
+
+Small bounded mapping used for derived per-document data (chunk lists,
+parsed analyses, ...). Keys are usually content hashes, so entries never
+go stale; eviction only bounds memory.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+def content_hash(*parts: str) -> str:
+    """Return a stable hex digest for one or more strings."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache with a fixed entry limit.
+    """
+
+    def __init__(self, max_entries: int = 128):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_entries: Entries kept before the least recently used is dropped.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store value under key, evicting the oldest entry if full."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove and return the value for key, or default."""
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,123 @@
+"""
+Chunk cards: compact stand-ins for chunks in search prompts.
+
+A card is one line per chunk: a short synopsis, key terms and entities,
+written by the fast model for several chunks per call. Cards are cached
+by chunk content (and model), so they are written once per chunk, shared
+by every document containing the same chunk, and reused by every later
+search. Search ranks a document's cards, about a tenth of the size of
+its chunks, and sends full text only for the best hits
+(GroqService.semantic_search).
+"""
+
+import asyncio
+from typing import TYPE_CHECKING, Any
+
+from app.services.cache import LRUCache, content_hash
+
+if TYPE_CHECKING:
+    from app.services.groq_service import GroqService
+
+# Chunks described per upstream call
+CARD_BATCH_SIZE = 8
+
+# Card-writing calls in flight at once
+CARD_CONCURRENCY = 4
+
+# Items kept per card field
+CARD_MAX_TERMS = 5
+
+
+def card_key(text: str, model: str) -> str:
+    """Cache key of the card for a chunk's text written by model."""
+    return content_hash("card", model, text)
+
+
+def format_card(card: dict[str, Any]) -> str | None:
+    """
+    Render a card object from the model as one prompt line.
+
+    Args:
+        card: Dict with 'synopsis' and optional 'keyTerms' and 'entities'
+            lists.
+
+    Returns:
+        "synopsis | terms: ... | entities: ...", or None when the card has
+        no synopsis.
+    """
+    synopsis = card.get("synopsis")
+    if not isinstance(synopsis, str) or not synopsis.strip():
+        return None
+    parts = [" ".join(synopsis.split())]
+    for label, field in (("terms", "keyTerms"), ("entities", "entities")):
+        items = card.get(field)
+        if isinstance(items, list):
+            items = [str(item).strip() for item in items if str(item).strip()]
+            if items:
+                parts.append(f"{label}: {', '.join(items[:CARD_MAX_TERMS])}")
+    return " | ".join(parts)
+
+
+def cached_cards(chunks: list[dict], cache: LRUCache, model: str) -> dict[int, str]:
+    """Cards already cached for chunks, by chunk index."""
+    cards = {}
+    for chunk in chunks:
+        card = cache.get(card_key(chunk["text"], model))
+        if card is not None:
+            cards[chunk["index"]] = card
+    return cards
+
+
+async def build_cards(
+    service: "GroqService",
+    chunks: list[dict],
+    cache: LRUCache,
+    batch_size: int = CARD_BATCH_SIZE,
+    concurrency: int = CARD_CONCURRENCY,
+) -> dict[int, str]:
+    """
+    Cards for chunks, writing the missing ones in batches.
+
+    A chunk the model skipped stays without a card (and is searched by
+    its full text); it is asked for again by the next build.
+
+    Args:
+        service: Service whose fast model writes the cards.
+        chunks: Chunk dicts with 'index' and 'text'.
+        cache: Card cache (keyed by card_key).
+        batch_size: Chunks per upstream call.
+        concurrency: Upstream calls in flight at once.
+
+    Returns:
+        Card lines by chunk index.
+    """
+    model = service.models["fast"]
+    cards = cached_cards(chunks, cache, model)
+    missing = [chunk for chunk in chunks if chunk["index"] not in cards]
+    if not missing:
+        return cards
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def write(batch: list[dict]) -> None:
+        async with semaphore:
+            written = await service.write_cards(batch)
+        for chunk in batch:
+            card = written.get(chunk["index"])
+            if card is not None:
+                cache.set(card_key(chunk["text"], model), card)
+                cards[chunk["index"]] = card
+
+    size = max(1, batch_size)
+    tasks = [
+        asyncio.ensure_future(write(missing[start : start + size]))
+        for start in range(0, len(missing), size)
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # Batches already written stay cached; stop the rest
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return cards
@@ -3,13 +3,170 @@ Document Chunking Service
 
 Splits document text into overlapping chunks for semantic search.
 Chunk size and overlap are configurable for optimal retrieval.
+
+Prompts that list chunks can drop the words each chunk shares with the
+one before it (see without_overlap), so overlapping text is sent once.
+
+Besides one-shot chunking of a complete string, the service can chunk a
+stream of words incrementally (see ChunkWindow and WordStreamDecoder) so
+uploads are split while they are still arriving.
 """
 
+import codecs
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator
+
 # Default chunk configuration (matches original spec)
 CHUNK_WORDS = 400
 CHUNK_OVERLAP = 50
 
 
+def without_overlap(chunks: list[dict]) -> list[tuple[int, str]]:
+    """
+    Trim each chunk to the words not already covered by the chunk before it.
+
+    Chunks are taken in the given order; a chunk that directly follows
+    the previous one in the document loses its leading overlap, any other
+    chunk is kept whole, and a chunk that is covered entirely (such as a
+    short tail chunk) is left out. Every segment is part of its own
+    chunk, so a segment's number is the chunk index it maps back to.
+
+    Args:
+        chunks: Chunk dicts with index, text and (optionally) startWord,
+            in document order.
+
+    Returns:
+        (chunk index, segment text) pairs, in the order of chunks.
+    """
+    segments = []
+    covered = None
+    for chunk in chunks:
+        text = chunk["text"]
+        start = chunk.get("startWord")
+        if start is not None and covered is not None and start < covered:
+            # Chunk text is its words joined by single spaces
+            parts = text.split(" ", covered - start)
+            text = parts[-1] if len(parts) > covered - start else ""
+        if start is not None:
+            covered = max(covered or 0, chunk.get("endWord", start))
+        else:
+            covered = None
+        if text:
+            segments.append((chunk["index"], text))
+    return segments
+
+
+class ChunkWindow:
+    """
+    Incremental sliding window over a stream of words.
+
+    Words are pushed in batches; a chunk is emitted as soon as the window
+    fills. Only the words of the current window are buffered, so memory
+    stays bounded by chunk size plus the largest pushed batch.
+    """
+
+    def __init__(self, chunk_words: int, step: int):
+        """
+        Initialize an empty window.
+
+        Args:
+            chunk_words: Words per full chunk.
+            step: Words to advance after each emitted chunk.
+        """
+        self.chunk_words = chunk_words
+        self.step = step
+        self.total_words = 0
+        self._buffer: list[str] = []
+        self._start = 0
+        self._index = 0
+
+    def push(self, words: list[str]) -> list[dict]:
+        """
+        Add words to the window.
+
+        Args:
+            words: Next words of the document, in order.
+
+        Returns:
+            Chunks completed by these words (possibly empty).
+        """
+        self._buffer.extend(words)
+        self.total_words += len(words)
+        chunks = []
+        while len(self._buffer) >= self.chunk_words:
+            chunks.append(self._emit(self.chunk_words))
+        return chunks
+
+    def close(self) -> list[dict]:
+        """
+        Flush the trailing partial chunks once the stream has ended.
+
+        Returns:
+            Remaining chunks, matching ChunkService.chunk tail behavior.
+        """
+        chunks = []
+        while self._buffer:
+            chunks.append(self._emit(min(self.chunk_words, len(self._buffer))))
+        return chunks
+
+    def _emit(self, size: int) -> dict:
+        chunk = {
+            "index": self._index,
+            "text": " ".join(self._buffer[:size]),
+            "startWord": self._start,
+            "endWord": self._start + size,
+        }
+        del self._buffer[: self.step]
+        self._start += self.step
+        self._index += 1
+        return chunk
+
+
+class WordStreamDecoder:
+    """
+    Incrementally decode UTF-8 bytes into whitespace-separated words.
+
+    Multi-byte characters and words split across network reads are held
+    back until the next feed() or flush().
+    """
+
+    def __init__(self, encoding: str = "utf-8"):
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._partial = ""
+        self.total_bytes = 0
+
+    def feed(self, data: bytes) -> list[str]:
+        """
+        Decode a block of bytes.
+
+        Args:
+            data: Next bytes of the body.
+
+        Returns:
+            Words that are complete (followed by whitespace).
+        """
+        self.total_bytes += len(data)
+        text = self._partial + self._decoder.decode(data)
+        if not text:
+            return []
+        words = text.split()
+        if text[-1].isspace():
+            self._partial = ""
+        else:
+            self._partial = words.pop() if words else ""
+        return words
+
+    def flush(self) -> list[str]:
+        """
+        Finish decoding at end of stream.
+
+        Returns:
+            Any words still held back.
+        """
+        text = self._partial + self._decoder.decode(b"", final=True)
+        self._partial = ""
+        return text.split()
+
+
 class ChunkService:
     """
     Service for splitting documents into searchable chunks.
@@ -34,6 +191,10 @@ class ChunkService:
         self.chunk_overlap = chunk_overlap
         self.step = chunk_words - chunk_overlap
 
+    def window(self) -> ChunkWindow:
+        """Return a new incremental window using this service's settings."""
+        return ChunkWindow(self.chunk_words, self.step)
+
     def chunk(self, text: str) -> list[dict]:
         """
         Split document text into overlapping chunks.
@@ -44,19 +205,45 @@ class ChunkService:
         Returns:
             List of chunk dicts with keys: index, text, startWord, endWord.
         """
-        words = text.strip().split()
-        words = [w for w in words if w]  # filter empty
-        chunks = []
-        i = 0
-
-        while i < len(words):
-            chunk_words = words[i : i + self.chunk_words]
-            chunks.append({
-                "index": len(chunks),
-                "text": " ".join(chunk_words),
-                "startWord": i,
-                "endWord": min(i + self.chunk_words, len(words)),
-            })
-            i += self.step
-
+        window = self.window()
+        chunks = window.push(text.split())
+        chunks.extend(window.close())
         return chunks
+
+    def iter_chunks(self, words: Iterable[str]) -> Iterator[dict]:
+        """
+        Lazily chunk a stream of words.
+
+        Args:
+            words: Document words, in order.
+
+        Yields:
+            Chunk dicts as soon as each window fills.
+        """
+        window = self.window()
+        for word in words:
+            yield from window.push([word])
+        yield from window.close()
+
+    async def aiter_chunks(
+        self,
+        byte_stream: AsyncIterable[bytes],
+    ) -> AsyncIterator[dict]:
+        """
+        Chunk a UTF-8 byte stream (e.g. a request body) as it arrives.
+
+        Args:
+            byte_stream: Async iterable of raw body bytes.
+
+        Yields:
+            Chunk dicts as soon as each window fills.
+        """
+        decoder = WordStreamDecoder()
+        window = self.window()
+        async for data in byte_stream:
+            for chunk in window.push(decoder.feed(data)):
+                yield chunk
+        for chunk in window.push(decoder.flush()):
+            yield chunk
+        for chunk in window.close():
+            yield chunk
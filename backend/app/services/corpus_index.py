@@ -0,0 +1,650 @@
+"""
+Corpus Index
+
+Sharded inverted index over the chunks of many documents, used to search
+a whole corpus ("which agreements have auto-renewal?") instead of one
+inline document. Each document lives in exactly one shard (chosen by a
+stable hash of its id); postings are delta + varint compressed and only
+ever appended, so documents are indexed incrementally as they arrive.
+
+A query first sums document frequencies across shards so every shard
+scores with the same corpus-wide BM25 statistics, then scores the shards
+one after another and merges their top-k. Scoring is pure Python, so
+threads would not run shards in parallel; asearch() moves the whole scan
+of a large corpus off the event loop in one executor call instead.
+
+With a directory configured, each shard can be saved as an on-disk
+segment (see app.services.segment) and reopened memory-mapped after a
+restart; documents added since are kept in memory on top of it until
+the next save. Several workers may share the directory: a save holds a
+lock on it and merges the worker's own changes into the segments on
+disk, so documents added by other workers are kept, and refresh() remaps
+segments other workers have saved since.
+"""
+
+import asyncio
+import fcntl
+import heapq
+import logging
+import math
+import threading
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from app.services.lexical_service import BM25_B, BM25_K1, tokenize
+from app.services.postings import PostingsList, iter_postings
+from app.services.segment import Segment, SegmentFormatError, write_segment
+
+logger = logging.getLogger(__name__)
+
+# Shards per index (per worker)
+DEFAULT_SHARDS = 8
+
+# asearch() scores corpora with fewer live chunks inline, where an
+# executor hop would cost more than the scan
+INLINE_SEARCH_CHUNKS = 5000
+
+# Fraction of deleted chunks in a shard that triggers compaction
+COMPACT_RATIO = 0.5
+
+# Minimum seconds between checks for segments saved by other workers
+REFRESH_INTERVAL = 1.0
+
+# File in the corpus directory locked while segments are rewritten
+LOCK_FILE = ".lock"
+
+
+@dataclass(frozen=True)
+class CorpusHit:
+    """One matching chunk of a corpus document."""
+
+    document_id: str
+    chunk_index: int
+    score: float
+
+
+class IndexShard:
+    """
+    Inverted index over the chunks of a subset of documents.
+
+    Chunks get shard-local ids in insertion order: ids below the base
+    segment's chunk count live in the memory-mapped segment, later ids in
+    the in-memory delta, so every postings list is appended in increasing
+    id order. Removed documents are tombstoned and skipped at query time
+    until the shard is compacted or saved.
+
+    Changes made through put() and delete() are also logged until they
+    are saved, so they can be merged into a segment another process has
+    written meanwhile.
+    """
+
+    def __init__(self, base: Segment | None = None):
+        """
+        Initialize a shard.
+
+        Args:
+            base: Read-only segment holding previously saved documents.
+        """
+        self.lock = threading.RLock()
+        # Unsaved changes, oldest first: (document id, chunks), where
+        # None chunks record a removal
+        self._unsaved: list[tuple[str, list[dict[str, Any]] | None]] = []
+        self._reset(base)
+
+    def _reset(self, base: Segment | None) -> None:
+        self._base = base
+        self._base_count = base.num_chunks if base else 0
+        self._postings: dict[str, PostingsList] = {}
+        # Change to the base segment's frequencies (negative after removals)
+        self._doc_freq: Counter = Counter()
+        self._chunk_docs: list[str] = []
+        self._chunk_indexes: list[int] = []
+        self._lengths: list[int] = []
+        self._texts: list[str] = []
+        self._documents: dict[str, list[int]] = {}
+        self._deleted: set[int] = set()
+        self.total_length = base.total_length if base else 0
+        self._base_doc_ids = base.document_ids() if base else []
+        if base is not None:
+            for chunk_id, doc_num in enumerate(base.doc_nums):
+                self._documents.setdefault(self._base_doc_ids[doc_num], []).append(chunk_id)
+
+    @property
+    def indexed_chunks(self) -> int:
+        """Chunks in the shard, including tombstoned ones."""
+        return self._base_count + len(self._lengths)
+
+    @property
+    def live_chunks(self) -> int:
+        """Chunks of documents still in the shard."""
+        return self.indexed_chunks - len(self._deleted)
+
+    @property
+    def garbage_ratio(self) -> float:
+        """Fraction of indexed chunks that belong to removed documents."""
+        total = self.indexed_chunks
+        return len(self._deleted) / total if total else 0.0
+
+    @property
+    def postings_bytes(self) -> int:
+        """Encoded size of the in-memory postings lists."""
+        return sum(p.nbytes for p in self._postings.values())
+
+    @property
+    def mapped_bytes(self) -> int:
+        """Size of the memory-mapped base segment."""
+        return self._base.nbytes if self._base else 0
+
+    @property
+    def term_count(self) -> int:
+        """Term dictionary entries (base segment plus in-memory)."""
+        base_terms = self._base.num_terms if self._base else 0
+        return base_terms + len(self._postings)
+
+    @property
+    def unsaved(self) -> int:
+        """Changes not yet written to a segment."""
+        return len(self._unsaved)
+
+    @property
+    def document_count(self) -> int:
+        return len(self._documents)
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self._documents
+
+    def add(self, document_id: str, chunks: list[dict[str, Any]]) -> None:
+        """Index a document's chunks (the caller removes any old version)."""
+        with self.lock:
+            ids = []
+            for chunk in chunks:
+                local_id = self.indexed_chunks
+                tf = Counter(tokenize(chunk["text"]))
+                for term, freq in tf.items():
+                    postings = self._postings.get(term)
+                    if postings is None:
+                        postings = self._postings[term] = PostingsList()
+                    postings.append(local_id, freq)
+                self._doc_freq.update(tf.keys())
+                length = sum(tf.values())
+                self._chunk_docs.append(document_id)
+                self._chunk_indexes.append(chunk["index"])
+                self._lengths.append(length)
+                self._texts.append(chunk["text"])
+                self.total_length += length
+                ids.append(local_id)
+            self._documents[document_id] = ids
+
+    def put(self, document_id: str, chunks: list[dict[str, Any]]) -> None:
+        """Index a document, replacing any previous version (logged)."""
+        with self.lock:
+            self.remove(document_id)
+            self.add(document_id, chunks)
+            self._unsaved.append((document_id, chunks))
+
+    def delete(self, document_id: str) -> bool:
+        """
+        Remove a document (logged), compacting the shard when most of it
+        is garbage.
+
+        Returns:
+            True if the document was in the shard.
+        """
+        with self.lock:
+            if not self.remove(document_id):
+                return False
+            self._unsaved.append((document_id, None))
+            if self.garbage_ratio > COMPACT_RATIO:
+                self.compact()
+            return True
+
+    def remove(self, document_id: str) -> bool:
+        """
+        Tombstone a document's chunks.
+
+        Returns:
+            True if the document was in the shard.
+        """
+        with self.lock:
+            ids = self._documents.pop(document_id, None)
+            if ids is None:
+                return False
+            for local_id in ids:
+                self._deleted.add(local_id)
+                self.total_length -= self._length(local_id)
+                self._doc_freq.subtract(set(tokenize(self._text(local_id))))
+            return True
+
+    def _length(self, local_id: int) -> int:
+        if local_id < self._base_count:
+            return self._base.lengths[local_id]
+        return self._lengths[local_id - self._base_count]
+
+    def _text(self, local_id: int) -> str:
+        if local_id < self._base_count:
+            return self._base.text(local_id)
+        return self._texts[local_id - self._base_count]
+
+    def _chunk_index(self, local_id: int) -> int:
+        if local_id < self._base_count:
+            return self._base.chunk_indexes[local_id]
+        return self._chunk_indexes[local_id - self._base_count]
+
+    def chunk_text(self, document_id: str, chunk_index: int) -> str | None:
+        """Text of one chunk of a document, or None if unknown."""
+        with self.lock:
+            for local_id in self._documents.get(document_id, ()):
+                if self._chunk_index(local_id) == chunk_index:
+                    return self._text(local_id)
+            return None
+
+    def documents(self) -> Iterator[tuple[str, list[dict[str, Any]]]]:
+        """Yield (document id, chunks) for every live document."""
+        with self.lock:
+            for document_id, ids in list(self._documents.items()):
+                yield document_id, [
+                    {"index": self._chunk_index(i), "text": self._text(i)}
+                    for i in ids
+                ]
+
+    def doc_freq(self, terms: list[str]) -> dict[str, int]:
+        """Live chunk frequency of each term in this shard."""
+        with self.lock:
+            return {
+                term: max(
+                    0,
+                    (self._base.doc_freq(term) if self._base else 0)
+                    + self._doc_freq.get(term, 0),
+                )
+                for term in terms
+            }
+
+    def search(
+        self,
+        idf: dict[str, float],
+        avg_length: float,
+        k: int,
+    ) -> list[CorpusHit]:
+        """
+        Score chunks containing any query term with BM25.
+
+        Args:
+            idf: Corpus-wide inverse document frequency per query term.
+            avg_length: Corpus-wide average chunk length in terms.
+            k: Hits to return.
+
+        Returns:
+            Up to k hits, best first.
+        """
+        with self.lock:
+            scores: dict[int, float] = {}
+            deleted = self._deleted
+            avg = avg_length or 1.0
+            for term, weight in idf.items():
+                sources = []
+                if self._base is not None:
+                    encoded = self._base.postings(term)
+                    if encoded is not None:
+                        sources.append(encoded)
+                delta = self._postings.get(term)
+                if delta is not None:
+                    sources.append(delta.data)
+                for encoded in sources:
+                    for local_id, freq in iter_postings(encoded):
+                        if local_id in deleted:
+                            continue
+                        norm = BM25_K1 * (1 - BM25_B + BM25_B * self._length(local_id) / avg)
+                        scores[local_id] = scores.get(local_id, 0.0) + (
+                            weight * freq * (BM25_K1 + 1) / (freq + norm)
+                        )
+            best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            hits = []
+            for local_id, score in best:
+                if local_id < self._base_count:
+                    document_id = self._base_doc_ids[self._base.doc_nums[local_id]]
+                else:
+                    document_id = self._chunk_docs[local_id - self._base_count]
+                hits.append(
+                    CorpusHit(
+                        document_id=document_id,
+                        chunk_index=self._chunk_index(local_id),
+                        score=score,
+                    )
+                )
+            return hits
+
+    def compact(self) -> None:
+        """Rebuild the shard in memory from its live documents."""
+        with self.lock:
+            documents = list(self.documents())
+            old_base = self._base
+            self._reset(None)
+            for document_id, chunks in documents:
+                self.add(document_id, chunks)
+            if old_base is not None:
+                old_base.close()
+
+    def save(self, path: Path, shard: int, num_shards: int) -> None:
+        """
+        Merge the unsaved changes into the segment at path and remap it.
+
+        The caller holds the directory lock, so one process at a time
+        reads the segment on disk (which may hold other processes'
+        documents), applies this shard's changes and rewrites it. The
+        shard lock is only held to snapshot the changes and to swap the
+        base; changes made during the write are kept. Afterwards the
+        shard's data lives in the page cache rather than the heap.
+        """
+        on_disk = open_segment(path, shard, num_shards)
+        with self.lock:
+            applied = len(self._unsaved)
+            changes = dict(self._unsaved)
+            # Nothing on disk to merge with: write this shard's own view
+            snapshot = list(self.documents()) if on_disk is None else None
+        if not changes and on_disk is not None:
+            if self._base is not None and not self._base.replaced():
+                on_disk.close()
+            else:
+                self._rebase(on_disk, 0)
+            return
+        try:
+            if on_disk is None:
+                documents: Iterable = snapshot
+            else:
+                documents = _merge_changes(on_disk.documents(), changes)
+            write_segment(path, documents, shard=shard, num_shards=num_shards)
+        finally:
+            if on_disk is not None:
+                on_disk.close()
+        self._rebase(Segment(path), applied)
+
+    def refresh(self, path: Path, shard: int, num_shards: int) -> bool:
+        """
+        Remap the segment at path if another process has saved it since
+        this shard mapped its base; unsaved changes are reapplied.
+
+        Returns:
+            True if the shard was remapped.
+        """
+        base = self._base
+        if base is not None and not base.replaced():
+            return False
+        if base is None and not path.exists():
+            return False
+        segment = open_segment(path, shard, num_shards)
+        if segment is None:
+            return False
+        self._rebase(segment, 0)
+        return True
+
+    def _rebase(self, segment: Segment, applied: int) -> None:
+        """Map segment as the base and reapply the changes after `applied`."""
+        with self.lock:
+            old_base = self._base
+            pending = self._unsaved[applied:]
+            self._reset(segment)
+            for document_id, chunks in pending:
+                self.remove(document_id)
+                if chunks is not None:
+                    self.add(document_id, chunks)
+            self._unsaved = pending
+            if old_base is not None and old_base is not segment:
+                old_base.close()
+
+    def close(self) -> None:
+        """Unmap the base segment and drop the shard's contents."""
+        with self.lock:
+            if self._base is not None:
+                self._base.close()
+                self._reset(None)
+
+
+def _merge_changes(
+    documents: Iterable[tuple[str, list[dict[str, Any]]]],
+    changes: dict[str, list[dict[str, Any]] | None],
+) -> Iterator[tuple[str, list[dict[str, Any]]]]:
+    """Documents with changed ones replaced or dropped, then added ones."""
+    for document_id, chunks in documents:
+        if document_id not in changes:
+            yield document_id, chunks
+    for document_id, chunks in changes.items():
+        if chunks is not None:
+            yield document_id, chunks
+
+
+def open_segment(path: Path, shard: int, num_shards: int) -> Segment | None:
+    """
+    Map a shard's segment, or None when it is missing, unreadable (e.g.
+    an older format version) or from another shard layout; problems are
+    logged.
+    """
+    if not path.exists():
+        return None
+    try:
+        segment = Segment(path)
+    except SegmentFormatError as e:
+        logger.warning("Ignoring corpus segment: %s", e)
+        return None
+    if segment.shard != shard or segment.num_shards != num_shards:
+        logger.warning("Ignoring corpus segment %s: shard layout mismatch", path)
+        segment.close()
+        return None
+    return segment
+
+
+@contextmanager
+def _directory_lock(directory: Path) -> Iterator[None]:
+    """Exclusive lock on a corpus directory across processes and threads."""
+    with open(directory / LOCK_FILE, "a+b") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class CorpusIndex:
+    """
+    Documents and their chunks, indexed across shards.
+    """
+
+    def __init__(
+        self,
+        num_shards: int = DEFAULT_SHARDS,
+        directory: str | Path | None = None,
+    ):
+        """
+        Initialize an empty index.
+
+        Args:
+            num_shards: Number of shards documents are spread over.
+            directory: Where load() and save() keep segment files
+                (default: in-memory only).
+        """
+        self._shards = [IndexShard() for _ in range(max(1, num_shards))]
+        self.directory = Path(directory) if directory else None
+        self.dirty = False
+        self._refreshed = time.monotonic()
+
+    def __len__(self) -> int:
+        return sum(shard.document_count for shard in self._shards)
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self._shards[self._shard_for(document_id)]
+
+    @property
+    def num_shards(self) -> int:
+        return len(self._shards)
+
+    @property
+    def total_chunks(self) -> int:
+        """Chunks of all live documents."""
+        return sum(shard.live_chunks for shard in self._shards)
+
+    def _shard_for(self, document_id: str) -> int:
+        return zlib.crc32(document_id.encode("utf-8")) % len(self._shards)
+
+    def _segment_path(self, shard_num: int) -> Path:
+        return self.directory / f"shard-{shard_num:03d}-of-{self.num_shards:03d}.seg"
+
+    def load(self) -> int:
+        """
+        Map the saved segments of every shard.
+
+        Shards whose segment is missing or unreadable (e.g. written by an
+        older format version) start empty; the problem is logged.
+
+        Returns:
+            Number of documents loaded.
+        """
+        if self.directory is None:
+            return 0
+        for shard_num in range(self.num_shards):
+            segment = open_segment(self._segment_path(shard_num), shard_num, self.num_shards)
+            if segment is None:
+                continue
+            self._shards[shard_num].close()
+            self._shards[shard_num] = IndexShard(segment)
+        self._refreshed = time.monotonic()
+        return len(self)
+
+    def save(self) -> None:
+        """
+        Atomically merge every shard's changes into its segment and remap it.
+
+        Other processes sharing the directory wait for the save to finish,
+        and the documents they saved before are kept.
+
+        Raises:
+            ValueError: If the index has no directory.
+        """
+        if self.directory is None:
+            raise ValueError("CorpusIndex has no directory to save to")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with _directory_lock(self.directory):
+            for shard_num, shard in enumerate(self._shards):
+                shard.save(self._segment_path(shard_num), shard_num, self.num_shards)
+        self.dirty = any(shard.unsaved for shard in self._shards)
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        Remap segments other processes have saved since they were mapped.
+
+        Checks at most once per REFRESH_INTERVAL unless forced; each check
+        is one stat() per shard.
+
+        Returns:
+            Number of shards remapped.
+        """
+        if self.directory is None:
+            return 0
+        now = time.monotonic()
+        if not force and now - self._refreshed < REFRESH_INTERVAL:
+            return 0
+        self._refreshed = now
+        return sum(
+            shard.refresh(self._segment_path(shard_num), shard_num, self.num_shards)
+            for shard_num, shard in enumerate(self._shards)
+        )
+
+    def close(self) -> None:
+        """Unmap all segments."""
+        for shard in self._shards:
+            shard.close()
+
+    def add_document(self, document_id: str, chunks: list[dict[str, Any]]) -> None:
+        """
+        Index a document, replacing any previous version with the same id.
+
+        Only the document's own shard is touched; the rest of the index
+        is not rebuilt.
+        """
+        self._shards[self._shard_for(document_id)].put(document_id, chunks)
+        self.dirty = True
+
+    def remove_document(self, document_id: str) -> bool:
+        """Remove a document. Returns True if it was indexed."""
+        if not self._shards[self._shard_for(document_id)].delete(document_id):
+            return False
+        self.dirty = True
+        return True
+
+    def chunk_text(self, document_id: str, chunk_index: int) -> str | None:
+        """Text of one indexed chunk, or None if unknown."""
+        return self._shards[self._shard_for(document_id)].chunk_text(
+            document_id, chunk_index
+        )
+
+    def _query_weights(self, query: str) -> tuple[dict[str, float], float]:
+        """Corpus-wide idf per query term and average chunk length."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        doc_freq: Counter = Counter()
+        total_length = 0
+        total_chunks = 0
+        for shard in self._shards:
+            doc_freq.update(shard.doc_freq(terms))
+            total_length += shard.total_length
+            total_chunks += shard.live_chunks
+        n = total_chunks
+        idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+            if df > 0
+        }
+        return idf, (total_length / total_chunks if total_chunks else 0.0)
+
+    @staticmethod
+    def _merge(per_shard: list[list[CorpusHit]], k: int) -> list[CorpusHit]:
+        hits = [hit for shard_hits in per_shard for hit in shard_hits]
+        return sorted(
+            hits, key=lambda h: (-h.score, h.document_id, h.chunk_index)
+        )[:k]
+
+    def search(self, query: str, k: int = 10) -> list[CorpusHit]:
+        """
+        Return the k best-matching chunks across the corpus.
+
+        Returns:
+            Hits with document id, chunk index and BM25 score, best first.
+        """
+        idf, avg_length = self._query_weights(query)
+        if not idf:
+            return []
+        return self._merge(
+            [shard.search(idf, avg_length, k) for shard in self._shards], k
+        )
+
+    async def asearch(
+        self,
+        query: str,
+        k: int = 10,
+        executor: Executor | None = None,
+    ) -> list[CorpusHit]:
+        """
+        search() that keeps the event loop free on large corpora.
+
+        Corpora of at least INLINE_SEARCH_CHUNKS chunks are scanned in one
+        executor call (the mapped segments cannot go to another process);
+        smaller ones are scored inline.
+        """
+        if self.total_chunks < INLINE_SEARCH_CHUNKS:
+            return self.search(query, k)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.search, query, k)
+
+    def stats(self) -> dict[str, int]:
+        """Index size counters."""
+        return {
+            "documents": len(self),
+            "chunks": self.total_chunks,
+            "shards": self.num_shards,
+            "terms": sum(shard.term_count for shard in self._shards),
+            "postings_bytes": sum(shard.postings_bytes for shard in self._shards),
+            "mapped_bytes": sum(shard.mapped_bytes for shard in self._shards),
+        }
@@ -0,0 +1,84 @@
+"""
+Request deadlines and upstream latency tracking.
+
+A Deadline is an absolute point in time (monotonic clock) by which a
+request must finish; it is created once per request and passed down so
+every upstream call only waits for the time that is actually left.
+LatencyTracker keeps recent upstream latencies to derive the p95 delay
+used for hedged requests.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+
+
+class Deadline:
+    """
+    Absolute request deadline on the monotonic clock.
+    """
+
+    def __init__(self, seconds: float):
+        """
+        Start a deadline that expires `seconds` from now.
+
+        Args:
+            seconds: Time budget for the request.
+        """
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left before expiry (never negative)."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        """True once the deadline has passed."""
+        return self.remaining() <= 0.0
+
+    def timeout(self, cap: float) -> float:
+        """Return the time left, capped at `cap` seconds."""
+        return min(cap, self.remaining())
+
+
+class LatencyTracker:
+    """
+    Sliding window of recent upstream latencies (seconds).
+    """
+
+    def __init__(self, window: int = 200):
+        """
+        Initialize an empty tracker.
+
+        Args:
+            window: Number of most recent samples kept.
+        """
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        """Add one latency sample."""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> float | None:
+        """
+        Return the given percentile of recorded latencies.
+
+        Args:
+            pct: Percentile in [0, 100].
+
+        Returns:
+            Latency in seconds, or None if no samples exist.
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(0, math.ceil(pct / 100 * len(samples)) - 1)
+        return samples[rank]
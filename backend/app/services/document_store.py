@@ -0,0 +1,118 @@
+"""
+Document Store
+
+Keeps chunked documents in memory under a server-generated id so later
+requests can refer to a document without re-uploading its text. The
+store is bounded: the least recently used documents are evicted first.
+"""
+
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from app.services.lexical_service import LexicalScorer
+from app.services.summary_tree import SummaryTree
+
+# Maximum number of documents kept in memory per process
+MAX_DOCUMENTS = 256
+
+# Words of the document opening included in its overview
+OVERVIEW_WORDS = 120
+
+
+@dataclass
+class StoredDocument:
+    """A registered document and its chunks."""
+
+    document_id: str
+    chunks: list[dict] = field(default_factory=list)
+    total_words: int = 0
+    total_bytes: int = 0
+
+    _scorer: LexicalScorer | None = field(default=None, repr=False)
+    _tree: SummaryTree | None = field(default=None, repr=False)
+
+    def add_chunk(self, chunk: dict) -> None:
+        """Append a chunk and track the document's word count."""
+        self.chunks.append(chunk)
+        self.total_words = max(self.total_words, chunk["endWord"])
+        self._scorer = None
+        self._tree = None
+
+    def scorer(self) -> LexicalScorer:
+        """Return the document's BM25 index, building it on first use."""
+        if self._scorer is None:
+            self._scorer = LexicalScorer(self.chunks)
+        return self._scorer
+
+    def tree(self) -> SummaryTree:
+        """Return the document's summary tree (summaries fill in on demand)."""
+        if self._tree is None:
+            self._tree = SummaryTree(len(self.chunks))
+        return self._tree
+
+    def overview(self, max_words: int = OVERVIEW_WORDS) -> str:
+        """
+        Short, deterministic description of the document.
+
+        Always the same bytes for the same document (until its summary
+        tree gets a root summary, which then replaces the opening), so it
+        can anchor a cacheable prompt prefix.
+        """
+        header = (
+            f"Document {self.document_id}: {self.total_words} words "
+            f"in {len(self.chunks)} chunks."
+        )
+        root = self._tree.root if self._tree is not None else None
+        if root is not None and root.summary is not None:
+            return f"{header}\nSummary: {root.summary}"
+        opening = ""
+        if self.chunks:
+            opening = " ".join(self.chunks[0]["text"].split()[:max_words])
+        return f"{header}\nOpening: {opening}"
+
+
+class DocumentStore:
+    """
+    In-memory LRU registry of chunked documents.
+    """
+
+    def __init__(self, max_documents: int = MAX_DOCUMENTS):
+        """
+        Initialize an empty store.
+
+        Args:
+            max_documents: Documents kept before the oldest is evicted.
+        """
+        self.max_documents = max_documents
+        self._documents: OrderedDict[str, StoredDocument] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def create(self) -> StoredDocument:
+        """
+        Allocate a new, empty document.
+
+        The document is only visible through get() once committed with
+        put(), so a failed upload never leaves a partial entry behind.
+        """
+        return StoredDocument(document_id=uuid.uuid4().hex)
+
+    def put(self, document: StoredDocument) -> None:
+        """Register (or refresh) a document, evicting the oldest if full."""
+        self._documents[document.document_id] = document
+        self._documents.move_to_end(document.document_id)
+        while len(self._documents) > self.max_documents:
+            self._documents.popitem(last=False)
+
+    def get(self, document_id: str) -> StoredDocument | None:
+        """Return a document by id, or None if unknown or evicted."""
+        document = self._documents.get(document_id)
+        if document is not None:
+            self._documents.move_to_end(document_id)
+        return document
+
+    def delete(self, document_id: str) -> bool:
+        """Remove a document. Returns True if it existed."""
+        return self._documents.pop(document_id, None) is not None
@@ -0,0 +1,185 @@
+"""
+Local entity and figure extraction.
+
+Dates, monetary amounts, percentages, durations, quoted defined terms,
+contract parties and company names follow predictable patterns, yet
+listing them under NAMED_ENTITIES costs the analysis model many output
+tokens (the slowest part of generation). This module finds them with
+precompiled regular expressions and small gazetteers (month names,
+currency symbols and codes, number words, company suffixes); a
+200k-character document takes a few tens of milliseconds. The results are
+returned with the analysis and passed to the model as hints, so the
+NAMED_ENTITIES section only has to add people and organizations, or is
+skipped altogether.
+"""
+
+import re
+
+# Entity types, in the order they are reported
+ENTITY_TYPES = (
+    "Parties",
+    "Organizations",
+    "Dates",
+    "Amounts",
+    "Percentages",
+    "Durations",
+    "Defined terms",
+)
+
+# Items kept per type (first occurrences win)
+MAX_PER_TYPE = 20
+
+# Gazetteers
+_MONTH = (
+    r"(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|June?|July?|"
+    r"Aug(?:ust)?|Sep(?:t(?:ember)?)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)\.?"
+)
+_CURRENCY_SYMBOL = r"\$|€|£|¥|₹"
+_CURRENCY_CODE = r"USD|EUR|GBP|JPY|CHF|CAD|AUD|CNY|INR|SGD|HKD|SEK|NOK|DKK"
+_CURRENCY_WORD = r"(?:dollars|euros|pounds(?: sterling)?|yen|francs|rupees)"
+_MAGNITUDE = r"(?:\s?(?:thousand|million|billion|trillion|[MmBbKk]n?)\b)?"
+_NUMBER = r"\d[\d,]*(?:\.\d+)?"
+_NUMBER_WORDS = (
+    "one", "two", "three", "four", "five", "six", "seven", "eight", "nine",
+    "ten", "eleven", "twelve", "fifteen", "eighteen", "twenty-four", "twenty",
+    "thirty", "forty-five", "forty", "sixty", "ninety", "hundred",
+)
+_NUMBER_WORD = "|".join(_NUMBER_WORDS)
+_DURATION_UNITS = r"(?:day|week|month|year|hour|minute)s?\b"
+_COMPANY_SUFFIX = (
+    r"(?:(?:Inc|Ltd|Corp|Co)\b\.?|(?:L\.L\.C|L\.P|S\.A|N\.V|B\.V)\.?"
+    r"|(?:LLC|Limited|Corporation|Company|GmbH|AG|plc|PLC|LLP|LP|SA|Pty)\b)"
+)
+_NAME = (
+    r"(?:[A-Z][\w&'.-]*\s+(?:(?:of|and|&|the|de|für)\s+)?){0,5}[A-Z][\w&'-]*"
+    rf"(?:,?\s+{_COMPANY_SUFFIX})?"
+)
+
+# Python's regex engine only skips ahead quickly when a pattern starts
+# with a literal or a character set, so every pattern below does (word
+# boundaries at the start are checked afterwards, see _word_start).
+# Figures are found as numbers first; what follows a number decides its
+# type, and the empty group closing each alternative names it.
+_NUMBER_RE = re.compile(r"\d+(?:,\d{3})*(?:\.\d+)?")
+_FIGURE_SUFFIX_RE = re.compile(
+    rf"(?:-\d{{2}}-\d{{2}}|/\d{{1,2}}/\d{{2,4}}"
+    rf"|(?:st|nd|rd|th)?\s+(?:day\s+of\s+)?{_MONTH},?\s+\d{{4}})\b(?P<Dates>)"
+    r"|(?:\s?%|\s?(?:percent|per cent)\b|\s(?:basis points|bps)\b)(?P<Percentages>)"
+    rf"|{_MAGNITUDE}\s?(?:{_CURRENCY_CODE}|{_CURRENCY_WORD})\b(?P<Amounts>)"
+)
+_MONTH_DATE_RE = re.compile(rf"{_MONTH}\s+(?:\d{{1,2}}(?:st|nd|rd|th)?,?\s+)?\d{{4}}\b")
+_PERIOD_RE = re.compile(r"(?:Q[1-4]|FY)\s?\d{2,4}\b")
+_CURRENCY_RE = re.compile(
+    rf"(?:{_CURRENCY_SYMBOL}|{_CURRENCY_CODE})\s?{_NUMBER}{_MAGNITUDE}"
+)
+# Durations are found by their unit, then the count before it is matched
+# backwards over a short window
+_DURATION_UNIT_RE = re.compile(_DURATION_UNITS)
+_DURATION_COUNT_RE = re.compile(
+    rf"(?<![\w.,])(?:\d+|(?i:{_NUMBER_WORD})(?:\s*\(\d+\))?)"
+    r"[\s-](?:(?:business|calendar|working)\s)?\Z"
+)
+_DURATION_WINDOW = 40
+_DEFINED_TERM_RE = re.compile(
+    r"[(\"“](?:(?:the\s|each\s|a\s)?[\"“]([A-Z][^\"”\n]{0,60})[\"”]\)"
+    r"|([A-Z][^\"”\n]{0,60})[\"”]\s+(?:means|shall mean|refers to|has the meaning)\b)"
+)
+_PARTIES_RE = re.compile(
+    rf"[Bb]etween\s+(?:the\s+)?({_NAME})"
+    r"(?:,\s+an?\s+[^,()\n]{1,80})?(?:,?\s*\([^)\n]{0,80}\))?,?"
+    rf"\s+and\s+(?:the\s+)?({_NAME})"
+)
+_ORGANIZATION_RE = re.compile(
+    rf"[A-Z][\w&'-]*(?:\s+[A-Z][\w&'-]*){{0,3}},?\s+{_COMPANY_SUFFIX}"
+)
+
+
+class _Collector:
+    """Case-insensitively de-duplicated items per type, kept with position."""
+
+    def __init__(self):
+        self.items: dict[str, dict[str, tuple[int, str]]] = {t: {} for t in ENTITY_TYPES}
+
+    def add(self, entity_type: str, value: str | None, position: int) -> None:
+        if not value:
+            return
+        value = " ".join(value.split()).strip(",;:")
+        key = value.lower()
+        seen = self.items[entity_type].get(key)
+        if value and (seen is None or position < seen[0]):
+            self.items[entity_type][key] = (position, value)
+
+    def result(self, limit: int) -> dict[str, list[str]]:
+        return {
+            entity_type: [value for _, value in sorted(items.values())[:limit]]
+            for entity_type, items in self.items.items()
+            if items
+        }
+
+
+def extract_entities(text: str, limit: int = MAX_PER_TYPE) -> dict[str, list[str]]:
+    """
+    Find dates, amounts, percentages, durations, defined terms and parties.
+
+    Args:
+        text: Document text.
+        limit: Maximum items kept per type.
+
+    Returns:
+        Mapping of entity type (see ENTITY_TYPES) to items in order of
+        first appearance; types with no matches are left out.
+    """
+    found = _Collector()
+    for match in _PARTIES_RE.finditer(text):
+        if _word_start(text, match):
+            found.add("Parties", match.group(1), match.start(1))
+            found.add("Parties", match.group(2), match.start(2))
+    for match in _ORGANIZATION_RE.finditer(text):
+        if _word_start(text, match):
+            found.add("Organizations", match.group(), match.start())
+    for match in _MONTH_DATE_RE.finditer(text):
+        if _word_start(text, match):
+            found.add("Dates", match.group(), match.start())
+    for match in _PERIOD_RE.finditer(text):
+        if _word_start(text, match):
+            found.add("Dates", match.group(), match.start())
+    for number in _NUMBER_RE.finditer(text):
+        figure = _FIGURE_SUFFIX_RE.match(text, number.end())
+        if figure is not None and _word_start(text, number):
+            found.add(figure.lastgroup, text[number.start():figure.end()], number.start())
+    for match in _CURRENCY_RE.finditer(text):
+        found.add("Amounts", match.group(), match.start())
+    for match in _DURATION_UNIT_RE.finditer(text):
+        start = match.start()
+        count = _DURATION_COUNT_RE.search(text, max(0, start - _DURATION_WINDOW), start)
+        if count is not None:
+            found.add("Durations", text[count.start():match.end()], count.start())
+    for match in _DEFINED_TERM_RE.finditer(text):
+        found.add("Defined terms", match.group(1) or match.group(2), match.start())
+    return found.result(limit)
+
+
+def _word_start(text: str, match: re.Match) -> bool:
+    """True if the match does not start in the middle of a word or number."""
+    start = match.start()
+    return start == 0 or not (text[start - 1].isalnum() or text[start - 1] in ".,")
+
+
+def merge_entities(
+    entities: dict[str, list[str]] | None,
+    extra: dict[str, list[str]],
+) -> dict[str, list[str]]:
+    """Add extracted items to parsed NAMED_ENTITIES, skipping repeats."""
+    merged = {group: list(items) for group, items in (entities or {}).items()}
+    seen = {item.lower() for items in merged.values() for item in items}
+    for group, items in extra.items():
+        new = [item for item in items if item.lower() not in seen]
+        if new:
+            merged.setdefault(group, []).extend(new)
+            seen.update(item.lower() for item in new)
+    return merged
+
+
+def format_entities(entities: dict[str, list[str]]) -> str:
+    """Render entities as "Type: a, b" lines (the NAMED_ENTITIES layout)."""
+    return "\n".join(f"{group}: {', '.join(items)}" for group, items in entities.items())
@@ -2,20 +2,137 @@
 Groq API Service
 
 Handles all communication with the Groq OpenAI-compatible API.
-Uses the Llama 3.3 70B model for document analysis and semantic search.
+Uses the Llama 3.3 70B model for document analysis and semantic search by
+default; models are routed per task and can be overridden in Settings.
+
+Semantic search supports a model cascade: a cheap recall stage (local
+BM25 or a small fast model) narrows the chunks, and only the surviving
+candidates are scored by the large model.
+
+Upstream calls honour an optional request Deadline, and can be hedged:
+when a call is slower than the recent p95 latency, a duplicate request is
+sent and whichever answers first wins.
+
+Server-side calls can go through an UpstreamPool of keys and endpoints;
+each attempt picks the least-loaded healthy member and fails over to the
+next one on errors, rate limits or timeouts.
+
+Search scoring asks for JSON mode (response_format) and parses the reply
+tolerantly: every complete result is kept from noisy or truncated output,
+and chunks a cut-off reply never reached get one follow-up call. Small
+scoring calls can be micro-batched across requests (see search_batcher).
+Consecutive chunks are listed without the words they share (see
+without_overlap), so overlapping text is not sent twice.
+
+When a document's chunk cards are available (see chunk_cards), search
+ranks the compact cards instead of the chunks and sends full text only
+for the best hits.
 """
 
-import json
-import re
-from typing import Any
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any, Literal
 
 import httpx
 
+from app.services.analysis_parser import SECTIONS
+from app.services.chunk_cards import format_card
+from app.services.chunk_service import without_overlap
+from app.services.deadline import Deadline, LatencyTracker
+from app.services.entity_extractor import format_entities
+from app.services import timing
+from app.services.json_salvage import ParsedArray, parse_json_array
+from app.services.lexical_service import LexicalScorer
+from app.services.metrics import MetricsRegistry
+from app.services.near_duplicates import DuplicateClusters
+from app.services.upstream_pool import FAILOVER_STATUSES, UpstreamPool
+
+if TYPE_CHECKING:
+    from app.config import Settings
+    from app.services.search_batcher import SearchBatcher
+
 # Groq API configuration
 GROQ_ENDPOINT = "https://api.groq.com/openai/v1/chat/completions"
 MODEL = "llama-3.3-70b-versatile"
+FAST_MODEL = "llama-3.1-8b-instant"
 MAX_TOKENS = 2048
 TEMPERATURE = 0.2
+TIMEOUT = 60.0
+
+# Percentile of recent upstream latency after which a request is hedged
+HEDGE_PERCENTILE = 95
+
+# Request JSON output (response_format) for search scoring
+JSON_MODE = True
+
+# JSON mode only allows an object at the top level, so the result array
+# is wrapped
+JSON_MODE_INSTRUCTION = """ Because the response must be a JSON object, wrap the array as {"results": [...]}."""
+
+# List chunks in search prompts without the words they share with the
+# chunk before them
+OVERLAP_FREE = True
+
+# Tells the model that chunks listed without overlap are consecutive
+OVERLAP_FREE_INSTRUCTION = """ Chunks with consecutive numbers are adjacent, non-overlapping passages of the document; a passage may continue into the next chunk."""
+
+# Default model per task (see Settings.groq_model_* to override)
+TASK_MODELS = {
+    "analysis": MODEL,
+    "search": MODEL,
+    "qa": MODEL,
+    "fast": FAST_MODEL,
+}
+
+# Chunks passed from the recall stage to the re-ranking stage
+CASCADE_CANDIDATES = 8
+
+# Chunks whose full text is scored after ranking chunk cards
+CARD_HITS = 3
+
+# Output budget per chunk of a write_cards call
+CARD_MAX_TOKENS = 80
+
+CARD_PROMPT = """You write compact index cards for numbered excerpts of a document, given as [n] text. Return a JSON array with one object per excerpt. Each object must have: 'chunkIndex' (the integer n), 'synopsis' (one sentence of at most 20 words saying what the excerpt is about, with its key facts), 'keyTerms' (up to 5 distinctive terms or phrases from the excerpt) and 'entities' (up to 5 names of people, organizations, places, dates or amounts in the excerpt). Do not add anything that is not in the excerpt. Return ONLY valid JSON, no markdown, no preamble."""
+
+# Queries packed into one upstream prompt by batch_search
+QUERIES_PER_CALL = 5
+
+# Per-section prompt instructions and output budgets for analyze_document
+SECTION_INSTRUCTIONS = {
+    "EXECUTIVE_SUMMARY": "Under EXECUTIVE_SUMMARY write 3-5 sentences.",
+    "KEY_POINTS": "Under KEY_POINTS write a numbered list of the most important facts, clauses, or findings.",
+    "CRITICAL_FLAGS": "Under CRITICAL_FLAGS list any risks, deadlines, penalties, obligations, or unusual items — write NONE if there are none.",
+    "NAMED_ENTITIES": "Under NAMED_ENTITIES list people, organizations, dates, and monetary amounts as comma-separated items grouped by type.",
+    "RECOMMENDED_ACTIONS": "Under RECOMMENDED_ACTIONS list what the reader should do or pay attention to.",
+}
+SECTION_MAX_TOKENS = {
+    "EXECUTIVE_SUMMARY": 300,
+    "KEY_POINTS": 600,
+    "CRITICAL_FLAGS": 400,
+    "NAMED_ENTITIES": 400,
+    "RECOMMENDED_ACTIONS": 350,
+}
+# NAMED_ENTITIES instruction and budget when locally extracted entities
+# are passed as hints (see entity_extractor)
+HINTED_ENTITIES_INSTRUCTION = "Under NAMED_ENTITIES list only people and organizations as comma-separated items grouped by type; dates, amounts, percentages, durations, defined terms and parties are already listed under EXTRACTED ENTITIES and must not be repeated."
+HINTED_ENTITIES_MAX_TOKENS = 150
+_NUMBER_WORDS = {1: "one", 2: "two", 3: "three", 4: "four", 5: "five"}
+
+# Answer length cap for document Q&A
+QA_MAX_TOKENS = 512
+
+QA_SYSTEM_PROMPT = """You are a precise document assistant answering questions about a single document. Each question comes with numbered excerpts from the document in the form [n] text. Answer only from the excerpts and the document overview. Cite every excerpt you rely on by its number in square brackets, e.g. [3]. If the excerpts do not contain the answer, say so plainly. Be concise."""
+
+# Output budgets for summary tree nodes (chunk leaves, parent nodes)
+LEAF_SUMMARY_MAX_TOKENS = 160
+PARENT_SUMMARY_MAX_TOKENS = 320
+
+LEAF_SUMMARY_PROMPT = """You summarize one excerpt of a long document. Write 2-3 sentences that keep the concrete facts: names, figures, dates, obligations and conclusions. Do not add anything that is not in the excerpt. No preamble."""
+
+PARENT_SUMMARY_PROMPT = """You summarize a part of a long document from summaries of its consecutive pieces, given in order as [n] text. Write one coherent summary of 3-5 sentences covering the whole part, keeping the most important names, figures, dates, obligations and conclusions. Do not add anything that is not in the summaries. No preamble."""
+
+SearchMode = Literal["fast", "balanced", "thorough"]
 
 
 class GroqServiceError(Exception):
@@ -35,14 +152,72 @@ class GroqService:
     appropriate prompts and parsing LLM responses.
     """
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        client: httpx.AsyncClient | None = None,
+        settings: "Settings | None" = None,
+        deadline: Deadline | None = None,
+        latency: LatencyTracker | None = None,
+        metrics: MetricsRegistry | None = None,
+        pool: UpstreamPool | None = None,
+        batcher: "SearchBatcher | None" = None,
+        client_id: str | None = None,
+    ):
         """
         Initialize the Groq service with an API key.
 
         Args:
             api_key: Groq API key for authentication.
+            client: Shared pooled HTTP client. When omitted, a short-lived
+                client is opened per request.
+            settings: Application settings for endpoint, model routing and
+                hedging. Module defaults are used when omitted.
+            deadline: Request deadline; upstream calls never wait past it.
+            latency: Shared tracker of upstream latencies (enables hedging
+                when Settings.hedge_upstream is set).
+            metrics: Registry for search parse failures and follow-ups.
+            pool: Server-side upstream pool; when set (with a shared
+                client), calls go to its members instead of
+                endpoint/api_key.
+            batcher: Shared micro-batcher; small score_chunks calls are
+                packed with other requests' calls into one upstream prompt.
+            client_id: Caller identity (see client_identity); calls are
+                only batched with the same caller's, so a server-side key
+                never mixes two clients' documents in one prompt.
         """
         self.api_key = api_key
+        self.client = client
+        self.deadline = deadline
+        self.latency = latency
+        self.metrics = metrics
+        self.pool = pool
+        self.batcher = batcher
+        self.client_id = client_id
+        self.endpoint = GROQ_ENDPOINT
+        self.models = dict(TASK_MODELS)
+        self.cascade_candidates = CASCADE_CANDIDATES
+        self.card_hits = CARD_HITS
+        self.timeout = TIMEOUT
+        self.hedge = False
+        self.hedge_min_samples = 0
+        self.json_mode = JSON_MODE
+        self.overlap_free = OVERLAP_FREE
+        if settings is not None:
+            self.json_mode = settings.groq_json_mode
+            self.overlap_free = settings.search_overlap_free
+            self.timeout = settings.http_timeout
+            self.hedge = settings.hedge_upstream
+            self.hedge_min_samples = settings.hedge_min_samples
+            self.endpoint = settings.groq_endpoint
+            self.models = {
+                "analysis": settings.groq_model_analysis,
+                "search": settings.groq_model_search,
+                "qa": settings.groq_model_qa,
+                "fast": settings.groq_model_fast,
+            }
+            self.cascade_candidates = settings.search_cascade_candidates
+            self.card_hits = settings.search_card_hits
         self._headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json",
@@ -52,6 +227,9 @@ class GroqService:
         self,
         messages: list[dict[str, str]],
         system_prompt: str,
+        model: str = MODEL,
+        max_tokens: int = MAX_TOKENS,
+        json_mode: bool = False,
     ) -> str:
         """
         Send a chat completion request to the Groq API.
@@ -59,6 +237,11 @@ class GroqService:
         Args:
             messages: List of message dicts with 'role' and 'content'.
             system_prompt: System prompt to guide model behavior.
+            model: Model name to run the completion on.
+            max_tokens: Upper bound on generated tokens.
+            json_mode: Request a JSON object response (response_format).
+                If upstream rejects the generation as invalid JSON, the
+                failed generation is returned for salvaging.
 
         Returns:
             The content of the assistant's response.
@@ -71,37 +254,194 @@ class GroqService:
             *messages,
         ]
         payload = {
-            "model": MODEL,
+            "model": model,
             "messages": full_messages,
             "temperature": TEMPERATURE,
-            "max_tokens": MAX_TOKENS,
+            "max_tokens": max_tokens,
         }
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                GROQ_ENDPOINT,
-                headers=self._headers,
-                json=payload,
-            )
+        with timing.stage("upstream"):
+            response = await self._post(payload)
 
         if response.status_code != 200:
             try:
-                err_data = response.json()
-                msg = err_data.get("error", {}).get("message", response.text)
+                error = response.json().get("error", {})
+                msg = error.get("message", response.text)
             except Exception:
+                error = {}
                 msg = response.text
+            if json_mode and error.get("code") == "json_validate_failed":
+                return error.get("failed_generation") or ""
             raise GroqServiceError(msg, response.status_code)
 
-        data = response.json()
+        with timing.stage("response_parse"):
+            data = response.json()
+        timing.add_usage(data.get("usage"))
         content = (
             data.get("choices", [{}])[0].get("message", {}).get("content") or ""
         )
         return content
 
+    def _request_timeout(self) -> float:
+        """Seconds an upstream call may take, bounded by the deadline."""
+        if self.deadline is None:
+            return self.timeout
+        if self.deadline.expired:
+            raise GroqServiceError("Request deadline exceeded", 504)
+        return self.deadline.timeout(self.timeout)
+
+    def _hedge_delay(self) -> float | None:
+        """Delay before sending a hedged duplicate, or None to not hedge."""
+        if not self.hedge or self.latency is None or self.client is None:
+            return None
+        if len(self.latency) < max(1, self.hedge_min_samples):
+            return None
+        return self.latency.percentile(HEDGE_PERCENTILE)
+
+    async def _post(self, payload: dict[str, Any]) -> httpx.Response:
+        """POST a completion payload, applying deadline and hedging."""
+        timeout = self._request_timeout()
+        if self.client is None:
+            try:
+                async with httpx.AsyncClient(timeout=timeout) as client:
+                    return await client.post(
+                        self.endpoint,
+                        headers=self._headers,
+                        json=payload,
+                    )
+            except httpx.TimeoutException:
+                raise GroqServiceError("Upstream request timed out", 504)
+
+        delay = self._hedge_delay()
+        if delay is None or delay >= timeout:
+            return await self._send(payload, timeout)
+        return await self._send_hedged(payload, timeout, delay)
+
+    async def _send(self, payload: dict[str, Any], timeout: float) -> httpx.Response:
+        """Send one request on the shared client and record its latency."""
+        if self.pool is not None:
+            return await self._send_pooled(payload, timeout)
+        started = time.monotonic()
+        try:
+            response = await self.client.post(
+                self.endpoint,
+                headers=self._headers,
+                json=payload,
+                timeout=timeout,
+            )
+        except httpx.TimeoutException:
+            raise GroqServiceError("Upstream request timed out", 504)
+        if self.latency is not None and response.status_code == 200:
+            self.latency.record(time.monotonic() - started)
+        return response
+
+    async def _send_pooled(
+        self,
+        payload: dict[str, Any],
+        timeout: float,
+    ) -> httpx.Response:
+        """
+        Send one request through the pool, failing over between members.
+
+        Each member is tried at most once. The last failover-worthy
+        response (e.g. 429) is returned when every member has been tried.
+        """
+        tried: set[str] = set()
+        last_response: httpx.Response | None = None
+        last_error: httpx.TransportError | None = None
+        while True:
+            member = self.pool.acquire(exclude=tried)
+            if member is None:
+                break
+            if tried:
+                self._count("upstream.failovers")
+            tried.add(member.name)
+            started = time.monotonic()
+            try:
+                response = await self.client.post(
+                    member.endpoint,
+                    headers=member.headers,
+                    json=member.payload(payload),
+                    timeout=timeout,
+                )
+            except httpx.TransportError as e:
+                self.pool.release(member, None, time.monotonic() - started)
+                last_error = e
+            except BaseException:
+                self.pool.abandon(member)
+                raise
+            else:
+                elapsed = time.monotonic() - started
+                self.pool.release(member, response, elapsed)
+                if response.status_code not in FAILOVER_STATUSES:
+                    if self.latency is not None and response.status_code == 200:
+                        self.latency.record(elapsed)
+                    return response
+                last_response = response
+            if self.deadline is not None and self.deadline.expired:
+                break
+            timeout = self._request_timeout()
+
+        if last_response is not None:
+            return last_response
+        if isinstance(last_error, httpx.TimeoutException):
+            raise GroqServiceError("Upstream request timed out", 504)
+        if last_error is not None:
+            raise GroqServiceError(f"Upstream unavailable: {last_error}", 502)
+        raise GroqServiceError(
+            f"No healthy upstream; retry in {self.pool.retry_after()}s", 503
+        )
+
+    async def _send_hedged(
+        self,
+        payload: dict[str, Any],
+        timeout: float,
+        delay: float,
+    ) -> httpx.Response:
+        """
+        Send a request and, if it has not answered after `delay` seconds,
+        a duplicate. The first successful (2xx) response wins; the other
+        request is cancelled. An error response or exception only settles
+        the call once no attempt is left: the last error response is
+        returned, or else the last exception raised.
+        """
+        pending = {asyncio.create_task(self._send(payload, timeout))}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                pending.add(
+                    asyncio.create_task(self._send(payload, timeout - delay))
+                )
+            error: BaseException | None = None
+            failed: httpx.Response | None = None
+            while True:
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif task.result().is_success:
+                        return task.result()
+                    else:
+                        failed = task.result()
+                if not pending:
+                    if failed is not None:
+                        return failed
+                    raise error
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+        finally:
+            for task in pending:
+                task.cancel()
+
     async def analyze_document(
         self,
         document_text: str,
         document_type: str,
+        sections: list[str] | None = None,
+        entity_hints: dict[str, list[str]] | None = None,
+        model: str | None = None,
     ) -> str:
         """
         Analyze a document and return structured analysis sections.
@@ -109,6 +449,12 @@ class GroqService:
         Args:
             document_text: Raw text content of the document.
             document_type: Type hint (contracts, research, business, general).
+            sections: Section labels to produce (default: all five). The
+                prompt and max_tokens shrink to match.
+            entity_hints: Entities extracted locally (type -> items). When
+                NAMED_ENTITIES is requested they follow the document, and
+                the model only adds people and organizations.
+            model: Model to use (default: the analysis model).
 
         Returns:
             Raw text response with labeled sections.
@@ -122,63 +468,631 @@ class GroqService:
         type_context = type_prompts.get(
             document_type, type_prompts["general"]
         )
+        with timing.stage("prompt"):
+            sections = [label for label in SECTIONS if label in (sections or SECTIONS)]
+            if len(sections) == 1:
+                scope = "this one section, preceded by its label"
+            else:
+                scope = f"these {_NUMBER_WORDS[len(sections)]} sections, each preceded by its label"
+            hinted = bool(entity_hints) and "NAMED_ENTITIES" in sections
+            instructions = " ".join(
+                HINTED_ENTITIES_INSTRUCTION
+                if hinted and label == "NAMED_ENTITIES"
+                else SECTION_INSTRUCTIONS[label]
+                for label in sections
+            )
+            max_tokens = sum(
+                HINTED_ENTITIES_MAX_TOKENS
+                if hinted and label == "NAMED_ENTITIES"
+                else SECTION_MAX_TOKENS[label]
+                for label in sections
+            )
+            if hinted:
+                document_text = (
+                    f"{document_text}\n\nEXTRACTED ENTITIES\n{format_entities(entity_hints)}"
+                )
 
-        system_prompt = f"""You are an expert document analyst specializing in {type_context} Analyze the following document and respond with exactly these five sections, each preceded by its label on its own line: EXECUTIVE_SUMMARY, KEY_POINTS, CRITICAL_FLAGS, NAMED_ENTITIES, RECOMMENDED_ACTIONS. Under EXECUTIVE_SUMMARY write 3-5 sentences. Under KEY_POINTS write a numbered list of the most important facts, clauses, or findings. Under CRITICAL_FLAGS list any risks, deadlines, penalties, obligations, or unusual items — write NONE if there are none. Under NAMED_ENTITIES list people, organizations, dates, and monetary amounts as comma-separated items grouped by type. Under RECOMMENDED_ACTIONS list what the reader should do or pay attention to. Be concise, precise, and prioritize information a busy professional would need immediately."""
+            system_prompt = f"""You are an expert document analyst specializing in {type_context} Analyze the following document and respond with exactly {scope} on its own line: {", ".join(sections)}. {instructions} Be concise, precise, and prioritize information a busy professional would need immediately."""
 
         return await self.chat_completion(
             [{"role": "user", "content": document_text}],
             system_prompt,
+            model=model or self.models["analysis"],
+            max_tokens=min(MAX_TOKENS, max_tokens),
         )
 
     async def semantic_search(
         self,
         chunks: list[dict[str, Any]],
         query: str,
+        mode: SearchMode = "thorough",
+        scorer: LexicalScorer | None = None,
+        clusters: DuplicateClusters | None = None,
+        cards: dict[int, str] | None = None,
     ) -> list[dict[str, Any]]:
         """
         Perform semantic search over document chunks using the LLM.
 
+        Modes trade latency for quality:
+            fast: local BM25 recall, then the fast model scores candidates.
+            balanced: the fast model scores every chunk, then the large
+                model re-scores the top candidates.
+            thorough: the large model scores every chunk.
+
+        With cards, balanced has the fast model score the chunks' cards
+        instead, and the search model scores the full text of the
+        card_hits best chunks only. Thorough ignores cards: it stays the
+        mode where the search model reads every chunk.
+
         Args:
             chunks: List of chunk dicts with 'index' and 'text'.
             query: User's search query.
+            mode: Search preset (fast, balanced, thorough).
+            scorer: Prebuilt BM25 index over chunks (built here if omitted).
+            clusters: Near-duplicate clusters of chunks; only one chunk per
+                cluster is scored and its result is copied to the others.
+            cards: Chunk card lines by chunk index (see chunk_cards);
+                chunks without a card are ranked by their full text.
+                Used by balanced only.
 
         Returns:
             List of result dicts with chunkIndex, relevanceScore, reason.
         """
-        chunks_text = "\n\n".join(
-            f"[{c['index']}] {c['text']}" for c in chunks
+        if clusters is None or not clusters.duplicates:
+            return await self._semantic_search(
+                chunks, chunks, query, mode, scorer, None, cards
+            )
+        representatives = clusters.representatives(chunks)
+        results = await self._semantic_search(
+            chunks, representatives, query, mode, scorer, clusters, cards
         )
-        user_message = f'Search Query: "{query}"\n\nDocument Chunks:\n{chunks_text}'
+        return clusters.expand(results)
+
+    async def _semantic_search(
+        self,
+        chunks: list[dict[str, Any]],
+        scored: list[dict[str, Any]],
+        query: str,
+        mode: SearchMode,
+        scorer: LexicalScorer | None,
+        clusters: DuplicateClusters | None,
+        cards: dict[int, str] | None = None,
+    ) -> list[dict[str, Any]]:
+        """semantic_search over `scored`, a duplicate-free subset of chunks."""
+        if cards and mode == "balanced":
+            ranked = await self.rank_cards(scored, cards, query, self.models["fast"])
+            hits = self._select(scored, [r["chunkIndex"] for r in ranked[: self.card_hits]])
+            if not hits:
+                return []
+            return await self.score_chunks(hits, query, self.models["search"])
+
+        if mode == "thorough":
+            return await self.score_chunks(scored, query, self.models["search"])
+
+        def lexical_top() -> list[int]:
+            top = (scorer or LexicalScorer(chunks)).top(query, self.cascade_candidates)
+            ranked = [idx for idx, _ in top]
+            return clusters.canonical_indexes(ranked) if clusters else ranked
+
+        if mode == "fast":
+            candidates = self._select(scored, lexical_top()) or scored
+            return await self.score_chunks(candidates, query, self.models["fast"])
+
+        recalled = await self.score_chunks(scored, query, self.models["fast"])
+        ranked = [r["chunkIndex"] for r in recalled[: self.cascade_candidates]]
+        if not ranked:
+            ranked = lexical_top()
+        candidates = self._select(scored, ranked)
+        if not candidates:
+            return []
+        return await self.score_chunks(candidates, query, self.models["search"])
+
+    @staticmethod
+    def _select(
+        chunks: list[dict[str, Any]],
+        indexes: list[int],
+    ) -> list[dict[str, Any]]:
+        """Return the chunks with the given indexes, in document order."""
+        wanted = set(indexes)
+        return [c for c in chunks if c["index"] in wanted]
+
+    async def score_chunks(
+        self,
+        chunks: list[dict[str, Any]],
+        query: str,
+        model: str,
+        follow_up: bool = True,
+        batch: bool = True,
+    ) -> list[dict[str, Any]]:
+        """
+        Ask one model to score chunks against the query.
+
+        If the reply is cut off mid-array, the results it did contain are
+        kept and one follow-up call scores the likeliest of the chunks it
+        never reached (see _follow_up_chunks). Most unlisted chunks were
+        left out on purpose (scored below 6), so the follow-up is bounded
+        rather than a resend of the whole prompt.
+
+        Args:
+            chunks: List of chunk dicts with 'index' and 'text'.
+            query: User's search query.
+            model: Model to score with.
+            follow_up: Re-score unscored chunks after a truncated reply.
+            batch: Allow the call to go through the micro-batcher.
+
+        Returns:
+            List of result dicts with chunkIndex, relevanceScore, reason,
+            sorted by relevanceScore descending.
+        """
+        if batch and self.batcher is not None and self.batcher.accepts(chunks):
+            return await self.batcher.submit(self, chunks, query, model)
+
+        with timing.stage("prompt"):
+            chunks_text = self._chunks_text(chunks)
+            user_message = f'Search Query: "{query}"\n\nDocument Chunks:\n{chunks_text}'
 
         system_prompt = """You are a semantic search engine. The user has provided a search query and a numbered list of document chunks. Return a JSON array of objects. Each object must have: 'chunkIndex' (integer), 'relevanceScore' (integer 1-10), and 'reason' (one sentence explaining why this chunk matches the query). Include every chunk that is contextually, semantically, or thematically relevant to the query — even if the exact words don't appear. Only include chunks with a relevanceScore of 6 or higher. Sort results by relevanceScore descending. If no chunks are relevant, return an empty array. Return ONLY valid JSON, no markdown, no preamble."""
 
+        content = await self.chat_completion(
+            [{"role": "user", "content": user_message}],
+            self._json_prompt(system_prompt),
+            model=model,
+            json_mode=self.json_mode,
+        )
+
+        with timing.stage("response_parse"):
+            parsed = self._parse_results(content)
+            valid = []
+            for r in parsed.items:
+                result = _validate_result(r)
+                if result is not None:
+                    valid.append(result)
+
+        if parsed.truncated and follow_up:
+            unscored = self._follow_up_chunks(chunks, valid, query)
+            if unscored:
+                self._count("search.followup_calls")
+                valid.extend(
+                    await self.score_chunks(
+                        unscored, query, model, follow_up=False, batch=False
+                    )
+                )
+        valid.sort(key=lambda r: -r["relevanceScore"])
+        return valid
+
+    def _follow_up_chunks(
+        self,
+        chunks: list[dict[str, Any]],
+        results: list[dict[str, Any]],
+        query: str,
+    ) -> list[dict[str, Any]]:
+        """
+        Chunks to re-score after a truncated reply: at most
+        cascade_candidates of those without a result, best BM25 matches
+        first, then the rest in prompt order; returned in prompt order.
+        """
+        scored = {r["chunkIndex"] for r in results}
+        unscored = [c for c in chunks if c["index"] not in scored]
+        limit = max(1, self.cascade_candidates)
+        if len(unscored) <= limit:
+            return unscored
+        wanted = [idx for idx, _ in LexicalScorer(unscored).top(query, limit)]
+        for c in unscored:
+            if len(wanted) >= limit:
+                break
+            if c["index"] not in wanted:
+                wanted.append(c["index"])
+        return self._select(unscored, wanted)
+
+    async def rank_cards(
+        self,
+        chunks: list[dict[str, Any]],
+        cards: dict[int, str],
+        query: str,
+        model: str,
+    ) -> list[dict[str, Any]]:
+        """
+        Ask one model to rank chunks by their cards.
+
+        A recall stage: the bar is lower than score_chunks', since the
+        best hits are scored again from their full text.
+
+        Args:
+            chunks: List of chunk dicts with 'index' and 'text'.
+            cards: Card lines by chunk index; chunks without one are
+                listed with their full text.
+            query: User's search query.
+            model: Model to rank with.
+
+        Returns:
+            List of result dicts with chunkIndex, relevanceScore, reason,
+            sorted by relevanceScore descending.
+        """
+        with timing.stage("prompt"):
+            lines = []
+            for c in chunks:
+                card = cards.get(c["index"])
+                if card is None:
+                    self._count("search.cards_missing")
+                lines.append(f"[{c['index']}] {card if card is not None else c['text']}")
+            user_message = f'Search Query: "{query}"\n\nDocument Chunks:\n' + "\n".join(lines)
+
+        system_prompt = """You are a semantic search engine. The user has provided a search query and a numbered list of document chunks, each described by a card: a synopsis, its key terms and its entities. Return a JSON array of objects. Each object must have: 'chunkIndex' (integer), 'relevanceScore' (integer 1-10, how likely the chunk is to answer the query) and 'reason' (a few words). Include every chunk that may be contextually, semantically, or thematically relevant to the query — even if the exact words don't appear. Only include chunks with a relevanceScore of 4 or higher. Sort results by relevanceScore descending. If no chunks are relevant, return an empty array. Return ONLY valid JSON, no markdown, no preamble."""
+        if self.json_mode:
+            system_prompt += JSON_MODE_INSTRUCTION
+
         content = await self.chat_completion(
             [{"role": "user", "content": user_message}],
             system_prompt,
+            model=model,
+            json_mode=self.json_mode,
         )
 
-        # Parse JSON from response (handle markdown fences)
-        cleaned = re.sub(r"```json\n?|\n?```", "", content).strip()
-        try:
-            results = json.loads(cleaned)
-        except json.JSONDecodeError:
-            return []
+        with timing.stage("response_parse"):
+            parsed = self._parse_results(content)
+            indexes = {c["index"] for c in chunks}
+            valid = []
+            for r in parsed.items:
+                result = _validate_result(r)
+                if result is not None and result["chunkIndex"] in indexes:
+                    valid.append(result)
+        valid.sort(key=lambda r: -r["relevanceScore"])
+        return valid
 
-        if not isinstance(results, list):
-            return []
+    async def write_cards(self, chunks: list[dict[str, Any]]) -> dict[int, str]:
+        """
+        Write chunk cards for a batch of chunks with the fast model.
+
+        Args:
+            chunks: Chunk dicts with 'index' and 'text'.
+
+        Returns:
+            Card lines (see chunk_cards.format_card) by chunk index; chunks
+            the reply did not describe are left out.
+        """
+        with timing.stage("prompt"):
+            user_message = "\n\n".join(f"[{c['index']}] {c['text']}" for c in chunks)
+        system_prompt = CARD_PROMPT
+        if self.json_mode:
+            system_prompt += JSON_MODE_INSTRUCTION
+        content = await self.chat_completion(
+            [{"role": "user", "content": user_message}],
+            system_prompt,
+            model=self.models["fast"],
+            max_tokens=min(MAX_TOKENS, CARD_MAX_TOKENS * len(chunks)),
+            json_mode=self.json_mode,
+        )
+
+        with timing.stage("response_parse"):
+            parsed = parse_json_array(content)
+            if not parsed.strict:
+                self._count("cards.parse_failures")
+            indexes = {c["index"] for c in chunks}
+            cards = {}
+            for item in parsed.items:
+                if not isinstance(item, dict):
+                    continue
+                try:
+                    idx = int(item.get("chunkIndex"))
+                except (TypeError, ValueError):
+                    continue
+                card = format_card(item)
+                if idx in indexes and card is not None:
+                    cards[idx] = card
+        self._count("cards.written", len(cards))
+        return cards
+
+    def batch_key(self) -> tuple:
+        """Calls with equal keys can share one upstream request."""
+        return (
+            self.client_id,
+            self.endpoint,
+            self.api_key,
+            id(self.pool),
+            id(self.client),
+            self.json_mode,
+        )
+
+    async def score_request_group(
+        self,
+        requests: list[tuple[list[dict[str, Any]], str]],
+        model: str,
+    ) -> list[list[dict[str, Any]]] | None:
+        """
+        Score several independent (chunks, query) requests in one call.
+
+        Each request is a tagged section with its own query and chunks;
+        results name their request and are split back per request.
 
-        # Validate and filter results
-        valid = []
-        for r in results:
-            if not isinstance(r, dict):
-                continue
-            idx = r.get("chunkIndex")
-            score = r.get("relevanceScore", 0)
-            reason = r.get("reason", "")
-            if idx is not None and isinstance(score, (int, float)):
-                valid.append({
-                    "chunkIndex": int(idx),
-                    "relevanceScore": max(1, min(10, int(score))),
-                    "reason": str(reason) if reason else "",
-                })
+        Args:
+            requests: (chunks, query) pairs from different searches.
+            model: Model to score with.
+
+        Returns:
+            Per-request result lists (same order), each sorted by
+            relevanceScore descending, or None if the reply could not be
+            parsed (callers should then score each request on its own).
+        """
+        with timing.stage("prompt"):
+            sections = []
+            for ri, (chunks, query) in enumerate(requests):
+                chunks_text = self._chunks_text(chunks)
+                sections.append(
+                    f'[R{ri}] Search Query: "{query}"\nDocument Chunks:\n{chunks_text}'
+                )
+            user_message = "\n\n".join(sections)
+
+        system_prompt = """You are a semantic search engine. The user has provided several independent search requests labeled [R<n>], each with its own query and its own numbered list of document chunks. Evaluate each request only against its own chunks. Return a single JSON array of objects. Each object must have: 'requestIndex' (the integer n from the request label), 'chunkIndex' (integer), 'relevanceScore' (integer 1-10), and 'reason' (one sentence explaining why this chunk matches that request's query). Include every chunk that is contextually, semantically, or thematically relevant to its query — even if the exact words don't appear. Only include pairs with a relevanceScore of 6 or higher. If nothing is relevant, return an empty array. Return ONLY valid JSON, no markdown, no preamble."""
+
+        content = await self.chat_completion(
+            [{"role": "user", "content": user_message}],
+            self._json_prompt(system_prompt),
+            model=model,
+            json_mode=self.json_mode,
+        )
+
+        with timing.stage("response_parse"):
+            parsed = self._parse_results(content)
+            if not parsed.strict:
+                return None
+            indexes = [{c["index"] for c in chunks} for chunks, _ in requests]
+            per_request: list[list[dict[str, Any]]] = [[] for _ in requests]
+            for r in parsed.items:
+                result = _validate_result(r)
+                ri = r.get("requestIndex") if isinstance(r, dict) else None
+                if result is None or not isinstance(ri, (int, float)):
+                    continue
+                ri = int(ri)
+                # A result must name a chunk of its own request
+                if 0 <= ri < len(requests) and result["chunkIndex"] in indexes[ri]:
+                    per_request[ri].append(result)
+            for results in per_request:
+                results.sort(key=lambda r: -r["relevanceScore"])
+        return per_request
+
+    def _json_prompt(self, system_prompt: str) -> str:
+        """Adapt an array-returning prompt to JSON mode and chunk encoding."""
+        if self.overlap_free:
+            system_prompt += OVERLAP_FREE_INSTRUCTION
+        if self.json_mode:
+            return system_prompt + JSON_MODE_INSTRUCTION
+        return system_prompt
+
+    def _chunks_text(self, chunks: list[dict[str, Any]]) -> str:
+        """
+        List chunks as "[index] text" for a scoring prompt.
+
+        With overlap_free set, consecutive chunks are trimmed to
+        non-overlapping segments; each segment keeps its chunk's index, so
+        results map back to chunks unchanged.
+        """
+        if not self.overlap_free:
+            return "\n\n".join(f"[{c['index']}] {c['text']}" for c in chunks)
+        segments = without_overlap(chunks)
+        skipped = sum(len(c["text"]) for c in chunks) - sum(len(t) for _, t in segments)
+        if skipped:
+            self._count("search.overlap_chars_skipped", skipped)
+        return "\n\n".join(f"[{index}] {text}" for index, text in segments)
+
+    def _parse_results(self, content: str) -> ParsedArray:
+        """Parse a result array, counting replies that needed salvaging."""
+        parsed = parse_json_array(content)
+        if not parsed.strict:
+            self._count("search.parse_failures")
+            if parsed.items:
+                self._count("search.salvaged_results", len(parsed.items))
+            else:
+                self._count("search.wasted_calls")
+        return parsed
+
+    def _count(self, name: str, value: int = 1) -> None:
+        if self.metrics is not None:
+            self.metrics.inc(name, value)
+
+    async def batch_search(
+        self,
+        chunks: list[dict[str, Any]],
+        queries: list[str],
+        prefilter: bool = True,
+        queries_per_call: int = QUERIES_PER_CALL,
+        scorer: LexicalScorer | None = None,
+        clusters: DuplicateClusters | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        """
+        Answer several queries against one document with shared upstream calls.
+
+        The BM25 index is built once; each query takes its top lexical
+        candidates. Queries are then packed into groups, and each group is
+        scored in one call over the union of its candidates. Queries that
+        match nothing lexically (or all, when prefilter is off) are grouped
+        separately and scored over every chunk. Groups run concurrently.
+
+        Args:
+            chunks: List of chunk dicts with 'index' and 'text'.
+            queries: Search queries, in request order.
+            prefilter: Narrow chunks with the local lexical scorer first.
+            queries_per_call: Maximum queries packed into one prompt.
+            scorer: Prebuilt BM25 index over chunks (built here if omitted).
+            clusters: Near-duplicate clusters of chunks; only one chunk per
+                cluster is scored and its result is copied to the others.
+
+        Returns:
+            Per-query result lists (same order as queries), each with
+            chunkIndex, relevanceScore, reason sorted by score descending.
+        """
+        scored = chunks
+        if clusters is not None and clusters.duplicates:
+            scored = clusters.representatives(chunks)
+        candidates: list[set[int]] = [set() for _ in queries]
+        if prefilter:
+            scorer = scorer or LexicalScorer(chunks)
+            for qi, query in enumerate(queries):
+                top = [idx for idx, _ in scorer.top(query, self.cascade_candidates)]
+                if clusters is not None:
+                    top = clusters.canonical_indexes(top)
+                candidates[qi] = set(top)
+
+        # Queries without lexical candidates are grouped apart and scored
+        # over every chunk, not over other queries' candidates
+        groups = []
+        for kind in (
+            [qi for qi in range(len(queries)) if candidates[qi]],
+            [qi for qi in range(len(queries)) if not candidates[qi]],
+        ):
+            groups.extend(
+                kind[start : start + queries_per_call]
+                for start in range(0, len(kind), queries_per_call)
+            )
+
+        async def run_group(group: list[int]) -> list[dict[str, Any]]:
+            wanted = set().union(*(candidates[qi] for qi in group))
+            group_chunks = self._select(scored, list(wanted)) if wanted else scored
+            return await self._score_query_group(
+                group_chunks,
+                {qi: queries[qi] for qi in group},
+            )
+
+        group_results = await asyncio.gather(*(run_group(g) for g in groups))
+
+        per_query: list[list[dict[str, Any]]] = [[] for _ in queries]
+        for results in group_results:
+            for r in results:
+                per_query[r.pop("queryIndex")].append(r)
+        for qi, results in enumerate(per_query):
+            results.sort(key=lambda r: -r["relevanceScore"])
+            if scored is not chunks:
+                per_query[qi] = clusters.expand(results)
+        return per_query
+
+    async def _score_query_group(
+        self,
+        chunks: list[dict[str, Any]],
+        queries: dict[int, str],
+    ) -> list[dict[str, Any]]:
+        """Score several queries against the same chunks in one call."""
+        with timing.stage("prompt"):
+            queries_text = "\n".join(f'[Q{qi}] "{q}"' for qi, q in queries.items())
+            chunks_text = self._chunks_text(chunks)
+            user_message = (
+                f"Search Queries:\n{queries_text}\n\nDocument Chunks:\n{chunks_text}"
+            )
+
+        system_prompt = """You are a semantic search engine. The user has provided several search queries labeled [Q<n>] and a numbered list of document chunks. Evaluate every query independently against the chunks. Return a single JSON array of objects. Each object must have: 'queryIndex' (the integer n from the query label), 'chunkIndex' (integer), 'relevanceScore' (integer 1-10), and 'reason' (one sentence explaining why this chunk matches that query). Include every chunk that is contextually, semantically, or thematically relevant to a query — even if the exact words don't appear. Only include pairs with a relevanceScore of 6 or higher. If nothing is relevant, return an empty array. Return ONLY valid JSON, no markdown, no preamble."""
+
+        content = await self.chat_completion(
+            [{"role": "user", "content": user_message}],
+            self._json_prompt(system_prompt),
+            model=self.models["search"],
+            json_mode=self.json_mode,
+        )
+
+        with timing.stage("response_parse"):
+            valid = []
+            for r in self._parse_results(content).items:
+                result = _validate_result(r)
+                if result is None:
+                    continue
+                qi = r.get("queryIndex")
+                if isinstance(qi, (int, float)) and int(qi) in queries:
+                    result["queryIndex"] = int(qi)
+                    valid.append(result)
         return valid
+
+    async def summarize_chunk(self, text: str) -> str:
+        """
+        Summarize one chunk (a summary tree leaf) with the fast model.
+
+        Args:
+            text: Chunk text.
+
+        Returns:
+            A 2-3 sentence summary.
+        """
+        return await self.chat_completion(
+            [{"role": "user", "content": text}],
+            LEAF_SUMMARY_PROMPT,
+            model=self.models["fast"],
+            max_tokens=LEAF_SUMMARY_MAX_TOKENS,
+        )
+
+    async def summarize_parts(self, parts: list[str]) -> str:
+        """
+        Summarize consecutive child summaries into their parent node.
+
+        Args:
+            parts: Child summaries in document order.
+
+        Returns:
+            A 3-5 sentence summary of the whole range.
+        """
+        with timing.stage("prompt"):
+            user_message = "\n\n".join(f"[{i}] {part}" for i, part in enumerate(parts, 1))
+        return await self.chat_completion(
+            [{"role": "user", "content": user_message}],
+            PARENT_SUMMARY_PROMPT,
+            model=self.models["analysis"],
+            max_tokens=PARENT_SUMMARY_MAX_TOKENS,
+        )
+
+    async def answer_question(
+        self,
+        document_overview: str,
+        excerpts: list[dict[str, Any]],
+        question: str,
+        history: list[dict[str, str]] | None = None,
+    ) -> str:
+        """
+        Answer a question about a document from retrieved excerpts.
+
+        The prompt is ordered for upstream prefix caching: the system
+        prompt and document overview are byte-identical for every question
+        on the same document, prior turns follow append-only, and only the
+        final user message (excerpts + question) changes per turn.
+
+        Args:
+            document_overview: Stable per-document context.
+            excerpts: Retrieved chunk dicts with 'index' and 'text'.
+            question: The user's question.
+            history: Previous turns as role/content dicts.
+
+        Returns:
+            Answer text citing excerpts as [chunk index].
+        """
+        with timing.stage("prompt"):
+            system_prompt = f"{QA_SYSTEM_PROMPT}\n\nDOCUMENT OVERVIEW\n{document_overview}"
+            excerpts_text = "\n\n".join(
+                f"[{c['index']}] {c['text']}" for c in excerpts
+            )
+            messages = [
+                *(history or []),
+                {
+                    "role": "user",
+                    "content": f"Excerpts:\n{excerpts_text}\n\nQuestion: {question}",
+                },
+            ]
+        return await self.chat_completion(
+            messages,
+            system_prompt,
+            model=self.models["qa"],
+            max_tokens=QA_MAX_TOKENS,
+        )
+
+
+def _validate_result(r: Any) -> dict[str, Any] | None:
+    """Normalize one search result object, or return None if malformed."""
+    if not isinstance(r, dict):
+        return None
+    idx = r.get("chunkIndex")
+    score = r.get("relevanceScore", 0)
+    reason = r.get("reason", "")
+    if idx is None or not isinstance(score, (int, float)):
+        return None
+    try:
+        idx = int(idx)
+    except (TypeError, ValueError):
+        return None
+    return {
+        "chunkIndex": idx,
+        "relevanceScore": max(1, min(10, int(score))),
+        "reason": str(reason) if reason else "",
+    }
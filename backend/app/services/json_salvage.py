@@ -0,0 +1,99 @@
+"""
+Tolerant parsing of JSON arrays in model output.
+
+Models asked for a JSON array sometimes wrap it in prose or markdown
+fences, return it inside an object ({"results": [...]} in JSON mode), or
+stop mid-array when they hit max_tokens. parse_json_array accepts all of
+these: when the output is not valid JSON it walks the array object by
+object and keeps every complete element, reporting whether the array was
+cut off so callers can ask again for what is missing.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+
+_FENCE_RE = re.compile(r"```(?:json)?\n?|\n?```")
+
+_DECODER = json.JSONDecoder()
+
+# Key holding the array when the model answers with an object
+RESULTS_KEY = "results"
+
+
+@dataclass
+class ParsedArray:
+    """Elements recovered from model output."""
+
+    items: list = field(default_factory=list)
+    # The whole output was valid JSON
+    strict: bool = True
+    # An array was opened but never closed (output cut off)
+    truncated: bool = False
+
+
+def _unwrap(value) -> list:
+    """Return the result array from a parsed JSON value."""
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict):
+        inner = value.get(RESULTS_KEY)
+        if isinstance(inner, list):
+            return inner
+        lists = [v for v in value.values() if isinstance(v, list)]
+        if len(lists) == 1:
+            return lists[0]
+        if value:
+            return [value]
+    return []
+
+
+def parse_json_array(content: str) -> ParsedArray:
+    """
+    Parse a JSON array from model output, salvaging what is complete.
+
+    Args:
+        content: Raw model output.
+
+    Returns:
+        ParsedArray with the recovered elements; strict is False when the
+        output needed salvaging, truncated is True when the array did not
+        close.
+    """
+    cleaned = _FENCE_RE.sub("", content).strip()
+    try:
+        return ParsedArray(items=_unwrap(json.loads(cleaned)))
+    except json.JSONDecodeError:
+        pass
+
+    # Start at the results array if the object wrapper is present, else at
+    # the first array; fall back to a bare run of objects
+    key = cleaned.find(f'"{RESULTS_KEY}"')
+    start = cleaned.find("[", key if key >= 0 else 0)
+    in_array = start >= 0
+    if in_array:
+        start += 1
+    else:
+        start = cleaned.find("{")
+        if start < 0:
+            return ParsedArray(strict=False)
+
+    items = []
+    pos = start
+    length = len(cleaned)
+    while pos < length:
+        char = cleaned[pos]
+        if char in " \t\r\n,":
+            pos += 1
+            continue
+        if char == "]":
+            return ParsedArray(items=items, strict=False)
+        next_object = cleaned.find("{", pos)
+        if next_object < 0:
+            break
+        try:
+            value, pos = _DECODER.raw_decode(cleaned, next_object)
+        except json.JSONDecodeError:
+            break
+        items.append(value)
+    return ParsedArray(items=items, strict=False, truncated=in_array)
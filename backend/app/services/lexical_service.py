@@ -0,0 +1,117 @@
+"""
+Lexical Scoring Service
+
+Local BM25 scorer over document chunks. Used as a zero-cost recall stage
+in front of the LLM: it ranks chunks by term overlap with the query so
+only the most promising candidates are sent upstream.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Any
+
+# BM25 parameters (standard defaults)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    """a an and are as at be by for from has have in is it its of on or that
+    the this to was were will with shall may any all""".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase text and split into alphanumeric terms, dropping stopwords."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class LexicalScorer:
+    """
+    BM25 index over one document's chunks.
+
+    Build once per document (term statistics are precomputed) and query
+    as often as needed.
+    """
+
+    def __init__(self, chunks: list[dict[str, Any]]):
+        """
+        Index chunks for scoring.
+
+        Args:
+            chunks: List of chunk dicts with 'index' and 'text'.
+        """
+        self.indexes = [c["index"] for c in chunks]
+        self._term_freqs = [Counter(tokenize(c["text"])) for c in chunks]
+        self._lengths = [sum(tf.values()) for tf in self._term_freqs]
+        self._avg_length = (
+            sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        )
+        doc_freq: Counter = Counter()
+        for tf in self._term_freqs:
+            doc_freq.update(tf.keys())
+        n = len(chunks)
+        self._idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    def score(self, query: str) -> list[tuple[int, float]]:
+        """
+        Score every chunk against the query.
+
+        Returns:
+            (chunk index, BM25 score) pairs in chunk order.
+        """
+        terms = [t for t in tokenize(query) if t in self._idf]
+        scores = []
+        for idx, tf, length in zip(self.indexes, self._term_freqs, self._lengths):
+            total = 0.0
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / (self._avg_length or 1))
+            for term in terms:
+                f = tf.get(term, 0)
+                if f:
+                    total += self._idf[term] * f * (BM25_K1 + 1) / (f + norm)
+            scores.append((idx, total))
+        return scores
+
+    def top(self, query: str, k: int) -> list[tuple[int, float]]:
+        """
+        Return the k best-matching chunks with a positive score.
+
+        Returns:
+            (chunk index, score) pairs, best first.
+        """
+        ranked = sorted(
+            (s for s in self.score(query) if s[1] > 0),
+            key=lambda s: (-s[1], s[0]),
+        )
+        return ranked[:k]
+
+    def centrality(self) -> list[float]:
+        """
+        Lexical centrality of every chunk: cosine similarity of its TF-IDF
+        vector to the whole document's.
+
+        Returns:
+            Scores in [0, 1], in chunk order.
+        """
+        vectors = [
+            {term: f * self._idf[term] for term, f in tf.items()}
+            for tf in self._term_freqs
+        ]
+        document: Counter = Counter()
+        for vector in vectors:
+            document.update(vector)
+        document_norm = math.sqrt(sum(w * w for w in document.values()))
+        scores = []
+        for vector in vectors:
+            norm = math.sqrt(sum(w * w for w in vector.values()))
+            if not norm or not document_norm:
+                scores.append(0.0)
+                continue
+            dot = sum(w * document[term] for term, w in vector.items())
+            scores.append(dot / (norm * document_norm))
+        return scores
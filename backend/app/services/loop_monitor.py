@@ -0,0 +1,106 @@
+"""
+Event-loop lag monitor.
+
+A request handler that does CPU-bound work on the event loop stalls every
+other request on the worker. The monitor measures this directly: a
+background task sleeps for a fixed interval and records how late it wakes
+up (the loop.lag_ms summary, whose snapshot carries max and p99), and a
+watchdog thread notices when the task has not woken up for longer than
+warn_after. It then logs the stack the loop thread is executing, which
+names the blocking call while it is still running.
+"""
+
+import asyncio
+import contextvars
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from app.services.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# Sampling interval of the lag probe (seconds)
+LOOP_MONITOR_INTERVAL = 0.05
+
+# Stall after which the blocking stack is logged (seconds)
+LOOP_BLOCK_WARN_SECONDS = 0.1
+
+# Innermost frames of the blocking stack included in the warning
+STACK_LIMIT = 8
+
+
+class LoopLagMonitor:
+    """
+    Samples event-loop delay and reports calls that block the loop.
+    """
+
+    def __init__(
+        self,
+        metrics: MetricsRegistry,
+        interval: float = LOOP_MONITOR_INTERVAL,
+        warn_after: float = LOOP_BLOCK_WARN_SECONDS,
+    ):
+        """
+        Configure the monitor. Call start() from the event loop.
+
+        Args:
+            metrics: Registry for loop.lag_ms and loop.blocked.
+            interval: Seconds between lag samples.
+            warn_after: Stall in seconds after which the loop thread's
+                stack is logged (once per stall).
+        """
+        self.metrics = metrics
+        self.interval = interval
+        self.warn_after = warn_after
+        self._beat = time.monotonic()
+        self._loop_thread: int | None = None
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Start the probe task on the running loop and the watchdog thread."""
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._probe(), context=contextvars.Context())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="doclens-loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def aclose(self) -> None:
+        """Stop the probe and the watchdog."""
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=self.interval * 2)
+            self._watchdog = None
+
+    async def _probe(self) -> None:
+        while True:
+            due = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self._beat = now = time.monotonic()
+            self.metrics.observe("loop.lag_ms", max(0.0, now - due) * 1000)
+
+    def _watch(self) -> None:
+        warned = None
+        while not self._stopped.wait(self.interval):
+            beat = self._beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.warn_after or beat == warned:
+                continue
+            warned = beat
+            self.metrics.inc("loop.blocked")
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame)[-STACK_LIMIT:]) if frame else ""
+            logger.warning(
+                "Event loop blocked for over %.0f ms in:\n%s", stalled * 1000, stack
+            )
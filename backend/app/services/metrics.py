@@ -0,0 +1,101 @@
+"""
+In-process metrics registry.
+
+Counters, gauges and rolling summaries (count, sum, max and percentiles
+over recent samples) kept per worker and exposed as JSON by the
+/api/metrics endpoint.
+"""
+
+import math
+import threading
+from collections import deque
+
+# Samples kept per summary for percentile estimates
+SUMMARY_WINDOW = 1024
+
+
+class Summary:
+    """
+    Rolling distribution of observed values.
+    """
+
+    def __init__(self, window: int = SUMMARY_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self._samples.append(value)
+
+    def percentile(self, pct: float) -> float:
+        """Percentile of recent observations (0.0 when empty)."""
+        samples = sorted(self._samples)
+        if not samples:
+            return 0.0
+        return samples[max(0, math.ceil(pct / 100 * len(samples)) - 1)]
+
+    def snapshot(self) -> dict[str, float]:
+        """Return count, sum, max, p50, p95 and p99."""
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class MetricsRegistry:
+    """
+    Named counters, gauges and summaries.
+    """
+
+    def __init__(self):
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, float] = {}
+        self._summaries: dict[str, Summary] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1) -> None:
+        """Increment a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Set a gauge to its current value."""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        """Add an observation to a summary."""
+        with self._lock:
+            summary = self._summaries.get(name)
+            if summary is None:
+                summary = self._summaries[name] = Summary()
+            summary.observe(value)
+
+    def counter(self, name: str) -> float:
+        """Current value of a counter (0 if never incremented)."""
+        return self._counters.get(name, 0)
+
+    def gauge(self, name: str) -> float:
+        """Current value of a gauge (0 if never set)."""
+        return self._gauges.get(name, 0)
+
+    def snapshot(self) -> dict:
+        """Return all metrics as a JSON-serializable dict."""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "summaries": {
+                    name: summary.snapshot()
+                    for name, summary in self._summaries.items()
+                },
+            }
@@ -0,0 +1,168 @@
+"""
+Near-duplicate chunk detection (MinHash with LSH banding).
+
+Contracts and reports repeat boilerplate (definitions, signature blocks,
+standard clauses), and every copy costs prompt tokens when chunks are
+scored. Each chunk is reduced to a MinHash signature over its word
+3-gram shingles (one-permutation hashing: each shingle hash lands in one
+of NUM_PERM bins and every bin keeps its minimum, so a signature costs a
+single pass; empty bins borrow from the next filled one). Signatures are
+split into bands, and chunks sharing any band bucket become candidate
+pairs. Candidates whose exact shingle Jaccard similarity reaches the
+threshold are clustered (union-find), and only one representative per
+cluster needs to be scored — its result is copied to the other members
+afterwards.
+"""
+
+import hashlib
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any
+
+# Words per shingle
+SHINGLE_WORDS = 3
+
+# Signature length and LSH layout (NUM_PERM = BANDS * ROWS). With 8 bands
+# of 4 rows, pairs above ~0.6 similarity almost always become candidates.
+NUM_PERM = 32
+BANDS = 8
+
+# Shingle Jaccard similarity at which two chunks count as duplicates
+DUPLICATE_THRESHOLD = 0.8
+
+_WORD_RE = re.compile(r"\w+")
+
+_EMPTY = 1 << 64
+
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> set[int]:
+    """Hashed word n-grams of text (the words themselves if shorter)."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return {
+        int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "little")
+        for g in grams
+    }
+
+
+def minhash(hashed: set[int]) -> tuple[int, ...]:
+    """One-permutation MinHash signature of a shingle set."""
+    bins = [_EMPTY] * NUM_PERM
+    for h in hashed:
+        slot = h % NUM_PERM
+        value = h // NUM_PERM
+        if value < bins[slot]:
+            bins[slot] = value
+    # Rotation densification: an empty bin takes the value of the next
+    # filled bin (offset by the distance, so bins stay distinguishable)
+    if _EMPTY in bins:
+        filled = [i for i, v in enumerate(bins) if v != _EMPTY]
+        if filled:
+            for i in range(NUM_PERM):
+                if bins[i] == _EMPTY:
+                    j = next((f for f in filled if f > i), filled[0] + NUM_PERM)
+                    bins[i] = bins[j % NUM_PERM] + (j - i) * _EMPTY
+    return tuple(bins)
+
+
+@dataclass
+class DuplicateClusters:
+    """Near-duplicate clusters of one document's chunks."""
+
+    total: int
+    # Duplicate chunk index -> index of its cluster's representative
+    canonical: dict[int, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.members: dict[int, list[int]] = defaultdict(list)
+        for index, representative in sorted(self.canonical.items()):
+            self.members[representative].append(index)
+
+    @property
+    def duplicates(self) -> int:
+        """Chunks that do not need to be scored."""
+        return len(self.canonical)
+
+    @property
+    def ratio(self) -> float:
+        """Fraction of chunks suppressed as duplicates."""
+        return self.duplicates / self.total if self.total else 0.0
+
+    def representatives(self, chunks: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """The chunks to score: one per cluster, in document order."""
+        return [c for c in chunks if c["index"] not in self.canonical]
+
+    def canonical_indexes(self, indexes: list[int]) -> list[int]:
+        """Map chunk indexes to their representatives (order kept, no repeats)."""
+        return list(dict.fromkeys(self.canonical.get(i, i) for i in indexes))
+
+    def expand(self, results: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Copy each representative's result to the members of its cluster."""
+        expanded = []
+        for result in results:
+            expanded.append(result)
+            for member in self.members.get(result["chunkIndex"], ()):
+                expanded.append({**result, "chunkIndex": member})
+        return expanded
+
+
+def find_near_duplicates(
+    chunks: list[dict[str, Any]],
+    threshold: float = DUPLICATE_THRESHOLD,
+) -> DuplicateClusters:
+    """
+    Cluster near-identical chunks.
+
+    Args:
+        chunks: Chunk dicts with 'index' and 'text'.
+        threshold: Minimum shingle Jaccard similarity of duplicates.
+
+    Returns:
+        DuplicateClusters; each cluster is represented by its first chunk.
+    """
+    rows = NUM_PERM // BANDS
+    shingle_sets: dict[int, set[int]] = {}
+    buckets: dict[tuple, list[int]] = defaultdict(list)
+    for chunk in chunks:
+        hashed = shingles(chunk["text"])
+        if not hashed:
+            continue
+        index = chunk["index"]
+        shingle_sets[index] = hashed
+        signature = minhash(hashed)
+        for band in range(BANDS):
+            buckets[(band, signature[band * rows:(band + 1) * rows])].append(index)
+
+    parent: dict[int, int] = {}
+
+    def find(i: int) -> int:
+        while parent.get(i, i) != i:
+            parent[i] = parent.get(parent[i], parent[i])
+            i = parent[i]
+        return i
+
+    checked: set[tuple[int, int]] = set()
+    for bucket in buckets.values():
+        for pos, first in enumerate(bucket):
+            for second in bucket[pos + 1:]:
+                pair = (first, second)
+                if pair in checked:
+                    continue
+                checked.add(pair)
+                a, b = shingle_sets[first], shingle_sets[second]
+                if len(a & b) >= threshold * len(a | b):
+                    root_a, root_b = find(first), find(second)
+                    if root_a != root_b:
+                        # The earliest chunk represents the cluster
+                        parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    canonical = {}
+    for index in shingle_sets:
+        root = find(index)
+        if root != index:
+            canonical[index] = root
+    return DuplicateClusters(total=len(chunks), canonical=canonical)
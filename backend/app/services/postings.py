@@ -0,0 +1,84 @@
+"""
+Compressed postings lists.
+
+Postings are (id, term frequency) pairs with strictly increasing ids.
+They are stored as LEB128 varints, ids delta-encoded against the
+previous entry, so a typical posting takes two or three bytes instead of
+two Python ints. The format is append-only, which lets the inverted index
+grow incrementally without re-encoding, and the same bytes are written
+verbatim into on-disk segments.
+"""
+
+from typing import Iterator
+
+
+def encode_varint(value: int, out: bytearray) -> None:
+    """Append a non-negative integer to out as an LEB128 varint."""
+    if value < 0:
+        raise ValueError("varint values must be non-negative")
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varints(data: bytes | bytearray | memoryview) -> Iterator[int]:
+    """Yield every varint in data, in order."""
+    value = 0
+    shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield value
+            value = 0
+            shift = 0
+
+
+def iter_postings(data: bytes | bytearray | memoryview) -> Iterator[tuple[int, int]]:
+    """Yield (id, frequency) pairs from an encoded postings buffer."""
+    values = decode_varints(data)
+    posting_id = -1
+    for gap in values:
+        posting_id += gap + 1
+        yield posting_id, next(values)
+
+
+class PostingsList:
+    """
+    Append-only, delta + varint encoded postings for one term.
+    """
+
+    __slots__ = ("data", "count", "last_id")
+
+    def __init__(self):
+        self.data = bytearray()
+        self.count = 0
+        self.last_id = -1
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, posting_id: int, freq: int) -> None:
+        """
+        Add a posting. Ids must be appended in increasing order.
+
+        Raises:
+            ValueError: If posting_id is not greater than the last id.
+        """
+        if posting_id <= self.last_id:
+            raise ValueError("postings must be appended in increasing id order")
+        encode_varint(posting_id - self.last_id - 1, self.data)
+        encode_varint(freq, self.data)
+        self.last_id = posting_id
+        self.count += 1
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        """Yield (id, frequency) pairs in id order."""
+        return iter_postings(self.data)
+
+    @property
+    def nbytes(self) -> int:
+        """Encoded size in bytes."""
+        return len(self.data)
@@ -0,0 +1,160 @@
+"""
+Speculative precomputation.
+
+When a client opens a document, the work its first action will need
+(chunking, the lexical index and optionally the analysis) is started in
+the background so the caches are warm by the time the user clicks. Jobs
+are keyed by document; each client has at most one running job (opening
+another document cancels the previous one), the number of concurrent
+jobs is bounded, and jobs can be cancelled when the document is
+abandoned by the last client that opened it.
+"""
+
+import asyncio
+import contextvars
+import logging
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Iterator
+
+from app.services.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class PrecomputeManager:
+    """
+    Registry of background precompute jobs.
+    """
+
+    def __init__(self, max_tasks: int, metrics: MetricsRegistry | None = None):
+        """
+        Initialize the registry.
+
+        Args:
+            max_tasks: Jobs allowed to run at once; beyond this, new
+                documents are not precomputed.
+            metrics: Registry for started/completed/cancelled/failed counts.
+        """
+        self.max_tasks = max_tasks
+        self.metrics = metrics or MetricsRegistry()
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._by_client: dict[str, str] = {}
+        self._queued: dict[str, asyncio.Event] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def start(
+        self,
+        key: str,
+        client_id: str,
+        job: Callable[[], Awaitable[None]],
+    ) -> str:
+        """
+        Start precomputing a document unless it is already running.
+
+        Args:
+            key: Document key.
+            client_id: Caller; its previous job (another key) is cancelled.
+            job: Coroutine function doing the work.
+
+        Returns:
+            "started", "running" (already in progress) or "busy" (too
+            many jobs; nothing started).
+        """
+        previous = self._by_client.get(client_id)
+        if previous is not None and previous != key:
+            self.cancel(previous, client_id)
+
+        if key in self._tasks:
+            self._by_client[client_id] = key
+            return "running"
+        if len(self._tasks) >= self.max_tasks:
+            self.metrics.inc("precompute.skipped_busy")
+            return "busy"
+
+        # A fresh context, so the job is not attributed to the request
+        # that started it (Server-Timing stages, token usage)
+        task = asyncio.create_task(job(), context=contextvars.Context())
+        self._tasks[key] = task
+        self._by_client[client_id] = key
+        task.add_done_callback(lambda t: self._finished(key, t))
+        self.metrics.inc("precompute.started")
+        return "started"
+
+    def _forget(self, key: str) -> None:
+        del self._tasks[key]
+        self._queued.pop(key, None)
+        for client_id, client_key in list(self._by_client.items()):
+            if client_key == key:
+                del self._by_client[client_id]
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            self._forget(key)
+        if task.cancelled():
+            self.metrics.inc("precompute.cancelled")
+        elif task.exception() is not None:
+            self.metrics.inc("precompute.failed")
+            logger.warning("Precompute failed: %s", task.exception())
+        else:
+            self.metrics.inc("precompute.completed")
+
+    def pending(self, key: str) -> asyncio.Task | None:
+        """The running job for a document, if any."""
+        return self._tasks.get(key)
+
+    @contextmanager
+    def queued(self, key: str) -> Iterator[None]:
+        """Mark a document's job as waiting for an admission slot."""
+        event = self._queued.setdefault(key, asyncio.Event())
+        event.set()
+        try:
+            yield
+        finally:
+            event.clear()
+
+    async def wait(self, key: str) -> None:
+        """
+        Wait for a document's job to finish, without ever cancelling it.
+
+        Returns early if the job is (or becomes) queued for admission: at
+        precompute_weight it can wait behind every user request, so the
+        caller is better off making its own call.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            return
+        queued = self._queued.setdefault(key, asyncio.Event())
+        if queued.is_set():
+            return
+        waiter = asyncio.ensure_future(queued.wait())
+        try:
+            await asyncio.wait({task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+
+    def cancel(self, key: str, client_id: str) -> bool:
+        """
+        Drop a client's hold on a document's job.
+
+        The job is cancelled only when no other client has the document
+        open. Returns True if it was cancelled.
+        """
+        if self._by_client.get(client_id) != key:
+            return False
+        del self._by_client[client_id]
+        task = self._tasks.get(key)
+        if task is None or key in self._by_client.values():
+            return False
+        # Forget it now so it no longer counts against max_tasks
+        self._forget(key)
+        task.cancel()
+        return True
+
+    async def aclose(self) -> None:
+        """Cancel all jobs and wait for them to finish."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
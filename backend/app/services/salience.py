@@ -0,0 +1,200 @@
+"""
+Extractive Salience Selection
+
+/analyze sends at most MAX_CHARS of a document to the model. Keeping
+only the head drops whatever comes later, and in contracts that is
+usually where termination, penalty and liability clauses sit. Instead,
+chunks are scored locally and the most valuable ones are kept, in
+document order, until the budget is full. A chunk's salience combines:
+
+- focus patterns for the document type: the clauses and figures
+  analyze_document asks about (obligations, penalties, termination and
+  payment terms for contracts; methodology, findings and limitations for
+  research; KPIs, decisions and action items for business reports),
+- position: opening and closing chunks carry parties, scope and
+  conclusions,
+- lexical centrality: how close a chunk's TF-IDF vector is to the whole
+  document's (see LexicalScorer.centrality).
+
+Adjacent selected chunks are rejoined without their overlap; left-out
+text is marked with GAP_MARKER.
+"""
+
+import re
+from collections import Counter
+from typing import Any
+
+from app.services.lexical_service import LexicalScorer
+from app.services.summary_tree import document_text
+
+# Weights of the three signals (each normalized to [0, 1])
+FOCUS_WEIGHT = 0.5
+CENTRALITY_WEIGHT = 0.3
+POSITION_WEIGHT = 0.2
+
+# Position prior of the first chunks and of the last chunk
+LEADING_PRIOR = (1.0, 0.5)
+TRAILING_PRIOR = (0.6,)
+
+# Matches of one pattern counted per chunk, so a single repeated term
+# does not outweigh everything else
+MAX_HITS = 3
+
+# Stands in for text that was left out
+GAP_MARKER = "\n\n[...]\n\n"
+
+# (pattern, weight) per document type, after the type_prompts focus
+# areas. Patterns are matched at word starts in lowercased text.
+FOCUS_PATTERNS = {
+    "contracts": (
+        (r"shall\b|must\b|agrees? to\b|is obligated\b", 1.0),
+        (r"terminat|expir|renew", 2.0),
+        (r"penalt|liquidated damages|fines?\b|late (?:fee|payment)", 2.0),
+        (r"liabilit|indemnif|warrant|breach|damages\b", 2.0),
+        (r"payments?\b|payable\b|fees?\b|invoic", 1.5),
+        (r"means\b|defined\b", 1.0),
+        (r"confidential|governing law\b|jurisdiction|force majeure\b", 1.0),
+    ),
+    "research": (
+        (r"abstract\b|we (?:propose|present|introduce|show)\b", 2.0),
+        (r"method|experiment|datasets?\b|participants\b", 1.5),
+        (r"results?\b|findings?\b|significant|outperform", 2.0),
+        (r"limitations?\b|future work\b|threats? to validity\b", 2.0),
+        (r"conclu|in summary\b|we find\b", 2.0),
+        (r"p\s?[<=]\s?0?\.\d", 1.0),
+    ),
+    "business": (
+        (r"revenue|profit|margins?\b|ebitda\b|growth\b|kpis?\b", 2.0),
+        (r"million\b|billion\b", 1.0),
+        (r"decid|decisions?\b|strateg|approv|invest", 1.5),
+        (r"action items?\b|next steps\b|deadlines?\b|responsible\b", 2.0),
+        (r"q[1-4]\b|fy\s?\d|timelines?\b|milestones?\b", 1.0),
+        (r"ceo\b|cfo\b|board\b|stakeholders?\b", 1.0),
+    ),
+    "general": (
+        (r"conclu|in summary\b|summar|overall\b", 2.0),
+        (r"important\b|key\b|critical\b|significant", 1.5),
+        (r"recommend|should\b|must\b|deadlines?\b|required?\b", 1.5),
+    ),
+}
+
+# Weight of money amounts and percentages per document type
+FIGURE_WEIGHTS = {"contracts": 1.5, "research": 1.0, "business": 1.5, "general": 1.0}
+
+# One pass per chunk: every focus area is a named group of one pattern
+_FOCUS_RES = {
+    document_type: re.compile(
+        r"\b(?:" + "|".join(f"(?P<f{i}>{p})" for i, (p, _) in enumerate(patterns)) + ")"
+    )
+    for document_type, patterns in FOCUS_PATTERNS.items()
+}
+_CURRENCY_RE = re.compile(r"[$€£]\s?\d")
+
+
+def focus_scores(chunks: list[dict[str, Any]], document_type: str) -> list[float]:
+    """Weighted focus-pattern matches per chunk (unnormalized)."""
+    if document_type not in FOCUS_PATTERNS:
+        document_type = "general"
+    pattern = _FOCUS_RES[document_type]
+    weights = [weight for _, weight in FOCUS_PATTERNS[document_type]]
+    figure_weight = FIGURE_WEIGHTS[document_type]
+    scores = []
+    for chunk in chunks:
+        text = chunk["text"].lower()
+        hits = Counter(match.lastgroup for match in pattern.finditer(text))
+        figures = len(_CURRENCY_RE.findall(text)) + text.count("%")
+        scores.append(
+            sum(weights[int(group[1:])] * min(MAX_HITS, n) for group, n in hits.items())
+            + figure_weight * min(MAX_HITS, figures)
+        )
+    return scores
+
+
+def salience_scores(
+    chunks: list[dict[str, Any]],
+    document_type: str,
+    centrality: list[float],
+) -> list[float]:
+    """
+    Score chunks for inclusion in the analysis prompt.
+
+    Args:
+        chunks: The document's chunks, in order.
+        document_type: contracts, research, business or general.
+        centrality: Lexical centrality per chunk (same order).
+
+    Returns:
+        Salience per chunk; higher is more worth keeping.
+    """
+    focus = focus_scores(chunks, document_type)
+    top = max(focus, default=0.0) or 1.0
+    last = len(chunks) - 1
+    scores = []
+    for i, (hits, central) in enumerate(zip(focus, centrality)):
+        position = LEADING_PRIOR[i] if i < len(LEADING_PRIOR) else 0.0
+        if last - i < len(TRAILING_PRIOR):
+            position = max(position, TRAILING_PRIOR[last - i])
+        scores.append(
+            FOCUS_WEIGHT * hits / top
+            + CENTRALITY_WEIGHT * central
+            + POSITION_WEIGHT * position
+        )
+    return scores
+
+
+def select_salient(
+    chunks: list[dict[str, Any]],
+    scores: list[float],
+    budget: int,
+) -> str:
+    """
+    Keep the highest-scoring chunks that fit the budget, in document order.
+
+    Args:
+        chunks: The document's chunks, in order.
+        scores: Salience per chunk (see salience_scores).
+        budget: Maximum characters of the result.
+
+    Returns:
+        The selected text; runs of adjacent chunks are joined without
+        their overlap and separated (and led or followed, when text was
+        left out there) by GAP_MARKER. When no chunk fits on its own
+        (text without whitespace, very long tokens), the head of the
+        document, cut at the budget.
+    """
+    chosen = []
+    used = 0
+    for i in sorted(range(len(chunks)), key=lambda i: (-scores[i], i)):
+        # Every run may cost a marker on each side; overlap is not
+        # subtracted, so the result never exceeds the budget
+        cost = len(chunks[i]["text"]) + 2 * len(GAP_MARKER)
+        if used + cost <= budget:
+            chosen.append(i)
+            used += cost
+    if not chosen:
+        return document_text(chunks)[:budget]
+    chosen.sort()
+
+    runs: list[list[int]] = []
+    for i in chosen:
+        if runs and runs[-1][-1] == i - 1:
+            runs[-1].append(i)
+        else:
+            runs.append([i])
+    text = GAP_MARKER.join(document_text([chunks[i] for i in run]) for run in runs)
+    if chosen[0] > 0:
+        text = GAP_MARKER.lstrip() + text
+    if chosen[-1] < len(chunks) - 1:
+        text += GAP_MARKER.rstrip()
+    return text
+
+
+def select_document(
+    chunks: list[dict[str, Any]],
+    document_type: str,
+    scorer: LexicalScorer,
+    budget: int,
+) -> str:
+    """Score a document's chunks and select_salient within budget."""
+    scores = salience_scores(chunks, document_type, scorer.centrality())
+    return select_salient(chunks, scores, budget)
@@ -0,0 +1,196 @@
+"""
+Cross-request micro-batching of small search calls.
+
+A /search over a short document costs one upstream call whose fixed
+overhead (system prompt, round trip, a request against the rate limit)
+outweighs the chunks themselves. When enabled, GroqService.score_chunks
+hands small scoring calls to the SearchBatcher, which holds them for a
+few milliseconds. Calls that arrive within the window and can share an
+upstream request (same caller, model and credentials) are packed into one
+prompt with one tagged section per request, and the reply is split back
+per request. A reply that cannot be parsed falls back to one call per
+request, so batching never loses results.
+"""
+
+import asyncio
+import contextvars
+import math
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from app.services import timing
+from app.services.metrics import MetricsRegistry
+
+if TYPE_CHECKING:
+    from app.services.groq_service import GroqService
+
+# Default collection window (milliseconds) and batch limits
+BATCH_WINDOW_MS = 5.0
+BATCH_MAX_SIZE = 8
+# Calls over more chunk text than this are sent on their own
+BATCH_MAX_CHARS = 6000
+
+
+@dataclass
+class _Waiter:
+    """One scoring call waiting for its batch."""
+
+    service: "GroqService"
+    chunks: list[dict[str, Any]]
+    query: str
+    future: asyncio.Future
+
+
+class SearchBatcher:
+    """
+    Collects small scoring calls and sends them upstream together.
+    """
+
+    def __init__(
+        self,
+        window_ms: float = BATCH_WINDOW_MS,
+        max_size: int = BATCH_MAX_SIZE,
+        max_chars: int = BATCH_MAX_CHARS,
+        metrics: MetricsRegistry | None = None,
+    ):
+        """
+        Initialize an empty batcher.
+
+        Args:
+            window_ms: How long the first call of a batch waits for others.
+            max_size: Calls per batch; a full batch is sent immediately.
+            max_chars: Largest chunk text (characters) a call may have to
+                be batched.
+            metrics: Registry for batch sizes and fallbacks.
+        """
+        self.window = window_ms / 1000
+        self.max_size = max_size
+        self.max_chars = max_chars
+        self.metrics = metrics or MetricsRegistry()
+        self._open: dict[tuple, list[_Waiter]] = {}
+        self._timers: dict[tuple, asyncio.TimerHandle] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def accepts(self, chunks: list[dict[str, Any]]) -> bool:
+        """True if a call over these chunks is small enough to batch."""
+        return sum(len(c["text"]) for c in chunks) <= self.max_chars
+
+    async def submit(
+        self,
+        service: "GroqService",
+        chunks: list[dict[str, Any]],
+        query: str,
+        model: str,
+    ) -> list[dict[str, Any]]:
+        """
+        Score chunks against a query as part of the next batch.
+
+        Args:
+            service: The caller's service (credentials, deadline).
+            chunks: List of chunk dicts with 'index' and 'text'.
+            query: User's search query.
+            model: Model to score with.
+
+        Returns:
+            Same as GroqService.score_chunks.
+        """
+        loop = asyncio.get_running_loop()
+        key = (model, *service.batch_key())
+        waiter = _Waiter(service, chunks, query, loop.create_future())
+        batch = self._open.setdefault(key, [])
+        batch.append(waiter)
+        if len(batch) >= self.max_size:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.window, self._flush, key)
+        # The batch runs outside this request's context; the wait is its
+        # upstream time
+        with timing.stage("upstream"):
+            return await waiter.future
+
+    def _flush(self, key: tuple) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        # Callers that gave up while waiting are dropped
+        batch = [w for w in self._open.pop(key, []) if not w.future.done()]
+        if not batch:
+            return
+        # A fresh context, so the shared call is not attributed to the
+        # request that happened to fill or open the batch
+        task = asyncio.create_task(self._run(batch, key[0]), context=contextvars.Context())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[_Waiter], model: str) -> None:
+        try:
+            if len(batch) == 1:
+                await self._score_alone(batch[0], model)
+                return
+            self.metrics.inc("search.batch_calls")
+            self.metrics.inc("search.batched_requests", len(batch))
+            self.metrics.observe("search.batch_size", len(batch))
+            # The call runs under the most generous deadline in the batch
+            service = max(batch, key=lambda w: _remaining(w.service)).service
+            try:
+                per_request = await service.score_request_group(
+                    [(w.chunks, w.query) for w in batch], model
+                )
+            except Exception as e:
+                for waiter in batch:
+                    _settle(waiter, exception=e)
+                return
+            if per_request is None:
+                self.metrics.inc("search.batch_fallbacks")
+                await asyncio.gather(*(self._score_alone(w, model) for w in batch))
+                return
+            for waiter, results in zip(batch, per_request):
+                _settle(waiter, results)
+        except asyncio.CancelledError:
+            for waiter in batch:
+                waiter.future.cancel()
+            raise
+
+    @staticmethod
+    async def _score_alone(waiter: _Waiter, model: str) -> None:
+        if waiter.future.done():
+            return
+        try:
+            results = await waiter.service.score_chunks(
+                waiter.chunks, waiter.query, model, batch=False
+            )
+        except Exception as e:
+            _settle(waiter, exception=e)
+        else:
+            _settle(waiter, results)
+
+    async def aclose(self) -> None:
+        """Cancel open batches and calls in flight."""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for batch in self._open.values():
+            for waiter in batch:
+                waiter.future.cancel()
+        self._open.clear()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _remaining(service: "GroqService") -> float:
+    return service.deadline.remaining() if service.deadline is not None else math.inf
+
+
+def _settle(
+    waiter: _Waiter,
+    results: list[dict[str, Any]] | None = None,
+    exception: BaseException | None = None,
+) -> None:
+    if waiter.future.done():
+        return
+    if exception is not None:
+        waiter.future.set_exception(exception)
+    else:
+        waiter.future.set_result(results)
@@ -0,0 +1,365 @@
+"""
+On-disk index segments.
+
+A segment is an immutable file holding one corpus shard: chunk text,
+per-chunk columns (document, chunk index, length, text offset), the
+sorted term dictionary and the varint postings. It is opened with mmap
+and read in place: columns are memoryviews cast over the mapping and
+postings are decoded straight from it, so loading a segment costs no
+parsing, and every worker that maps the same file shares one
+page-cache copy instead of holding its own in the Python heap.
+
+Layout (all sections 8-byte aligned, columns in native byte order):
+
+    header        magic, format version, byte order, shard, counts,
+                  then the offset of every section
+    doc_nums      u32[num_chunks]    document number of each chunk
+    chunk_idx     u32[num_chunks]    chunk index within its document
+    lengths       u32[num_chunks]    chunk length in terms
+    text_offsets  u64[num_chunks+1]  into the text blob
+    docid_offsets u64[num_docs+1]    into the document id blob
+    term_offsets  u64[num_terms+1]   into the term blob (terms sorted)
+    term_df       u32[num_terms]     chunks containing each term
+    post_offsets  u64[num_terms+1]   into the postings blob
+    text blob, document id blob, term blob, postings blob
+
+Segments are written to a temporary file, fsynced and renamed over the
+old one, so readers only ever see a complete file; processes that still
+map the previous version keep reading it until they reopen (replaced()
+tells them when).
+"""
+
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from app.services.lexical_service import tokenize
+from app.services.postings import PostingsList
+
+MAGIC = b"DLSEGMNT"
+FORMAT_VERSION = 1
+
+_SECTIONS = (
+    "doc_nums",
+    "chunk_idx",
+    "lengths",
+    "text_offsets",
+    "docid_offsets",
+    "term_offsets",
+    "term_df",
+    "post_offsets",
+    "text",
+    "docids",
+    "terms",
+    "postings",
+    "end",
+)
+
+# magic, version, byte order (0 little / 1 big), shard, num_shards,
+# num_chunks, num_docs, num_terms, total_length, section offsets
+_HEADER = struct.Struct(f"<8sHHIIIIIQ{len(_SECTIONS)}Q")
+
+_BYTE_ORDER = 0 if sys.byteorder == "little" else 1
+
+
+class SegmentFormatError(Exception):
+    """Raised when a segment file is missing, truncated or incompatible."""
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def write_segment(
+    path: str | Path,
+    documents: Iterable[tuple[str, list[dict[str, Any]]]],
+    shard: int = 0,
+    num_shards: int = 1,
+) -> None:
+    """
+    Atomically write a segment holding the given documents.
+
+    Args:
+        path: Destination file (replaced if it exists).
+        documents: (document id, chunks) pairs; chunks have 'index' and
+            'text'.
+        shard: Shard number stored in the header.
+        num_shards: Shard count the documents were partitioned with.
+    """
+    doc_ids: list[str] = []
+    doc_nums = array("I")
+    chunk_idx = array("I")
+    lengths = array("I")
+    text_offsets = array("Q", [0])
+    text = bytearray()
+    postings: dict[str, PostingsList] = {}
+    chunk_id = 0
+    for document_id, chunks in documents:
+        doc_num = len(doc_ids)
+        doc_ids.append(document_id)
+        for chunk in chunks:
+            tf = Counter(tokenize(chunk["text"]))
+            for term, freq in tf.items():
+                plist = postings.get(term)
+                if plist is None:
+                    plist = postings[term] = PostingsList()
+                plist.append(chunk_id, freq)
+            doc_nums.append(doc_num)
+            chunk_idx.append(chunk["index"])
+            lengths.append(sum(tf.values()))
+            text += chunk["text"].encode("utf-8")
+            text_offsets.append(len(text))
+            chunk_id += 1
+
+    docid_offsets = array("Q", [0])
+    docid_blob = bytearray()
+    for document_id in doc_ids:
+        docid_blob += document_id.encode("utf-8")
+        docid_offsets.append(len(docid_blob))
+
+    terms = sorted(postings, key=lambda t: t.encode("utf-8"))
+    term_offsets = array("Q", [0])
+    term_blob = bytearray()
+    term_df = array("I")
+    post_offsets = array("Q", [0])
+    post_blob = bytearray()
+    for term in terms:
+        term_blob += term.encode("utf-8")
+        term_offsets.append(len(term_blob))
+        term_df.append(len(postings[term]))
+        post_blob += postings[term].data
+        post_offsets.append(len(post_blob))
+
+    payloads = [
+        doc_nums.tobytes(),
+        chunk_idx.tobytes(),
+        lengths.tobytes(),
+        text_offsets.tobytes(),
+        docid_offsets.tobytes(),
+        term_offsets.tobytes(),
+        term_df.tobytes(),
+        post_offsets.tobytes(),
+        bytes(text),
+        bytes(docid_blob),
+        bytes(term_blob),
+        bytes(post_blob),
+    ]
+    offsets = []
+    position = _align(_HEADER.size)
+    for payload in payloads:
+        offsets.append(position)
+        position = _align(position + len(payload))
+    offsets.append(position)
+
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        _BYTE_ORDER,
+        shard,
+        num_shards,
+        len(lengths),
+        len(doc_ids),
+        len(terms),
+        sum(lengths),
+        *offsets,
+    )
+
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            for offset, payload in zip(offsets, payloads):
+                f.write(b"\0" * (offset - f.tell()))
+                f.write(payload)
+            f.write(b"\0" * (offsets[-1] - f.tell()))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    _fsync_dir(path.parent)
+
+
+def _fsync_dir(directory: Path) -> None:
+    """Persist a rename by syncing its directory (no-op where unsupported)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class Segment:
+    """
+    Read-only, memory-mapped view of a segment file.
+    """
+
+    def __init__(self, path: str | Path):
+        """
+        Map a segment file and validate its header.
+
+        Raises:
+            SegmentFormatError: If the file is unreadable, truncated, or
+                written by an incompatible format version or byte order.
+        """
+        self.path = Path(path)
+        try:
+            with open(self.path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                stat = os.fstat(f.fileno())
+        except (OSError, ValueError) as e:
+            raise SegmentFormatError(f"Cannot map {self.path}: {e}")
+        if len(self._mm) < _HEADER.size:
+            self._mm.close()
+            raise SegmentFormatError(f"{self.path} is truncated")
+        (
+            magic,
+            version,
+            byte_order,
+            self.shard,
+            self.num_shards,
+            self.num_chunks,
+            self.num_docs,
+            self.num_terms,
+            self.total_length,
+            *offsets,
+        ) = _HEADER.unpack_from(self._mm)
+        if magic != MAGIC:
+            self._mm.close()
+            raise SegmentFormatError(f"{self.path} is not a segment file")
+        if version != FORMAT_VERSION or byte_order != _BYTE_ORDER:
+            self._mm.close()
+            raise SegmentFormatError(
+                f"{self.path} has format version {version}, byte order {byte_order}"
+            )
+        if offsets[-1] > len(self._mm):
+            self._mm.close()
+            raise SegmentFormatError(f"{self.path} is truncated")
+        self._offsets = dict(zip(_SECTIONS, offsets))
+        # The file this mapping belongs to, to notice when it is replaced
+        self._identity = (stat.st_dev, stat.st_ino)
+
+        self._buffer = memoryview(self._mm)
+        self.doc_nums = self._column("doc_nums", "I", self.num_chunks)
+        self.chunk_indexes = self._column("chunk_idx", "I", self.num_chunks)
+        self.lengths = self._column("lengths", "I", self.num_chunks)
+        self._text_offsets = self._column("text_offsets", "Q", self.num_chunks + 1)
+        self._docid_offsets = self._column("docid_offsets", "Q", self.num_docs + 1)
+        self._term_offsets = self._column("term_offsets", "Q", self.num_terms + 1)
+        self._term_df = self._column("term_df", "I", self.num_terms)
+        self._post_offsets = self._column("post_offsets", "Q", self.num_terms + 1)
+
+    def _column(self, section: str, fmt: str, count: int) -> memoryview:
+        start = self._offsets[section]
+        size = struct.calcsize(fmt) * count
+        return self._buffer[start:start + size].cast(fmt)
+
+    def _blob(self, section: str, start: int, end: int) -> memoryview:
+        base = self._offsets[section]
+        return self._buffer[base + start:base + end]
+
+    def document_ids(self) -> list[str]:
+        """Document ids in document-number order."""
+        offsets = self._docid_offsets
+        return [
+            str(self._blob("docids", offsets[i], offsets[i + 1]), "utf-8")
+            for i in range(self.num_docs)
+        ]
+
+    def documents(self) -> Iterator[tuple[str, list[dict[str, Any]]]]:
+        """Yield (document id, chunks) in file order, text decoded."""
+        doc_ids = self.document_ids()
+        current, chunks = None, []
+        for chunk_id in range(self.num_chunks):
+            doc_num = self.doc_nums[chunk_id]
+            if doc_num != current:
+                if chunks:
+                    yield doc_ids[current], chunks
+                current, chunks = doc_num, []
+            chunks.append({"index": self.chunk_indexes[chunk_id], "text": self.text(chunk_id)})
+        if chunks:
+            yield doc_ids[current], chunks
+
+    def replaced(self) -> bool:
+        """Whether another file has been renamed over this segment's path."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return (stat.st_dev, stat.st_ino) != self._identity
+
+    def text(self, chunk_id: int) -> str:
+        """Text of one chunk, decoded from the mapping."""
+        offsets = self._text_offsets
+        return str(self._blob("text", offsets[chunk_id], offsets[chunk_id + 1]), "utf-8")
+
+    def _find_term(self, term: str) -> int | None:
+        """Binary-search the sorted term dictionary."""
+        key = term.encode("utf-8")
+        offsets = self._term_offsets
+        lo, hi = 0, self.num_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            candidate = self._blob("terms", offsets[mid], offsets[mid + 1])
+            if candidate == key:
+                return mid
+            if bytes(candidate) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def doc_freq(self, term: str) -> int:
+        """Chunks in the segment containing the term."""
+        slot = self._find_term(term)
+        return 0 if slot is None else self._term_df[slot]
+
+    def postings(self, term: str) -> memoryview | None:
+        """Encoded postings of a term (a view into the mapping), or None."""
+        slot = self._find_term(term)
+        if slot is None:
+            return None
+        return self._blob("postings", self._post_offsets[slot], self._post_offsets[slot + 1])
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the mapped file."""
+        return len(self._mm)
+
+    def close(self) -> None:
+        """
+        Unmap the file.
+
+        Views handed out by text()/postings() must no longer be in use.
+        """
+        for view in (
+            self.doc_nums,
+            self.chunk_indexes,
+            self.lengths,
+            self._text_offsets,
+            self._docid_offsets,
+            self._term_offsets,
+            self._term_df,
+            self._post_offsets,
+            self._buffer,
+        ):
+            view.release()
+        try:
+            self._mm.close()
+        except BufferError:
+            # A caller still holds a view; the mapping is freed with it
+            pass
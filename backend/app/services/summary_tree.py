@@ -0,0 +1,170 @@
+"""
+Summary Tree
+
+Hierarchical summaries over a document's chunks, for documents far
+larger than one prompt. Leaves summarize single chunks; each parent
+summarizes up to TREE_FANOUT consecutive children (level 1 nodes are the
+document's sections) and the root summarizes the whole document.
+
+Nodes are generated on demand and kept: asking for one section builds
+only that subtree, and later requests reuse every summary already
+written. A parent is summarized as soon as its own children are done, so
+independent branches of the tree are built concurrently.
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+# Children summarized into one parent
+TREE_FANOUT = 8
+
+# Upstream summarization calls running at once per build
+TREE_CONCURRENCY = 8
+
+
+@dataclass
+class SummaryNode:
+    """One node: a summary of the chunk range [chunk_start, chunk_end)."""
+
+    level: int
+    index: int
+    chunk_start: int
+    chunk_end: int
+    children: list["SummaryNode"] = field(default_factory=list, repr=False)
+    summary: str | None = None
+
+
+async def _gather_all(coroutines) -> None:
+    """Run coroutines concurrently; on the first failure cancel the rest."""
+    tasks = [asyncio.ensure_future(c) for c in coroutines]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def document_text(chunks: list[dict]) -> str:
+    """Rejoin overlapping chunks into the text they cover, without repeats."""
+    words: list[str] = []
+    covered = 0
+    for chunk in chunks:
+        chunk_words = chunk["text"].split()
+        start = chunk.get("startWord", covered)
+        words.extend(chunk_words[max(0, covered - start):])
+        covered = max(covered, start + len(chunk_words))
+    return " ".join(words)
+
+
+class SummaryTree:
+    """
+    Lazily built summary tree over a fixed list of chunks.
+    """
+
+    def __init__(self, num_chunks: int, fanout: int = TREE_FANOUT):
+        """
+        Lay out the (empty) tree.
+
+        Args:
+            num_chunks: Chunks of the document (one leaf each).
+            fanout: Children per parent node.
+        """
+        self.fanout = fanout
+        self.levels: list[list[SummaryNode]] = [
+            [SummaryNode(0, i, i, i + 1) for i in range(num_chunks)]
+        ]
+        while len(self.levels[-1]) > 1:
+            below = self.levels[-1]
+            level = len(self.levels)
+            self.levels.append([
+                SummaryNode(
+                    level,
+                    i,
+                    group[0].chunk_start,
+                    group[-1].chunk_end,
+                    children=group,
+                )
+                for i, group in enumerate(
+                    below[start:start + fanout] for start in range(0, len(below), fanout)
+                )
+            ])
+        self._lock = asyncio.Lock()
+
+    @property
+    def depth(self) -> int:
+        """Number of levels (leaves are level 0, the root the last)."""
+        return len(self.levels)
+
+    @property
+    def root(self) -> SummaryNode | None:
+        return self.levels[-1][0] if self.levels[-1] else None
+
+    @property
+    def sections(self) -> list[SummaryNode]:
+        """Level 1 nodes (the leaves for documents of one section)."""
+        return self.levels[1] if self.depth > 1 else self.levels[0]
+
+    def node(self, level: int | None = None, index: int = 0) -> SummaryNode | None:
+        """The node at (level, index); the root when level is None."""
+        if level is None:
+            return self.root
+        if 0 <= level < self.depth and 0 <= index < len(self.levels[level]):
+            return self.levels[level][index]
+        return None
+
+    def summarized(self) -> int:
+        """Nodes that already have a summary."""
+        return sum(1 for level in self.levels for node in level if node.summary is not None)
+
+    async def build(
+        self,
+        nodes: list[SummaryNode],
+        chunks: list[dict],
+        summarize_chunk: Callable[[str], Awaitable[str]],
+        summarize_parts: Callable[[list[str]], Awaitable[str]],
+        concurrency: int = TREE_CONCURRENCY,
+    ) -> int:
+        """
+        Make sure the given nodes (and their subtrees) are summarized.
+
+        Concurrent builds of the same tree run one after the other, so a
+        node is never generated twice; a build that is cancelled keeps the
+        summaries it finished.
+
+        Args:
+            nodes: Nodes whose summaries are needed.
+            chunks: The document's chunks (leaf text).
+            summarize_chunk: Summarizes one chunk's text.
+            summarize_parts: Summarizes consecutive child summaries.
+            concurrency: Upstream calls in flight at once.
+
+        Returns:
+            Number of summaries generated by this call.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        generated = 0
+
+        async def ensure(node: SummaryNode) -> None:
+            nonlocal generated
+            if node.summary is not None:
+                return
+            if node.children:
+                await _gather_all(ensure(child) for child in node.children)
+                parts = [child.summary for child in node.children]
+                if len(parts) == 1:
+                    # A lone trailing child needs no second summary
+                    node.summary = parts[0]
+                    return
+                async with semaphore:
+                    node.summary = await summarize_parts(parts)
+            else:
+                async with semaphore:
+                    node.summary = await summarize_chunk(chunks[node.chunk_start]["text"])
+            generated += 1
+
+        async with self._lock:
+            await _gather_all(ensure(node) for node in nodes)
+        return generated
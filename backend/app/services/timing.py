@@ -0,0 +1,97 @@
+"""
+Per-request stage timings.
+
+The timing middleware creates a RequestTimings for every request and
+stores it in a context variable; services record stages into it with
+stage() without having it passed around explicitly. Outside a request
+(tests, scripts) all helpers are no-ops.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+
+class RequestTimings:
+    """
+    Accumulated stage durations and annotations for one request.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: dict[str, float] = {}
+        self.annotations: dict[str, Any] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        """Add time to a stage (repeated stages accumulate)."""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        """Seconds since the request started."""
+        return time.perf_counter() - self.started
+
+    def header_value(self) -> str:
+        """Format stages and total as a Server-Timing header value."""
+        parts = [f"{name};dur={secs * 1000:.1f}" for name, secs in self.stages.items()]
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+def start_request() -> RequestTimings:
+    """Begin timing a new request in the current context."""
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+
+def current() -> RequestTimings | None:
+    """Return the current request's timings, if any."""
+    return _current.get()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the enclosed block as a named stage of the current request."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def mark_parsed() -> None:
+    """
+    Record body parsing/validation time.
+
+    Called first thing in a route handler: everything since the request
+    started was spent receiving, decoding and validating the body.
+    """
+    timings = _current.get()
+    if timings is not None and "parse" not in timings.stages:
+        timings.add("parse", timings.elapsed())
+
+
+def annotate(key: str, value: Any) -> None:
+    """Attach a value (e.g. document size) to the current request."""
+    timings = _current.get()
+    if timings is not None:
+        timings.annotations[key] = value
+
+
+def add_usage(usage: dict | None) -> None:
+    """Accumulate upstream token usage onto the current request."""
+    timings = _current.get()
+    if timings is None or not isinstance(usage, dict):
+        return
+    for key in ("prompt_tokens", "completion_tokens"):
+        value = usage.get(key)
+        if isinstance(value, int):
+            timings.annotations[key] = timings.annotations.get(key, 0) + value
@@ -0,0 +1,297 @@
+"""
+Upstream pool.
+
+Server-side completions can be spread over several Groq API keys and
+other OpenAI-compatible endpoints (for example a local vLLM or Ollama
+stand-in). Each call goes to the least-loaded healthy member: load is the
+number of calls in flight times the member's recent latency, scaled up
+as its remaining rate-limit budget (x-ratelimit-* response headers) runs
+low. A member that answers 429 is skipped until its limit resets; a
+member that fails repeatedly (transport errors, 5xx, rejected key) is
+taken out by a circuit breaker and probed again after a cool-down.
+Callers fail over to the next member within the request deadline.
+"""
+
+import re
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+import httpx
+
+from app.services.metrics import MetricsRegistry
+
+if TYPE_CHECKING:
+    from app.config import Settings
+
+# Statuses after which the call is retried on another member
+FAILOVER_STATUSES = frozenset({401, 403, 429, 500, 502, 503, 504})
+
+# Latency assumed for members without samples (seconds)
+DEFAULT_LATENCY = 1.0
+
+# Smoothing factor of the per-member latency average
+LATENCY_ALPHA = 0.2
+
+# Remaining-budget fraction below which a member is treated as this full
+MIN_CAPACITY = 0.05
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_reset(value: str | None) -> float | None:
+    """
+    Parse a rate-limit reset header into seconds.
+
+    Accepts plain seconds ("7.5") and Groq-style durations ("2m59.56s",
+    "250ms"). Returns None when the value cannot be read.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _header_int(headers: httpx.Headers, name: str) -> int | None:
+    try:
+        return int(float(headers[name]))
+    except (KeyError, ValueError):
+        return None
+
+
+@dataclass
+class UpstreamMember:
+    """One key/endpoint pair and its live health state."""
+
+    name: str
+    endpoint: str
+    api_key: str
+    # Task model name -> model name served by this member
+    models: dict[str, str] = field(default_factory=dict)
+    in_flight: int = 0
+    latency: float | None = None
+    remaining_requests: int | None = None
+    limit_requests: int | None = None
+    limited_until: float = 0.0
+    failures: int = 0
+    open_until: float = 0.0
+    probing: bool = False
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+
+    def payload(self, payload: dict) -> dict:
+        """The payload with the model renamed for this member."""
+        model = self.models.get(payload.get("model"))
+        if model is None:
+            return payload
+        return {**payload, "model": model}
+
+    def available(self, now: float) -> bool:
+        """Whether a call may be sent now (circuit closed, not rate limited)."""
+        if now < self.limited_until:
+            return False
+        if self.open_until:
+            # Half-open after the cool-down: one probe at a time
+            return now >= self.open_until and not self.probing
+        return True
+
+    def load(self) -> float:
+        """Relative cost of sending one more call here (lower is better)."""
+        cost = (self.in_flight + 1) * (self.latency or DEFAULT_LATENCY)
+        if self.remaining_requests is not None and self.limit_requests:
+            capacity = self.remaining_requests / self.limit_requests
+            cost /= max(capacity, MIN_CAPACITY)
+        return cost
+
+
+class UpstreamPool:
+    """
+    Health-aware load balancer over upstream members.
+    """
+
+    def __init__(
+        self,
+        members: list[UpstreamMember],
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        metrics: MetricsRegistry | None = None,
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            members: Members in preference order (ties go to the first).
+            failure_threshold: Consecutive failures that open a circuit.
+            cooldown: Seconds an open circuit waits before a probe.
+            metrics: Registry for per-member gauges and failover counts.
+        """
+        if not members:
+            raise ValueError("An upstream pool needs at least one member")
+        self.members = members
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.metrics = metrics or MetricsRegistry()
+
+    @classmethod
+    def from_settings(
+        cls,
+        settings: "Settings",
+        metrics: MetricsRegistry | None = None,
+    ) -> "UpstreamPool | None":
+        """
+        Build the server-side pool: GROQ_API_KEY and GROQ_API_KEYS on the
+        Groq endpoint, then UPSTREAM_ENDPOINTS. None when nothing is set.
+        """
+        members = []
+        keys = [settings.groq_api_key, *settings.groq_api_keys]
+        for key in dict.fromkeys(k for k in keys if k):
+            members.append(
+                UpstreamMember(f"groq-{len(members) + 1}", settings.groq_endpoint, key)
+            )
+        for i, config in enumerate(settings.upstream_endpoints, 1):
+            members.append(
+                UpstreamMember(
+                    config.name or f"endpoint-{i}",
+                    config.endpoint,
+                    config.api_key,
+                    dict(config.models),
+                )
+            )
+        if not members:
+            return None
+        return cls(
+            members,
+            failure_threshold=settings.upstream_failure_threshold,
+            cooldown=settings.upstream_cooldown_seconds,
+            metrics=metrics,
+        )
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def acquire(self, exclude: set[str] = frozenset()) -> UpstreamMember | None:
+        """
+        Reserve the least-loaded available member.
+
+        Args:
+            exclude: Names of members already tried by this call.
+
+        Returns:
+            The member (its in-flight count is incremented; pass it to
+            release), or None when no member can take the call.
+        """
+        now = time.monotonic()
+        candidates = [
+            m for m in self.members if m.name not in exclude and m.available(now)
+        ]
+        if not candidates:
+            return None
+        member = min(candidates, key=UpstreamMember.load)
+        if member.open_until:
+            member.probing = True
+        member.in_flight += 1
+        self._publish(member)
+        return member
+
+    def release(
+        self,
+        member: UpstreamMember,
+        response: httpx.Response | None,
+        elapsed: float,
+    ) -> None:
+        """
+        Return a member and record the outcome of its call.
+
+        Args:
+            member: Member returned by acquire.
+            response: The upstream response, or None if the call failed
+                (transport error or timeout).
+            elapsed: Seconds the call took.
+        """
+        member.in_flight -= 1
+        member.probing = False
+        now = time.monotonic()
+        if response is not None:
+            self._record_limits(member, response, now)
+
+        status = response.status_code if response is not None else None
+        if status == 429:
+            # Over its rate limit, not unhealthy
+            self.metrics.inc("upstream.rate_limited")
+        elif status is None or status in FAILOVER_STATUSES:
+            member.failures += 1
+            if member.open_until or member.failures >= self.failure_threshold:
+                if not member.open_until or now >= member.open_until:
+                    self.metrics.inc("upstream.circuit_opened")
+                member.open_until = now + self.cooldown
+        else:
+            member.failures = 0
+            member.open_until = 0.0
+            if status == 200:
+                member.latency = (
+                    elapsed
+                    if member.latency is None
+                    else member.latency + LATENCY_ALPHA * (elapsed - member.latency)
+                )
+        self._publish(member)
+
+    def abandon(self, member: UpstreamMember) -> None:
+        """Return a member whose call was cancelled; its health is unchanged."""
+        member.in_flight -= 1
+        member.probing = False
+        self._publish(member)
+
+    def _record_limits(
+        self,
+        member: UpstreamMember,
+        response: httpx.Response,
+        now: float,
+    ) -> None:
+        headers = response.headers
+        remaining = _header_int(headers, "x-ratelimit-remaining-requests")
+        if remaining is not None:
+            member.remaining_requests = remaining
+            member.limit_requests = (
+                _header_int(headers, "x-ratelimit-limit-requests") or member.limit_requests
+            )
+        wait = None
+        if response.status_code == 429:
+            wait = parse_reset(headers.get("retry-after")) or parse_reset(
+                headers.get("x-ratelimit-reset-requests")
+            ) or 1.0
+        elif remaining == 0:
+            wait = parse_reset(headers.get("x-ratelimit-reset-requests"))
+        elif _header_int(headers, "x-ratelimit-remaining-tokens") == 0:
+            wait = parse_reset(headers.get("x-ratelimit-reset-tokens"))
+        if wait:
+            member.limited_until = now + wait
+        elif remaining is not None and remaining > 0:
+            member.limited_until = 0.0
+
+    def retry_after(self) -> int:
+        """Seconds until some member should accept calls again."""
+        now = time.monotonic()
+        waits = [
+            max(m.limited_until, m.open_until) - now for m in self.members
+        ]
+        return max(1, int(min(waits) + 0.999))
+
+    def _publish(self, member: UpstreamMember) -> None:
+        prefix = f"upstream.{member.name}"
+        self.metrics.set_gauge(f"{prefix}.in_flight", member.in_flight)
+        self.metrics.set_gauge(f"{prefix}.circuit_open", 1 if member.open_until else 0)
+        if member.remaining_requests is not None:
+            self.metrics.set_gauge(f"{prefix}.remaining_requests", member.remaining_requests)
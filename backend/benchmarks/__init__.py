@@ -0,0 +1 @@
+"""Standalone benchmark scripts for the DocLens backend (not run by pytest)."""
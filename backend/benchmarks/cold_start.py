@@ -0,0 +1,73 @@
+"""
+Cold-start benchmark.
+
+Measures, in a fresh interpreter per run, how long it takes to import
+the application, run the lifespan startup, and serve the first request.
+Each run is a separate process so module import caches do not carry over.
+
+Usage (from backend/):
+    python -m benchmarks.cold_start --runs 5
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Executed in a child interpreter; prints one JSON line of timings (ms).
+_CHILD = r"""
+import asyncio, json, time
+t0 = time.perf_counter()
+from app.main import create_app
+t1 = time.perf_counter()
+
+async def main():
+    from httpx import ASGITransport, AsyncClient
+    app = create_app()
+    t2 = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        t3 = time.perf_counter()
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as ac:
+            await ac.get("/api/health")
+            t4 = time.perf_counter()
+            await ac.get("/api/health")
+            t5 = time.perf_counter()
+    print(json.dumps({
+        "import_ms": (t1 - t0) * 1000,
+        "create_app_ms": (t2 - t1) * 1000,
+        "startup_ms": (t3 - t2) * 1000,
+        "first_request_ms": (t4 - t3) * 1000,
+        "second_request_ms": (t5 - t4) * 1000,
+        "total_ms": (t4 - t0) * 1000,
+    }))
+
+asyncio.run(main())
+"""
+
+
+def run_once() -> dict:
+    """Run one cold start in a child process and return its timings."""
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    samples = [run_once() for _ in range(args.runs)]
+    print(f"{'stage':<20}{'median ms':>12}{'max ms':>12}")
+    for key in samples[0]:
+        values = [s[key] for s in samples]
+        print(f"{key:<20}{statistics.median(values):>12.1f}{max(values):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Server throughput benchmark.
+
+Starts each server command in turn, waits until it answers, and drives
+it with keep-alive HTTP/1.1 connections from separate load processes for
+a fixed time, reporting requests per second and latency percentiles. The
+commands compared are the README's development command, plain uvicorn,
+and the `python -m app` launcher.
+
+The load generator runs on the same machine as the server, so on hosts
+with few CPUs both compete for them; compare commands on the same host
+only.
+
+Usage (from backend/):
+    python -m benchmarks.throughput --duration 10 --connections 64
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+COMMANDS = {
+    "uvicorn --reload": "{python} -m uvicorn app.main:app --reload --port {port}",
+    "uvicorn": "{python} -m uvicorn app.main:app --port {port}",
+    "python -m app": "{python} -m app --port {port}",
+}
+
+
+async def _connection(port: int, path: str, deadline: float, latencies: list[float]) -> None:
+    """
+    Send requests back to back on a keep-alive connection.
+
+    Reconnects when the server closes the connection (e.g. a recycled
+    worker), as a real client would.
+    """
+    request = f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n".encode()
+    while time.perf_counter() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        except OSError:
+            await asyncio.sleep(0.01)
+            continue
+        try:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                writer.write(request)
+                headers = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in headers.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                await reader.readexactly(length)
+                latencies.append(time.perf_counter() - started)
+        except (OSError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def _load(port: int, path: str, connections: int, duration: float, queue) -> None:
+    """Load process body: run connections for duration, report latencies."""
+    latencies: list[float] = []
+    deadline = time.perf_counter() + duration
+
+    async def main():
+        await asyncio.gather(
+            *(_connection(port, path, deadline, latencies) for _ in range(connections))
+        )
+
+    asyncio.run(main())
+    queue.put(latencies)
+
+
+def _wait_ready(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1) as sock:
+                sock.sendall(b"GET /api/health HTTP/1.1\r\nHost: bench\r\n\r\n")
+                if sock.recv(64).startswith(b"HTTP/1.1 200"):
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def run_command(
+    command: str,
+    port: int,
+    path: str,
+    connections: int,
+    duration: float,
+    processes: int,
+) -> dict:
+    """Start a server command, load it, stop it; return its results."""
+    server = subprocess.Popen(
+        command.format(python=sys.executable, port=port).split(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    try:
+        _wait_ready(port)
+        queue = multiprocessing.Queue()
+        loaders = [
+            multiprocessing.Process(
+                target=_load, args=(port, path, connections // processes, duration, queue)
+            )
+            for _ in range(processes)
+        ]
+        for loader in loaders:
+            loader.start()
+        latencies = [lat for _ in loaders for lat in queue.get()]
+        for loader in loaders:
+            loader.join()
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait()
+    latencies.sort()
+    return {
+        "rps": len(latencies) / duration,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--processes", type=int, default=2, help="load generator processes")
+    parser.add_argument("--path", default="/api/health")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{'command':<20}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, command in COMMANDS.items():
+        result = run_command(
+            command, args.port, args.path, args.connections, args.duration, args.processes
+        )
+        print(
+            f"{name:<20}{result['rps']:>10.0f}"
+            f"{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
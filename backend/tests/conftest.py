@@ -18,12 +18,13 @@ def anyio_backend():
 
 @pytest.fixture
 async def client():
-    """Async HTTP client for testing FastAPI endpoints."""
-    async with AsyncClient(
-        transport=ASGITransport(app=app),
-        base_url="http://test",
-    ) as ac:
-        yield ac
+    """Async HTTP client for testing FastAPI endpoints (lifespan running)."""
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(
+            transport=ASGITransport(app=app),
+            base_url="http://test",
+        ) as ac:
+            yield ac
 
 
 @pytest.fixture
@@ -0,0 +1,121 @@
+"""
+Tests for admission control and weighted fair queuing.
+"""
+
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+from pydantic import ValidationError
+from unittest.mock import AsyncMock, patch
+
+from app.config import Settings
+from app.main import app
+from app.services.admission import AdmissionController, AdmissionRejected
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_full():
+    """Requests beyond concurrency + queue capacity should be rejected fast."""
+    controller = AdmissionController(max_concurrency=1, max_queue=0, queue_timeout=1)
+    async with controller.slot("a"):
+        with pytest.raises(AdmissionRejected) as exc_info:
+            async with controller.slot("b"):
+                pass
+    assert exc_info.value.retry_after >= 1
+    assert controller.metrics.counter("admission.rejected_queue_full") == 1
+
+
+@pytest.mark.asyncio
+async def test_rejects_after_queue_timeout():
+    """Waiters should give up after their queue-time budget."""
+    controller = AdmissionController(max_concurrency=1, max_queue=5, queue_timeout=0.05)
+    async with controller.slot("a"):
+        with pytest.raises(AdmissionRejected):
+            async with controller.slot("b"):
+                pass
+        assert controller.queue_depth == 0
+    assert controller.active == 0
+
+
+@pytest.mark.asyncio
+async def test_fair_order_across_clients():
+    """A heavy client's backlog should not starve a light client."""
+    controller = AdmissionController(max_concurrency=1, max_queue=10, queue_timeout=5)
+    order = []
+    gate = asyncio.Event()
+
+    async def run(client_id, label):
+        async with controller.slot(client_id):
+            order.append(label)
+            await gate.wait()
+
+    holder = asyncio.create_task(run("heavy", "h0"))
+    await asyncio.sleep(0)
+    tasks = [asyncio.create_task(run("heavy", f"h{i}")) for i in range(1, 4)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(run("light", "l1")))
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(holder, *tasks)
+    assert order.index("l1") <= 2
+
+
+@pytest.mark.asyncio
+async def test_weights_give_larger_share():
+    """A client with a higher weight should be served more often."""
+    controller = AdmissionController(
+        max_concurrency=1, max_queue=20, queue_timeout=5, weights={"gold": 3.0}
+    )
+    order = []
+    gate = asyncio.Event()
+
+    async def run(client_id):
+        async with controller.slot(client_id):
+            order.append(client_id)
+            await gate.wait()
+
+    holder = asyncio.create_task(run("init"))
+    await asyncio.sleep(0)
+    tasks = [asyncio.create_task(run(c)) for c in ["gold"] * 6 + ["basic"] * 6]
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(holder, *tasks)
+    assert order[1:5].count("gold") >= 3
+
+
+@pytest.mark.asyncio
+async def test_route_returns_503_with_retry_after(
+    client: AsyncClient,
+    sample_api_key: str,
+):
+    """A full queue should produce 503 + Retry-After on Groq-backed routes."""
+    resources = app.state.resources
+    resources.admission.max_concurrency = 0
+    resources.admission.max_queue = 0
+    with patch("app.api.routes.search.GroqService") as mock_groq:
+        mock_groq.return_value = AsyncMock()
+        response = await client.post(
+            "/api/search",
+            json={"document_text": "hello", "query": "test", "api_key": sample_api_key},
+        )
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+
+    metrics = (await client.get("/api/metrics")).json()
+    assert metrics["counters"]["admission.rejected_queue_full"] == 1
+    assert "admission.queue_depth" in metrics["gauges"]
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {"admission_weights": {"client:batch": 0}},
+        {"admission_weights": {"client:batch": -1.0}},
+        {"precompute_weight": 0},
+    ],
+)
+def test_non_positive_weights_fail_at_startup(overrides):
+    """A zero or negative weight is a settings error, not a 500 under load."""
+    with pytest.raises(ValidationError):
+        Settings(**overrides)
@@ -0,0 +1,54 @@
+"""
+Tests for the analysis output parser.
+
+Covers section splitting, list and entity parsing, and NONE handling.
+"""
+
+from app.services.analysis_parser import parse_section, split_sections
+
+SAMPLE = """**EXECUTIVE_SUMMARY**
+This agreement sets out a consulting engagement.
+It runs for one year.
+
+KEY_POINTS:
+1. Payment of $50,000 on completion.
+2. Either party may terminate with 30 days notice.
+
+## CRITICAL_FLAGS
+NONE
+
+NAMED_ENTITIES
+Organizations: Acme Corporation
+People: John Doe
+Monetary amounts: $50,000, $100,000
+"""
+
+
+def test_split_sections_tolerates_markdown_labels():
+    """Labels with markdown decoration or colons should still split."""
+    sections = split_sections(SAMPLE)
+    assert list(sections) == [
+        "EXECUTIVE_SUMMARY",
+        "KEY_POINTS",
+        "CRITICAL_FLAGS",
+        "NAMED_ENTITIES",
+    ]
+    assert sections["CRITICAL_FLAGS"] == "NONE"
+
+
+def test_parse_section_types():
+    """Each section should parse into its structured form."""
+    sections = split_sections(SAMPLE)
+    assert parse_section("EXECUTIVE_SUMMARY", sections["EXECUTIVE_SUMMARY"]) == (
+        "This agreement sets out a consulting engagement. It runs for one year."
+    )
+    assert parse_section("KEY_POINTS", sections["KEY_POINTS"]) == [
+        "Payment of $50,000 on completion.",
+        "Either party may terminate with 30 days notice.",
+    ]
+    assert parse_section("CRITICAL_FLAGS", sections["CRITICAL_FLAGS"]) == []
+    assert parse_section("NAMED_ENTITIES", sections["NAMED_ENTITIES"]) == {
+        "Organizations": ["Acme Corporation"],
+        "People": ["John Doe"],
+        "Monetary amounts": ["$50,000", "$100,000"],
+    }
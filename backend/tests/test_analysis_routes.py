@@ -145,3 +145,75 @@ async def test_analyze_429_on_rate_limit(
             },
         )
         assert response.status_code == 429
+
+
+@pytest.mark.asyncio
+async def test_analyze_returns_parsed_sections(
+    client: AsyncClient,
+    sample_document_text: str,
+    sample_api_key: str,
+):
+    """Analysis should be parsed server-side into typed sections."""
+    with patch("app.api.routes.analysis.GroqService") as mock_groq:
+        mock_instance = AsyncMock()
+        mock_instance.analyze_document = AsyncMock(
+            return_value="EXECUTIVE_SUMMARY\nA summary.\n\nKEY_POINTS\n1. First\n2. Second"
+        )
+        mock_groq.return_value = mock_instance
+
+        response = await client.post(
+            "/api/analyze",
+            json={"document_text": sample_document_text, "api_key": sample_api_key},
+        )
+    data = response.json()
+    assert data["sections"]["executive_summary"] == "A summary."
+    assert data["sections"]["key_points"] == ["First", "Second"]
+    assert data["sections"]["critical_flags"] is None
+
+
+@pytest.mark.asyncio
+async def test_analyze_requests_only_selected_sections_and_caches_them(
+    client: AsyncClient,
+    sample_document_text: str,
+    sample_api_key: str,
+):
+    """Only requested sections are generated; cached sections are not regenerated."""
+    with patch("app.api.routes.analysis.GroqService") as mock_groq:
+        mock_instance = AsyncMock()
+        mock_instance.analyze_document = AsyncMock(
+            return_value="CRITICAL_FLAGS\n- Penalty of $100,000"
+        )
+        mock_groq.return_value = mock_instance
+
+        body = {
+            "document_text": sample_document_text,
+            "document_type": "contracts",
+            "sections": ["CRITICAL_FLAGS"],
+            "api_key": sample_api_key,
+        }
+        first = await client.post("/api/analyze", json=body)
+        second = await client.post("/api/analyze", json=body)
+
+    assert mock_instance.analyze_document.await_count == 1
+    assert mock_instance.analyze_document.call_args[1]["sections"] == ["CRITICAL_FLAGS"]
+    assert first.json()["sections"]["critical_flags"] == ["Penalty of $100,000"]
+    assert second.json()["sections"] == first.json()["sections"]
+    assert second.json()["analysis"].startswith("CRITICAL_FLAGS")
+
+
+@pytest.mark.asyncio
+async def test_analyze_rejects_unknown_section(
+    client: AsyncClient,
+    sample_document_text: str,
+    sample_api_key: str,
+):
+    """Unknown section labels should fail validation."""
+    response = await client.post(
+        "/api/analyze",
+        json={
+            "document_text": sample_document_text,
+            "sections": ["SUMMARY"],
+            "api_key": sample_api_key,
+        },
+    )
+    assert response.status_code == 422
@@ -0,0 +1,67 @@
+"""
+Tests for the application factory and lifespan-managed resources.
+
+Covers settings injection, resource creation/teardown, and upstream
+pre-warming.
+"""
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from unittest.mock import AsyncMock, patch
+
+from app.config import Settings
+from app.main import create_app
+from app.resources import AppResources
+
+
+@pytest.mark.asyncio
+async def test_create_app_uses_given_settings():
+    """Factory settings should drive config responses and resources."""
+    app = create_app(Settings(groq_api_key="server_key", chunk_cache_size=3))
+    async with app.router.lifespan_context(app):
+        resources = app.state.resources
+        assert resources.chunk_cache.max_entries == 3
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as ac:
+            response = await ac.get("/api/config")
+        assert response.json()["hasApiKey"] is True
+
+
+@pytest.mark.asyncio
+async def test_lifespan_opens_and_closes_resources():
+    """HTTP pool and executor should exist only while the app is running."""
+    app = create_app(Settings(groq_api_key=None))
+    async with app.router.lifespan_context(app):
+        resources = app.state.resources
+        assert resources.http_client is not None
+        assert resources.executor is not None
+        client = resources.http_client
+    assert client.is_closed
+    assert resources.http_client is None
+    assert resources.executor is None
+
+
+@pytest.mark.asyncio
+async def test_prewarm_runs_only_when_enabled():
+    """Upstream pre-warm should be opt-in."""
+    with patch.object(AppResources, "prewarm", new_callable=AsyncMock) as mock_prewarm:
+        app = create_app(Settings(prewarm_upstream=False))
+        async with app.router.lifespan_context(app):
+            pass
+        mock_prewarm.assert_not_called()
+
+        app = create_app(Settings(prewarm_upstream=True))
+        async with app.router.lifespan_context(app):
+            pass
+        mock_prewarm.assert_awaited_once()
+
+
+def test_chunk_cache_reuses_chunks():
+    """Identical documents should be chunked once."""
+    resources = AppResources(Settings())
+    text = " ".join(["word"] * 500)
+    first = resources.chunk(text)
+    second = resources.chunk(text)
+    assert first is second
+    assert resources.chunk_cache.hits == 1
@@ -0,0 +1,155 @@
+"""
+Tests for chunk cards.
+
+Covers card rendering, batched writing and caching by chunk content,
+searching over cards, and the prompt size of repeated /search calls.
+"""
+
+import json
+import random
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import AsyncClient
+
+from app.main import app
+from app.services.cache import LRUCache
+from app.services.chunk_cards import build_cards, format_card
+from app.services.groq_service import CARD_PROMPT, GroqService
+
+# ~14k words of 3-9 letters (about 40 chunks, under the /search limit)
+_rng = random.Random(7)
+_VOCABULARY = [
+    "".join(_rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(_rng.randint(3, 9)))
+    for _ in range(3000)
+]
+DOCUMENT = " ".join(_rng.choice(_VOCABULARY) for _ in range(14000))
+
+# A card of full length: a 20-word synopsis, five terms, five entities
+CARD = {
+    "synopsis": "The contractor must pay all invoices within thirty days or owe late fees, "
+    "and either party may audit the payment records yearly.",
+    "keyTerms": ["payment schedule", "late fees", "invoice", "audit", "escrow"],
+    "entities": ["Acme Corp", "John Doe", "March 2025", "$50,000", "30 days"],
+}
+
+
+def _cards_reply(user_message: str) -> str:
+    indexes = [int(line[1:].split("]")[0]) for line in user_message.split("\n\n")]
+    return json.dumps([{"chunkIndex": i, **CARD} for i in indexes])
+
+
+def test_format_card_renders_one_line():
+    """A card is synopsis, terms and entities on one line; no synopsis, no card."""
+    card = format_card({"synopsis": " Fees  are due\nmonthly. ", "keyTerms": ["fees", ""], "entities": []})
+    assert card == "Fees are due monthly. | terms: fees"
+    assert format_card({"keyTerms": ["fees"]}) is None
+
+
+@pytest.mark.asyncio
+async def test_build_cards_batches_missing_chunks_and_caches_by_content():
+    """Cards are written in batches once; equal chunk text reuses the card."""
+    service = GroqService(api_key="key")
+    service.write_cards = AsyncMock(
+        side_effect=lambda batch: {c["index"]: f"card {c['text']}" for c in batch}
+    )
+    cache = LRUCache(100)
+    chunks = [{"index": i, "text": f"text {i}"} for i in range(10)]
+
+    cards = await build_cards(service, chunks, cache, batch_size=4)
+    assert cards[3] == "card text 3"
+    assert [len(call.args[0]) for call in service.write_cards.call_args_list] == [4, 4, 2]
+
+    # Same chunk text at another position (e.g. another document)
+    moved = [{"index": 0, "text": "text 3"}, {"index": 1, "text": "new"}]
+    cards = await build_cards(service, moved, cache, batch_size=4)
+    assert cards == {0: "card text 3", 1: "card new"}
+    assert service.write_cards.call_args_list[-1].args[0] == [moved[1]]
+
+
+@pytest.mark.asyncio
+async def test_semantic_search_ranks_cards_then_scores_full_text_of_hits():
+    """With cards, balanced sends only the best hits with their full text."""
+    with patch.object(GroqService, "chat_completion", new_callable=AsyncMock) as mock_chat:
+        mock_chat.side_effect = [
+            json.dumps([
+                {"chunkIndex": 2, "relevanceScore": 8, "reason": "a"},
+                {"chunkIndex": 0, "relevanceScore": 5, "reason": "b"},
+            ]),
+            json.dumps([{"chunkIndex": 2, "relevanceScore": 9, "reason": "Final."}]),
+        ]
+        service = GroqService(api_key="key")
+        service.card_hits = 1
+        chunks = [{"index": i, "text": f"Full text {i}"} for i in range(4)]
+        cards = {0: "card 0", 1: "card 1", 2: "card 2"}
+
+        result = await service.semantic_search(chunks, "q", mode="balanced", cards=cards)
+
+    assert result == [{"chunkIndex": 2, "relevanceScore": 9, "reason": "Final."}]
+    ranking, scoring = (call[0][0][0]["content"] for call in mock_chat.call_args_list)
+    assert [call.kwargs["model"] for call in mock_chat.call_args_list] == [
+        service.models["fast"],
+        service.models["search"],
+    ]
+    assert "[2] card 2" in ranking and "[3] Full text 3" in ranking
+    assert "Full text 0" not in ranking
+    assert "[2] Full text 2" in scoring and "[0]" not in scoring
+
+
+@pytest.mark.asyncio
+async def test_thorough_search_ignores_cards():
+    """Thorough mode still scores every chunk's full text."""
+    with patch.object(GroqService, "chat_completion", new_callable=AsyncMock) as mock_chat:
+        mock_chat.return_value = json.dumps(
+            [{"chunkIndex": i, "relevanceScore": 7, "reason": "r"} for i in range(5)]
+        )
+        service = GroqService(api_key="key")
+        chunks = [{"index": i, "text": f"Full text {i}"} for i in range(5)]
+        cards = {i: f"card {i}" for i in range(5)}
+
+        result = await service.semantic_search(chunks, "q", mode="thorough", cards=cards)
+
+    assert len(result) == 5
+    mock_chat.assert_awaited_once()
+    prompt = mock_chat.call_args[0][0][0]["content"]
+    assert "card" not in prompt and "[4] Full text 4" in prompt
+
+
+@pytest.mark.asyncio
+async def test_repeat_search_prompt_is_several_times_smaller(
+    client: AsyncClient, sample_api_key: str, monkeypatch
+):
+    """After the first balanced search writes the cards, prompts shrink over 5x."""
+    settings = app.state.resources.settings
+    prompts: list[str] = []
+
+    async def chat(self, messages, system_prompt, **kwargs):
+        content = messages[0]["content"]
+        if system_prompt.startswith(CARD_PROMPT):
+            return _cards_reply(content)
+        prompts.append(content)
+        return json.dumps([{"chunkIndex": i, "relevanceScore": 7, "reason": "r"} for i in range(5)])
+
+    async def search():
+        prompts.clear()
+        response = await client.post(
+            "/api/search",
+            json={
+                "document_text": DOCUMENT,
+                "query": "late fees",
+                "mode": "balanced",
+                "api_key": sample_api_key,
+            },
+        )
+        assert response.status_code == 200
+        return sum(len(p) for p in prompts)
+
+    with patch.object(GroqService, "chat_completion", chat):
+        full_text = await search()
+        monkeypatch.setattr(settings, "search_cards", True)
+        await search()
+        with patch.object(GroqService, "write_cards") as write_cards:
+            repeat = await search()
+
+    write_cards.assert_not_called()
+    assert full_text / repeat > 5
@@ -6,7 +6,7 @@ Covers chunking logic, edge cases, overlap behavior, and boundary conditions.
 
 import pytest
 
-from app.services.chunk_service import ChunkService
+from app.services.chunk_service import ChunkService, WordStreamDecoder, without_overlap
 
 
 def test_chunk_empty_string():
@@ -108,3 +108,58 @@ def test_chunk_preserves_word_order(chunk_service: ChunkService):
         chunk_words = chunk["text"].split()
         expected = words[start:end]
         assert chunk_words == expected
+
+
+def test_iter_chunks_matches_chunk(chunk_service: ChunkService):
+    """Lazy chunking over a word iterator should equal one-shot chunking."""
+    text = " ".join([f"w{i}" for i in range(333)])
+    assert list(chunk_service.iter_chunks(iter(text.split()))) == chunk_service.chunk(text)
+
+
+def test_window_emits_chunk_as_soon_as_full(chunk_service: ChunkService):
+    """A chunk should be emitted the moment its window fills, not at close."""
+    window = chunk_service.window()
+    assert window.push(["w"] * 99) == []
+    emitted = window.push(["w"])
+    assert len(emitted) == 1
+    assert emitted[0]["endWord"] == 100
+
+
+def test_word_stream_decoder_handles_split_words_and_utf8():
+    """Words and multi-byte characters split across reads should be rejoined."""
+    decoder = WordStreamDecoder()
+    data = "naïve café contract".encode("utf-8")
+    words = []
+    for i in range(len(data)):
+        words.extend(decoder.feed(data[i : i + 1]))
+    words.extend(decoder.flush())
+    assert words == ["naïve", "café", "contract"]
+
+
+@pytest.mark.asyncio
+async def test_aiter_chunks_matches_chunk(chunk_service: ChunkService):
+    """Chunking a byte stream should equal chunking the decoded string."""
+    text = " ".join([f"word{i}" for i in range(250)])
+    data = text.encode("utf-8")
+
+    async def stream():
+        for i in range(0, len(data), 7):
+            yield data[i : i + 7]
+
+    result = [c async for c in chunk_service.aiter_chunks(stream())]
+    assert result == chunk_service.chunk(text)
+
+
+def test_without_overlap_sends_each_word_once():
+    """Adjacent chunks lose their shared words; the rest stay whole."""
+    service = ChunkService(chunk_words=100, chunk_overlap=20)
+    text = " ".join(f"w{i}" for i in range(250))
+    chunks = service.chunk(text)
+
+    segments = without_overlap(chunks)
+    assert " ".join(segment for _, segment in segments) == text
+    # The last chunk (words 240-250) is covered by the one before it
+    assert [index for index, _ in segments] == [0, 1, 2]
+
+    # Non-adjacent chunks (e.g. cascade candidates) are not trimmed
+    assert without_overlap([chunks[0], chunks[2]])[1][1] == chunks[2]["text"]
@@ -0,0 +1,95 @@
+"""
+Tests for the compressed postings and the sharded corpus index.
+
+Covers varint/delta round trips, corpus-wide BM25 ranking, incremental
+replace/remove, and agreement between inline and offloaded search.
+"""
+
+import pytest
+
+from app.services.corpus_index import CorpusIndex
+from app.services.lexical_service import LexicalScorer
+from app.services.postings import PostingsList, decode_varints, encode_varint
+
+
+def _chunks(*texts: str) -> list[dict]:
+    return [{"index": i, "text": t} for i, t in enumerate(texts)]
+
+
+def test_varint_round_trip():
+    """Small and large values should survive encoding."""
+    out = bytearray()
+    values = [0, 1, 127, 128, 300, 2**32]
+    for v in values:
+        encode_varint(v, out)
+    assert list(decode_varints(out)) == values
+    assert len(out) < 8 * len(values)
+
+
+def test_postings_delta_encoding_and_order():
+    """Postings iterate back in id order; out-of-order appends fail."""
+    postings = PostingsList()
+    for posting_id, freq in [(0, 2), (5, 1), (1000, 7)]:
+        postings.append(posting_id, freq)
+    assert list(postings) == [(0, 2), (5, 1), (1000, 7)]
+    assert len(postings) == 3
+    with pytest.raises(ValueError):
+        postings.append(1000, 1)
+
+
+def test_search_returns_document_ids_across_shards():
+    """Hits should name their document and rank the best match first."""
+    index = CorpusIndex(num_shards=4)
+    index.add_document("lease", _chunks("rent is due monthly", "this lease renews automatically each year"))
+    index.add_document("nda", _chunks("confidential information must not be disclosed"))
+    index.add_document("msa", _chunks("services renew automatically unless cancelled", "payment net 30"))
+
+    hits = index.search("renews automatically", k=5)
+    assert {(h.document_id, h.chunk_index) for h in hits} >= {("lease", 1), ("msa", 0)}
+    assert all(h.score > 0 for h in hits)
+    assert hits == sorted(hits, key=lambda h: -h.score)
+    assert index.search("zebra") == []
+
+
+def test_single_shard_scores_match_lexical_scorer():
+    """Corpus BM25 over one document should equal the per-document scorer."""
+    chunks = _chunks("alpha beta beta", "beta gamma", "gamma delta alpha alpha")
+    index = CorpusIndex(num_shards=3)
+    index.add_document("doc", chunks)
+    expected = LexicalScorer(chunks).top("alpha gamma", 3)
+    hits = index.search("alpha gamma", k=3)
+    assert [(h.chunk_index, round(h.score, 6)) for h in hits] == [
+        (idx, round(score, 6)) for idx, score in expected
+    ]
+
+
+def test_replace_and_remove_are_incremental():
+    """Re-adding an id replaces it; removed documents stop matching."""
+    index = CorpusIndex(num_shards=2)
+    index.add_document("a", _chunks("termination for convenience"))
+    index.add_document("b", _chunks("termination for cause"))
+    index.add_document("a", _chunks("governing law is delaware"))
+
+    assert len(index) == 2
+    assert {h.document_id for h in index.search("termination")} == {"b"}
+    assert index.search("delaware")[0].document_id == "a"
+
+    assert index.remove_document("b") is True
+    assert index.remove_document("b") is False
+    assert index.search("termination") == []
+    assert index.total_chunks == 1
+    assert index.chunk_text("a", 0) == "governing law is delaware"
+
+
+@pytest.mark.asyncio
+async def test_offloaded_search_matches_sequential(monkeypatch):
+    """Scanning the corpus on an executor should give the same hits."""
+    monkeypatch.setattr("app.services.corpus_index.INLINE_SEARCH_CHUNKS", 0)
+    index = CorpusIndex(num_shards=4)
+    for n in range(40):
+        index.add_document(f"doc{n}", _chunks(f"clause {n} renewal term {n % 7}", "payment schedule"))
+    assert await index.asearch("renewal term 3", k=10) == index.search("renewal term 3", k=10)
+    stats = index.stats()
+    assert stats["documents"] == 40
+    assert stats["chunks"] == 80
+    assert stats["postings_bytes"] > 0
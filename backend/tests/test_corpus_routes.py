@@ -0,0 +1,71 @@
+"""
+Tests for corpus API routes.
+
+Covers indexing documents, corpus-wide search, deletion and LLM
+re-ranking.
+"""
+
+import pytest
+from httpx import AsyncClient
+from unittest.mock import AsyncMock, patch
+
+
+@pytest.fixture
+async def indexed_corpus(client: AsyncClient):
+    """Index two small documents; return their ids."""
+    ids = []
+    for text in (
+        "This agreement renews automatically for successive one year terms.",
+        "Either party may terminate this agreement with thirty days notice.",
+    ):
+        response = await client.post("/api/corpus/documents", json={"document_text": text})
+        assert response.status_code == 201
+        ids.append(response.json()["document_id"])
+    yield ids
+    for document_id in ids:
+        await client.delete(f"/api/corpus/documents/{document_id}")
+
+
+@pytest.mark.asyncio
+async def test_corpus_search_returns_document_ids(client: AsyncClient, indexed_corpus):
+    """Lexical corpus search should find the renewal clause by document."""
+    response = await client.post("/api/corpus/search", json={"query": "auto renews"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["reranked"] is False
+    assert data["total_documents"] >= 2
+    assert data["results"][0]["document_id"] == indexed_corpus[0]
+    assert "renews automatically" in data["results"][0]["chunk_text"]
+
+
+@pytest.mark.asyncio
+async def test_corpus_delete_unknown_document_returns_404(client: AsyncClient):
+    """Deleting a document that is not indexed should 404."""
+    response = await client.delete("/api/corpus/documents/missing")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_corpus_search_rerank_orders_by_llm(
+    client: AsyncClient,
+    indexed_corpus,
+    sample_api_key: str,
+):
+    """Re-ranking should keep only LLM-approved hits, in LLM order."""
+    with patch("app.api.routes.corpus.GroqService") as mock_cls:
+        service = mock_cls.return_value
+        service.models = {"search": "m"}
+        service.score_chunks = AsyncMock(return_value=[
+            {"chunkIndex": 1, "relevanceScore": 9, "reason": "termination notice"},
+        ])
+        response = await client.post(
+            "/api/corpus/search",
+            json={"query": "agreement", "rerank": True, "api_key": sample_api_key},
+        )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["reranked"] is True
+    assert len(data["results"]) == 1
+    assert data["results"][0]["relevance_score"] == 9
+    passages = service.score_chunks.call_args.args[0]
+    assert [p["index"] for p in passages] == list(range(len(passages)))
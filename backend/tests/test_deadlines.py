@@ -0,0 +1,181 @@
+"""
+Tests for request deadlines, disconnect cancellation and hedged upstream calls.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from httpx import AsyncClient
+from starlette.requests import Request
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.api.cancellation import run_cancellable
+from app.config import Settings
+from app.services.deadline import Deadline, LatencyTracker
+from app.services.groq_service import GroqService, GroqServiceError
+
+
+def _request(receive) -> Request:
+    return Request({"type": "http", "method": "POST", "headers": []}, receive)
+
+
+@pytest.mark.asyncio
+async def test_run_cancellable_cancels_work_on_disconnect():
+    """Client disconnect should cancel the in-flight call and return 499."""
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def upstream():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def receive():
+        await started.wait()
+        return {"type": "http.disconnect"}
+
+    with pytest.raises(HTTPException) as exc_info:
+        await run_cancellable(_request(receive), upstream(), Deadline(5))
+    assert exc_info.value.status_code == 499
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_run_cancellable_enforces_deadline():
+    """Work running past the deadline should be cancelled with 504."""
+    async def receive():
+        await asyncio.sleep(10)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await run_cancellable(_request(receive), asyncio.sleep(10), Deadline(0.05))
+    assert exc_info.value.status_code == 504
+
+
+@pytest.mark.asyncio
+async def test_run_cancellable_returns_result():
+    """Completed work should return its result unchanged."""
+    async def receive():
+        await asyncio.sleep(10)
+
+    async def upstream():
+        return "done"
+
+    assert await run_cancellable(_request(receive), upstream(), Deadline(5)) == "done"
+
+
+def test_latency_tracker_percentile():
+    """p95 of 1..100 should be 95."""
+    tracker = LatencyTracker()
+    for i in range(1, 101):
+        tracker.record(float(i))
+    assert tracker.percentile(95) == 95.0
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_expired_deadline_raises_504():
+    """An expired deadline should fail fast without calling upstream."""
+    client = MagicMock()
+    client.post = AsyncMock()
+    service = GroqService(api_key="key", client=client, deadline=Deadline(0))
+    with pytest.raises(GroqServiceError) as exc_info:
+        await service.chat_completion([{"role": "user", "content": "Hi"}], "System")
+    assert exc_info.value.status_code == 504
+    client.post.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_timeout_bounded_by_deadline():
+    """The per-request timeout should not exceed the remaining deadline."""
+    response = httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})
+    client = MagicMock()
+    client.post = AsyncMock(return_value=response)
+    service = GroqService(api_key="key", client=client, deadline=Deadline(2))
+    await service.chat_completion([{"role": "user", "content": "Hi"}], "System")
+    assert client.post.call_args[1]["timeout"] <= 2
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_uses_faster_duplicate():
+    """A slow first call should be hedged and the faster duplicate should win."""
+    fast = httpx.Response(200, json={"choices": [{"message": {"content": "hedged"}}]})
+    calls = []
+
+    async def post(*args, **kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            await asyncio.sleep(10)
+        return fast
+
+    client = MagicMock()
+    client.post = post
+    tracker = LatencyTracker()
+    for _ in range(5):
+        tracker.record(0.01)
+    service = GroqService(
+        api_key="key",
+        client=client,
+        settings=Settings(hedge_upstream=True, hedge_min_samples=5),
+        latency=tracker,
+    )
+    result = await asyncio.wait_for(
+        service.chat_completion([{"role": "user", "content": "Hi"}], "System"),
+        timeout=2,
+    )
+    assert result == "hedged"
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_waits_past_an_error_response():
+    """A fast 429 should not win over a slower duplicate that succeeds."""
+    ok = httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})
+    calls = []
+
+    async def post(*args, **kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            await asyncio.sleep(0.1)
+            return ok
+        return httpx.Response(429, json={"error": {"message": "rate limited"}})
+
+    client = MagicMock()
+    client.post = post
+    tracker = LatencyTracker()
+    for _ in range(5):
+        tracker.record(0.01)
+    service = GroqService(
+        api_key="key",
+        client=client,
+        settings=Settings(hedge_upstream=True, hedge_min_samples=5),
+        latency=tracker,
+    )
+    result = await asyncio.wait_for(
+        service.chat_completion([{"role": "user", "content": "Hi"}], "System"),
+        timeout=2,
+    )
+    assert result == "ok"
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_search_honours_deadline_header(client: AsyncClient, sample_api_key: str):
+    """A short X-Request-Timeout should make a slow search return 504."""
+    async def slow_search(**kwargs):
+        await asyncio.sleep(10)
+
+    with patch("app.api.routes.search.GroqService") as mock_groq:
+        mock_instance = MagicMock()
+        mock_instance.semantic_search = slow_search
+        mock_groq.return_value = mock_instance
+
+        response = await client.post(
+            "/api/search",
+            json={"document_text": "hello world", "query": "test", "api_key": sample_api_key},
+            headers={"X-Request-Timeout": "0.05"},
+        )
+    assert response.status_code == 504
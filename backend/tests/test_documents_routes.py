@@ -0,0 +1,106 @@
+"""
+Tests for document ingestion API routes.
+
+Covers streamed ingestion, size limits, and document lookup.
+"""
+
+import pytest
+from httpx import AsyncClient
+from unittest.mock import AsyncMock, patch
+
+
+@pytest.mark.asyncio
+async def test_ingest_streams_body_into_chunks(client: AsyncClient):
+    """Streamed upload should be chunked and registered."""
+    text = " ".join([f"word{i}" for i in range(1000)])
+
+    async def body():
+        data = text.encode("utf-8")
+        for i in range(0, len(data), 1024):
+            yield data[i : i + 1024]
+
+    response = await client.post(
+        "/api/documents/ingest",
+        content=body(),
+        headers={"Content-Type": "text/plain"},
+    )
+    assert response.status_code == 201
+    data = response.json()
+    assert data["total_words"] == 1000
+    assert data["total_chunks"] == 3
+    assert data["total_bytes"] == len(text.encode("utf-8"))
+
+    lookup = await client.get(f"/api/documents/{data['document_id']}")
+    assert lookup.status_code == 200
+    assert lookup.json() == data
+
+
+@pytest.mark.asyncio
+async def test_ingest_rejects_empty_body(client: AsyncClient):
+    """Whitespace-only upload should be rejected."""
+    response = await client.post("/api/documents/ingest", content=b"  \n ")
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_ingest_rejects_oversized_body(client: AsyncClient):
+    """Uploads over the byte limit should return 413."""
+    with patch("app.api.routes.documents.MAX_INGEST_BYTES", 10):
+        response = await client.post(
+            "/api/documents/ingest",
+            content=b"this body is longer than ten bytes",
+        )
+    assert response.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_get_unknown_document_returns_404(client: AsyncClient):
+    """Unknown document ids should return 404."""
+    response = await client.get("/api/documents/does-not-exist")
+    assert response.status_code == 404
+
+
+async def _ingest(client: AsyncClient, text: str) -> str:
+    response = await client.post("/api/documents/ingest", content=text.encode("utf-8"))
+    assert response.status_code == 201
+    return response.json()["document_id"]
+
+
+@pytest.mark.asyncio
+async def test_ask_retrieves_relevant_chunks_and_citations(
+    client: AsyncClient,
+    sample_api_key: str,
+):
+    """Only relevant chunks should be sent and cited indexes returned."""
+    filler = " ".join(["filler"] * 800)
+    text = f"{filler} The termination notice period is ninety days. {filler}"
+    document_id = await _ingest(client, text)
+
+    with patch("app.api.routes.documents.GroqService") as mock_groq:
+        mock_instance = AsyncMock()
+        mock_instance.answer_question = AsyncMock(
+            return_value="Ninety days [2]. Unrelated [99]."
+        )
+        mock_groq.return_value = mock_instance
+
+        response = await client.post(
+            f"/api/documents/{document_id}/ask",
+            json={"question": "What is the termination notice?", "api_key": sample_api_key},
+        )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["citations"] == [2]
+    assert data["context_chunks"] == [2]
+    kwargs = mock_instance.answer_question.call_args[1]
+    assert all("termination" in c["text"] for c in kwargs["excerpts"])
+    assert document_id in kwargs["document_overview"]
+
+
+@pytest.mark.asyncio
+async def test_ask_unknown_document_returns_404(client: AsyncClient, sample_api_key: str):
+    """Questions about unknown documents should return 404."""
+    response = await client.post(
+        "/api/documents/missing/ask",
+        json={"question": "Anything?", "api_key": sample_api_key},
+    )
+    assert response.status_code == 404
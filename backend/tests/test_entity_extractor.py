@@ -0,0 +1,134 @@
+"""
+Tests for local entity extraction and its use in /analyze.
+
+Covers each entity type, word-boundary handling, throughput on a
+200k-character document, the hinted NAMED_ENTITIES prompt, and merging
+into the structured response.
+"""
+
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import AsyncClient
+
+from app.main import app
+from app.services.entity_extractor import extract_entities, merge_entities
+from app.services.groq_service import HINTED_ENTITIES_MAX_TOKENS, GroqService
+
+CONTRACT = """This Master Services Agreement (the "Agreement") is entered into on March 1, 2024
+between Acme Holdings, Inc., a Delaware corporation ("Acme"), and Beta Widgets LLC ("Supplier").
+"Services" means the work described in Exhibit A. Supplier shall deliver within thirty (30) days
+of each order for a term of 24 months. Fees of $1,250,000 per year, plus USD 15,000 setup, rise by
+3.5% annually; late payments accrue 1.5 percent per month. Either party may terminate on 90 days'
+notice, effective 2024-12-31 or by Q3 2025. Penalties of 250,000 euros apply."""
+
+
+def test_extracts_each_entity_type_in_document_order():
+    """Every type is found, first occurrence first."""
+    entities = extract_entities(CONTRACT)
+    assert entities["Parties"] == ["Acme Holdings, Inc.", "Beta Widgets LLC"]
+    assert entities["Dates"] == ["March 1, 2024", "2024-12-31", "Q3 2025"]
+    assert entities["Amounts"] == ["$1,250,000", "USD 15,000", "250,000 euros"]
+    assert entities["Percentages"] == ["3.5%", "1.5 percent"]
+    assert entities["Durations"] == ["thirty (30) days", "24 months", "90 days"]
+    assert entities["Defined terms"] == ["Agreement", "Acme", "Supplier", "Services"]
+
+
+def test_ignores_partial_words_and_numbers():
+    """Units inside words and digits inside codes are not entities."""
+    text = "Call someone today, Monday. Part A15% is a code; version 2.5 days-old build 12/2."
+    entities = extract_entities(text)
+    assert "Durations" not in entities
+    assert "Percentages" not in entities
+    assert "Dates" not in entities
+
+
+def test_large_document_is_fast():
+    """200k characters are processed well within one upstream round trip."""
+    filler = "The Supplier shall indemnify the Customer under Section 12.3 of this Agreement. " * 8
+    text = ((CONTRACT + filler) * 200)[:200_000]
+    extract_entities(text)
+    start = time.perf_counter()
+    entities = extract_entities(text)
+    assert time.perf_counter() - start < 0.25
+    assert len(entities["Amounts"]) == 3
+
+
+def test_merge_skips_items_the_model_already_listed():
+    """Items already under any model group are not added again."""
+    merged = merge_entities(
+        {"Organizations": ["Acme Holdings, Inc."]},
+        {"Parties": ["Acme Holdings, Inc.", "Beta Widgets LLC"], "Dates": ["March 1, 2024"]},
+    )
+    assert merged == {
+        "Organizations": ["Acme Holdings, Inc."],
+        "Parties": ["Beta Widgets LLC"],
+        "Dates": ["March 1, 2024"],
+    }
+
+
+@pytest.mark.asyncio
+async def test_hints_shrink_the_named_entities_request():
+    """With hints the model is told to list only people and organizations."""
+    service = GroqService(api_key="k")
+    with patch.object(service, "chat_completion", new_callable=AsyncMock) as chat:
+        chat.return_value = "NAMED_ENTITIES\nPeople: Jane Roe"
+        await service.analyze_document(
+            CONTRACT,
+            "contracts",
+            sections=["NAMED_ENTITIES"],
+            entity_hints=extract_entities(CONTRACT),
+        )
+    system_prompt = chat.call_args.args[1]
+    assert "list only people and organizations" in system_prompt
+    assert chat.call_args.args[0][0]["content"].endswith("Defined terms: Agreement, Acme, Supplier, Services")
+    assert chat.call_args.kwargs["max_tokens"] == HINTED_ENTITIES_MAX_TOKENS
+
+
+@pytest.mark.asyncio
+async def test_analyze_merges_local_entities(client: AsyncClient, sample_api_key: str):
+    """Local figures join the model's people and organizations."""
+    with patch("app.api.routes.analysis.GroqService") as mock_groq:
+        mock_groq.return_value.analyze_document = AsyncMock(
+            return_value="NAMED_ENTITIES\nPeople: Jane Roe"
+        )
+        response = await client.post(
+            "/api/analyze",
+            json={
+                "document_text": CONTRACT,
+                "document_type": "contracts",
+                "sections": ["NAMED_ENTITIES"],
+                "api_key": sample_api_key,
+            },
+        )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["entities"]["Percentages"] == ["3.5%", "1.5 percent"]
+    named = data["sections"]["named_entities"]
+    assert named["People"] == ["Jane Roe"]
+    assert named["Dates"] == ["March 1, 2024", "2024-12-31", "Q3 2025"]
+    assert "Dates: March 1, 2024" in data["analysis"]
+    hints = mock_groq.return_value.analyze_document.call_args.kwargs["entity_hints"]
+    assert hints == data["entities"]
+
+
+@pytest.mark.asyncio
+async def test_replace_mode_skips_the_model(
+    client: AsyncClient, sample_api_key: str, monkeypatch
+):
+    """In "replace" mode NAMED_ENTITIES alone needs no upstream call."""
+    monkeypatch.setattr(app.state.resources.settings, "local_entities", "replace")
+    with patch("app.api.routes.analysis.GroqService") as mock_groq:
+        mock_groq.return_value.analyze_document = AsyncMock()
+        response = await client.post(
+            "/api/analyze",
+            json={
+                "document_text": CONTRACT,
+                "sections": ["NAMED_ENTITIES"],
+                "api_key": sample_api_key,
+            },
+        )
+    assert response.status_code == 200
+    assert response.json()["sections"]["named_entities"]["Amounts"][0] == "$1,250,000"
+    mock_groq.return_value.analyze_document.assert_not_called()
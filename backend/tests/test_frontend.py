@@ -0,0 +1,91 @@
+"""
+Tests for serving the built frontend from the FastAPI app.
+
+Covers precompressed variants, strong ETags, cache headers, SPA fallback
+and API precedence.
+"""
+
+import gzip
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.config import Settings
+from app.frontend import IMMUTABLE_CACHE, precompress
+from app.main import create_app
+
+
+@pytest.fixture
+def build_dir(tmp_path):
+    """A minimal Vite-like build with a hashed asset, precompressed."""
+    (tmp_path / "index.html").write_text("<!doctype html><div id=root></div>")
+    assets = tmp_path / "assets"
+    assets.mkdir()
+    (assets / "index-3f2a9c.js").write_text("console.log('doclens');\n" * 200)
+    written = precompress(tmp_path)
+    assert assets / "index-3f2a9c.js.gz" in written
+    return tmp_path
+
+
+@pytest.fixture
+async def frontend_client(build_dir):
+    app = create_app(Settings(groq_api_key=None, frontend_dir=str(build_dir)))
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as ac:
+            yield ac
+
+
+@pytest.mark.asyncio
+async def test_asset_served_precompressed_and_immutable(frontend_client, build_dir):
+    """Clients accepting gzip get the .gz variant with immutable caching."""
+    response = await frontend_client.get(
+        "/assets/index-3f2a9c.js", headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.text == (build_dir / "assets" / "index-3f2a9c.js").read_text()
+    etag = response.headers["etag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+
+    identity = await frontend_client.get(
+        "/assets/index-3f2a9c.js", headers={"Accept-Encoding": "identity"}
+    )
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["etag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_if_none_match_returns_304(frontend_client):
+    """A matching strong ETag should be answered without a body."""
+    first = await frontend_client.get("/index.html")
+    second = await frontend_client.get(
+        "/index.html", headers={"If-None-Match": first.headers["etag"]}
+    )
+    assert second.status_code == 304
+    assert second.content == b""
+
+
+@pytest.mark.asyncio
+async def test_spa_fallback_but_api_and_missing_files_404(frontend_client):
+    """Client routes get index.html; unknown API paths and files do not."""
+    route = await frontend_client.get("/documents/42")
+    assert route.status_code == 200
+    assert "id=root" in route.text
+    assert route.headers["cache-control"] == "no-cache"
+
+    assert (await frontend_client.get("/api/nope")).status_code == 404
+    assert (await frontend_client.get("/assets/missing.js")).status_code == 404
+    assert (await frontend_client.get("/api/health")).status_code == 200
+
+
+def test_precompress_output_is_deterministic(build_dir):
+    """Re-running precompress should produce identical gzip bytes."""
+    gz = build_dir / "assets" / "index-3f2a9c.js.gz"
+    before = gz.read_bytes()
+    precompress(build_dir)
+    assert gz.read_bytes() == before
+    assert gzip.decompress(before).startswith(b"console.log")
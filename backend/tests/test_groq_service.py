@@ -119,3 +119,267 @@ async def test_semantic_search_strips_markdown_fences():
         result = await service.semantic_search(chunks=chunks, query="test")
         assert len(result) == 1
         assert result[0]["chunkIndex"] == 0
+
+
+@pytest.mark.asyncio
+async def test_semantic_search_thorough_uses_large_model_once():
+    """Thorough mode should score all chunks with the search model."""
+    with patch.object(GroqService, "chat_completion", new_callable=AsyncMock) as mock_chat:
+        mock_chat.return_value = "[]"
+
+        service = GroqService(api_key="key")
+        chunks = [{"index": i, "text": f"Chunk {i}"} for i in range(3)]
+        await service.semantic_search(chunks=chunks, query="test", mode="thorough")
+        assert mock_chat.call_count == 1
+        assert mock_chat.call_args[1]["model"] == "llama-3.3-70b-versatile"
+
+
+@pytest.mark.asyncio
+async def test_semantic_search_fast_sends_only_lexical_candidates():
+    """Fast mode should send BM25 candidates to the fast model only."""
+    with patch.object(GroqService, "chat_completion", new_callable=AsyncMock) as mock_chat:
+        mock_chat.return_value = '[{"chunkIndex": 1, "relevanceScore": 9, "reason": "Ok"}]'
+
+        service = GroqService(api_key="key")
+        chunks = [
+            {"index": 0, "text": "Definitions and interpretation."},
+            {"index": 1, "text": "Termination on thirty days notice."},
+            {"index": 2, "text": "Governing law of the agreement."},
+        ]
+        result = await service.semantic_search(chunks=chunks, query="termination", mode="fast")
+        assert result[0]["chunkIndex"] == 1
+        assert mock_chat.call_count == 1
+        assert mock_chat.call_args[1]["model"] == "llama-3.1-8b-instant"
+        user_message = mock_chat.call_args[0][0][0]["content"]
+        assert "[1] Termination" in user_message
+        assert "[0]" not in user_message
+
+
+@pytest.mark.asyncio
+async def test_semantic_search_balanced_reranks_recall_candidates():
+    """Balanced mode should re-rank only the fast model's top chunks with the large model."""
+    with patch.object(GroqService, "chat_completion", new_callable=AsyncMock) as mock_chat:
+        mock_chat.side_effect = [
+            json.dumps([
+                {"chunkIndex": 2, "relevanceScore": 8, "reason": "a"},
+                {"chunkIndex": 0, "relevanceScore": 7, "reason": "b"},
+            ]),
+            json.dumps([{"chunkIndex": 2, "relevanceScore": 9, "reason": "Final."}]),
+        ]
+
+        service = GroqService(api_key="key")
+        service.cascade_candidates = 1
+        chunks = [{"index": i, "text": f"Chunk {i}"} for i in range(4)]
+        result = await service.semantic_search(chunks=chunks, query="q", mode="balanced")
+        assert result == [{"chunkIndex": 2, "relevanceScore": 9, "reason": "Final."}]
+        first, second = mock_chat.call_args_list
+        assert first[1]["model"] == "llama-3.1-8b-instant"
+        assert second[1]["model"] == "llama-3.3-70b-versatile"
+        rerank_message = second[0][0][0]["content"]
+        assert "[2] Chunk 2" in rerank_message
+        assert "[0]" not in rerank_message
+
+
+def test_settings_override_task_models():
+    """Models should be routed per task from Settings."""
+    from app.config import Settings
+
+    service = GroqService(
+        api_key="key",
+        settings=Settings(groq_model_search="custom-search", groq_model_fast="custom-fast"),
+    )
+    assert service.models["search"] == "custom-search"
+    assert service.models["fast"] == "custom-fast"
+
+
+@pytest.mark.asyncio
+async def test_batch_search_packs_queries_and_demultiplexes():
+    """Queries should share upstream calls and results map back per query."""
+    with patch.object(GroqService, "chat_completion", new_callable=AsyncMock) as mock_chat:
+        mock_chat.side_effect = [
+            json.dumps([
+                {"queryIndex": 0, "chunkIndex": 1, "relevanceScore": 7, "reason": "a"},
+                {"queryIndex": 1, "chunkIndex": 0, "relevanceScore": 9, "reason": "b"},
+                {"queryIndex": 7, "chunkIndex": 0, "relevanceScore": 9, "reason": "bad"},
+            ]),
+            json.dumps([
+                {"queryIndex": 2, "chunkIndex": 2, "relevanceScore": 8, "reason": "c"},
+            ]),
+        ]
+
+        service = GroqService(api_key="key")
+        chunks = [
+            {"index": 0, "text": "Payment terms and invoices."},
+            {"index": 1, "text": "Termination for convenience."},
+            {"index": 2, "text": "Confidentiality obligations."},
+        ]
+        result = await service.batch_search(
+            chunks=chunks,
+            queries=["termination", "payment", "confidentiality"],
+            queries_per_call=2,
+        )
+        assert mock_chat.call_count == 2
+        assert [r["chunkIndex"] for r in result[0]] == [1]
+        assert [r["chunkIndex"] for r in result[1]] == [0]
+        assert [r["chunkIndex"] for r in result[2]] == [2]
+        first_prompt = mock_chat.call_args_list[0][0][0][0]["content"]
+        assert '[Q0] "termination"' in first_prompt
+        assert '[Q1] "payment"' in first_prompt
+        assert "[2] Confidentiality" not in first_prompt
+
+
+@pytest.mark.asyncio
+async def test_batch_search_scores_unmatched_queries_over_every_chunk():
+    """A query with no lexical candidates should not borrow another query's."""
+    with patch.object(GroqService, "chat_completion", new_callable=AsyncMock) as mock_chat:
+        mock_chat.return_value = "[]"
+
+        service = GroqService(api_key="key")
+        chunks = [
+            {"index": 0, "text": "Payment terms and invoices."},
+            {"index": 1, "text": "Termination for convenience."},
+            {"index": 2, "text": "Confidentiality obligations."},
+        ]
+        await service.batch_search(chunks=chunks, queries=["payment", "ending the deal"])
+        prompts = [call[0][0][0]["content"] for call in mock_chat.call_args_list]
+        assert len(prompts) == 2
+        lexical, unmatched = sorted(prompts, key=lambda p: "ending" in p)
+        assert "[1] Termination" not in lexical
+        assert "[1] Termination" in unmatched and "[0] Payment" in unmatched
+
+
+@pytest.mark.asyncio
+async def test_answer_question_prefix_is_stable_across_turns():
+    """System prompt + overview should be byte-identical between questions."""
+    with patch.object(GroqService, "chat_completion", new_callable=AsyncMock) as mock_chat:
+        mock_chat.return_value = "Answer [0]."
+
+        service = GroqService(api_key="key")
+        await service.answer_question(
+            "Document d1: overview", [{"index": 0, "text": "A"}], "First?"
+        )
+        await service.answer_question(
+            "Document d1: overview",
+            [{"index": 3, "text": "B"}],
+            "Second?",
+            history=[
+                {"role": "user", "content": "First?"},
+                {"role": "assistant", "content": "Answer [0]."},
+            ],
+        )
+        first, second = mock_chat.call_args_list
+        assert first[0][1] == second[0][1]
+        assert second[0][0][0]["content"] == "First?"
+        assert "Question: Second?" in second[0][0][-1]["content"]
+
+
+@pytest.mark.asyncio
+async def test_analyze_document_trims_prompt_to_requested_sections():
+    """Requesting fewer sections should shrink the prompt and max_tokens."""
+    with patch.object(GroqService, "chat_completion", new_callable=AsyncMock) as mock_chat:
+        mock_chat.return_value = "NAMED_ENTITIES\nPeople: Jane"
+
+        service = GroqService(api_key="key")
+        await service.analyze_document("Text.", "general", sections=["NAMED_ENTITIES"])
+        system_prompt = mock_chat.call_args[0][1]
+        assert "NAMED_ENTITIES" in system_prompt
+        assert "KEY_POINTS" not in system_prompt
+        assert mock_chat.call_args[1]["max_tokens"] < 2048
+
+
+@pytest.mark.asyncio
+async def test_score_chunks_requests_json_mode():
+    """Search scoring should ask for a JSON object and unwrap its results."""
+    with patch.object(GroqService, "chat_completion", new_callable=AsyncMock) as mock_chat:
+        mock_chat.return_value = '{"results": [{"chunkIndex": 0, "relevanceScore": 7, "reason": "Ok"}]}'
+
+        service = GroqService(api_key="key")
+        result = await service.semantic_search([{"index": 0, "text": "Chunk"}], "test")
+        assert result[0]["relevanceScore"] == 7
+        assert mock_chat.call_args[1]["json_mode"] is True
+        assert '{"results": [...]}' in mock_chat.call_args[0][1]
+
+
+@pytest.mark.asyncio
+async def test_score_chunks_sends_overlap_once_and_keeps_chunk_indexes():
+    """Chunks are listed as non-overlapping segments; results name chunks."""
+    from app.services.chunk_service import ChunkService
+
+    chunks = ChunkService(chunk_words=100, chunk_overlap=20).chunk(
+        " ".join(f"w{i}" for i in range(180))
+    )
+    with patch.object(GroqService, "chat_completion", new_callable=AsyncMock) as mock_chat:
+        mock_chat.return_value = '[{"chunkIndex": 1, "relevanceScore": 8, "reason": "w150"}]'
+        result = await GroqService(api_key="key").semantic_search(chunks, "w150")
+
+    prompt = mock_chat.call_args[0][0][0]["content"]
+    assert prompt.count(" w90 ") == 1
+    assert "[1] w100 " in prompt
+    assert "adjacent, non-overlapping passages" in mock_chat.call_args[0][1]
+    assert result == [{"chunkIndex": 1, "relevanceScore": 8, "reason": "w150"}]
+
+
+@pytest.mark.asyncio
+async def test_truncated_reply_keeps_results_and_follows_up_on_unscored_chunks():
+    """A cut-off array should be salvaged, then only unscored chunks re-sent once."""
+    from app.services.metrics import MetricsRegistry
+
+    with patch.object(GroqService, "chat_completion", new_callable=AsyncMock) as mock_chat:
+        mock_chat.side_effect = [
+            'Here you go: [{"chunkIndex": 1, "relevanceScore": 9, "reason": "A"}, {"chunkIndex": 0, "rel',
+            '[{"chunkIndex": 2, "relevanceScore": 6, "reason": "B"}]',
+        ]
+        metrics = MetricsRegistry()
+        service = GroqService(api_key="key", metrics=metrics)
+        chunks = [{"index": i, "text": f"Chunk {i}"} for i in range(3)]
+        result = await service.semantic_search(chunks, "test")
+
+        assert [r["chunkIndex"] for r in result] == [1, 2]
+        follow_up_prompt = mock_chat.call_args_list[1][0][0][0]["content"]
+        assert "[1] Chunk 1" not in follow_up_prompt
+        assert "[0] Chunk 0" in follow_up_prompt and "[2] Chunk 2" in follow_up_prompt
+        assert metrics.counter("search.parse_failures") == 1
+        assert metrics.counter("search.salvaged_results") == 1
+        assert metrics.counter("search.followup_calls") == 1
+
+
+@pytest.mark.asyncio
+async def test_truncated_reply_follow_up_is_bounded_to_likely_chunks():
+    """A follow-up should not resend every chunk the reply left out."""
+    with patch.object(GroqService, "chat_completion", new_callable=AsyncMock) as mock_chat:
+        mock_chat.side_effect = [
+            '[{"chunkIndex": 0, "relevanceScore": 9, "reason": "A"}, {"chunkIn',
+            "[]",
+        ]
+        service = GroqService(api_key="key")
+        service.cascade_candidates = 2
+        chunks = [{"index": i, "text": f"Filler text {i}"} for i in range(20)]
+        chunks[15]["text"] = "Late payment penalties apply."
+        await service.semantic_search(chunks, "late payment")
+
+        follow_up_prompt = mock_chat.call_args_list[1][0][0][0]["content"]
+        assert follow_up_prompt.count("\n[") == 2
+        assert "[15] Late payment" in follow_up_prompt
+        assert "[1] Filler text 1" in follow_up_prompt
+
+
+@pytest.mark.asyncio
+async def test_json_validate_failure_returns_failed_generation():
+    """Upstream JSON-mode rejections should hand back the generation to salvage."""
+    with patch("httpx.AsyncClient") as mock_client:
+        mock_response = AsyncMock()
+        mock_response.status_code = 400
+        mock_response.json = lambda: {
+            "error": {
+                "code": "json_validate_failed",
+                "message": "Failed to generate JSON",
+                "failed_generation": '{"results": [{"chunkIndex": 0, "relevanceScore": 8, "reason": "x"}',
+            }
+        }
+        mock_client.return_value.__aenter__.return_value.post = AsyncMock(return_value=mock_response)
+
+        service = GroqService(api_key="key")
+        content = await service.chat_completion([], "Return JSON.", json_mode=True)
+        assert content.startswith('{"results"')
+        payload = mock_client.return_value.__aenter__.return_value.post.call_args[1]["json"]
+        assert payload["response_format"] == {"type": "json_object"}
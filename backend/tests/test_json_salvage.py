@@ -0,0 +1,39 @@
+"""
+Tests for tolerant JSON array parsing of model output.
+
+Covers strict parses, object-wrapped arrays, noisy prose and truncation.
+"""
+
+from app.services.json_salvage import parse_json_array
+
+
+def test_strict_array_and_wrapped_object():
+    """Valid JSON parses strictly, with or without the results wrapper."""
+    plain = parse_json_array('[{"a": 1}]')
+    wrapped = parse_json_array('```json\n{"results": [{"a": 1}]}\n```')
+    assert plain.items == wrapped.items == [{"a": 1}]
+    assert plain.strict and wrapped.strict
+    assert not plain.truncated
+
+
+def test_preamble_and_trailing_text_are_skipped():
+    """Prose around a complete array should not lose any element."""
+    parsed = parse_json_array('Sure! Results: [{"a": 1}, {"b": "x]"}] Hope this helps.')
+    assert parsed.items == [{"a": 1}, {"b": "x]"}]
+    assert not parsed.strict
+    assert not parsed.truncated
+
+
+def test_truncated_array_keeps_complete_objects():
+    """Every object before the cut should be recovered."""
+    parsed = parse_json_array('{"results": [{"a": 1}, {"a": 2}, {"a": 3, "reas')
+    assert parsed.items == [{"a": 1}, {"a": 2}]
+    assert parsed.truncated
+
+
+def test_unparseable_output_returns_nothing():
+    """Output with no JSON at all yields an empty, non-strict result."""
+    parsed = parse_json_array("I could not find anything relevant.")
+    assert parsed.items == []
+    assert not parsed.strict
+    assert not parsed.truncated
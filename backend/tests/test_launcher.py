@@ -0,0 +1,41 @@
+"""
+Tests for the `python -m app` launcher.
+
+Covers worker sizing from CPUs and memory, loop and parser selection,
+and command-line defaults taken from Settings.
+"""
+
+from app import launcher
+from app.config import Settings
+
+
+def test_workers_follow_cpus_unless_memory_is_short(monkeypatch):
+    """One worker per CPU, fewer when memory cannot hold them all."""
+    monkeypatch.setattr(launcher, "available_cpus", lambda: 8)
+    monkeypatch.setattr(launcher, "available_memory", lambda: 16 * 2**30)
+    assert launcher.worker_count(512) == 8
+    assert launcher.worker_count(4096) == 4
+
+    monkeypatch.setattr(launcher, "available_memory", lambda: 256 * 2**20)
+    assert launcher.worker_count(512) == 1
+
+    monkeypatch.setattr(launcher, "available_memory", lambda: None)
+    assert launcher.worker_count(512) == 8
+
+
+def test_fastest_loop_and_parser_fall_back(monkeypatch):
+    """uvloop and httptools are used only when installed."""
+    monkeypatch.setattr(launcher.importlib.util, "find_spec", lambda name: None)
+    assert (launcher.fastest_loop(), launcher.fastest_http()) == ("asyncio", "h11")
+    monkeypatch.setattr(launcher.importlib.util, "find_spec", lambda name: object())
+    assert (launcher.fastest_loop(), launcher.fastest_http()) == ("uvloop", "httptools")
+
+
+def test_command_line_defaults_come_from_settings():
+    """Settings supply defaults; flags override them."""
+    settings = Settings(server_port=9000, max_requests=0, preload_app=False)
+    args = launcher.parse_args([], settings)
+    assert (args.port, args.max_requests, args.preload, args.workers) == (9000, 0, False, 0)
+
+    args = launcher.parse_args(["--port", "8001", "--preload", "--workers", "3"], settings)
+    assert (args.port, args.preload, args.workers) == (8001, True, 3)
@@ -0,0 +1,31 @@
+"""
+Tests for the local BM25 LexicalScorer.
+
+Covers tokenization, ranking order, and zero-overlap queries.
+"""
+
+from app.services.lexical_service import LexicalScorer, tokenize
+
+
+def _chunks():
+    return [
+        {"index": 0, "text": "The parties agree to the payment schedule below."},
+        {"index": 1, "text": "Termination requires thirty days written notice."},
+        {"index": 2, "text": "Payment is due within 30 days; late payment incurs a penalty."},
+    ]
+
+
+def test_tokenize_lowercases_and_drops_stopwords():
+    """Tokenizer should lowercase and remove common stopwords."""
+    assert tokenize("The Payment of Fees") == ["payment", "fees"]
+
+
+def test_top_ranks_by_term_overlap():
+    """Chunks with more query-term matches should rank first."""
+    top = LexicalScorer(_chunks()).top("late payment penalty", k=2)
+    assert [idx for idx, _ in top] == [2, 0]
+
+
+def test_top_excludes_non_matching_chunks():
+    """Queries with no term overlap should return no candidates."""
+    assert LexicalScorer(_chunks()).top("confidentiality", k=5) == []
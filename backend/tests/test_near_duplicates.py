@@ -0,0 +1,97 @@
+"""
+Tests for near-duplicate chunk suppression.
+
+Covers MinHash/LSH clustering, result fan-out in GroqService, and the
+dedup ratio reported by /search.
+"""
+
+import random
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import AsyncClient
+
+from app.services.groq_service import GroqService
+from app.services.near_duplicates import find_near_duplicates, minhash, shingles
+
+random.seed(7)
+_VOCAB = [f"term{i}" for i in range(2000)]
+
+
+def _text(words: int = 300) -> str:
+    return " ".join(random.choice(_VOCAB) for _ in range(words))
+
+
+def _edit(text: str, changes: int) -> str:
+    words = text.split()
+    for _ in range(changes):
+        words[random.randrange(len(words))] = random.choice(_VOCAB)
+    return " ".join(words)
+
+
+def test_clusters_near_identical_chunks():
+    """Lightly edited copies cluster under the first copy; others stay apart."""
+    boilerplate = _text()
+    texts = [boilerplate, _text(), _edit(boilerplate, 4), _text(), _edit(boilerplate, 2), "Signed."]
+    chunks = [{"index": i, "text": t} for i, t in enumerate(texts)]
+
+    clusters = find_near_duplicates(chunks)
+    assert clusters.canonical == {2: 0, 4: 0}
+    assert clusters.ratio == pytest.approx(2 / 6)
+    assert [c["index"] for c in clusters.representatives(chunks)] == [0, 1, 3, 5]
+    assert clusters.canonical_indexes([4, 3, 0]) == [0, 3]
+
+
+def test_dissimilar_chunks_are_not_clustered():
+    """A shared paragraph alone must not make two chunks duplicates."""
+    shared = _text(60)
+    chunks = [
+        {"index": 0, "text": shared + " " + _text(240)},
+        {"index": 1, "text": shared + " " + _text(240)},
+    ]
+    assert find_near_duplicates(chunks).duplicates == 0
+
+
+def test_signature_is_deterministic_and_dense():
+    """Signatures depend only on the text and have no empty bins."""
+    hashed = shingles("a short clause")
+    assert minhash(hashed) == minhash(shingles("A short clause"))
+    assert all(v < (1 << 64) * 64 for v in minhash(hashed))
+
+
+@pytest.mark.asyncio
+async def test_semantic_search_scores_representatives_and_fans_out():
+    """Only representatives reach the model; members inherit their score."""
+    boilerplate = _text()
+    chunks = [
+        {"index": 0, "text": boilerplate},
+        {"index": 1, "text": _text()},
+        {"index": 2, "text": boilerplate},
+    ]
+    clusters = find_near_duplicates(chunks)
+    service = GroqService(api_key="k")
+    with patch.object(service, "score_chunks", new_callable=AsyncMock) as score:
+        score.return_value = [{"chunkIndex": 0, "relevanceScore": 8, "reason": "Definitions"}]
+        results = await service.semantic_search(chunks, "definitions", clusters=clusters)
+
+    assert [c["index"] for c in score.call_args.args[0]] == [0, 1]
+    assert [(r["chunkIndex"], r["relevanceScore"]) for r in results] == [(0, 8), (2, 8)]
+
+
+@pytest.mark.asyncio
+async def test_search_route_reports_dedup_ratio(client: AsyncClient, sample_api_key: str):
+    """/search should report the share of chunks skipped as duplicates."""
+    block = " ".join(f"clause{i}" for i in range(350))
+    # Chunks advance 350 words, so each lines up with one copy of the block
+    document = " ".join([block, block, block, _text(350)])
+    with patch("app.api.routes.search.GroqService") as mock_groq:
+        mock_groq.return_value.semantic_search = AsyncMock(return_value=[])
+        response = await client.post(
+            "/api/search",
+            json={"document_text": document, "query": "clause", "api_key": sample_api_key},
+        )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["dedup_ratio"] > 0
+    clusters = mock_groq.return_value.semantic_search.call_args.kwargs["clusters"]
+    assert clusters.duplicates >= 1
@@ -0,0 +1,128 @@
+"""
+Tests for offloading CPU-bound work and the event-loop lag monitor.
+
+Covers which inputs leave the event loop, thread and process executors,
+the search and registered-document analysis routes on offloaded work,
+and reports of blocking calls.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import AsyncClient
+
+from app.config import Settings
+from app.main import app
+from app.resources import AppResources
+from app.services.loop_monitor import LoopLagMonitor
+from app.services.metrics import MetricsRegistry
+
+DOCUMENT = " ".join(f"word{i % 900} clause{i % 37}" for i in range(3000))
+
+
+def _thread_name(_: str) -> str:
+    return threading.current_thread().name
+
+
+@pytest.mark.asyncio
+async def test_large_inputs_leave_the_event_loop(client: AsyncClient, monkeypatch):
+    """Inputs over offload_min_chars run on a worker thread, others inline."""
+    resources = app.state.resources
+    monkeypatch.setattr(resources.settings, "offload_min_chars", 1000)
+
+    assert await resources.offload("t", 10, _thread_name, "x") == threading.current_thread().name
+    assert (await resources.offload("t", 1000, _thread_name, "x")).startswith("doclens-worker")
+    assert resources.metrics.counter("offload.calls") == 1
+
+
+@pytest.mark.asyncio
+async def test_search_uses_offloaded_chunks(
+    client: AsyncClient, sample_api_key: str, monkeypatch
+):
+    """Offloaded chunking, indexing and de-duplication feed the search."""
+    resources = app.state.resources
+    monkeypatch.setattr(resources.settings, "offload_min_chars", 0)
+    with patch("app.api.routes.search.GroqService") as mock_groq:
+        mock_groq.return_value.semantic_search = AsyncMock(
+            return_value=[{"chunkIndex": 1, "relevanceScore": 8, "reason": "r"}]
+        )
+        response = await client.post(
+            "/api/search",
+            json={"document_text": DOCUMENT, "query": "clause", "mode": "fast", "api_key": sample_api_key},
+        )
+    assert response.status_code == 200
+    kwargs = mock_groq.return_value.semantic_search.call_args.kwargs
+    assert kwargs["chunks"] == resources.chunk_service.chunk(DOCUMENT)
+    assert kwargs["scorer"] is resources.lexical_index(DOCUMENT)
+    assert response.json()["results"][0]["chunk_text"] == kwargs["chunks"][1]["text"]
+    assert resources.metrics.counter("offload.calls") == 3
+
+
+@pytest.mark.asyncio
+async def test_registered_document_analysis_offloads_text_and_entities(
+    client: AsyncClient, sample_api_key: str, monkeypatch
+):
+    """Rejoining a registered document and scanning its entities run off the loop."""
+    resources = app.state.resources
+    response = await client.post("/api/documents/ingest", content=b"Acme Corp pays John Doe $50,000.")
+    document_id = response.json()["document_id"]
+    monkeypatch.setattr(resources.settings, "offload_min_chars", 0)
+    calls = resources.metrics.counter("offload.calls")
+    with patch("app.api.routes.documents.GroqService") as mock_groq:
+        mock_groq.return_value.analyze_document = AsyncMock(
+            return_value="EXECUTIVE_SUMMARY\nA payment."
+        )
+        response = await client.post(
+            f"/api/documents/{document_id}/analyze",
+            json={"sections": ["EXECUTIVE_SUMMARY"], "api_key": sample_api_key},
+        )
+    assert response.status_code == 200
+    assert resources.metrics.counter("offload.calls") == calls + 2
+    kwargs = mock_groq.return_value.analyze_document.call_args.kwargs
+    assert kwargs["document_text"] == "Acme Corp pays John Doe $50,000."
+    assert kwargs["entity_hints"]["Organizations"] == ["Acme Corp"]
+
+
+@pytest.mark.asyncio
+async def test_process_executor_returns_the_same_results():
+    """With offload_executor="process" work runs in spawned processes."""
+    resources = AppResources(
+        Settings(offload_executor="process", offload_min_chars=0, loop_monitor=False)
+    )
+    await resources.startup()
+    try:
+        chunks = await resources.achunk(DOCUMENT)
+        selected = await resources.asalient_text(DOCUMENT, "contracts", 2000)
+    finally:
+        await resources.aclose()
+    assert chunks == resources.chunk_service.chunk(DOCUMENT)
+    assert 0 < len(selected) <= 2000
+
+
+def _block_the_loop():
+    time.sleep(0.3)
+
+
+@pytest.mark.asyncio
+async def test_lag_monitor_reports_blocking_calls(caplog):
+    """A blocking call shows up as lag and is logged with its stack."""
+    metrics = MetricsRegistry()
+    monitor = LoopLagMonitor(metrics, interval=0.02, warn_after=0.1)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        with caplog.at_level(logging.WARNING, logger="app.services.loop_monitor"):
+            _block_the_loop()
+            await asyncio.sleep(0.05)
+    finally:
+        await monitor.aclose()
+
+    assert metrics.counter("loop.blocked") == 1
+    assert "_block_the_loop" in caplog.text
+    lag = metrics.snapshot()["summaries"]["loop.lag_ms"]
+    assert lag["max"] >= 200
+    assert lag["p99"] >= lag["p50"]
@@ -0,0 +1,229 @@
+"""
+Tests for speculative precomputation of opened documents.
+
+Covers cache warming through /documents/open, background analysis being
+reused (including while still in flight, but not while queued for
+admission), and cancellation by the last client holding a document.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import AsyncClient
+
+from app.main import app
+from app.services.precompute import PrecomputeManager
+
+ANALYSIS = (
+    "EXECUTIVE_SUMMARY\nA contract.\n\nKEY_POINTS\n1. Pay\n\nCRITICAL_FLAGS\n1. None\n\n"
+    "NAMED_ENTITIES\nPEOPLE: John Doe\n\nRECOMMENDED_ACTIONS\n1. Sign"
+)
+
+
+async def _settle(key: str) -> None:
+    task = app.state.resources.precompute.pending(key)
+    if task is not None:
+        await asyncio.wait({task})
+
+
+@pytest.mark.asyncio
+async def test_open_warms_chunk_and_index_caches(client: AsyncClient, sample_document_text: str):
+    """Opening a document should build the chunks and BM25 index off-request."""
+    response = await client.post(
+        "/api/documents/open", json={"document_text": sample_document_text}
+    )
+    assert response.status_code == 202
+    body = response.json()
+    assert body["status"] == "started"
+    await _settle(body["document_key"])
+
+    resources = app.state.resources
+    hits = resources.lexical_cache.hits
+    with patch("app.api.routes.search.GroqService") as mock_groq:
+        mock_groq.return_value.semantic_search = AsyncMock(return_value=[])
+        response = await client.post(
+            "/api/search",
+            json={
+                "document_text": sample_document_text,
+                "query": "payment",
+                "mode": "fast",
+                "api_key": "gsk_test",
+            },
+        )
+    assert response.status_code == 200
+    assert resources.lexical_cache.hits == hits + 1
+    kwargs = mock_groq.return_value.semantic_search.call_args.kwargs
+    assert kwargs["scorer"] is not None
+
+
+@pytest.mark.asyncio
+async def test_analyze_reuses_inflight_precompute(
+    client: AsyncClient, sample_document_text: str, sample_api_key: str
+):
+    """/analyze should wait for background analysis instead of repeating it."""
+    text = sample_document_text + " Precompute variant."
+
+    async def slow_analysis(**kwargs):
+        await asyncio.sleep(0.05)
+        return ANALYSIS
+
+    with patch("app.api.routes.precompute.GroqService") as background, patch(
+        "app.api.routes.analysis.GroqService"
+    ) as foreground:
+        background.return_value.analyze_document = AsyncMock(side_effect=slow_analysis)
+        foreground.return_value.analyze_document = AsyncMock(return_value=ANALYSIS)
+        response = await client.post(
+            "/api/documents/open",
+            json={
+                "document_text": text,
+                "document_type": "contracts",
+                "precompute_analysis": True,
+                "api_key": sample_api_key,
+            },
+        )
+        assert response.json()["status"] == "started"
+        response = await client.post(
+            "/api/analyze",
+            json={"document_text": text, "document_type": "contracts", "api_key": sample_api_key},
+        )
+
+    assert response.status_code == 200
+    assert response.json()["sections"]["executive_summary"] == "A contract."
+    background.return_value.analyze_document.assert_awaited_once()
+    foreground.return_value.analyze_document.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_close_cancels_background_work(client: AsyncClient, sample_document_text: str):
+    """DELETE /documents/open/{key} should cancel a running job."""
+    started = asyncio.Event()
+
+    async def stall(*args):
+        started.set()
+        await asyncio.sleep(30)
+
+    with patch("app.api.routes.precompute.precompute_document", side_effect=stall):
+        response = await client.post(
+            "/api/documents/open", json={"document_text": sample_document_text + " close"}
+        )
+        key = response.json()["document_key"]
+        await started.wait()
+        task = app.state.resources.precompute.pending(key)
+        response = await client.delete(f"/api/documents/open/{key}")
+        assert response.status_code == 204
+        await asyncio.wait({task})
+    assert task.cancelled()
+    assert app.state.resources.precompute.pending(key) is None
+
+
+@pytest.mark.asyncio
+async def test_manager_supersedes_client_job_and_caps_tasks():
+    """A client's new document cancels its old job; extra jobs are refused."""
+    manager = PrecomputeManager(max_tasks=2)
+
+    async def stall():
+        await asyncio.sleep(30)
+
+    assert manager.start("doc-a", "alice", stall) == "started"
+    first = manager.pending("doc-a")
+    assert manager.start("doc-a", "alice", stall) == "running"
+    assert manager.start("doc-b", "alice", stall) == "started"
+    await asyncio.wait({first})
+    assert first.cancelled()
+    assert manager.start("doc-c", "bob", stall) == "started"
+    assert manager.start("doc-d", "carol", stall) == "busy"
+    assert manager.metrics.counter("precompute.cancelled") == 1
+    await manager.aclose()
+    assert len(manager) == 0
+
+
+@pytest.mark.asyncio
+async def test_close_keeps_a_job_another_client_has_open():
+    """Only the last client with the document open cancels its job."""
+    manager = PrecomputeManager(max_tasks=2)
+
+    async def stall():
+        await asyncio.sleep(30)
+
+    manager.start("doc-a", "alice", stall)
+    manager.start("doc-a", "bob", stall)
+    task = manager.pending("doc-a")
+    assert not manager.cancel("doc-a", "mallory")
+    assert not manager.cancel("doc-a", "alice")
+    # Alice's next document does not cancel Bob's either
+    manager.start("doc-b", "alice", stall)
+    assert manager.pending("doc-a") is task
+    assert manager.cancel("doc-a", "bob")
+    await asyncio.wait({task})
+    assert task.cancelled()
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_close_from_another_client_keeps_background_work(
+    client: AsyncClient, sample_document_text: str
+):
+    """DELETE from a client that did not open the document is a no-op."""
+    started = asyncio.Event()
+
+    async def stall(*args):
+        started.set()
+        await asyncio.sleep(30)
+
+    with patch("app.api.routes.precompute.precompute_document", side_effect=stall):
+        response = await client.post(
+            "/api/documents/open",
+            json={"document_text": sample_document_text + " shared"},
+            headers={"X-Client-Id": "tab-1"},
+        )
+        key = response.json()["document_key"]
+        await started.wait()
+        response = await client.delete(
+            f"/api/documents/open/{key}", headers={"X-Client-Id": "tab-2"}
+        )
+        assert response.status_code == 204
+        task = app.state.resources.precompute.pending(key)
+        assert task is not None and not task.done()
+        await client.delete(f"/api/documents/open/{key}", headers={"X-Client-Id": "tab-1"})
+        await asyncio.wait({task})
+    assert task.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_analyze_skips_precompute_queued_for_admission(
+    client: AsyncClient, sample_document_text: str, sample_api_key: str
+):
+    """/analyze makes its own call rather than wait behind a queued job."""
+    text = sample_document_text + " Queued variant."
+    manager = app.state.resources.precompute
+    queued = asyncio.Event()
+
+    async def wait_for_slot(resources, key, *args):
+        with manager.queued(key):
+            queued.set()
+            await asyncio.sleep(30)
+
+    with patch(
+        "app.api.routes.precompute.precompute_document", side_effect=wait_for_slot
+    ), patch("app.api.routes.analysis.GroqService") as foreground:
+        foreground.return_value.analyze_document = AsyncMock(return_value=ANALYSIS)
+        response = await client.post(
+            "/api/documents/open", json={"document_text": text, "document_type": "contracts"}
+        )
+        key = response.json()["document_key"]
+        await queued.wait()
+        response = await asyncio.wait_for(
+            client.post(
+                "/api/analyze",
+                json={"document_text": text, "document_type": "contracts", "api_key": sample_api_key},
+            ),
+            timeout=5,
+        )
+        task = manager.pending(key)
+
+    assert response.status_code == 200
+    foreground.return_value.analyze_document.assert_awaited_once()
+    assert task is not None and not task.done()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
@@ -0,0 +1,180 @@
+"""
+Tests for /analyze/progressive.
+
+Covers the fast summary streamed ahead of the full analysis, reuse of
+cached sections, a failing phase reported as an error event, and the
+admission slot both phases share.
+"""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+from httpx import AsyncClient
+
+from app.api.routes.analysis import PREVIEW_CHARS
+from app.main import app
+from app.services.groq_service import GroqServiceError
+
+FULL = """EXECUTIVE_SUMMARY
+A services agreement between Acme and Beta.
+KEY_POINTS
+1. Fees are due monthly."""
+
+
+def _events(response) -> list[dict]:
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def _fake_analyze(calls: list, fail_full: bool = False, fail_summary: bool = False):
+    async def analyze_document(document_text, document_type, sections=None, entity_hints=None, model=None):
+        calls.append((model, sections, len(document_text)))
+        if model is not None:
+            if fail_summary:
+                raise GroqServiceError("Upstream timed out", status_code=504)
+            return "EXECUTIVE_SUMMARY\nA quick summary."
+        await asyncio.sleep(0.05)
+        if fail_full:
+            raise GroqServiceError("Rate limited", status_code=429)
+        return FULL
+
+    return analyze_document
+
+
+@pytest.mark.asyncio
+async def test_fast_summary_arrives_before_full_analysis(
+    client: AsyncClient, sample_api_key: str
+):
+    """The fast model reads a compressed document; the full result follows."""
+    document = "The supplier shall deliver goods and the buyer shall pay fees. " * 800
+    calls = []
+    with patch("app.api.routes.analysis.GroqService") as mock_groq:
+        mock_groq.return_value.analyze_document = _fake_analyze(calls)
+        response = await client.post(
+            "/api/analyze/progressive",
+            json={"document_text": document, "api_key": sample_api_key},
+        )
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    summary, analysis = _events(response)
+    fast_model = app.state.resources.settings.groq_model_fast
+    assert summary == {
+        "event": "summary",
+        "executive_summary": "A quick summary.",
+        "model": fast_model,
+        "compressed": True,
+    }
+    assert analysis["event"] == "analysis"
+    assert analysis["sections"]["key_points"] == ["Fees are due monthly."]
+    fast_call = next(c for c in calls if c[0] == fast_model)
+    assert fast_call[1] == ["EXECUTIVE_SUMMARY"] and fast_call[2] <= PREVIEW_CHARS
+
+
+@pytest.mark.asyncio
+async def test_cached_analysis_serves_both_phases(
+    client: AsyncClient, sample_api_key: str, sample_document_text: str
+):
+    """After /analyze, both events come from the cache without upstream calls."""
+    calls = []
+    body = {
+        "document_text": sample_document_text,
+        "sections": ["EXECUTIVE_SUMMARY", "KEY_POINTS"],
+        "api_key": sample_api_key,
+    }
+    with patch("app.api.routes.analysis.GroqService") as mock_groq:
+        mock_groq.return_value.analyze_document = _fake_analyze(calls)
+        await client.post("/api/analyze", json=body)
+        calls.clear()
+        response = await client.post("/api/analyze/progressive", json=body)
+    summary, analysis = _events(response)
+    assert calls == []
+    assert summary["executive_summary"] == "A services agreement between Acme and Beta."
+    assert summary["model"] == app.state.resources.settings.groq_model_analysis
+    assert analysis["sections"]["executive_summary"] == summary["executive_summary"]
+
+
+@pytest.mark.asyncio
+async def test_failed_full_analysis_is_an_error_event(
+    client: AsyncClient, sample_api_key: str, sample_document_text: str
+):
+    """The summary still arrives; the failed phase becomes an error event."""
+    with patch("app.api.routes.analysis.GroqService") as mock_groq:
+        mock_groq.return_value.analyze_document = _fake_analyze([], fail_full=True)
+        response = await client.post(
+            "/api/analyze/progressive",
+            json={"document_text": sample_document_text, "api_key": sample_api_key},
+        )
+    assert response.status_code == 200
+    summary, error = _events(response)
+    assert summary["compressed"] is False
+    assert error == {
+        "event": "error",
+        "phase": "analysis",
+        "status_code": 429,
+        "detail": "Rate limit exceeded. Please wait and try again.",
+    }
+
+
+@pytest.mark.asyncio
+async def test_failed_summary_is_an_error_event_before_the_analysis(
+    client: AsyncClient, sample_api_key: str, sample_document_text: str
+):
+    """A failed preview is a summary-phase error; the analysis still follows."""
+    with patch("app.api.routes.analysis.GroqService") as mock_groq:
+        mock_groq.return_value.analyze_document = _fake_analyze([], fail_summary=True)
+        response = await client.post(
+            "/api/analyze/progressive",
+            json={"document_text": sample_document_text + " Preview fails.", "api_key": sample_api_key},
+        )
+    error, analysis = _events(response)
+    assert error["event"] == "error" and error["phase"] == "summary"
+    assert error["status_code"] == 504
+    assert analysis["event"] == "analysis"
+    assert analysis["sections"]["executive_summary"] == "A services agreement between Acme and Beta."
+
+
+@pytest.mark.asyncio
+async def test_both_phases_share_one_admission_slot(
+    client: AsyncClient, sample_api_key: str, sample_document_text: str
+):
+    """The preview and the full analysis run side by side in one slot."""
+    admission = app.state.resources.admission
+    active = []
+    analyze = _fake_analyze([])
+
+    async def record(*args, **kwargs):
+        active.append(admission.active)
+        return await analyze(*args, **kwargs)
+
+    with patch("app.api.routes.analysis.GroqService") as mock_groq:
+        mock_groq.return_value.analyze_document = record
+        response = await client.post(
+            "/api/analyze/progressive",
+            json={"document_text": sample_document_text + " Shared slot.", "api_key": sample_api_key},
+        )
+    assert [event["event"] for event in _events(response)] == ["summary", "analysis"]
+    assert active == [1, 1]
+    assert admission.active == 0
+
+
+@pytest.mark.asyncio
+async def test_unexpected_summary_failure_is_an_error_event(
+    client: AsyncClient, sample_api_key: str, sample_document_text: str
+):
+    """A preview crashing outside HTTPException still ends in the analysis."""
+    with patch("app.api.routes.analysis.GroqService") as mock_groq, patch(
+        "app.api.routes.analysis.preview_summary", side_effect=KeyError("boom")
+    ):
+        mock_groq.return_value.analyze_document = _fake_analyze([])
+        response = await client.post(
+            "/api/analyze/progressive",
+            json={"document_text": sample_document_text + " Preview crashes.", "api_key": sample_api_key},
+        )
+    error, analysis = _events(response)
+    assert error == {
+        "event": "error",
+        "phase": "summary",
+        "status_code": 500,
+        "detail": "Summary failed",
+    }
+    assert analysis["event"] == "analysis"
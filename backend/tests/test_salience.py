@@ -0,0 +1,111 @@
+"""
+Tests for extractive salience selection in /analyze.
+
+Covers lexical centrality, chunk scoring and budget filling (including
+documents whose chunks are all over budget), and the text /analyze sends
+for documents longer than its window.
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import AsyncClient
+
+from app.api.routes.analysis import MAX_CHARS, PREVIEW_CHARS, prepare_document
+from app.config import Settings
+from app.main import app
+from app.resources import AppResources
+from app.services.chunk_service import ChunkService
+from app.services.lexical_service import LexicalScorer
+from app.services.salience import GAP_MARKER, salience_scores, select_salient
+
+FILLER = "The parties discussed background matters and general context at length. "
+CLAUSES = (
+    "Either party may terminate this Agreement upon material breach. "
+    "Late payments incur penalties and liquidated damages of $5,000 per day. "
+    "Supplier's liability for damages is capped at the fees paid. "
+)
+
+
+def _contract(paragraphs: int = 500) -> str:
+    # Key clauses deep inside the document, far past the head
+    middle = paragraphs * 3 // 4
+    return "".join(CLAUSES * 6 if i == middle else FILLER for i in range(paragraphs))
+
+
+def test_centrality_prefers_on_topic_chunks():
+    """A chunk sharing the document's vocabulary is more central than an outlier."""
+    chunks = [
+        {"index": 0, "text": "lease rent tenant landlord rent"},
+        {"index": 1, "text": "tenant pays rent to landlord monthly"},
+        {"index": 2, "text": "volcanic basalt erupts"},
+    ]
+    central = LexicalScorer(chunks).centrality()
+    assert central[1] > central[2]
+    assert all(0.0 <= c <= 1.0 for c in central)
+
+
+def test_selection_keeps_clauses_and_opening_within_budget():
+    """Buried clauses and the opening survive; gaps are marked."""
+    chunks = ChunkService(chunk_words=100, chunk_overlap=20).chunk(_contract())
+    scores = salience_scores(chunks, "contracts", LexicalScorer(chunks).centrality())
+    selected = select_salient(chunks, scores, 3000)
+
+    assert len(selected) <= 3000
+    assert selected.startswith(FILLER.split()[0])
+    assert "liquidated damages" in selected
+    assert GAP_MARKER in selected
+
+
+def test_adjacent_chunks_are_joined_without_overlap():
+    """A fully selected document reads as the original words."""
+    text = " ".join(f"w{i}" for i in range(300))
+    chunks = ChunkService(chunk_words=100, chunk_overlap=20).chunk(text)
+    assert select_salient(chunks, [1.0] * len(chunks), 10_000) == text
+
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "合同条款" * 8000,  # No whitespace: one chunk of the whole text
+        " ".join(f"{i:04d}" + "x" * 146 for i in range(1000)),  # 150-char tokens
+    ],
+)
+def test_oversized_chunks_fall_back_to_the_head(text: str):
+    """When no chunk fits the budget, the document's head is kept."""
+    resources = AppResources(Settings(loop_monitor=False))
+    prepared, truncated = prepare_document(resources, text, "contracts")
+    assert truncated
+    assert prepared == text[:MAX_CHARS]
+    preview = resources.salient_text(text, "contracts", PREVIEW_CHARS)
+    assert preview == text[:PREVIEW_CHARS]
+async def test_analyze_sends_salient_chunks_of_long_documents(
+    client: AsyncClient, sample_api_key: str, monkeypatch
+):
+    """Long documents keep their key clauses instead of only the head."""
+    document = _contract(800)
+    assert len(document) > MAX_CHARS and document.index("liquidated") > MAX_CHARS
+
+    async def analyze(selection: str) -> str:
+        monkeypatch.setattr(app.state.resources.settings, "analysis_selection", selection)
+        with patch("app.api.routes.analysis.GroqService") as mock_groq:
+            mock_groq.return_value.analyze_document = AsyncMock(
+                return_value="EXECUTIVE_SUMMARY\nA contract."
+            )
+            response = await client.post(
+                "/api/analyze",
+                json={
+                    "document_text": document,
+                    "document_type": "contracts",
+                    "sections": ["EXECUTIVE_SUMMARY"],
+                    "api_key": sample_api_key,
+                },
+            )
+        assert response.json()["truncated"] is True
+        return mock_groq.return_value.analyze_document.call_args.kwargs["document_text"]
+
+    salient = await analyze("salience")
+    assert len(salient) <= MAX_CHARS
+    assert "liquidated damages" in salient
+    assert "liquidated damages" not in await analyze("head")
@@ -0,0 +1,142 @@
+"""
+Tests for cross-request micro-batching of search scoring calls.
+
+Covers packing concurrent calls into one upstream prompt, splitting the
+reply per request, falling back to single calls on unparseable replies,
+and which calls are batched together (never two callers' calls).
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.services.groq_service import GroqService
+from app.services.metrics import MetricsRegistry
+from app.services.search_batcher import SearchBatcher
+
+
+def _reply(content) -> httpx.Response:
+    if not isinstance(content, str):
+        content = json.dumps(content)
+    return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+
+def _setup(handler, **kwargs):
+    metrics = MetricsRegistry()
+    batcher = SearchBatcher(window_ms=20, metrics=metrics, **kwargs)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    def service(api_key: str = "k", client_id: str | None = None) -> GroqService:
+        return GroqService(
+            api_key=api_key, client=client, metrics=metrics, batcher=batcher, client_id=client_id
+        )
+
+    return service, metrics
+
+
+def _chunks(*texts: str) -> list[dict]:
+    return [{"index": i, "text": t} for i, t in enumerate(texts)]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_upstream_request():
+    """Calls within the window are packed and their results split back."""
+    prompts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        prompts.append(json.loads(request.content)["messages"][1]["content"])
+        return _reply({"results": [
+            {"requestIndex": 1, "chunkIndex": 0, "relevanceScore": 9, "reason": "rent"},
+            {"requestIndex": 0, "chunkIndex": 1, "relevanceScore": 7, "reason": "term"},
+            # Not a chunk of request 0: dropped rather than misattributed
+            {"requestIndex": 0, "chunkIndex": 5, "relevanceScore": 8, "reason": "?"},
+        ]})
+
+    service, metrics = _setup(handler)
+    first, second = await asyncio.gather(
+        service().score_chunks(_chunks("a", "lease term"), "term", "m"),
+        service().score_chunks(_chunks("rent is due"), "rent", "m"),
+    )
+    assert len(prompts) == 1
+    assert '[R0] Search Query: "term"' in prompts[0]
+    assert '[R1] Search Query: "rent"' in prompts[0]
+    assert [(r["chunkIndex"], r["reason"]) for r in first] == [(1, "term")]
+    assert [(r["chunkIndex"], r["reason"]) for r in second] == [(0, "rent")]
+    assert metrics.counter("search.batched_requests") == 2
+
+
+@pytest.mark.asyncio
+async def test_unparseable_batch_falls_back_to_single_calls():
+    """A garbled batch reply is retried as one call per request."""
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        prompt = json.loads(request.content)["messages"][1]["content"]
+        calls.append(prompt)
+        if prompt.startswith("[R0]"):
+            return _reply("Sorry, I cannot help with that.")
+        return _reply({"results": [{"chunkIndex": 0, "relevanceScore": 8, "reason": "ok"}]})
+
+    service, metrics = _setup(handler)
+    results = await asyncio.gather(
+        service().score_chunks(_chunks("x"), "one", "m"),
+        service().score_chunks(_chunks("y"), "two", "m"),
+    )
+    assert len(calls) == 3
+    assert all(r[0]["reason"] == "ok" for r in results)
+    assert metrics.counter("search.batch_fallbacks") == 1
+
+
+@pytest.mark.asyncio
+async def test_large_and_incompatible_calls_are_not_packed():
+    """Big calls skip the batcher; calls on different keys go separately."""
+    keys = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        keys.append(request.headers["authorization"])
+        return _reply({"results": []})
+
+    service, metrics = _setup(handler, max_chars=100)
+    await asyncio.gather(
+        service("k1").score_chunks(_chunks("a"), "q", "m"),
+        service("k2").score_chunks(_chunks("b"), "q", "m"),
+        service("k1").score_chunks(_chunks("c" * 200), "q", "m"),
+    )
+    assert sorted(keys) == ["Bearer k1", "Bearer k1", "Bearer k2"]
+    assert metrics.counter("search.batch_calls") == 0
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_sent_without_waiting():
+    """Reaching max_size flushes immediately instead of after the window."""
+    service, metrics = _setup(lambda request: _reply({"results": []}), max_size=2)
+    service().batcher.window = 60.0
+    await asyncio.wait_for(
+        asyncio.gather(
+            service().score_chunks(_chunks("a"), "q", "m"),
+            service().score_chunks(_chunks("b"), "q", "m"),
+        ),
+        timeout=1,
+    )
+    assert metrics.counter("search.batch_calls") == 1
+
+
+@pytest.mark.asyncio
+async def test_calls_from_different_callers_are_not_packed():
+    """On a shared server-side key, each caller's calls go on their own."""
+    prompts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        prompts.append(json.loads(request.content)["messages"][1]["content"])
+        return _reply({"results": []})
+
+    service, metrics = _setup(handler)
+    await asyncio.gather(
+        service(client_id="ip:10.0.0.1").score_chunks(_chunks("mine"), "q", "m"),
+        service(client_id="ip:10.0.0.2").score_chunks(_chunks("theirs"), "q", "m"),
+    )
+    assert len(prompts) == 2
+    assert not any("mine" in p and "theirs" in p for p in prompts)
+    assert metrics.counter("search.batch_calls") == 0
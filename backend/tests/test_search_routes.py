@@ -136,3 +136,120 @@ async def test_search_401_on_invalid_api_key(
             },
         )
         assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_search_passes_mode_preset(
+    client: AsyncClient,
+    sample_search_document: str,
+    sample_api_key: str,
+):
+    """The requested mode preset should reach GroqService and the response."""
+    with patch("app.api.routes.search.GroqService") as mock_groq:
+        mock_instance = AsyncMock()
+        mock_instance.semantic_search = AsyncMock(return_value=[])
+        mock_groq.return_value = mock_instance
+
+        response = await client.post(
+            "/api/search",
+            json={
+                "document_text": sample_search_document,
+                "query": "payment",
+                "mode": "fast",
+                "api_key": sample_api_key,
+            },
+        )
+        assert response.status_code == 200
+        assert response.json()["mode"] == "fast"
+        assert mock_instance.semantic_search.call_args[1]["mode"] == "fast"
+
+
+@pytest.mark.asyncio
+async def test_search_rejects_unknown_mode(
+    client: AsyncClient,
+    sample_search_document: str,
+    sample_api_key: str,
+):
+    """Unknown presets should fail validation."""
+    response = await client.post(
+        "/api/search",
+        json={
+            "document_text": sample_search_document,
+            "query": "payment",
+            "mode": "turbo",
+            "api_key": sample_api_key,
+        },
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_batch_search_returns_results_per_query(
+    client: AsyncClient,
+    sample_search_document: str,
+    sample_api_key: str,
+):
+    """Batch search should return one result list per query, in order."""
+    with patch("app.api.routes.search.GroqService") as mock_groq:
+        mock_instance = AsyncMock()
+        mock_instance.batch_search = AsyncMock(
+            return_value=[
+                [{"chunkIndex": 0, "relevanceScore": 8, "reason": "Relevant."}],
+                [],
+            ]
+        )
+        mock_groq.return_value = mock_instance
+
+        response = await client.post(
+            "/api/search/batch",
+            json={
+                "document_text": sample_search_document,
+                "queries": ["payment", "termination"],
+                "api_key": sample_api_key,
+            },
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert [r["query"] for r in data["results"]] == ["payment", "termination"]
+        assert data["results"][0]["results"][0]["chunk_index"] == 0
+        assert data["results"][0]["results"][0]["chunk_text"]
+        assert data["results"][1]["results"] == []
+        assert mock_instance.batch_search.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_search_requires_queries(
+    client: AsyncClient,
+    sample_search_document: str,
+    sample_api_key: str,
+):
+    """An empty query list should fail validation."""
+    response = await client.post(
+        "/api/search/batch",
+        json={
+            "document_text": sample_search_document,
+            "queries": [],
+            "api_key": sample_api_key,
+        },
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_batch_search_whitespace_document_makes_no_upstream_call(
+    client: AsyncClient,
+    sample_api_key: str,
+):
+    """A document without words should answer every query with no results."""
+    with patch("app.api.routes.search.GroqService") as mock_groq:
+        response = await client.post(
+            "/api/search/batch",
+            json={"document_text": "   ", "queries": ["a", "b"], "api_key": sample_api_key},
+        )
+    assert response.status_code == 200
+    assert response.json() == {
+        "results": [{"query": "a", "results": []}, {"query": "b", "results": []}],
+        "total_chunks": 0,
+        "dedup_ratio": 0.0,
+    }
+    mock_groq.return_value.batch_search.assert_not_called()
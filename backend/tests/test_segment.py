@@ -0,0 +1,155 @@
+"""
+Tests for memory-mapped index segments and corpus persistence.
+
+Covers the segment round trip, header validation, atomic replacement,
+and a corpus that survives an application restart.
+"""
+
+import struct
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.config import Settings
+from app.main import create_app
+from app.services.corpus_index import CorpusIndex
+from app.services.postings import iter_postings
+from app.services.segment import FORMAT_VERSION, MAGIC, Segment, SegmentFormatError, write_segment
+
+
+def _chunks(*texts: str) -> list[dict]:
+    return [{"index": i, "text": t} for i, t in enumerate(texts)]
+
+
+def test_segment_round_trip(tmp_path):
+    """Columns, text and postings should read back from the mapping."""
+    path = tmp_path / "s.seg"
+    write_segment(path, [("a", _chunks("alpha beta", "beta gamma")), ("b", _chunks("gamma délta"))])
+    segment = Segment(path)
+    try:
+        assert segment.num_chunks == 3
+        assert segment.document_ids() == ["a", "b"]
+        assert list(segment.doc_nums) == [0, 0, 1]
+        assert list(segment.chunk_indexes) == [0, 1, 0]
+        assert segment.text(2) == "gamma délta"
+        assert segment.doc_freq("gamma") == 2
+        assert list(iter_postings(segment.postings("beta"))) == [(0, 1), (1, 1)]
+        assert segment.postings("missing") is None
+    finally:
+        segment.close()
+    assert [p.name for p in tmp_path.iterdir()] == ["s.seg"]
+
+
+def test_segment_rejects_other_format_version(tmp_path):
+    """A segment from another format version must not be read."""
+    path = tmp_path / "s.seg"
+    write_segment(path, [("a", _chunks("alpha"))])
+    data = bytearray(path.read_bytes())
+    assert data[:8] == MAGIC
+    struct.pack_into("<H", data, 8, FORMAT_VERSION + 1)
+    path.write_bytes(bytes(data))
+    with pytest.raises(SegmentFormatError):
+        Segment(path)
+    (tmp_path / "junk.seg").write_bytes(b"not a segment")
+    with pytest.raises(SegmentFormatError):
+        Segment(tmp_path / "junk.seg")
+
+
+def test_corpus_save_and_reload_from_segments(tmp_path):
+    """A reloaded corpus should answer like the original and accept updates."""
+    index = CorpusIndex(num_shards=3, directory=tmp_path)
+    index.add_document("lease", _chunks("rent is due monthly", "this lease renews automatically"))
+    index.add_document("nda", _chunks("confidential information must not be disclosed"))
+    before = index.search("renews confidential", k=5)
+    index.save()
+    index.close()
+
+    reloaded = CorpusIndex(num_shards=3, directory=tmp_path)
+    assert reloaded.load() == 2
+    assert reloaded.search("renews confidential", k=5) == before
+    assert reloaded.stats()["mapped_bytes"] > 0
+    assert reloaded.chunk_text("lease", 1) == "this lease renews automatically"
+
+    # Updates layer on top of the mapped base
+    reloaded.add_document("msa", _chunks("services renew automatically"))
+    reloaded.remove_document("lease")
+    assert {h.document_id for h in reloaded.search("automatically")} == {"msa"}
+    reloaded.close()
+
+    mismatched = CorpusIndex(num_shards=4, directory=tmp_path)
+    assert mismatched.load() == 0
+
+
+def test_workers_sharing_a_directory_keep_each_others_documents(tmp_path):
+    """Saves merge into the segments on disk; other workers remap them."""
+    first = CorpusIndex(num_shards=2, directory=tmp_path)
+    first.add_document("lease", _chunks("rent is due monthly"))
+    first.save()
+    second = CorpusIndex(num_shards=2, directory=tmp_path)
+    second.load()
+    first.add_document("nda", _chunks("confidential information"))
+    second.add_document("msa", _chunks("services renew monthly"))
+    second.remove_document("lease")
+    first.save()
+    second.save()
+
+    # The later save kept the earlier one's document
+    assert {h.document_id for h in second.search("monthly confidential")} == {"msa", "nda"}
+    # The earlier saver sees the later save after a refresh
+    assert first.refresh(force=True) > 0
+    assert {h.document_id for h in first.search("monthly confidential")} == {"msa", "nda"}
+    assert not first.dirty and not second.dirty
+    first.close()
+    second.close()
+
+    reloaded = CorpusIndex(num_shards=2, directory=tmp_path)
+    assert reloaded.load() == 2
+    reloaded.close()
+
+
+def test_changes_during_a_save_stay_unsaved(tmp_path, monkeypatch):
+    """A document added while segments are written is kept for the next save."""
+    import app.services.corpus_index as corpus_index
+
+    index = CorpusIndex(num_shards=1, directory=tmp_path)
+    index.add_document("lease", _chunks("rent is due monthly"))
+    real_write = corpus_index.write_segment
+
+    def write_and_add(*args, **kwargs):
+        # The shard lock is not held while writing
+        index.add_document("nda", _chunks("confidential information"))
+        real_write(*args, **kwargs)
+
+    monkeypatch.setattr(corpus_index, "write_segment", write_and_add)
+    index.save()
+    assert index.dirty
+    assert {h.document_id for h in index.search("rent confidential")} == {"lease", "nda"}
+    monkeypatch.setattr(corpus_index, "write_segment", real_write)
+    index.save()
+    index.close()
+    reloaded = CorpusIndex(num_shards=1, directory=tmp_path)
+    assert reloaded.load() == 2
+    reloaded.close()
+
+
+@pytest.mark.asyncio
+async def test_corpus_survives_app_restart(tmp_path):
+    """Documents indexed before shutdown should be searchable after startup."""
+    settings = Settings(groq_api_key=None, corpus_dir=str(tmp_path))
+    app = create_app(settings)
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            response = await ac.post(
+                "/api/corpus/documents",
+                json={"document_id": "c1", "document_text": "auto renewal applies yearly"},
+            )
+            assert response.status_code == 201
+
+    app = create_app(settings)
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            response = await ac.post("/api/corpus/search", json={"query": "renewal"})
+            assert response.json()["results"][0]["document_id"] == "c1"
+            snapshot = await ac.post("/api/corpus/snapshot")
+            assert snapshot.status_code == 200
+            assert snapshot.json()["documents"] == 1
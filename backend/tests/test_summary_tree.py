@@ -0,0 +1,193 @@
+"""
+Tests for the hierarchical summary tree and the routes that use it.
+
+Covers tree layout, incremental reuse of summaries, overlap-free text
+reconstruction, drill-down summaries, analysis from section summaries,
+and coarse-to-fine search.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import AsyncClient
+
+from app.services.chunk_service import ChunkService
+from app.services.summary_tree import SummaryTree, document_text
+
+
+def _chunks(n: int) -> list[dict]:
+    return [{"index": i, "text": f"chunk {i}"} for i in range(n)]
+
+
+def _summarizers(calls: list):
+    async def summarize_chunk(text):
+        calls.append(("leaf", text))
+        return f"sum({text})"
+
+    async def summarize_parts(parts):
+        calls.append(("parts", len(parts)))
+        return f"sum{len(parts)}"
+
+    return summarize_chunk, summarize_parts
+
+
+def test_tree_layout():
+    """20 chunks with fanout 8 give 3 sections under one root."""
+    tree = SummaryTree(20)
+    assert tree.depth == 3
+    assert [(s.chunk_start, s.chunk_end) for s in tree.sections] == [(0, 8), (8, 16), (16, 20)]
+    assert (tree.root.chunk_start, tree.root.chunk_end) == (0, 20)
+    assert tree.node(1, 3) is None
+
+
+@pytest.mark.asyncio
+async def test_build_generates_each_node_once():
+    """A section builds only its subtree; later builds reuse everything."""
+    tree = SummaryTree(20)
+    calls = []
+    leaf, parts = _summarizers(calls)
+
+    assert await tree.build([tree.node(1, 2)], _chunks(20), leaf, parts) == 5
+    assert tree.summarized() == 5
+
+    calls.clear()
+    generated = await tree.build([tree.root], _chunks(20), leaf, parts)
+    assert generated == 16 + 2 + 1
+    assert [c for c in calls if c[0] == "leaf" and c[1] in {f"chunk {i}" for i in range(16, 20)}] == []
+    assert await tree.build([tree.root], _chunks(20), leaf, parts) == 0
+
+
+@pytest.mark.asyncio
+async def test_lone_child_is_not_summarized_again():
+    """A parent with a single child reuses the child's summary."""
+    tree = SummaryTree(9)
+    calls = []
+    leaf, parts = _summarizers(calls)
+    await tree.build([tree.root], _chunks(9), leaf, parts)
+    assert tree.sections[1].summary == "sum(chunk 8)"
+    assert ("parts", 1) not in calls
+
+
+@pytest.mark.asyncio
+async def test_failed_build_keeps_finished_summaries():
+    """A failing call cancels the build but completed nodes are kept."""
+    tree = SummaryTree(4)
+
+    async def leaf(text):
+        if text == "chunk 3":
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+        return "ok"
+
+    async def parts(items):
+        return "parent"
+
+    with pytest.raises(RuntimeError):
+        await tree.build([tree.root], _chunks(4), leaf, parts)
+    assert tree.summarized() == 3
+    assert tree.root.summary is None
+
+
+def test_document_text_drops_chunk_overlap():
+    """Overlapping chunks rejoin into the original word sequence."""
+    text = " ".join(f"w{i}" for i in range(1000))
+    chunks = ChunkService().chunk(text)
+    assert len(chunks) > 1
+    assert document_text(chunks) == text
+    assert document_text(chunks[1:2]) == chunks[1]["text"]
+
+
+async def _ingest(client: AsyncClient, words: int) -> str:
+    text = " ".join(f"term{i % 97} word{i}" for i in range(words // 2))
+    response = await client.post("/api/documents/ingest", content=text.encode())
+    assert response.status_code == 201
+    return response.json()["document_id"]
+
+
+def _mock_service(mock_groq) -> AsyncMock:
+    service = AsyncMock()
+    service.models = {"fast": "small", "search": "large"}
+    service.cascade_candidates = 8
+    service.summarize_chunk = AsyncMock(side_effect=lambda text: f"leaf {text.split()[1]}")
+    service.summarize_parts = AsyncMock(side_effect=lambda parts: f"{len(parts)} parts")
+    mock_groq.return_value = service
+    return service
+
+
+@pytest.mark.asyncio
+async def test_summary_drill_down_reuses_tree(client: AsyncClient, sample_api_key: str):
+    """The root builds the tree once; drilling into a section is free."""
+    document_id = await _ingest(client, 7000)  # 20 chunks
+    with patch("app.api.routes.documents.GroqService") as mock_groq:
+        service = _mock_service(mock_groq)
+        response = await client.post(
+            f"/api/documents/{document_id}/summary", json={"api_key": sample_api_key}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["depth"] == 3
+        assert data["generated"] == 20 + 3 + 1
+        assert data["node"]["summary"] == "3 parts"
+        assert [c["chunk_end"] for c in data["children"]] == [8, 16, 20]
+
+        response = await client.post(
+            f"/api/documents/{document_id}/summary",
+            json={"level": 1, "index": 2, "api_key": sample_api_key},
+        )
+        assert response.json()["generated"] == 0
+        assert len(response.json()["children"]) == 4
+        assert service.summarize_chunk.await_count == 20
+
+        missing = await client.post(
+            f"/api/documents/{document_id}/summary",
+            json={"level": 1, "index": 9, "api_key": sample_api_key},
+        )
+        assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_analyze_large_document_from_section_summaries(
+    client: AsyncClient, sample_api_key: str
+):
+    """A document beyond the analysis window is analyzed from its sections."""
+    document_id = await _ingest(client, 7000)
+    with patch("app.api.routes.documents.GroqService") as mock_groq:
+        service = _mock_service(mock_groq)
+        service.analyze_document = AsyncMock(return_value="EXECUTIVE_SUMMARY\nLong document.")
+        response = await client.post(
+            f"/api/documents/{document_id}/analyze",
+            json={"sections": ["EXECUTIVE_SUMMARY"], "api_key": sample_api_key},
+        )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["source"] == "summaries"
+    assert data["sections"]["executive_summary"] == "Long document."
+    analyzed = service.analyze_document.call_args.kwargs["document_text"]
+    assert analyzed.startswith("PART 1 (chunks 0-7)\n8 parts")
+
+
+@pytest.mark.asyncio
+async def test_search_scores_only_chunks_of_matching_sections(
+    client: AsyncClient, sample_api_key: str
+):
+    """Section summaries pick where to look; only those chunks are scored."""
+    document_id = await _ingest(client, 7000)
+    with patch("app.api.routes.documents.GroqService") as mock_groq:
+        service = _mock_service(mock_groq)
+
+        async def score(chunks, query, model):
+            if model == "small":
+                return [{"chunkIndex": 1, "relevanceScore": 9, "reason": "section"}]
+            return [{"chunkIndex": chunks[0]["index"], "relevanceScore": 8, "reason": "chunk"}]
+
+        service.score_chunks = AsyncMock(side_effect=score)
+        response = await client.post(
+            f"/api/documents/{document_id}/search",
+            json={"query": "word", "top_sections": 1, "api_key": sample_api_key},
+        )
+    assert response.status_code == 200
+    assert response.json()["mode"] == "tree"
+    assert response.json()["results"][0]["chunk_index"] == 8
+    scored = service.score_chunks.call_args_list[-1].args[0]
+    assert [c["index"] for c in scored] == list(range(8, 16))
@@ -0,0 +1,97 @@
+"""
+Tests for per-request stage timings and the Server-Timing middleware.
+
+Covers the timing recorder, the Server-Timing header on a search request,
+the slow-request log and sampled profiling.
+"""
+
+import json
+import logging
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from unittest.mock import AsyncMock, MagicMock
+
+from app.config import Settings
+from app.main import create_app
+from app.services import timing
+
+
+def test_stage_is_noop_outside_request():
+    """Recording outside a request should neither fail nor leak state."""
+    with timing.stage("chunk"):
+        pass
+    timing.annotate("document_chars", 10)
+    timing.add_usage({"prompt_tokens": 5})
+    assert timing.current() is None
+
+
+def test_stages_accumulate_and_format_header():
+    """Repeated stages add up; the header lists stages then total."""
+    recorded = timing.RequestTimings()
+    recorded.add("upstream", 0.25)
+    recorded.add("upstream", 0.25)
+    recorded.add("chunk", 0.002)
+    header = recorded.header_value()
+    assert header.startswith("upstream;dur=500.0, chunk;dur=2.0, total;dur=")
+
+
+async def _search_with_mock_upstream(settings: Settings):
+    """POST /api/search against a mocked upstream; return the response."""
+    app = create_app(settings)
+    upstream = MagicMock(status_code=200)
+    upstream.json.return_value = {
+        "choices": [{"message": {"content": '[{"chunkIndex": 0, "relevanceScore": 9, "reason": "r"}]'}}],
+        "usage": {"prompt_tokens": 120, "completion_tokens": 30},
+    }
+    async with app.router.lifespan_context(app):
+        app.state.resources.http_client.post = AsyncMock(return_value=upstream)
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as ac:
+            return await ac.post(
+                "/api/search",
+                json={
+                    "document_text": "payment terms " * 50,
+                    "query": "payment",
+                    "api_key": "gsk_test",
+                },
+            )
+
+
+@pytest.mark.asyncio
+async def test_search_response_has_server_timing_stages():
+    """Every pipeline stage of a search should appear in Server-Timing."""
+    response = await _search_with_mock_upstream(Settings(groq_api_key=None))
+    assert response.status_code == 200
+    names = [part.split(";")[0] for part in response.headers["server-timing"].split(", ")]
+    for stage in ("parse", "chunk", "prompt", "upstream", "response_parse", "serialize", "total"):
+        assert stage in names
+
+
+@pytest.mark.asyncio
+async def test_slow_request_log_includes_timings_and_tokens(caplog):
+    """Requests over the threshold should be logged with sizes and tokens."""
+    settings = Settings(groq_api_key=None, slow_request_seconds=0.0)
+    with caplog.at_level(logging.WARNING, logger="app.slow_requests"):
+        await _search_with_mock_upstream(settings)
+    entry = json.loads(caplog.records[-1].getMessage().split(" ", 2)[2])
+    assert entry["path"] == "/api/search"
+    assert entry["status"] == 200
+    assert "upstream" in entry["stages_ms"]
+    assert entry["document_chars"] == len("payment terms " * 50)
+    assert entry["prompt_tokens"] == 120
+    assert entry["completion_tokens"] == 30
+    assert "profile" not in entry
+
+
+@pytest.mark.asyncio
+async def test_sampled_profile_attached_to_slow_request(caplog):
+    """With sampling on, the slow-request entry should carry a profile."""
+    settings = Settings(
+        groq_api_key=None, slow_request_seconds=0.0, profile_sample_rate=1.0
+    )
+    with caplog.at_level(logging.WARNING, logger="app.slow_requests"):
+        await _search_with_mock_upstream(settings)
+    entry = json.loads(caplog.records[-1].getMessage().split(" ", 2)[2])
+    assert "function calls" in entry["profile"]
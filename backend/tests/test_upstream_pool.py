@@ -0,0 +1,130 @@
+"""
+Tests for the upstream key/endpoint pool.
+
+Covers rate-limit header parsing, least-loaded selection, circuit
+breaking, and failover inside GroqService.
+"""
+
+import time
+
+import httpx
+import pytest
+
+from app.config import Settings, UpstreamEndpoint
+from app.services.groq_service import GroqService, GroqServiceError
+from app.services.metrics import MetricsRegistry
+from app.services.upstream_pool import UpstreamMember, UpstreamPool, parse_reset
+
+OK_BODY = {"choices": [{"message": {"content": "hello"}}]}
+
+
+def _pool(*names: str, **kwargs) -> UpstreamPool:
+    members = [UpstreamMember(n, f"https://{n}.test/v1/chat/completions", f"key-{n}") for n in names]
+    return UpstreamPool(members, **kwargs)
+
+
+def _service(pool: UpstreamPool, handler) -> GroqService:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return GroqService(api_key="unused", client=client, pool=pool, metrics=pool.metrics)
+
+
+def test_parse_reset_durations():
+    """Reset headers come as seconds or Groq-style durations."""
+    assert parse_reset("7.5") == 7.5
+    assert parse_reset("2m59.5s") == pytest.approx(179.5)
+    assert parse_reset("250ms") == pytest.approx(0.25)
+    assert parse_reset("soon") is None
+    assert parse_reset(None) is None
+
+
+def test_pool_prefers_least_loaded_member():
+    """Load spreads across members and follows remaining rate-limit budget."""
+    pool = _pool("a", "b")
+    first = pool.acquire()
+    second = pool.acquire()
+    assert {first.name, second.name} == {"a", "b"}
+    pool.release(first, httpx.Response(200, headers={
+        "x-ratelimit-remaining-requests": "1",
+        "x-ratelimit-limit-requests": "100",
+    }), 0.5)
+    pool.release(second, httpx.Response(200, headers={
+        "x-ratelimit-remaining-requests": "90",
+        "x-ratelimit-limit-requests": "100",
+    }), 0.5)
+    assert pool.acquire().name == second.name
+
+
+def test_circuit_opens_after_repeated_failures_and_probes_after_cooldown():
+    """A failing member is skipped, then probed once after the cool-down."""
+    pool = _pool("a", "b", failure_threshold=2, cooldown=60)
+    a = pool.members[0]
+    for _ in range(2):
+        pool.release(pool.acquire(exclude={"b"}), None, 0.1)
+    assert pool.acquire(exclude={"b"}) is None
+    assert pool.metrics.counter("upstream.circuit_opened") == 1
+
+    a.open_until = time.monotonic() - 1
+    probe = pool.acquire(exclude={"b"})
+    assert probe is a
+    assert pool.acquire(exclude={"b"}) is None  # one probe at a time
+    pool.release(probe, httpx.Response(200), 0.2)
+    assert a.open_until == 0 and a.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_service_fails_over_on_rate_limit_and_transport_errors():
+    """429 and connection errors move the call to the next member."""
+    pool = _pool("a", "b", "c")
+    hosts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        hosts.append(request.url.host)
+        assert request.headers["authorization"] == f"Bearer key-{request.url.host[0]}"
+        if request.url.host == "a.test":
+            return httpx.Response(429, headers={"retry-after": "30"}, json={"error": {}})
+        if request.url.host == "b.test":
+            raise httpx.ConnectError("refused")
+        return httpx.Response(200, json=OK_BODY)
+
+    service = _service(pool, handler)
+    assert await service.chat_completion([{"role": "user", "content": "hi"}], "sys") == "hello"
+    assert hosts == ["a.test", "b.test", "c.test"]
+    assert pool.metrics.counter("upstream.failovers") == 2
+    # The rate-limited member is skipped until its limit resets
+    assert not pool.members[0].available(time.monotonic())
+    hosts.clear()
+    await service.chat_completion([{"role": "user", "content": "hi"}], "sys")
+    assert "a.test" not in hosts
+
+
+@pytest.mark.asyncio
+async def test_service_reports_unavailable_when_all_members_are_out():
+    """With every circuit open the call fails fast with 503."""
+    pool = _pool("a", failure_threshold=1)
+    service = _service(pool, lambda request: httpx.Response(500, json={"error": {"message": "boom"}}))
+    with pytest.raises(GroqServiceError) as first:
+        await service.chat_completion([{"role": "user", "content": "hi"}], "sys")
+    assert first.value.status_code == 500
+    with pytest.raises(GroqServiceError) as second:
+        await service.chat_completion([{"role": "user", "content": "hi"}], "sys")
+    assert second.value.status_code == 503
+
+
+def test_pool_from_settings_maps_local_models():
+    """Keys and extra endpoints become members; local models are renamed."""
+    settings = Settings(
+        groq_api_key="k1",
+        groq_api_keys=["k2", "k1"],
+        upstream_endpoints=[
+            UpstreamEndpoint(
+                endpoint="http://localhost:11434/v1/chat/completions",
+                name="local",
+                models={"llama-3.3-70b-versatile": "llama3.3"},
+            )
+        ],
+    )
+    pool = UpstreamPool.from_settings(settings, MetricsRegistry())
+    assert [m.name for m in pool.members] == ["groq-1", "groq-2", "local"]
+    local = pool.members[2]
+    assert local.payload({"model": "llama-3.3-70b-versatile"})["model"] == "llama3.3"
+    assert UpstreamPool.from_settings(Settings(groq_api_key=None)) is None
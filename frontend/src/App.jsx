@@ -6,7 +6,7 @@
  * When backend has GROQ_API_KEY in .env, the API key section is hidden.
  */
 
-import React, { useState, useCallback } from "react";
+import React, { useState, useCallback, useEffect } from "react";
 import { ApiKeySection } from "./components/ApiKeySection";
 import { DocumentIngestion } from "./components/DocumentIngestion";
 import { DocumentTypeSelector } from "./components/DocumentTypeSelector";
@@ -19,6 +19,10 @@ import { AnalysisOutput } from "./components/AnalysisOutput";
 import { useDocument } from "./hooks/useDocument";
 import { useApiKey } from "./hooks/useApiKey";
 import { useApiConfig } from "./hooks/useApiConfig";
+import { analyzeProgressive, closeDocument, openDocument } from "./services/api";
+
+// Wait this long after the document settles before announcing it
+const OPEN_DEBOUNCE_MS = 400;
 
 function App() {
   const { hasApiKey: serverHasKey } = useApiConfig();
@@ -43,6 +47,33 @@ function App() {
   const [error, setError] = useState("");
   const [statusMessage, setStatusMessage] = useState("");
 
+  // Let the backend warm its caches while the user reads; cancelled when
+  // the document or its type changes
+  useEffect(() => {
+    const text = (documentText || "").trim();
+    if (!text) return undefined;
+    let documentKey = null;
+    let closed = false;
+    const timer = setTimeout(() => {
+      openDocument({
+        documentText: text,
+        documentType,
+        precomputeAnalysis: Boolean(effectiveApiKey),
+        apiKey: serverHasKey ? null : apiKey,
+      })
+        .then((data) => {
+          documentKey = data.document_key;
+          if (closed) closeDocument(documentKey).catch(() => {});
+        })
+        .catch(() => {});
+    }, OPEN_DEBOUNCE_MS);
+    return () => {
+      closed = true;
+      clearTimeout(timer);
+      if (documentKey) closeDocument(documentKey).catch(() => {});
+    };
+  }, [documentText, documentType, effectiveApiKey, serverHasKey, apiKey]);
+
   const hideError = useCallback(() => setError(""), []);
   const hideWarning = useCallback(() => setIsTruncated(false), []);
 
@@ -93,28 +124,16 @@ function App() {
           setIsAnalyzing(true);
           setStatusMessage("Analyzing…");
           try {
-            const body = {
-              document_text: text,
-              document_type: documentType,
-            };
-            if (!serverHasKey && apiKey) body.api_key = apiKey;
-
-            const res = await fetch("/api/analyze", {
-              method: "POST",
-              headers: { "Content-Type": "application/json" },
-              body: JSON.stringify(body),
+            const data = await analyzeProgressive({
+              documentText: text,
+              documentType,
+              apiKey: !serverHasKey && apiKey ? apiKey : null,
+              // Show the quick summary while the full analysis finishes
+              onSummary: (event) => {
+                setAnalysisRaw(`EXECUTIVE_SUMMARY\n${event.executive_summary}`);
+                setStatusMessage("Summary ready — finishing the full analysis…");
+              },
             });
-            const data = await res.json();
-            if (!res.ok) {
-              const detail = data.detail;
-              const msg = Array.isArray(detail)
-                ? detail.map((d) => d.msg || JSON.stringify(d)).join("; ")
-                : typeof detail === "string"
-                  ? detail
-                  : "Analysis failed";
-              setError(msg);
-              return;
-            }
             setIsTruncated(data.truncated || false);
             setAnalysisRaw(data.analysis);
           } catch (err) {
@@ -50,6 +50,77 @@ export async function analyzeDocument({
   return data;
 }
 
+/**
+ * Analyze a document progressively: a quick executive summary from the
+ * fast model arrives first (passed to onSummary), then the full analysis.
+ * Reads the NDJSON event stream of /api/analyze/progressive. Only an error
+ * in the analysis phase rejects; a summary-phase error is skipped.
+ *
+ * @param {Object} params
+ * @param {string} params.documentText - Raw document text
+ * @param {string} params.documentType - contracts | research | business | general
+ * @param {string} [params.apiKey] - Groq API key (optional if server has GROQ_API_KEY)
+ * @param {(event: { executive_summary: string, model: string }) => void} [params.onSummary]
+ * @returns {Promise<{ analysis: string, sections: Object, truncated: boolean }>}
+ */
+export async function analyzeProgressive({
+  documentText,
+  documentType,
+  apiKey = null,
+  onSummary = () => {},
+}) {
+  const body = {
+    document_text: documentText,
+    document_type: documentType,
+  };
+  if (apiKey) body.api_key = apiKey;
+
+  const res = await fetch(`${API_BASE}/analyze/progressive`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(body),
+  });
+  if (!res.ok) {
+    const data = await res.json();
+    throw new Error(errorMessage(data.detail, "Analysis failed"));
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    buffered += decoder.decode(value, { stream: !done });
+    const lines = buffered.split("\n");
+    buffered = lines.pop();
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      const event = JSON.parse(line);
+      if (event.event === "summary") onSummary(event);
+      else if (event.event === "analysis") return event;
+      // A failed summary only loses the preview; the analysis still comes
+      else if (event.event === "error" && event.phase === "analysis") {
+        throw new Error(event.detail || "Analysis failed");
+      }
+    }
+    if (done) throw new Error("Analysis stream ended early");
+  }
+}
+
+/**
+ * Turn a FastAPI error detail (string or validation list) into a message.
+ *
+ * @param {string|Array|undefined} detail
+ * @param {string} fallback
+ * @returns {string}
+ */
+export function errorMessage(detail, fallback) {
+  if (Array.isArray(detail)) {
+    return detail.map((d) => d.msg || JSON.stringify(d)).join("; ");
+  }
+  return typeof detail === "string" ? detail : fallback;
+}
+
 /**
  * Perform semantic search within a document.
  *
@@ -76,3 +147,50 @@ export async function semanticSearch({
   if (!res.ok) throw new Error(data.detail || "Search failed");
   return data;
 }
+
+/**
+ * Tell the backend a document was opened so it can warm its caches
+ * (chunks, search index and, with precomputeAnalysis, the analysis).
+ * Returns immediately; the work runs in the background.
+ *
+ * @param {Object} params
+ * @param {string} params.documentText - Document text, exactly as later analyzed
+ * @param {string} params.documentType - contracts | research | business | general
+ * @param {boolean} [params.precomputeAnalysis] - Also generate the analysis
+ * @param {string} [params.apiKey] - Groq API key (optional if server has GROQ_API_KEY)
+ * @returns {Promise<{ document_key: string, status: string }>}
+ */
+export async function openDocument({
+  documentText,
+  documentType,
+  precomputeAnalysis = false,
+  apiKey = null,
+}) {
+  const body = {
+    document_text: documentText,
+    document_type: documentType,
+    precompute_analysis: precomputeAnalysis,
+  };
+  if (apiKey) body.api_key = apiKey;
+
+  const res = await fetch(`${API_BASE}/documents/open`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(body),
+  });
+  const data = await res.json();
+  if (!res.ok) throw new Error(data.detail || "Open failed");
+  return data;
+}
+
+/**
+ * Cancel background work for a document that is no longer open.
+ *
+ * @param {string} documentKey - document_key returned by openDocument
+ * @returns {Promise<void>}
+ */
+export async function closeDocument(documentKey) {
+  await fetch(`${API_BASE}/documents/open/${encodeURIComponent(documentKey)}`, {
+    method: "DELETE",
+  });
+}
@@ -1,11 +1,31 @@
 /**
  * Tests for API service layer
  *
- * Covers analyzeDocument and semanticSearch request structure and error handling.
+ * Covers analyzeDocument, semanticSearch and openDocument/closeDocument
+ * request structure and error handling.
  */
 
 import { describe, it, expect, vi, beforeEach } from "vitest";
-import { analyzeDocument, semanticSearch } from "./api";
+import {
+  analyzeDocument,
+  analyzeProgressive,
+  closeDocument,
+  openDocument,
+  semanticSearch,
+} from "./api";
+
+// A fetch body whose reader yields the given strings as byte chunks
+function streamBody(...chunks) {
+  const encoded = chunks.map((c) => new TextEncoder().encode(c));
+  return {
+    getReader: () => ({
+      read: async () =>
+        encoded.length
+          ? { done: false, value: encoded.shift() }
+          : { done: true, value: undefined },
+    }),
+  };
+}
 
 describe("api service", () => {
   beforeEach(() => {
@@ -71,6 +91,61 @@ describe("api service", () => {
     });
   });
 
+  describe("analyzeProgressive", () => {
+    it("passes the summary on and resolves with the full analysis", async () => {
+      const summary = { event: "summary", executive_summary: "Quick.", model: "fast" };
+      const analysis = { event: "analysis", analysis: "EXECUTIVE_SUMMARY\nFull.", truncated: false };
+      fetch.mockResolvedValueOnce({
+        ok: true,
+        // Events split across reads, as network chunks may be
+        body: streamBody(JSON.stringify(summary) + "\n" + JSON.stringify(analysis).slice(0, 10),
+          JSON.stringify(analysis).slice(10) + "\n"),
+      });
+      const onSummary = vi.fn();
+
+      const result = await analyzeProgressive({
+        documentText: "text",
+        documentType: "general",
+        onSummary,
+      });
+
+      expect(fetch.mock.calls[0][0]).toBe("/api/analyze/progressive");
+      expect(onSummary).toHaveBeenCalledWith(summary);
+      expect(result.analysis).toBe("EXECUTIVE_SUMMARY\nFull.");
+    });
+
+    it("throws on an analysis-phase error event", async () => {
+      const error = { event: "error", phase: "analysis", status_code: 429, detail: "Rate limit" };
+      fetch.mockResolvedValueOnce({
+        ok: true,
+        body: streamBody(JSON.stringify(error) + "\n"),
+      });
+
+      await expect(
+        analyzeProgressive({ documentText: "text", documentType: "general" })
+      ).rejects.toThrow("Rate limit");
+    });
+
+    it("skips a summary-phase error and resolves with the analysis", async () => {
+      const error = { event: "error", phase: "summary", status_code: 504, detail: "Timeout" };
+      const analysis = { event: "analysis", analysis: "EXECUTIVE_SUMMARY\nFull.", truncated: false };
+      fetch.mockResolvedValueOnce({
+        ok: true,
+        body: streamBody(JSON.stringify(error) + "\n" + JSON.stringify(analysis) + "\n"),
+      });
+      const onSummary = vi.fn();
+
+      const result = await analyzeProgressive({
+        documentText: "text",
+        documentType: "general",
+        onSummary,
+      });
+
+      expect(onSummary).not.toHaveBeenCalled();
+      expect(result.analysis).toBe("EXECUTIVE_SUMMARY\nFull.");
+    });
+  });
+
   describe("semanticSearch", () => {
     it("sends correct request structure", async () => {
       fetch.mockResolvedValueOnce({
@@ -114,4 +189,40 @@ describe("api service", () => {
       ).rejects.toThrow("Search failed");
     });
   });
+
+  describe("openDocument", () => {
+    it("requests background precomputation", async () => {
+      fetch.mockResolvedValueOnce({
+        ok: true,
+        json: async () => ({ document_key: "abc", status: "started" }),
+      });
+
+      const data = await openDocument({
+        documentText: "Document content here",
+        documentType: "contracts",
+        precomputeAnalysis: true,
+      });
+
+      expect(data.document_key).toBe("abc");
+      expect(fetch).toHaveBeenCalledWith("/api/documents/open", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          document_text: "Document content here",
+          document_type: "contracts",
+          precompute_analysis: true,
+        }),
+      });
+    });
+
+    it("cancels with closeDocument", async () => {
+      fetch.mockResolvedValueOnce({ ok: true });
+
+      await closeDocument("abc");
+
+      expect(fetch).toHaveBeenCalledWith("/api/documents/open/abc", {
+        method: "DELETE",
+      });
+    });
+  });
 });